@@ -2,9 +2,15 @@ from flask import Flask
 from flask_cors import CORS
 from config import configuraciones
 import os
+import time
+
+def _milisegundos_desde(inicio):
+    return round((time.perf_counter() - inicio) * 1000, 1)
 
 def crear_app(nombre_config='default'):
     """Factory para crear la aplicación Flask"""
+    inicio = time.perf_counter()
+    tiempos_inicio = {}
     app = Flask(__name__)
     
     # Cargar configuración
@@ -24,30 +30,58 @@ def crear_app(nombre_config='default'):
          allow_headers=['Content-Type', 'Authorization'],
          methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
     
+    # Métricas por endpoint y encabezado Server-Timing
+    if app.config['METRICAS_HABILITADAS']:
+        from servicios.metricas import instrumentar_app
+        instrumentar_app(app)
+    
+    # Sesión HTTP con pool compartida por los clientes de Azure y Graph
+    from servicios.transporte_http import transporte_http
+    transporte_http.configurar(app.config)
+    
     # Inicializar servicios de Azure con contexto de aplicación
     with app.app_context():
-        from servicios.cosmos_db import servicio_cosmos
-        from servicios.azure_storage import servicio_storage
+        from servicios.cosmos_db import servicio_cosmos, backend_simulado, cosmos_configurado
+        from servicios.azure_storage import servicio_storage, storage_local, storage_configurado
+        
+        # Con INICIO_RAPIDO no se crean base de datos ni contenedores (ver scripts/aprovisionar.py)
+        aprovisionar = not app.config['INICIO_RAPIDO']
         
         # Inicializar CosmosDB
-        if app.config.get('COSMOS_ENDPOINT') and app.config.get('COSMOS_KEY'):
-            cosmos_inicializado = servicio_cosmos.inicializar()
-            if cosmos_inicializado:
+        inicio_fase = time.perf_counter()
+        if cosmos_configurado(app.config):
+            cosmos_inicializado = servicio_cosmos.inicializar(aprovisionar)
+            if cosmos_inicializado and backend_simulado(app.config):
+                print(f"✓ CosmosDB simulado ({app.config['COSMOS_BACKEND']}) inicializado correctamente")
+            elif cosmos_inicializado:
                 print('✓ CosmosDB inicializado correctamente')
             else:
                 print('✗ Error: No se pudo inicializar CosmosDB')
         else:
             print('✗ Error: CosmosDB no configurado')
+        tiempos_inicio['cosmos_ms'] = _milisegundos_desde(inicio_fase)
         
         # Inicializar Azure Storage (opcional)
-        if app.config.get('AZURE_STORAGE_CONNECTION_STRING'):
-            storage_inicializado = servicio_storage.inicializar()
-            if storage_inicializado:
+        inicio_fase = time.perf_counter()
+        if storage_configurado(app.config):
+            storage_inicializado = servicio_storage.inicializar(aprovisionar)
+            if storage_inicializado and storage_local(app.config):
+                print(f"✓ Storage local ({app.config['AZURE_STORAGE_LOCAL_RUTA']}) inicializado correctamente")
+            elif storage_inicializado:
                 print('✓ Azure Storage inicializado correctamente')
             else:
                 print('⚠ Azure Storage no disponible - Endpoints de recursos deshabilitados')
         else:
             print('⚠ Azure Storage no configurado - Endpoints de recursos deshabilitados')
+        tiempos_inicio['storage_ms'] = _milisegundos_desde(inicio_fase)
+        
+        # Escritura diferida de respuestas (reenvía lo pendiente de una ejecución anterior)
+        if app.config['RESPUESTAS_ESCRITURA_DIFERIDA']:
+            from servicios.cola_respuestas import cola_respuestas
+            if cola_respuestas.iniciar(app):
+                print('✓ Cola de respuestas iniciada')
+            else:
+                print('⚠ Cola de respuestas no disponible - Las respuestas se guardan directamente')
     
     # Registrar blueprints
     from rutas.recursos import bp_recursos
@@ -57,6 +91,7 @@ def crear_app(nombre_config='default'):
     from rutas.auth import bp_auth
     # from rutas.documentos import bp_documentos  # DEPRECATED: Movido a configuracion
     from rutas.configuracion_induccion import bp_configuracion
+    from rutas.induccion import bp_induccion
     from rutas.video_upload import bp_video
     
     app.register_blueprint(bp_recursos, url_prefix='/api/recursos')
@@ -66,25 +101,71 @@ def crear_app(nombre_config='default'):
     app.register_blueprint(bp_auth, url_prefix='/api/auth')
     # app.register_blueprint(bp_documentos, url_prefix='/api/documentos')  # DEPRECATED
     app.register_blueprint(bp_configuracion, url_prefix='/api/configuracion')
+    app.register_blueprint(bp_induccion, url_prefix='/api/induccion')
     app.register_blueprint(bp_video, url_prefix='/api/video')
     
+    # Descargas con URL firmadas del almacenamiento local
+    if storage_local(app.config):
+        from rutas.almacenamiento_local import bp_almacenamiento
+        app.register_blueprint(bp_almacenamiento, url_prefix='/api/almacenamiento')
+    
     # Ruta de prueba
     @app.route('/api/salud', methods=['GET'])
     def verificar_salud():
-        from servicios.cosmos_db import servicio_cosmos
-        from servicios.azure_storage import servicio_storage
+        from servicios.cosmos_db import servicio_cosmos, backend_simulado
+        from servicios.azure_storage import servicio_storage, storage_local
+        from servicios.cola_respuestas import cola_respuestas
         
         estado_cosmos = servicio_cosmos.cliente is not None
         estado_storage = servicio_storage.cliente_blob is not None
         
-        return {
+        if estado_cosmos and backend_simulado(app.config):
+            texto_cosmos = f"simulado ({app.config['COSMOS_BACKEND']})"
+        elif estado_cosmos:
+            texto_cosmos = 'conectado'
+        elif servicio_cosmos.conexion_diferida is not None:
+            texto_cosmos = 'se conectará en el primer uso'
+        else:
+            texto_cosmos = 'no configurado'
+        
+        if estado_storage and storage_local(app.config):
+            texto_storage = 'local'
+        elif estado_storage:
+            texto_storage = 'conectado'
+        else:
+            texto_storage = 'no configurado'
+        
+        salud = {
             'estado': 'activo', 
             'mensaje': 'API de Inducción GxP funcionando',
             'servicios': {
-                'cosmos_db': 'conectado' if estado_cosmos else 'no configurado',
-                'azure_storage': 'conectado' if estado_storage else 'no configurado'
-            }
-        }, 200
+                'cosmos_db': texto_cosmos,
+                'azure_storage': texto_storage
+            },
+            'inicio': tiempos_inicio
+        }
+        if cola_respuestas.activa:
+            salud['cola_respuestas'] = cola_respuestas.contar()
+        
+        return salud, 200
+    
+    if app.config['METRICAS_HABILITADAS']:
+        @app.route('/api/metricas', methods=['GET'])
+        def obtener_metricas():
+            """Histogramas de RU y latencia por endpoint en formato de texto de Prometheus"""
+            from servicios.metricas import registro
+            
+            return registro.formato_prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+    
+    # Tiempo de arranque, para detectar regresiones (también en /api/salud y /api/metricas)
+    tiempos_inicio['total_ms'] = _milisegundos_desde(inicio)
+    modo = 'inicio rápido' if app.config['INICIO_RAPIDO'] else 'con aprovisionamiento'
+    print(f"✓ Aplicación lista en {tiempos_inicio['total_ms']} ms ({modo}; CosmosDB "
+          f"{tiempos_inicio['cosmos_ms']} ms, Storage {tiempos_inicio['storage_ms']} ms)")
+    if app.config['METRICAS_HABILITADAS']:
+        from servicios.metricas import registro
+        for fase, milisegundos in tiempos_inicio.items():
+            registro.observar('induccion_inicio_segundos', {'fase': fase.removesuffix('_ms')}, milisegundos / 1000)
     
     return app
 
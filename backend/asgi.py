@@ -0,0 +1,113 @@
+"""
+Punto de entrada ASGI (modo asíncrono)
+
+Las rutas de rutas/asincronas.py se atienden con Quart y los clientes
+asíncronos de CosmosDB y Storage, así un solo proceso sostiene cientos de
+envíos concurrentes. Cualquier otra petición (y los preflight OPTIONS, que
+resuelve Flask-CORS) pasa a la aplicación Flask de siempre, que corre en
+hilos mediante el adaptador WSGI de hypercorn.
+
+Uso:
+    pip install -r requirements-async.txt
+    hypercorn asgi:app --bind 0.0.0.0:5000 --workers 2
+"""
+import os
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from quart import Quart, request
+from werkzeug.exceptions import HTTPException
+from app import crear_app
+from rutas.asincronas import bp_asincrono
+from servicios.cosmos_db import servicio_cosmos, cosmos_configurado
+from servicios.cosmos_db_async import servicio_cosmos_async
+from servicios.azure_storage_async import servicio_storage_async
+from servicios.azure_storage import storage_configurado
+
+
+def _con_primer_fragmento(app_wsgi):
+    """Hace que la respuesta WSGI entregue siempre al menos un fragmento
+
+    El adaptador de hypercorn envía el inicio de la respuesta (estado y
+    encabezados) al recibir el primer fragmento del cuerpo, así que las
+    respuestas vacías de Flask (preflight OPTIONS, 304) quedarían sin enviar.
+    """
+    def aplicacion(environ, start_response):
+        cuerpo = app_wsgi(environ, start_response)
+
+        def fragmentos():
+            try:
+                yield b''
+                yield from cuerpo
+            finally:
+                if hasattr(cuerpo, 'close'):
+                    cuerpo.close()
+
+        return fragmentos()
+
+    return aplicacion
+
+
+def crear_app_asgi(nombre_config='default'):
+    """Crea la aplicación ASGI que combina las rutas asíncronas con la aplicación Flask"""
+    app_flask = crear_app(nombre_config)
+
+    app_async = Quart(__name__, static_folder=None)
+    app_async.config.update(app_flask.config)
+    app_async.register_blueprint(bp_asincrono)
+
+    @app_async.before_serving
+    async def inicializar_servicios():
+        aprovisionar = not app_async.config['INICIO_RAPIDO']
+        if cosmos_configurado(app_async.config):
+            if await servicio_cosmos_async.inicializar(app_async.config, aprovisionar):
+                # Misma caché que el servicio síncrono: las escrituras de uno invalidan al otro
+                if servicio_cosmos.cache is not None:
+                    servicio_cosmos_async.configurar_cache(servicio_cosmos.cache, servicio_cosmos.ttl_cache)
+                print('✓ CosmosDB (async) inicializado correctamente')
+            else:
+                print('✗ Error: No se pudo inicializar CosmosDB (async)')
+
+        if storage_configurado(app_async.config):
+            if await servicio_storage_async.inicializar(app_async.config, aprovisionar):
+                print('✓ Azure Storage (async) inicializado correctamente')
+
+    @app_async.after_serving
+    async def cerrar_servicios():
+        await servicio_cosmos_async.cerrar()
+        await servicio_storage_async.cerrar()
+
+    @app_async.after_request
+    async def agregar_cors(respuesta):
+        # Equivalente a la configuración de Flask-CORS de app.py
+        origen = request.headers.get('Origin')
+        if origen and origen in app_async.config['CORS_ORIGINS']:
+            respuesta.headers['Access-Control-Allow-Origin'] = origen
+            respuesta.headers['Access-Control-Allow-Credentials'] = 'true'
+            respuesta.headers['Vary'] = 'Origin'
+        return respuesta
+
+    # El adaptador acumula el cuerpo completo en memoria antes de pasarlo a Flask
+    app_wsgi = AsyncioWSGIMiddleware(
+        _con_primer_fragmento(app_flask), max_body_size=app_flask.config['ASGI_MAX_CUERPO_WSGI']
+    )
+    rutas_asincronas = app_async.url_map.bind('')
+
+    def es_ruta_asincrona(scope):
+        if scope['method'] == 'OPTIONS':
+            return False
+        try:
+            rutas_asincronas.match(scope['path'], method=scope['method'])
+            return True
+        except HTTPException:
+            return False
+
+    async def aplicacion(scope, receive, send):
+        # lifespan va a Quart para que corran before_serving/after_serving
+        if scope['type'] == 'lifespan' or (scope['type'] == 'http' and es_ruta_asincrona(scope)):
+            await app_async(scope, receive, send)
+        else:
+            await app_wsgi(scope, receive, send)
+
+    return aplicacion
+
+
+app = crear_app_asgi(os.getenv('FLASK_ENV', 'default'))
@@ -0,0 +1,129 @@
+"""
+Benchmark: consulta entre particiones vs. lectura puntual de induccion_general
+
+Mide latencia (p50/p95) y RU por operación para las dos formas de leer el
+documento de configuración. Pensado para ejecutarse contra el emulador local
+de CosmosDB (o una cuenta de pruebas), nunca contra producción, o contra el
+backend simulado (COSMOS_BACKEND=memoria o sqlite, ver
+servicios/cosmos_simulado.py) con su latencia y RU simuladas.
+
+Junto a induccion_general se guardan --otros documentos de otros tipos, como
+los que la aplicación tiene en el contenedor de configuración (estadísticas y
+versiones de preguntas): la consulta entre particiones los recorre todos.
+
+Uso:
+    COSMOS_ENDPOINT=https://localhost:8081/ COSMOS_KEY=<clave-emulador> \\
+        python benchmarks/benchmark_configuracion.py --iteraciones 200
+    COSMOS_BACKEND=memoria COSMOS_SIMULADO_LATENCIA_MS=8 \\
+        python benchmarks/benchmark_configuracion.py --iteraciones 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from azure.cosmos import CosmosClient, PartitionKey
+from dotenv import load_dotenv
+
+# Permite importar config y servicios al ejecutar desde backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+from config import configuraciones  # noqa: E402
+from servicios.cosmos_db import backend_simulado  # noqa: E402
+from servicios.cosmos_simulado import crear_cliente_simulado  # noqa: E402
+
+CONSULTA = "SELECT * FROM c WHERE c.tipo = 'induccion' AND c.id = 'induccion_general'"
+
+
+def _cargo(contenedor):
+    return float(contenedor.client_connection.last_response_headers.get('x-ms-request-charge', 0))
+
+
+def medir_consulta(contenedor):
+    """Consulta entre particiones (comportamiento anterior). Suma el RU de cada página"""
+    inicio = time.perf_counter()
+    cargo = 0.0
+    for pagina in contenedor.query_items(query=CONSULTA, enable_cross_partition_query=True).by_page():
+        list(pagina)
+        cargo += _cargo(contenedor)
+    return (time.perf_counter() - inicio) * 1000, cargo
+
+
+def medir_lectura_puntual(contenedor):
+    """Lectura puntual con read_item (comportamiento actual)"""
+    inicio = time.perf_counter()
+    contenedor.read_item(item='induccion_general', partition_key='induccion')
+    return (time.perf_counter() - inicio) * 1000, _cargo(contenedor)
+
+
+def resumir(nombre, mediciones):
+    latencias = sorted(m[0] for m in mediciones)
+    cargos = [m[1] for m in mediciones]
+    p95 = latencias[int(len(latencias) * 0.95) - 1]
+    print(f"{nombre:>16}  p50 {statistics.median(latencias):7.2f} ms  "
+          f"p95 {p95:7.2f} ms  RU promedio {statistics.mean(cargos):6.2f}")
+
+
+def _crear_cliente():
+    """CosmosClient, o el cliente simulado si COSMOS_BACKEND es memoria o sqlite"""
+    config = {clave: getattr(configuraciones['default'], clave)
+              for clave in dir(configuraciones['default']) if clave.isupper()}
+    if backend_simulado(config):
+        print(f"CosmosDB simulado ({config['COSMOS_BACKEND']}), latencia "
+              f"{config['COSMOS_SIMULADO_LATENCIA_MS']:g} ms + hasta "
+              f"{config['COSMOS_SIMULADO_LATENCIA_VARIACION_MS']:g} ms")
+        return crear_cliente_simulado(config, con_metricas=False)
+    return CosmosClient(os.environ['COSMOS_ENDPOINT'], os.environ['COSMOS_KEY'])
+
+
+def _otros_documentos(total):
+    """Documentos de estadísticas y versiones de preguntas como los de la aplicación"""
+    for i in range(total):
+        if i % 10 == 0:
+            yield {'id': f'estadisticas_cuestionario_{i}', 'tipo': 'estadisticas',
+                   'total_respuestas': 100, 'suma_calificaciones': 8000}
+        else:
+            yield {'id': f'cuestionario_{i // 10}:{i:08x}', 'tipo': 'version_preguntas',
+                   'cuestionario_id': f'cuestionario_{i // 10}',
+                   'preguntas': [{'id': f'p{n}', 'pregunta': 'Texto de la pregunta ' * 5} for n in range(10)]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iteraciones', type=int, default=100)
+    parser.add_argument('--base-datos', default='induccion_gxp_benchmark')
+    parser.add_argument('--otros', type=int, default=100,
+                        help='documentos de otros tipos en el contenedor de configuración')
+    args = parser.parse_args()
+
+    cliente = _crear_cliente()
+    base_datos = cliente.create_database_if_not_exists(id=args.base_datos)
+    contenedor = base_datos.create_container_if_not_exists(
+        id='configuracion', partition_key=PartitionKey(path='/tipo')
+    )
+    contenedor.upsert_item({
+        'id': 'induccion_general',
+        'tipo': 'induccion',
+        'titulo': 'Inducción gestión por procesos',
+        'descripcion': 'Documento de prueba para el benchmark',
+        'documentos': [
+            {'id': f'doc_{i}', 'nombre': f'Documento {i}', 'tipo': 'pdf',
+             'url': f'https://ejemplo/{i}.pdf', 'orden': i, 'activo': True}
+            for i in range(20)
+        ]
+    })
+    for documento in _otros_documentos(args.otros):
+        contenedor.upsert_item(documento)
+
+    # Calentamiento (conexiones, plan de consulta)
+    medir_consulta(contenedor)
+    medir_lectura_puntual(contenedor)
+
+    resumir('consulta', [medir_consulta(contenedor) for _ in range(args.iteraciones)])
+    resumir('lectura puntual', [medir_lectura_puntual(contenedor) for _ in range(args.iteraciones)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark de memoria: lista + jsonify vs. streaming (arreglo JSON y NDJSON)
+
+Cada combinación de modo y número de filas se ejecuta en un proceso nuevo para
+que el pico de RSS (ru_maxrss) refleje solo esa respuesta.
+
+Uso:
+    python benchmarks/benchmark_streaming.py
+    python benchmarks/benchmark_streaming.py --filas 1000 10000 100000
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+
+DIRECTORIO_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODOS = ['lista', 'json', 'ndjson']
+FILAS_POR_DEFECTO = [1000, 10000, 50000, 100000]
+
+
+def generar_respuestas(total):
+    """Genera documentos de respuesta sintéticos con 10 preguntas cada uno"""
+    for i in range(total):
+        yield {
+            'id': f'cuestionario_demo_{i:08d}',
+            'cuestionario_id': 'cuestionario_demo',
+            'nombre': f'Usuario {i}',
+            'cuestionario_titulo': 'Cuestionario de prueba',
+            'respuestas': [
+                {
+                    'orden': n,
+                    'titulo': f'Pregunta {n}',
+                    'pregunta': 'Texto de la pregunta ' * 5,
+                    'tipo_pregunta': 'multiple_choice',
+                    'opciones': ['Opción A', 'Opción B', 'Opción C', 'Opción D'],
+                    'respuesta_correcta': 'Opción B',
+                    'respuesta_usuario': 'Opción A',
+                    'es_correcta': n % 2 == 0
+                }
+                for n in range(1, 11)
+            ],
+            'calificacion': 50.0,
+            'aprobado': False,
+            'fecha_completado': '2024-01-01T00:00:00-05:00'
+        }
+
+
+def ejecutar_caso(modo, filas):
+    """Ejecuta un caso dentro del proceso actual y retorna (bytes, pico_rss_kb)"""
+    sys.path.insert(0, DIRECTORIO_BACKEND)
+    from flask import Flask, jsonify
+    from utilidades.streaming import responder_en_streaming
+
+    app = Flask(__name__)
+    url = '/?formato=ndjson' if modo == 'ndjson' else '/'
+
+    with app.test_request_context(url):
+        if modo == 'lista':
+            respuestas = list(generar_respuestas(filas))
+            respuesta = jsonify({'total': len(respuestas), 'respuestas': respuestas})
+        else:
+            respuesta = responder_en_streaming(generar_respuestas(filas), clave='respuestas', contar=True)
+
+        total_bytes = sum(len(fragmento) for fragmento in respuesta.response)
+
+    return total_bytes, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, nargs='+', default=FILAS_POR_DEFECTO)
+    parser.add_argument('--caso', nargs=2, metavar=('MODO', 'FILAS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.caso:
+        total_bytes, pico_kb = ejecutar_caso(args.caso[0], int(args.caso[1]))
+        print(f'{total_bytes} {pico_kb}')
+        return
+
+    print(f"{'filas':>10} {'modo':>8} {'MB enviados':>12} {'pico RSS MB':>12}")
+    for filas in args.filas:
+        for modo in MODOS:
+            salida = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--caso', modo, str(filas)],
+                capture_output=True, text=True, check=True
+            ).stdout.split()
+            total_bytes, pico_kb = int(salida[0]), int(salida[1])
+            print(f'{filas:>10} {modo:>8} {total_bytes / 1e6:>12.1f} {pico_kb / 1024:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,450 @@
+"""
+Prueba de carga: cohortes de nuevos empleados haciendo la inducción completa
+
+Cada nuevo empleado es un hilo con su propia sesión HTTP que recorre el flujo
+real del frontend: bundle de la página de inducción (configuración,
+documentos y preguntas del cuestionario) y envío de respuestas. Mientras
+tanto, los administradores consultan periódicamente /api/admin/*. Al final se reporta el throughput y
+p50/p95/p99 por ruta, y se escribe un JSON con los resultados para comparar
+entre commits (--comparar).
+
+Sin --url se levanta crear_app en un proceso aparte (servidor WSGI con hilos,
+HTTP/1.1 con keep-alive) contra los backends locales: CosmosDB simulado en
+memoria y Storage en un directorio temporal. Las variables de entorno del
+simulado se respetan, p. ej. para agregar la latencia de red de CosmosDB:
+
+    COSMOS_SIMULADO_LATENCIA_MS=8 python benchmarks/carga_induccion.py --nuevos 200
+
+Con --url se mide un servidor ya levantado (p. ej. gunicorn con varios workers
+y COSMOS_BACKEND=sqlite); si no tiene preguntas ni configuración se crean con
+los endpoints de desarrollo. Nunca apuntarlo a producción.
+
+Uso:
+    python benchmarks/carga_induccion.py
+    python benchmarks/carga_induccion.py --nuevos 100 --flujos 5 --administradores 3
+    python benchmarks/carga_induccion.py --url http://localhost:8000 --salida carga.json
+    python benchmarks/carga_induccion.py --comparar benchmarks/resultados/carga_anterior.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+import requests
+
+DIRECTORIO_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRECTORIO_RESULTADOS = os.path.join(DIRECTORIO_BACKEND, 'benchmarks', 'resultados')
+
+CUESTIONARIO_ID = 'cuestionario_gestion_procesos'
+DOCUMENTOS_SEMILLA = 5
+
+# Rutas que consultan los administradores, en orden (una por intervalo)
+RUTAS_ADMIN = [
+    ('GET /api/admin/estadisticas', '/api/admin/estadisticas'),
+    ('GET /api/admin/respuestas/todas', '/api/admin/respuestas/todas?limit=50'),
+    ('GET /api/admin/preguntas/todas', '/api/admin/preguntas/todas'),
+    ('GET /api/admin/cache', '/api/admin/cache'),
+]
+
+_RU_SERVER_TIMING = re.compile(r'([\d.]+) RU')
+
+
+def _percentil(valores_ordenados, percentil):
+    """Percentil por rango más cercano (valores ya ordenados)"""
+    if not valores_ordenados:
+        return None
+    indice = max(math.ceil(percentil / 100 * len(valores_ordenados)) - 1, 0)
+    return valores_ordenados[indice]
+
+
+class Mediciones:
+    """Latencias, códigos y RU por ruta, compartidas por todos los hilos"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rutas = {}
+        self.flujos_completos = 0
+        self.flujos_fallidos = 0
+
+    def registrar(self, ruta, duracion, estado, ru):
+        with self.lock:
+            datos = self.rutas.setdefault(ruta, {'latencias': [], 'estados': {}, 'ru': 0.0})
+            datos['latencias'].append(duracion)
+            datos['estados'][estado] = datos['estados'].get(estado, 0) + 1
+            datos['ru'] += ru
+
+    def flujo_terminado(self, correcto):
+        with self.lock:
+            if correcto:
+                self.flujos_completos += 1
+            else:
+                self.flujos_fallidos += 1
+
+    def resumen(self, duracion_total):
+        rutas = {}
+        for ruta, datos in sorted(self.rutas.items()):
+            latencias = sorted(datos['latencias'])
+            total = len(latencias)
+            errores = sum(n for estado, n in datos['estados'].items() if estado == 'error' or int(estado) >= 400)
+            rutas[ruta] = {
+                'peticiones': total,
+                'errores': errores,
+                'estados': {str(estado): n for estado, n in sorted(datos['estados'].items(), key=str)},
+                'por_segundo': round(total / duracion_total, 2),
+                'p50_ms': round(_percentil(latencias, 50) * 1000, 2),
+                'p95_ms': round(_percentil(latencias, 95) * 1000, 2),
+                'p99_ms': round(_percentil(latencias, 99) * 1000, 2),
+                'max_ms': round(latencias[-1] * 1000, 2),
+                'ru_promedio': round(datos['ru'] / total, 2)
+            }
+        peticiones = sum(r['peticiones'] for r in rutas.values())
+        return {
+            'duracion_s': round(duracion_total, 3),
+            'peticiones': peticiones,
+            'errores': sum(r['errores'] for r in rutas.values()),
+            'peticiones_por_segundo': round(peticiones / duracion_total, 2),
+            'flujos_completos': self.flujos_completos,
+            'flujos_fallidos': self.flujos_fallidos,
+            'flujos_por_segundo': round(self.flujos_completos / duracion_total, 2),
+            'rutas': rutas
+        }
+
+
+class Cliente:
+    """Sesión HTTP de un usuario simulado que mide cada petición"""
+
+    def __init__(self, url_base, mediciones, timeout):
+        self.url_base = url_base
+        self.mediciones = mediciones
+        self.timeout = timeout
+        self.sesion = requests.Session()
+
+    def pedir(self, ruta, metodo, camino, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            respuesta = self.sesion.request(metodo, self.url_base + camino, timeout=self.timeout, **kwargs)
+            respuesta.content  # el cuerpo completo forma parte de la latencia
+        except requests.RequestException:
+            self.mediciones.registrar(ruta, time.perf_counter() - inicio, 'error', 0.0)
+            return None
+        duracion = time.perf_counter() - inicio
+
+        cargo = _RU_SERVER_TIMING.search(respuesta.headers.get('Server-Timing', ''))
+        self.mediciones.registrar(ruta, duracion, respuesta.status_code, float(cargo.group(1)) if cargo else 0.0)
+        return respuesta
+
+    def cerrar(self):
+        self.sesion.close()
+
+
+def _respuestas_simuladas(preguntas, azar, tasa_acierto):
+    """Arma el envío compacto {pregunta_id: respuesta} como lo envía el frontend"""
+    respuestas = {}
+    for pregunta in preguntas:
+        opciones = pregunta.get('opciones') or []
+        if pregunta.get('tipo') == 'verdadero-falso':
+            correcta = bool(pregunta.get('respuesta_correcta'))
+            respuestas[pregunta['id']] = correcta if azar.random() < tasa_acierto else azar.choice([True, False])
+        elif pregunta.get('tipo') == 'opcion-multiple-multi':
+            correctas = [opcion['id'] for opcion in opciones if opcion.get('correcta')]
+            respuestas[pregunta['id']] = correctas if azar.random() < tasa_acierto else \
+                azar.sample([opcion['id'] for opcion in opciones], k=min(2, len(opciones)))
+        elif pregunta.get('tipo') == 'likert':
+            respuestas[pregunta['id']] = azar.randint(pregunta.get('escala_min', 1), pregunta.get('escala_max', 5))
+        elif pregunta.get('tipo') == 'abierta':
+            respuestas[pregunta['id']] = 'Respuesta de prueba ' * 3
+        elif opciones:
+            correcta = next((opcion['id'] for opcion in opciones if opcion.get('correcta')), opciones[0]['id'])
+            respuestas[pregunta['id']] = correcta if azar.random() < tasa_acierto else \
+                azar.choice([opcion['id'] for opcion in opciones])
+    return respuestas
+
+
+def nuevo_empleado(numero, args, url_base, mediciones, inicio_comun, detener):
+    """Recorre el flujo de inducción args.flujos veces"""
+    azar = random.Random(args.semilla * 100003 + numero)
+    cliente = Cliente(url_base, mediciones, args.timeout)
+    # Llegada escalonada dentro de la rampa
+    time.sleep(max(inicio_comun + azar.uniform(0, args.rampa_s) - time.monotonic(), 0))
+    pausa = args.pausa_ms / 1000
+
+    try:
+        for flujo in range(args.flujos):
+            if detener.is_set():
+                break
+            # Como el frontend: configuración, documentos y preguntas llegan en el bundle
+            correcto = True
+            preguntas = []
+            respuesta = cliente.pedir('GET /api/induccion/bundle', 'GET',
+                                      f'/api/induccion/bundle?cuestionario_id={CUESTIONARIO_ID}')
+            if respuesta is None or respuesta.status_code >= 400:
+                correcto = False
+            else:
+                preguntas = respuesta.json()['preguntas']
+            if pausa:
+                time.sleep(azar.uniform(0.5, 1.5) * pausa)
+
+            if correcto and preguntas:
+                cuerpo = {
+                    'nombre': f'Empleado {numero:05d}-{flujo}',
+                    'cuestionario_id': CUESTIONARIO_ID,
+                    'respuestas': _respuestas_simuladas(preguntas, azar, args.tasa_acierto),
+                    'tiempo_empleado': azar.randint(60, 900)
+                }
+                respuesta = cliente.pedir('POST /api/cuestionarios/respuesta', 'POST',
+                                          '/api/cuestionarios/respuesta', json=cuerpo)
+                correcto = respuesta is not None and respuesta.status_code in (201, 202)
+            mediciones.flujo_terminado(correcto and bool(preguntas))
+    finally:
+        cliente.cerrar()
+
+
+def administrador(numero, args, url_base, mediciones, detener):
+    """Consulta las rutas de administración cada args.intervalo_admin_s hasta que terminen los empleados"""
+    cliente = Cliente(url_base, mediciones, args.timeout)
+    indice = numero
+    try:
+        while not detener.is_set():
+            ruta, camino = RUTAS_ADMIN[indice % len(RUTAS_ADMIN)]
+            cliente.pedir(ruta, 'GET', camino)
+            indice += 1
+            detener.wait(args.intervalo_admin_s)
+    finally:
+        cliente.cerrar()
+
+
+def sembrar_datos(url_base):
+    """Crea preguntas, configuración y documentos si el servidor no los tiene"""
+    sesion = requests.Session()
+    preguntas = sesion.get(f'{url_base}/api/preguntas/cuestionario/{CUESTIONARIO_ID}', timeout=30)
+    preguntas.raise_for_status()
+    if not preguntas.json():
+        sesion.post(f'{url_base}/api/preguntas/inicializar-datos', timeout=30).raise_for_status()
+
+    documentos = sesion.get(f'{url_base}/api/configuracion/induccion/documentos/todos', timeout=30)
+    documentos.raise_for_status()
+    if not documentos.json():
+        sesion.put(f'{url_base}/api/configuracion/induccion', json={
+            'titulo': 'Inducción gestión por procesos',
+            'descripcion': 'Inducción para la prueba de carga',
+            'video_url': '/videos/induccion.mp4'
+        }, timeout=30).raise_for_status()
+        for numero in range(1, DOCUMENTOS_SEMILLA + 1):
+            sesion.post(f'{url_base}/api/configuracion/induccion/documentos', json={
+                'nombre': f'Documento {numero}',
+                'tipo': 'pdf',
+                'url': f'https://ejemplo.invalid/documento_{numero}.pdf',
+                'descripcion': 'Documento de la prueba de carga'
+            }, timeout=30).raise_for_status()
+    sesion.close()
+
+
+# ---------------------------------------------------------------------------
+# Servidor local (proceso hijo)
+# ---------------------------------------------------------------------------
+
+def ejecutar_servidor(puerto):
+    """Levanta crear_app con los backends locales en 127.0.0.1:puerto (proceso hijo)"""
+    directorio = tempfile.mkdtemp(prefix='carga_induccion_')
+    # Antes de importar config: tienen prioridad sobre el .env, nunca se usa Azure
+    os.environ.setdefault('COSMOS_BACKEND', 'memoria')
+    os.environ.setdefault('COSMOS_SIMULADO_RUTA', os.path.join(directorio, 'cosmos.sqlite3'))
+    os.environ.setdefault('AZURE_STORAGE_BACKEND', 'local')
+    os.environ.setdefault('AZURE_STORAGE_LOCAL_RUTA', os.path.join(directorio, 'storage'))
+    os.environ.setdefault('RESPUESTAS_COLA_RUTA', os.path.join(directorio, 'cola.sqlite3'))
+
+    sys.path.insert(0, DIRECTORIO_BACKEND)
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from app import crear_app
+
+    class ManejadorHTTP11(WSGIRequestHandler):
+        # Keep-alive como un servidor de producción; sin log por petición
+        protocol_version = 'HTTP/1.1'
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    app = crear_app(os.getenv('FLASK_ENV', 'default'))
+    servidor = make_server('127.0.0.1', puerto, app, threaded=True, request_handler=ManejadorHTTP11)
+    servidor.daemon_threads = True
+    print('listo', flush=True)
+    servidor.serve_forever()
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def iniciar_servidor_local():
+    """Lanza el servidor en un proceso aparte (no compite por el GIL con los clientes)"""
+    puerto = _puerto_libre()
+    proceso = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--servidor', str(puerto)],
+        cwd=DIRECTORIO_BACKEND, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+    url_base = f'http://127.0.0.1:{puerto}'
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f'El servidor terminó al iniciar:\n{proceso.stdout.read()}')
+        try:
+            if requests.get(f'{url_base}/api/salud', timeout=1).ok:
+                return proceso, url_base
+        except requests.RequestException:
+            time.sleep(0.2)
+    proceso.kill()
+    raise RuntimeError('El servidor no respondió en 60 s')
+
+
+# ---------------------------------------------------------------------------
+# Resultados
+# ---------------------------------------------------------------------------
+
+def _commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=DIRECTORIO_BACKEND,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def imprimir_resumen(resumen):
+    print(f"\n{'ruta':<46} {'pet.':>7} {'err.':>5} {'pet/s':>8} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'RU':>6}")
+    for ruta, datos in resumen['rutas'].items():
+        print(f"{ruta:<46} {datos['peticiones']:>7} {datos['errores']:>5} {datos['por_segundo']:>8.1f} "
+              f"{datos['p50_ms']:>8.1f} {datos['p95_ms']:>8.1f} {datos['p99_ms']:>8.1f} "
+              f"{datos['max_ms']:>8.1f} {datos['ru_promedio']:>6.1f}")
+    print(f"\nTotal: {resumen['peticiones']} peticiones en {resumen['duracion_s']:.1f} s "
+          f"({resumen['peticiones_por_segundo']:.1f}/s, {resumen['errores']} errores); "
+          f"{resumen['flujos_completos']} flujos completos ({resumen['flujos_por_segundo']:.1f}/s), "
+          f"{resumen['flujos_fallidos']} fallidos")
+
+
+def imprimir_comparacion(anterior, actual):
+    """Diferencia de throughput y p95 por ruta contra un resultado anterior"""
+    print(f"\nComparación con {anterior.get('commit') or 'resultado anterior'} "
+          f"({anterior['parametros']['nuevos']} nuevos, {anterior['parametros']['flujos']} flujos):")
+    print(f"{'ruta':<46} {'pet/s antes':>12} {'ahora':>8} {'p95 antes':>10} {'ahora':>8} {'Δ p95':>8}")
+    for ruta, datos in actual['resumen']['rutas'].items():
+        previo = anterior['resumen']['rutas'].get(ruta)
+        if not previo:
+            continue
+        delta = (datos['p95_ms'] / previo['p95_ms'] - 1) * 100 if previo['p95_ms'] else 0.0
+        print(f"{ruta:<46} {previo['por_segundo']:>12.1f} {datos['por_segundo']:>8.1f} "
+              f"{previo['p95_ms']:>10.1f} {datos['p95_ms']:>8.1f} {delta:>+7.1f}%")
+    print(f"{'flujos por segundo':<46} {anterior['resumen']['flujos_por_segundo']:>12.1f} "
+          f"{actual['resumen']['flujos_por_segundo']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nuevos', type=int, default=50, help='nuevos empleados concurrentes')
+    parser.add_argument('--flujos', type=int, default=3, help='inducciones completas por empleado')
+    parser.add_argument('--administradores', type=int, default=2)
+    parser.add_argument('--intervalo-admin-s', type=float, default=1.0, help='pausa entre consultas de cada administrador')
+    parser.add_argument('--rampa-s', type=float, default=2.0, help='los empleados llegan repartidos en este intervalo')
+    parser.add_argument('--pausa-ms', type=float, default=0.0, help='tiempo de lectura promedio entre pasos del flujo')
+    parser.add_argument('--tasa-acierto', type=float, default=0.8)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--url', help='servidor ya levantado (por defecto se inicia crear_app local)')
+    parser.add_argument('--salida', help='archivo JSON de resultados (por defecto benchmarks/resultados/carga_<commit>.json)')
+    parser.add_argument('--comparar', help='resultado anterior contra el cual comparar')
+    parser.add_argument('--servidor', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.servidor:
+        ejecutar_servidor(args.servidor)
+        return
+
+    proceso = None
+    if args.url:
+        url_base = args.url.rstrip('/')
+    else:
+        proceso, url_base = iniciar_servidor_local()
+
+    try:
+        sembrar_datos(url_base)
+        salud = requests.get(f'{url_base}/api/salud', timeout=10).json()
+
+        mediciones = Mediciones()
+        detener = threading.Event()
+        inicio_comun = time.monotonic()
+        hilos_nuevos = [
+            threading.Thread(target=nuevo_empleado, args=(n, args, url_base, mediciones, inicio_comun, detener))
+            for n in range(args.nuevos)
+        ]
+        hilos_admin = [
+            threading.Thread(target=administrador, args=(n, args, url_base, mediciones, detener))
+            for n in range(args.administradores)
+        ]
+        print(f"{args.nuevos} nuevos empleados × {args.flujos} flujos, {args.administradores} "
+              f"administradores contra {url_base} ({salud.get('servicios')})")
+
+        inicio = time.perf_counter()
+        for hilo in hilos_nuevos + hilos_admin:
+            hilo.start()
+        try:
+            for hilo in hilos_nuevos:
+                hilo.join()
+        except KeyboardInterrupt:
+            print('Interrumpido: se reportan las mediciones hasta ahora')
+        detener.set()
+        for hilo in hilos_admin:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+    finally:
+        if proceso:
+            proceso.terminate()
+            proceso.wait()
+
+    resumen = mediciones.resumen(duracion)
+    imprimir_resumen(resumen)
+
+    commit = _commit_actual()
+    resultado = {
+        'commit': commit,
+        'fecha': datetime.now(timezone.utc).isoformat(),
+        'url': args.url or 'local',
+        'servicios': salud.get('servicios'),
+        'entorno': {
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+            'variables': {clave: valor for clave, valor in sorted(os.environ.items())
+                          if clave.startswith(('COSMOS_SIMULADO_', 'COSMOS_BACKEND', 'AZURE_STORAGE_BACKEND',
+                                               'RESPUESTAS_ESCRITURA', 'COSMOS_CACHE'))}
+        },
+        'parametros': {clave: valor for clave, valor in vars(args).items()
+                       if clave not in ('servidor', 'salida', 'comparar')},
+        'resumen': resumen
+    }
+
+    salida = args.salida or os.path.join(DIRECTORIO_RESULTADOS, f"carga_{commit or 'sin_commit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as archivo:
+        json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+    print(f"Resultados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            imprimir_comparacion(json.load(archivo), resultado)
+
+    if resumen['errores'] or resumen['flujos_fallidos']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
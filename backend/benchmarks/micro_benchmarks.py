@@ -0,0 +1,554 @@
+"""
+Microbenchmarks de los caminos críticos con referencia guardada en el repositorio
+
+Casos (cada uno con datos sintéticos de 1k a 1M intentos):
+- calificacion.construir_respuesta: validación y calificación de cada envío
+  (construir_respuesta, el cuerpo de POST /api/cuestionarios/respuesta).
+- calificacion.compacto: lo mismo con el envío compacto {pregunta_id: respuesta}
+  calificado en el servidor con la clave de respuestas ya cacheada.
+- estadisticas.acumular: reducción que reconstruye las estadísticas global y
+  por cuestionario (acumular_respuestas, en reconstruir_estadisticas).
+- estadisticas.proyeccion: reducción de respaldo de las estadísticas general y
+  por cuestionario cuando CosmosDB no resuelve el agregado (reducir_resumen).
+- estadisticas.contadores: lo que calculan obtener_estadisticas_generales y
+  obtener_estadisticas_cuestionario a partir de los contadores (no debe
+  depender del número de intentos).
+- preguntas.agrupar: agrupación de GET /api/admin/preguntas/todas.
+- serializacion.*: jsonify y streaming (arreglo JSON y NDJSON) de listados de
+  respuestas, en la vista de resumen y la completa.
+
+Como pytest-benchmark, cada caso prepara sus datos fuera de la medición, se
+ejecuta varias rondas (al menos --rondas y hasta completar --tiempo-s) y se
+reportan mínimo, mediana, media y desviación. Cada caso se mide
+--repeticiones veces y, justo antes de cada repetición, se mide una carga de
+referencia en Python puro: el tiempo normalizado de la repetición es la
+mediana de sus rondas dividida por la de la carga de referencia, así la
+referencia guardada sirve en máquinas distintas y una ráfaga de carga de
+otros procesos afecta por igual a ambas. Las comparaciones usan la mediana de
+los tiempos normalizados de las repeticiones; una sola ejecución (o el
+mínimo de una) varía demasiado en los tamaños chicos para decidir nada, y
+aun así los menores de 100k se comparan con un umbral más amplio
+(--umbral-chicos).
+
+Uso:
+    python benchmarks/micro_benchmarks.py                     # ejecutar y mostrar
+    python benchmarks/micro_benchmarks.py --rapido            # solo 1k y 10k
+    python benchmarks/micro_benchmarks.py --casos 'estadisticas.*'
+    python benchmarks/micro_benchmarks.py --guardar           # actualizar la referencia
+    python benchmarks/micro_benchmarks.py --comparar          # falla si algo empeora más de --umbral
+    python benchmarks/micro_benchmarks.py --rapido --comparar --repeticiones 7
+    python benchmarks/micro_benchmarks.py --comparar --desde resultados.json
+"""
+import argparse
+import fnmatch
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+DIRECTORIO_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIRECTORIO_BACKEND)
+
+from flask import Flask, jsonify  # noqa: E402
+from rutas.admin import agrupar_por_cuestionario  # noqa: E402
+from servicios.calificacion import compilar_clave  # noqa: E402
+from servicios.estadisticas import (  # noqa: E402
+    ID_ESTADISTICAS_GLOBAL, _documento_vacio, acumular_respuestas, calcular_desviacion_estandar,
+    calcular_promedio, contar_aprobados_por_calificacion, reducir_resumen
+)
+from servicios.metricas import ProveedorJSONMedido  # noqa: E402
+from servicios.repositorio_respuestas import CAMPOS_RESUMEN, construir_respuesta  # noqa: E402
+from utilidades.streaming import generar_arreglo_json, generar_ndjson  # noqa: E402
+
+REFERENCIA_POR_DEFECTO = os.path.join(DIRECTORIO_BACKEND, 'benchmarks', 'referencias', 'micro.json')
+TAMANOS = [1_000, 10_000, 100_000, 1_000_000]
+TAMANOS_RAPIDO = [1_000, 10_000]
+UMBRAL_POR_DEFECTO = 0.20
+# Los tamaños chicos tardan milisegundos y su mediana varía hasta ~25% entre
+# ejecuciones en la misma máquina: con un umbral menor la comparación falla sola
+UMBRAL_CHICOS_POR_DEFECTO = 0.35
+REPETICIONES_POR_DEFECTO = 5
+# Desde este tamaño una ronda tarda segundos: una ronda por repetición y, desde 1M, sin calentamiento
+TAMANO_GRANDE = 100_000
+TAMANO_SIN_CALENTAMIENTO = 1_000_000
+
+# Documentos distintos que se repiten para armar los conjuntos grandes: las
+# funciones medidas no modifican sus entradas y así 1M intentos caben en memoria
+VARIANTES = 1000
+CUESTIONARIOS = 5
+PREGUNTAS_POR_INTENTO = 10
+
+CASOS = {}
+
+
+def caso(nombre, tamanos=TAMANOS):
+    """Registra un caso: la función recibe el tamaño y retorna el callable a medir"""
+    def registrar(preparar):
+        CASOS[nombre] = (preparar, tamanos)
+        return preparar
+    return registrar
+
+
+# ---------------------------------------------------------------------------
+# Datos sintéticos
+# ---------------------------------------------------------------------------
+
+def _repetir(variantes, total):
+    return [variantes[i % len(variantes)] for i in range(total)]
+
+
+def _preguntas_respondidas(semilla):
+    return [
+        {
+            'orden': n,
+            'titulo': f'Pregunta {n}',
+            'pregunta': 'Texto de la pregunta ' * 5,
+            'tipo_pregunta': 'multiple_choice',
+            'opciones': ['Opción A', 'Opción B', 'Opción C', 'Opción D'],
+            'respuesta_correcta': 'Opción B',
+            'respuesta_usuario': 'Opción B' if (semilla + n) % 3 else 'Opción A',
+            'es_correcta': bool((semilla + n) % 3)
+        }
+        for n in range(1, PREGUNTAS_POR_INTENTO + 1)
+    ]
+
+
+def envios(total):
+    """Cuerpos de POST /api/cuestionarios/respuesta"""
+    variantes = [
+        {
+            'nombre': f'Usuario {i}',
+            'cuestionario_id': f'cuestionario_{i % CUESTIONARIOS}',
+            'cuestionario_titulo': 'Cuestionario de prueba',
+            'respuestas': _preguntas_respondidas(i),
+            'tiempo_empleado': 300 + i
+        }
+        for i in range(VARIANTES)
+    ]
+    return _repetir(variantes, total)
+
+
+def claves_respuestas():
+    """Clave de respuestas de cada cuestionario sintético (opción correcta: la B)"""
+    claves = {}
+    for c in range(CUESTIONARIOS):
+        cuestionario_id = f'cuestionario_{c}'
+        claves[cuestionario_id] = compilar_clave(cuestionario_id, [
+            {
+                'id': f'{cuestionario_id}_pregunta_{n}',
+                'cuestionario_id': cuestionario_id,
+                'cuestionario_titulo': 'Cuestionario de prueba',
+                'orden': n,
+                'pregunta': 'Texto de la pregunta ' * 5,
+                'tipo': 'opcion-multiple',
+                'opciones': [
+                    {'id': f'opcion_{letra}', 'texto': f'Opción {letra.upper()}', 'correcta': letra == 'b'}
+                    for letra in 'abcd'
+                ],
+                'activo': True
+            }
+            for n in range(1, PREGUNTAS_POR_INTENTO + 1)
+        ])
+    return claves
+
+
+def envios_compactos(total):
+    """Cuerpos compactos de POST /api/cuestionarios/respuesta, con las mismas respuestas que envios()"""
+    variantes = [
+        {
+            'nombre': f'Usuario {i}',
+            'cuestionario_id': f'cuestionario_{i % CUESTIONARIOS}',
+            'respuestas': {
+                f'cuestionario_{i % CUESTIONARIOS}_pregunta_{n}': 'opcion_b' if (i + n) % 3 else 'opcion_a'
+                for n in range(1, PREGUNTAS_POR_INTENTO + 1)
+            },
+            'tiempo_empleado': 300 + i
+        }
+        for i in range(VARIANTES)
+    ]
+    return _repetir(variantes, total)
+
+
+def intentos_completos(total):
+    """Documentos de respuesta como los guarda POST /api/cuestionarios/respuesta"""
+    variantes = [construir_respuesta(datos)[0] for datos in envios(VARIANTES)]
+    return _repetir(variantes, total)
+
+
+def intentos_resumen(total):
+    variantes = [{campo: intento.get(campo) for campo in CAMPOS_RESUMEN} for intento in intentos_completos(VARIANTES)]
+    return _repetir(variantes, total)
+
+
+def intentos_proyectados(total):
+    """Proyección (cuestionario_id, calificacion, aprobado) que leen las estadísticas"""
+    variantes = [
+        {'cuestionario_id': f'cuestionario_{i % CUESTIONARIOS}', 'calificacion': (i * 7) % 101, 'aprobado': (i * 7) % 101 >= 70}
+        for i in range(VARIANTES)
+    ]
+    return _repetir(variantes, total)
+
+
+def preguntas(total):
+    variantes = [
+        {
+            'id': f'pregunta_{i}',
+            'cuestionario_id': f'cuestionario_{i % (CUESTIONARIOS * 4)}',
+            'orden': i,
+            'pregunta': 'Texto de la pregunta ' * 5,
+            'tipo': 'opcion-multiple',
+            'activo': True
+        }
+        for i in range(VARIANTES)
+    ]
+    return _repetir(variantes, total)
+
+
+# ---------------------------------------------------------------------------
+# Casos
+# ---------------------------------------------------------------------------
+
+@caso('calificacion.construir_respuesta')
+def _construir_respuesta(total):
+    cuerpos = envios(total)
+
+    def ejecutar():
+        for datos in cuerpos:
+            construir_respuesta(datos)
+    return ejecutar
+
+
+@caso('calificacion.compacto')
+def _calificar_compacto(total):
+    cuerpos = envios_compactos(total)
+    claves = claves_respuestas()
+
+    def ejecutar():
+        for datos in cuerpos:
+            construir_respuesta(datos, claves[datos['cuestionario_id']])
+    return ejecutar
+
+
+@caso('estadisticas.acumular')
+def _acumular(total):
+    intentos = intentos_proyectados(total)
+
+    def ejecutar():
+        acumular_respuestas({ID_ESTADISTICAS_GLOBAL: _documento_vacio()}, intentos)
+    return ejecutar
+
+
+@caso('estadisticas.proyeccion')
+def _proyeccion(total):
+    intentos = intentos_proyectados(total)
+
+    def ejecutar():
+        reducir_resumen(intentos, criterio='calificacion')
+    return ejecutar
+
+
+@caso('estadisticas.contadores')
+def _contadores(total):
+    documento = acumular_respuestas({ID_ESTADISTICAS_GLOBAL: _documento_vacio()},
+                                    intentos_proyectados(total))[ID_ESTADISTICAS_GLOBAL]
+
+    def ejecutar():
+        for _ in range(1000):
+            contar_aprobados_por_calificacion(documento)
+            calcular_promedio(documento)
+            calcular_desviacion_estandar(documento)
+    return ejecutar
+
+
+@caso('preguntas.agrupar')
+def _agrupar(total):
+    lista = preguntas(total)
+
+    def ejecutar():
+        agrupar_por_cuestionario(lista)
+    return ejecutar
+
+
+def _aplicacion_json():
+    # Mismo proveedor JSON que la aplicación con métricas habilitadas
+    app = Flask(__name__)
+    app.json = ProveedorJSONMedido(app)
+    return app
+
+
+@caso('serializacion.jsonify_resumen')
+def _jsonify_resumen(total):
+    app = _aplicacion_json()
+    documentos = intentos_resumen(total)
+
+    def ejecutar():
+        with app.app_context():
+            jsonify({'total': len(documentos), 'respuestas': documentos, 'siguiente_cursor': None})
+    return ejecutar
+
+
+@caso('serializacion.streaming_resumen')
+def _streaming_resumen(total):
+    documentos = intentos_resumen(total)
+
+    def ejecutar():
+        for _ in generar_arreglo_json(documentos, clave='respuestas', contar=True):
+            pass
+    return ejecutar
+
+
+@caso('serializacion.ndjson_resumen')
+def _ndjson_resumen(total):
+    documentos = intentos_resumen(total)
+
+    def ejecutar():
+        for _ in generar_ndjson(documentos):
+            pass
+    return ejecutar
+
+
+# La vista completa pesa unos 2 KB por intento: hasta 100k para no usar varios GB
+@caso('serializacion.jsonify_completa', tamanos=TAMANOS[:3])
+def _jsonify_completa(total):
+    app = _aplicacion_json()
+    documentos = intentos_completos(total)
+
+    def ejecutar():
+        with app.app_context():
+            jsonify({'total': len(documentos), 'respuestas': documentos, 'siguiente_cursor': None})
+    return ejecutar
+
+
+@caso('serializacion.streaming_completa', tamanos=TAMANOS[:3])
+def _streaming_completa(total):
+    documentos = intentos_completos(total)
+
+    def ejecutar():
+        for _ in generar_arreglo_json(documentos, clave='respuestas', contar=True):
+            pass
+    return ejecutar
+
+
+# ---------------------------------------------------------------------------
+# Medición
+# ---------------------------------------------------------------------------
+
+def _carga_referencia():
+    """Trabajo fijo en Python puro (diccionarios, cadenas, json) para normalizar entre máquinas"""
+    datos = [{'id': i, 'nombre': f'n{i}', 'valor': i * 0.5} for i in range(20000)]
+    indice = {}
+    for documento in datos:
+        indice.setdefault(documento['id'] % 97, []).append(documento['nombre'])
+    json.dumps(datos)
+
+
+def medir(ejecutar, rondas_minimas, tiempo_objetivo, rondas_maximas=50, calentar=True):
+    """Ejecuta rondas hasta cumplir el mínimo de rondas y el tiempo objetivo. Retorna las duraciones"""
+    if calentar:
+        ejecutar()
+    duraciones = []
+    inicio_total = time.perf_counter()
+    gc_activo = gc.isenabled()
+    try:
+        while len(duraciones) < rondas_maximas and (
+                len(duraciones) < rondas_minimas or time.perf_counter() - inicio_total < tiempo_objetivo):
+            gc.collect()
+            gc.disable()
+            inicio = time.perf_counter()
+            ejecutar()
+            duraciones.append(time.perf_counter() - inicio)
+            if gc_activo:
+                gc.enable()
+    finally:
+        if gc_activo:
+            gc.enable()
+    return duraciones
+
+
+def _medir_referencia():
+    """Mediana de la carga de referencia, medida junto a cada repetición de un caso"""
+    return statistics.median(medir(_carga_referencia, 5, 0.1))
+
+
+def _estadisticas(duraciones, normalizados, total):
+    """duraciones: todas las rondas; normalizados: mediana/referencia de cada repetición"""
+    mediana = statistics.median(duraciones)
+    return {
+        'rondas': len(duraciones),
+        'repeticiones': len(normalizados),
+        'min_s': min(duraciones),
+        'mediana_s': mediana,
+        'media_s': statistics.mean(duraciones),
+        'desviacion_s': statistics.stdev(duraciones) if len(duraciones) > 1 else 0.0,
+        'ns_por_elemento': mediana / total * 1e9,
+        'normalizado': statistics.median(normalizados),
+        'dispersion_normalizado': (max(normalizados) - min(normalizados)) / statistics.median(normalizados)
+    }
+
+
+def ejecutar_casos(patrones, tamanos_fijos, rapido, rondas_minimas, tiempo_objetivo, repeticiones):
+    referencia = _medir_referencia()
+    print(f"Carga de referencia: {referencia * 1000:.2f} ms ({repeticiones} repeticiones por caso)\n")
+    print(f"{'caso':<36} {'tamaño':>9} {'rondas':>6} {'mediana':>11} {'min':>11} {'desv.':>9} "
+          f"{'ns/elem':>9} {'dispersión':>10}")
+
+    resultados = {}
+    for nombre, (preparar, tamanos) in CASOS.items():
+        if patrones and not any(fnmatch.fnmatch(nombre, patron) for patron in patrones):
+            continue
+        if tamanos_fijos:
+            tamanos = [t for t in tamanos_fijos if t <= max(tamanos)]
+        elif rapido:
+            tamanos = [t for t in tamanos if t in TAMANOS_RAPIDO]
+        for total in tamanos:
+            ejecutar = preparar(total)
+            # Con los tamaños grandes cada repetición es una ronda
+            rondas = 1 if total >= TAMANO_GRANDE else rondas_minimas
+            duraciones, normalizados = [], []
+            for repeticion in range(repeticiones):
+                referencia_local = _medir_referencia()
+                rondas_repeticion = medir(
+                    ejecutar, rondas, tiempo_objetivo / repeticiones,
+                    calentar=repeticion == 0 and total < TAMANO_SIN_CALENTAMIENTO
+                )
+                duraciones.extend(rondas_repeticion)
+                normalizados.append(statistics.median(rondas_repeticion) / referencia_local)
+            medicion = _estadisticas(duraciones, normalizados, total)
+            del ejecutar
+            resultados[f'{nombre}[{total}]'] = {'caso': nombre, 'tamano': total, **medicion}
+            print(f"{nombre:<36} {total:>9} {medicion['rondas']:>6} {_tiempo(medicion['mediana_s']):>11} "
+                  f"{_tiempo(medicion['min_s']):>11} {_tiempo(medicion['desviacion_s']):>9} "
+                  f"{medicion['ns_por_elemento']:>9.0f} {medicion['dispersion_normalizado']:>9.1%}")
+
+    return {
+        'fecha': datetime.now(timezone.utc).isoformat(),
+        'entorno': {
+            'python': platform.python_version(),
+            'implementacion': platform.python_implementation(),
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'referencia_s': referencia,
+        'resultados': resultados
+    }
+
+
+def _tiempo(segundos):
+    if segundos >= 1:
+        return f'{segundos:.3f} s'
+    if segundos >= 1e-3:
+        return f'{segundos * 1e3:.2f} ms'
+    return f'{segundos * 1e6:.1f} µs'
+
+
+def comparar(referencia, actual, umbral, umbral_chicos=UMBRAL_CHICOS_POR_DEFECTO):
+    """Imprime la diferencia por caso (tiempos normalizados) y retorna la lista de regresiones
+
+    Los tamaños menores que TAMANO_GRANDE usan umbral_chicos.
+    """
+    factor = actual['referencia_s'] / referencia['referencia_s']
+    print(f"\nComparación con la referencia del {referencia['fecha'][:10]} "
+          f"(velocidad de esta máquina relativa: {1 / factor:.2f}x, umbral {umbral:.0%}, "
+          f"{umbral_chicos:.0%} por debajo de {TAMANO_GRANDE})")
+    print(f"{'caso':<36} {'tamaño':>9} {'referencia':>11} {'esperado':>11} {'actual':>11} {'Δ':>8}")
+
+    regresiones = []
+    for clave, medicion in actual['resultados'].items():
+        base = referencia['resultados'].get(clave)
+        if not base:
+            continue
+        if 'normalizado' not in base or 'normalizado' not in medicion:
+            print(f"{medicion['caso']:<36} {medicion['tamano']:>9} sin tiempo normalizado (ejecutar con --guardar)")
+            continue
+        # Tiempo que se esperaría en esta máquina: el normalizado de la referencia
+        # por la carga de referencia de esta ejecución
+        esperado = base['normalizado'] * actual['referencia_s']
+        delta = medicion['normalizado'] / base['normalizado'] - 1
+        umbral_caso = umbral if medicion['tamano'] >= TAMANO_GRANDE else umbral_chicos
+        if delta > umbral_caso:
+            estado = 'REGRESIÓN'
+            regresiones.append(clave)
+        elif delta < -umbral_caso:
+            estado = 'mejora'
+        else:
+            estado = ''
+        print(f"{medicion['caso']:<36} {medicion['tamano']:>9} {_tiempo(base['mediana_s']):>11} "
+              f"{_tiempo(esperado):>11} {_tiempo(medicion['normalizado'] * actual['referencia_s']):>11} "
+              f"{delta:>+7.1%} {estado}")
+
+    sin_referencia = sorted(set(actual['resultados']) - set(referencia['resultados']))
+    if sin_referencia:
+        print(f"Sin referencia (ejecutar con --guardar): {', '.join(sin_referencia)}")
+    return regresiones
+
+
+def _guardar(datos, ruta):
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(datos, archivo, ensure_ascii=False, indent=2, sort_keys=True)
+        archivo.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--casos', nargs='+', metavar='PATRON', help="p. ej. 'estadisticas.*'")
+    parser.add_argument('--tamanos', type=int, nargs='+')
+    parser.add_argument('--rapido', action='store_true', help=f'solo tamaños {TAMANOS_RAPIDO}')
+    parser.add_argument('--rondas', type=int, default=5, help='rondas mínimas por caso')
+    parser.add_argument('--tiempo-s', type=float, default=1.0,
+                        help='tiempo mínimo de medición por caso (repartido entre las repeticiones)')
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES_POR_DEFECTO,
+                        help='mediciones de cada caso, cada una junto a la carga de referencia')
+    parser.add_argument('--salida', help='guardar los resultados de esta ejecución en un JSON')
+    parser.add_argument('--guardar', nargs='?', const=REFERENCIA_POR_DEFECTO, metavar='RUTA',
+                        help='guardar como referencia (por defecto benchmarks/referencias/micro.json)')
+    parser.add_argument('--comparar', nargs='?', const=REFERENCIA_POR_DEFECTO, metavar='RUTA',
+                        help='comparar con la referencia; código de salida 1 si hay regresiones')
+    parser.add_argument('--desde', help='usar resultados ya guardados (--salida) en lugar de ejecutar')
+    parser.add_argument('--umbral', type=float, default=UMBRAL_POR_DEFECTO,
+                        help='aumento relativo del tiempo normalizado que cuenta como regresión (0.2 = 20%%)')
+    parser.add_argument('--umbral-chicos', type=float, default=UMBRAL_CHICOS_POR_DEFECTO,
+                        help=f'umbral para los tamaños menores que {TAMANO_GRANDE}')
+    args = parser.parse_args()
+
+    if args.desde:
+        with open(args.desde, encoding='utf-8') as archivo:
+            actual = json.load(archivo)
+    else:
+        actual = ejecutar_casos(args.casos, args.tamanos, args.rapido, args.rondas, args.tiempo_s,
+                                args.repeticiones)
+
+    if args.salida:
+        _guardar(actual, args.salida)
+        print(f"\nResultados en {args.salida}")
+
+    if args.guardar:
+        # Se conservan los casos de la referencia que no se ejecutaron esta vez (los
+        # tiempos normalizados de ejecuciones distintas son comparables)
+        if os.path.exists(args.guardar) and not args.desde:
+            with open(args.guardar, encoding='utf-8') as archivo:
+                anterior = json.load(archivo)
+            anterior['resultados'] = {
+                clave: medicion for clave, medicion in anterior.get('resultados', {}).items()
+                if 'normalizado' in medicion
+            }
+            actual['resultados'] = {**anterior.get('resultados', {}), **actual['resultados']}
+        _guardar(actual, args.guardar)
+        print(f"\nReferencia guardada en {args.guardar}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            referencia = json.load(archivo)
+        regresiones = comparar(referencia, actual, args.umbral, args.umbral_chicos)
+        if regresiones:
+            print(f"\n{len(regresiones)} regresiones por encima del umbral: {', '.join(regresiones)}")
+            sys.exit(1)
+        print("\nSin regresiones")
+
+
+if __name__ == '__main__':
+    main()
@@ -18,15 +18,103 @@ class Config:
     COSMOS_KEY = os.getenv('COSMOS_KEY')
     COSMOS_DATABASE = os.getenv('COSMOS_DATABASE', 'induccion_gxp')
     COSMOS_CONTAINER_RESPUESTAS = os.getenv('COSMOS_CONTAINER_RESPUESTAS', 'respuestas')
+    # Partition key con el que se crea el contenedor de respuestas si no existe.
+    # Un contenedor existente conserva el suyo (ver scripts/migrar_respuestas.py)
+    COSMOS_PARTICION_RESPUESTAS = os.getenv('COSMOS_PARTICION_RESPUESTAS', '/cuestionario_id')
     COSMOS_CONTAINER_PREGUNTAS = os.getenv('COSMOS_CONTAINER_PREGUNTAS', 'preguntas')
     COSMOS_CONTAINER_ADMINISTRADORES = os.getenv('COSMOS_CONTAINER_ADMINISTRADORES', 'administradores')
     # COSMOS_CONTAINER_DOCUMENTOS = os.getenv('COSMOS_CONTAINER_DOCUMENTOS', 'documentos')  # DEPRECATED: Moved to configuracion
     COSMOS_CONTAINER_CONFIGURACION = os.getenv('COSMOS_CONTAINER_CONFIGURACION', 'configuracion')
     
+    # Backend de CosmosDB: azure, o uno simulado local para pruebas sin Azure: memoria
+    # (por proceso) o sqlite (archivo compartido por los workers). Ver servicios/cosmos_simulado.py
+    COSMOS_BACKEND = os.getenv('COSMOS_BACKEND', 'azure').lower()
+    COSMOS_SIMULADO_RUTA = os.getenv('COSMOS_SIMULADO_RUTA', '.cosmos_simulado.sqlite3')
+    COSMOS_SIMULADO_LATENCIA_MS = float(os.getenv('COSMOS_SIMULADO_LATENCIA_MS', '0'))
+    COSMOS_SIMULADO_LATENCIA_VARIACION_MS = float(os.getenv('COSMOS_SIMULADO_LATENCIA_VARIACION_MS', '0'))
+    COSMOS_SIMULADO_FACTOR_RU = float(os.getenv('COSMOS_SIMULADO_FACTOR_RU', '1'))
+    # Throughput aprovisionado simulado por contenedor: al excederlo responde 429 (0 = sin límite)
+    COSMOS_SIMULADO_RU_POR_SEGUNDO = int(os.getenv('COSMOS_SIMULADO_RU_POR_SEGUNDO', '0'))
+    
+    # Inicio rápido: no crea base de datos ni contenedores al iniciar (sin llamadas de red).
+    # Requiere haberlos creado con scripts/aprovisionar.py
+    INICIO_RAPIDO = os.getenv('INICIO_RAPIDO', 'false').lower() == 'true'
+    
+    # Conexiones HTTP a Azure y Graph (una sesión con pool por proceso, ver servicios/transporte_http.py)
+    HTTP_POOL_POR_HOST = int(os.getenv('HTTP_POOL_POR_HOST', '20'))
+    HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '10'))
+    HTTP_TIMEOUT_CONEXION_S = float(os.getenv('HTTP_TIMEOUT_CONEXION_S', '5'))
+    HTTP_TIMEOUT_LECTURA_S = float(os.getenv('HTTP_TIMEOUT_LECTURA_S', '60'))
+    HTTP_KEEPALIVE_S = int(os.getenv('HTTP_KEEPALIVE_S', '60'))
+    
+    # Caché de lecturas de CosmosDB (por proceso). TTL en segundos por contenedor; 0 la desactiva
+    COSMOS_CACHE_HABILITADA = os.getenv('COSMOS_CACHE_HABILITADA', 'true').lower() == 'true'
+    COSMOS_CACHE_MAX_ENTRADAS = int(os.getenv('COSMOS_CACHE_MAX_ENTRADAS', '1024'))
+    COSMOS_CACHE_TTL_CONFIGURACION = int(os.getenv('COSMOS_CACHE_TTL_CONFIGURACION', '30'))
+    COSMOS_CACHE_TTL_PREGUNTAS = int(os.getenv('COSMOS_CACHE_TTL_PREGUNTAS', '30'))
+    COSMOS_CACHE_TTL_ADMINISTRADORES = int(os.getenv('COSMOS_CACHE_TTL_ADMINISTRADORES', '60'))
+    
+    # Clave de respuestas para calificar en el servidor (por proceso, ver servicios/calificacion.py); 0 la desactiva
+    CALIFICACION_CACHE_TTL = int(os.getenv('CALIFICACION_CACHE_TTL', '300'))
+    
+    # Versiones de preguntas que se conservan por cuestionario, además de las que referencian los intentos; 0 las conserva todas
+    VERSIONES_PREGUNTAS_CONSERVAR = int(os.getenv('VERSIONES_PREGUNTAS_CONSERVAR', '20'))
+    
+    # Reintentos ante throttling (429/503) por contenedor, además de los del SDK
+    COSMOS_REINTENTOS_RESPUESTAS = int(os.getenv('COSMOS_REINTENTOS_RESPUESTAS', '8'))
+    COSMOS_REINTENTOS_PREGUNTAS = int(os.getenv('COSMOS_REINTENTOS_PREGUNTAS', '3'))
+    COSMOS_REINTENTOS_ADMINISTRADORES = int(os.getenv('COSMOS_REINTENTOS_ADMINISTRADORES', '3'))
+    COSMOS_REINTENTOS_CONFIGURACION = int(os.getenv('COSMOS_REINTENTOS_CONFIGURACION', '3'))
+    COSMOS_REINTENTOS_ESPERA_BASE_MS = int(os.getenv('COSMOS_REINTENTOS_ESPERA_BASE_MS', '100'))
+    COSMOS_REINTENTOS_ESPERA_MAXIMA_MS = int(os.getenv('COSMOS_REINTENTOS_ESPERA_MAXIMA_MS', '5000'))
+    
+    # Límite de RU/s por contenedor para escrituras y operaciones masivas (por proceso); 0 lo desactiva
+    COSMOS_RU_POR_SEGUNDO_RESPUESTAS = int(os.getenv('COSMOS_RU_POR_SEGUNDO_RESPUESTAS', '0'))
+    COSMOS_RU_POR_SEGUNDO_PREGUNTAS = int(os.getenv('COSMOS_RU_POR_SEGUNDO_PREGUNTAS', '0'))
+    COSMOS_RU_POR_SEGUNDO_ADMINISTRADORES = int(os.getenv('COSMOS_RU_POR_SEGUNDO_ADMINISTRADORES', '0'))
+    COSMOS_RU_POR_SEGUNDO_CONFIGURACION = int(os.getenv('COSMOS_RU_POR_SEGUNDO_CONFIGURACION', '0'))
+    
+    # Caché HTTP (ETag / If-None-Match) de configuración, documentos y preguntas
+    HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', '0'))
+    HTTP_CACHE_TTL_VALIDADOR = int(os.getenv('HTTP_CACHE_TTL_VALIDADOR', '30'))
+    # Respuestas grandes y muy pedidas (bundle de inducción) comprimidas con gzip una vez por ETag
+    HTTP_GZIP_PRECOMPRIMIDO = os.getenv('HTTP_GZIP_PRECOMPRIMIDO', 'true').lower() == 'true'
+    
+    # Hilos para leer en paralelo las partes del bundle de inducción (por proceso)
+    INDUCCION_BUNDLE_HILOS = int(os.getenv('INDUCCION_BUNDLE_HILOS', '8'))
+    
+    # Eliminación masiva de respuestas (trabajo en segundo plano)
+    ELIMINACION_MASIVA_HILOS = int(os.getenv('ELIMINACION_MASIVA_HILOS', '8'))
+    ELIMINACION_MASIVA_LOTE = int(os.getenv('ELIMINACION_MASIVA_LOTE', '100'))
+    ELIMINACION_MASIVA_REINTENTOS = int(os.getenv('ELIMINACION_MASIVA_REINTENTOS', '5'))
+    # Cada cuántos segundos el trabajo registra que sigue vivo (ver servicios/eliminacion_masiva.py)
+    ELIMINACION_MASIVA_LATIDO_S = float(os.getenv('ELIMINACION_MASIVA_LATIDO_S', '15'))
+    
+    # Escritura diferida de respuestas: se encolan en SQLite y se envían a CosmosDB en segundo plano
+    RESPUESTAS_ESCRITURA_DIFERIDA = os.getenv('RESPUESTAS_ESCRITURA_DIFERIDA', 'false').lower() == 'true'
+    RESPUESTAS_COLA_RUTA = os.getenv('RESPUESTAS_COLA_RUTA', '.cola_respuestas.sqlite3')
+    RESPUESTAS_COLA_LOTE = int(os.getenv('RESPUESTAS_COLA_LOTE', '25'))
+    RESPUESTAS_COLA_INTERVALO_MS = int(os.getenv('RESPUESTAS_COLA_INTERVALO_MS', '1000'))
+    RESPUESTAS_COLA_MAX_INTENTOS = int(os.getenv('RESPUESTAS_COLA_MAX_INTENTOS', '20'))
+    RESPUESTAS_COLA_ESPERA_MAXIMA_S = int(os.getenv('RESPUESTAS_COLA_ESPERA_MAXIMA_S', '300'))
+    
     # Azure Storage
     AZURE_STORAGE_CONNECTION_STRING = os.getenv('AZURE_STORAGE_CONNECTION_STRING')
     AZURE_STORAGE_CONTAINER_VIDEOS = os.getenv('AZURE_STORAGE_CONTAINER_VIDEOS', 'videoinduccion')
     AZURE_STORAGE_CONTAINER_RECURSOS = os.getenv('AZURE_STORAGE_CONTAINER_RECURSOS', 'recursos')
+    # Backend de Storage: azure, o local (directorio en disco, sin Azure) con URL firmadas
+    # que sirve /api/almacenamiento. Ver servicios/storage_local.py
+    AZURE_STORAGE_BACKEND = os.getenv('AZURE_STORAGE_BACKEND', 'azure').lower()
+    AZURE_STORAGE_LOCAL_RUTA = os.getenv('AZURE_STORAGE_LOCAL_RUTA', '.storage_local')
+    # Prefijo de las URL firmadas (p. ej. http://localhost:5000); vacío = relativas al sitio
+    AZURE_STORAGE_LOCAL_URL_BASE = os.getenv('AZURE_STORAGE_LOCAL_URL_BASE', '')
+    
+    # Métricas por endpoint (RU, latencia) en /api/metricas y encabezado Server-Timing
+    METRICAS_HABILITADAS = os.getenv('METRICAS_HABILITADAS', 'true').lower() == 'true'
+    
+    # Modo ASGI (asgi.py): tamaño máximo en bytes del cuerpo de las peticiones que
+    # se reenvían a Flask (p. ej. subida de videos)
+    ASGI_MAX_CUERPO_WSGI = int(os.getenv('ASGI_MAX_CUERPO_WSGI', str(1024 * 1024 * 1024)))
     
     # CORS
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:5173').split(',')
@@ -1,9 +1,32 @@
+from azure.cosmos import exceptions
 from flask import Blueprint, jsonify, request, current_app
 from servicios.cosmos_db import servicio_cosmos
+from servicios.repositorio_respuestas import repositorio_respuestas
+from servicios.calificacion import motor_calificacion, expandir_respuestas
+from utilidades.paginacion import (
+    obtener_parametros_paginacion, codificar_cursor, estado_error_cosmos, solicita_vista_completa
+)
+from utilidades.streaming import responder_en_streaming
+from servicios.estadisticas import (
+    resumir_respuestas, contar_documentos, obtener_estadisticas, reconstruir_estadisticas,
+    descontar_respuesta, calcular_promedio, calcular_desviacion_estandar,
+    contar_aprobados_por_calificacion
+)
+from servicios.eliminacion_masiva import iniciar_eliminacion, obtener_trabajo
 import traceback
 
 bp_admin = Blueprint('admin', __name__)
 
+def agrupar_por_cuestionario(preguntas):
+    """Agrupa las preguntas por cuestionario_id conservando el orden de la consulta"""
+    cuestionarios = {}
+    for pregunta in preguntas:
+        cuestionario_id = pregunta.get('cuestionario_id', 'sin_cuestionario')
+        if cuestionario_id not in cuestionarios:
+            cuestionarios[cuestionario_id] = []
+        cuestionarios[cuestionario_id].append(pregunta)
+    return cuestionarios
+
 @bp_admin.route('/sesiones/todas', methods=['GET'])
 def listar_todas_sesiones():
     """Lista todas las sesiones creadas"""
@@ -14,16 +37,34 @@ def listar_todas_sesiones():
 
 @bp_admin.route('/respuestas/todas', methods=['GET'])
 def listar_todas_respuestas():
-    """Lista todas las respuestas guardadas"""
+    """Lista las respuestas guardadas, una página a la vez (?limit=&cursor=)
+    
+    Con ?formato=ndjson o ?formato=json se entrega el contenedor completo en
+    streaming, sin acumular las respuestas en memoria. Cada respuesta trae
+    solo los campos de resumen; ?vista=completa incluye el detalle por
+    pregunta, que también se obtiene con GET /respuestas/<respuesta_id>.
+    """
     try:
-        contenedor_respuestas = current_app.config['COSMOS_CONTAINER_RESPUESTAS']
-        consulta = "SELECT * FROM c ORDER BY c.fecha_completado DESC"
-        
-        respuestas = servicio_cosmos.consultar_documentos(contenedor_respuestas, consulta)
+        if request.args.get('formato') in ('ndjson', 'json'):
+            contenedor_respuestas = repositorio_respuestas.contenedor()
+            consulta = repositorio_respuestas.consulta_listado(completa=solicita_vista_completa())
+            documentos = servicio_cosmos.iterar_documentos(contenedor_respuestas, consulta)
+            return responder_en_streaming(documentos, clave='respuestas', contar=True)
+        
+        try:
+            limite, posicion = obtener_parametros_paginacion()
+            respuestas, siguiente = repositorio_respuestas.listar_pagina(
+                completa=solicita_vista_completa(), limite=limite, desde=posicion
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except exceptions.CosmosHttpResponseError as e:
+            return jsonify({'error': str(e)}), estado_error_cosmos(e)
         
         return jsonify({
             'total': len(respuestas),
-            'respuestas': respuestas
+            'respuestas': respuestas,
+            'siguiente_cursor': codificar_cursor(siguiente)
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -37,17 +78,9 @@ def listar_todas_preguntas():
         
         preguntas = servicio_cosmos.consultar_documentos(contenedor_preguntas, consulta)
         
-        # Agrupar por cuestionario
-        cuestionarios = {}
-        for pregunta in preguntas:
-            cuestionario_id = pregunta.get('cuestionario_id', 'sin_cuestionario')
-            if cuestionario_id not in cuestionarios:
-                cuestionarios[cuestionario_id] = []
-            cuestionarios[cuestionario_id].append(pregunta)
-        
         return jsonify({
             'total': len(preguntas),
-            'cuestionarios': cuestionarios,
+            'cuestionarios': agrupar_por_cuestionario(preguntas),
             'preguntas': preguntas
         }), 200
     except Exception as e:
@@ -60,33 +93,34 @@ def obtener_estadisticas_generales():
         contenedor_respuestas = current_app.config['COSMOS_CONTAINER_RESPUESTAS']
         contenedor_preguntas = current_app.config['COSMOS_CONTAINER_PREGUNTAS']
         
-        # Contar respuestas
-        respuestas = servicio_cosmos.consultar_documentos(contenedor_respuestas, "SELECT * FROM c")
-        total_respuestas = len(respuestas)
-        
-        # Contar preguntas activas
-        preguntas = servicio_cosmos.consultar_documentos(
-            contenedor_preguntas, 
-            "SELECT * FROM c WHERE c.activo = true"
-        )
-        total_preguntas_activas = len(preguntas)
-        
-        # Calcular calificación promedio
-        if respuestas:
-            calificaciones = [r.get('calificacion', 0) for r in respuestas if 'calificacion' in r]
-            promedio_calificacion = sum(calificaciones) / len(calificaciones) if calificaciones else 0
+        # Leer contadores mantenidos incrementalmente (una lectura puntual)
+        documento = obtener_estadisticas()
+        if documento:
+            total_respuestas = documento['total']
+            aprobados = contar_aprobados_por_calificacion(documento)
+            promedio_calificacion = calcular_promedio(documento)
+            desviacion_estandar = round(calcular_desviacion_estandar(documento), 2)
+            histograma = documento['histograma']
         else:
-            promedio_calificacion = 0
+            # Respaldo: agregados de CosmosDB sobre el contenedor de respuestas
+            resumen = resumir_respuestas(contenedor_respuestas, criterio='calificacion')
+            total_respuestas = resumen['total']
+            aprobados = resumen['aprobados']
+            promedio_calificacion = resumen['promedio']
+            desviacion_estandar = None
+            histograma = None
         
-        # Contar aprobados
-        aprobados = sum(1 for r in respuestas if r.get('calificacion', 0) >= 70)
+        # Contar preguntas activas (el contenedor de preguntas es pequeño)
+        total_preguntas_activas = contar_documentos(contenedor_preguntas, 'c.activo = true')
         
         return jsonify({
             'respuestas': {
                 'total': total_respuestas,
                 'aprobados': aprobados,
                 'reprobados': total_respuestas - aprobados,
-                'promedio_calificacion': round(promedio_calificacion, 2)
+                'promedio_calificacion': round(promedio_calificacion, 2),
+                'desviacion_estandar': desviacion_estandar,
+                'histograma': histograma
             },
             'preguntas': {
                 'total_activas': total_preguntas_activas
@@ -95,44 +129,99 @@ def obtener_estadisticas_generales():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp_admin.route('/estadisticas/reconstruir', methods=['POST'])
+def reconstruir_estadisticas_respuestas():
+    """Recalcula los documentos de estadísticas recorriendo todas las respuestas"""
+    try:
+        documentos = reconstruir_estadisticas()
+        
+        return jsonify({
+            'mensaje': 'Estadísticas reconstruidas exitosamente',
+            'total_documentos': len(documentos),
+            'total_respuestas': documentos['estadisticas_global']['total']
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp_admin.route('/cache', methods=['GET'])
+def obtener_estado_cache():
+    """Obtiene los contadores de la caché de lecturas de CosmosDB (de este proceso)"""
+    try:
+        if not servicio_cosmos.cache:
+            return jsonify({'habilitada': False}), 200
+        
+        return jsonify({
+            'habilitada': True,
+            'ttl_por_contenedor': servicio_cosmos.ttl_cache,
+            **servicio_cosmos.cache.estadisticas()
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bp_admin.route('/respuestas/vaciar', methods=['DELETE'])
 def vaciar_respuestas():
-    """Elimina todas las respuestas del contenedor"""
+    """Inicia la eliminación de respuestas en segundo plano
+    
+    Sin filtros elimina todas las respuestas. Filtros opcionales (query string
+    o cuerpo JSON): cuestionario_id, desde y hasta (ISO 8601 sobre
+    fecha_completado, hasta exclusivo). El avance se consulta en
+    GET /respuestas/vaciar/<trabajo_id>.
+    """
     try:
-        contenedor_respuestas = current_app.config['COSMOS_CONTAINER_RESPUESTAS']
+        datos = request.get_json(silent=True) or {}
+        filtros = {
+            campo: datos.get(campo) or request.args.get(campo)
+            for campo in ('cuestionario_id', 'desde', 'hasta')
+        }
         
-        # Obtener todas las respuestas (solo ID)
-        consulta = "SELECT c.id FROM c"
-        respuestas = servicio_cosmos.consultar_documentos(contenedor_respuestas, consulta)
+        trabajo = iniciar_eliminacion(**filtros)
         
-        eliminados = 0
-        errores = 0
+        return jsonify({
+            'mensaje': 'Eliminación de respuestas iniciada',
+            'trabajo': trabajo
+        }), 202
+            
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp_admin.route('/respuestas/vaciar/<trabajo_id>', methods=['GET'])
+def obtener_estado_vaciado(trabajo_id):
+    """Obtiene el avance de un trabajo de eliminación de respuestas"""
+    try:
+        trabajo = obtener_trabajo(trabajo_id)
         
-        for respuesta in respuestas:
-            # El partition key es el mismo id del documento
-            resultado = servicio_cosmos.eliminar_documento(
-                contenedor_respuestas, 
-                respuesta['id'], 
-                respuesta['id']  # partition_key = id
-            )
+        if not trabajo:
+            return jsonify({'error': 'Trabajo no encontrado'}), 404
+        
+        return jsonify(trabajo), 200
             
-            if resultado and resultado.get('success'):
-                eliminados += 1
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp_admin.route('/respuestas/<respuesta_id>', methods=['GET'])
+def obtener_respuesta_individual(respuesta_id):
+    """Obtiene el intento completo, con el detalle de cada pregunta
+    
+    Con ?cuestionario_id= es una lectura puntual. Los intentos calificados en
+    el servidor se expanden con el texto de cada pregunta y de sus opciones,
+    tomados de la versión de preguntas con que se calificaron.
+    """
+    try:
+        respuesta = repositorio_respuestas.obtener(respuesta_id, request.args.get('cuestionario_id'))
+        
+        if not respuesta:
+            return jsonify({'error': 'Respuesta no encontrada'}), 404
+        
+        if any('pregunta_id' in pregunta for pregunta in respuesta.get('respuestas') or []):
+            if respuesta.get('version_preguntas'):
+                clave = motor_calificacion.obtener_clave_version(
+                    respuesta['cuestionario_id'], respuesta['version_preguntas']
+                )
             else:
-                errores += 1
-        
-        if errores > 0:
-            return jsonify({
-                'mensaje': f'{eliminados} respuestas eliminadas. {errores} errores encontrados.',
-                'total_eliminados': eliminados,
-                'errores': errores
-            }), 206  # 206 = Partial Content
-        else:
-            return jsonify({
-                'mensaje': f'{eliminados} respuestas eliminadas exitosamente',
-                'total_eliminados': eliminados
-            }), 200
-            
+                clave = motor_calificacion.obtener_clave(respuesta['cuestionario_id'])
+            respuesta = expandir_respuestas(respuesta, clave)
+        
+        return jsonify(respuesta), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -140,17 +229,17 @@ def vaciar_respuestas():
 def eliminar_respuesta_individual(respuesta_id):
     """Elimina una respuesta específica por ID"""
     try:
-        contenedor_respuestas = current_app.config['COSMOS_CONTAINER_RESPUESTAS']
+        # Se lee antes de eliminar para conocer su partition key y poder
+        # descontarla de las estadísticas. Con ?cuestionario_id= es una lectura puntual
+        respuesta = repositorio_respuestas.obtener(respuesta_id, request.args.get('cuestionario_id'))
+        
+        if not respuesta:
+            return jsonify({'error': 'Documento no encontrado'}), 404
         
-        # El contenedor está configurado con /id como partition key
-        # Por lo tanto, el partition_key es el mismo respuesta_id
-        resultado = servicio_cosmos.eliminar_documento(
-            contenedor_respuestas, 
-            respuesta_id, 
-            respuesta_id  # partition_key = id
-        )
+        resultado = repositorio_respuestas.eliminar(respuesta)
         
         if resultado and resultado.get('success'):
+            descontar_respuesta(respuesta)
             return jsonify({'mensaje': 'Respuesta eliminada exitosamente'}), 200
         else:
             error_msg = resultado.get('message', 'Error al eliminar la respuesta') if resultado else 'Error desconocido'
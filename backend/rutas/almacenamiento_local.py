@@ -0,0 +1,41 @@
+from flask import Blueprint, request, jsonify, send_file
+from servicios.azure_storage import servicio_storage
+from servicios.storage_local import ClienteBlobLocal
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+import os
+
+# Solo se registra con AZURE_STORAGE_BACKEND=local (ver servicios/storage_local.py)
+bp_almacenamiento = Blueprint('almacenamiento', __name__)
+
+@bp_almacenamiento.route('/<contenedor>/<path:nombre>', methods=['GET'])
+def descargar_blob(contenedor, nombre):
+    """Sirve un blob del almacenamiento local con una URL firmada (sp, se, sig)
+
+    Con Range responde 206 con el fragmento pedido (el reproductor de video
+    avanza y retrocede sin descargar el archivo completo); If-None-Match e
+    If-Modified-Since responden 304.
+    """
+    try:
+        cliente = servicio_storage.cliente_blob
+        if not isinstance(cliente, ClienteBlobLocal) or contenedor not in servicio_storage.contenedores:
+            return jsonify({'error': 'Recurso no encontrado'}), 404
+
+        valida, restante = cliente.verificar_firma(contenedor, nombre, request.args)
+        if not valida:
+            return jsonify({'error': 'Firma no válida o vencida'}), 403
+
+        ruta = cliente.ruta_blob(contenedor, nombre)
+        if not ruta or not os.path.isfile(ruta):
+            return jsonify({'error': 'Recurso no encontrado'}), 404
+
+        # send_file transmite el archivo por fragmentos y atiende Range/If-Range
+        respuesta = send_file(ruta, conditional=True, etag=True, max_age=restante)
+        respuesta.cache_control.public = False
+        respuesta.cache_control.private = True
+        return respuesta
+
+    except RequestedRangeNotSatisfiable as e:
+        # 416 con Content-Range: bytes */tamaño
+        return e.get_response()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,114 @@
+"""
+Rutas asíncronas para el modo ASGI (ver asgi.py)
+
+Son las rutas más concurrentes al inicio de una cohorte: enviar un
+cuestionario, cargar sus preguntas y obtener la URL del video. Responden lo
+mismo que sus equivalentes síncronas en rutas/cuestionarios.py,
+rutas/preguntas.py y rutas/recursos.py, pero esperan a CosmosDB y Storage sin
+bloquear el proceso. El resto de la API sigue en la aplicación Flask.
+"""
+import asyncio
+from quart import Blueprint, Response, current_app, jsonify, request
+from servicios.cosmos_db_async import servicio_cosmos_async
+from servicios.azure_storage_async import servicio_storage_async
+from servicios.repositorio_respuestas import construir_respuesta
+from servicios.calificacion import motor_calificacion
+from servicios.versiones_preguntas import repositorio_versiones, CONSULTA_ACTIVAS
+from servicios.cola_respuestas import cola_respuestas
+from servicios.estadisticas import registrar_respuesta_async
+from utilidades.http_cache import etag_de_contenido
+
+bp_asincrono = Blueprint('asincrono', __name__)
+
+
+def _cache_control():
+    return f"public, max-age={current_app.config['HTTP_CACHE_MAX_AGE']}, must-revalidate"
+
+
+@bp_asincrono.route('/api/cuestionarios/respuesta', methods=['POST'])
+async def guardar_respuesta():
+    """Guarda la respuesta de un cuestionario (ver rutas/cuestionarios.py)"""
+    try:
+        datos = await request.get_json()
+        clave = None
+        if isinstance(datos, dict) and 'cuestionario_id' in datos:
+            clave = await motor_calificacion.obtener_clave_async(
+                servicio_cosmos_async, current_app.config, datos['cuestionario_id']
+            )
+
+        respuesta, error = construir_respuesta(datos, clave)
+        if error:
+            return jsonify({'error': error}), 400
+
+        # Escritura diferida: el commit en SQLite hace fsync, se ejecuta en un hilo
+        if cola_respuestas.activa and await asyncio.to_thread(cola_respuestas.encolar, respuesta):
+            return jsonify(respuesta), 202, {'Location': f"/api/cuestionarios/respuesta/{respuesta['id']}/estado"}
+
+        resultado = await servicio_cosmos_async.crear_documento(
+            current_app.config['COSMOS_CONTAINER_RESPUESTAS'], respuesta
+        )
+
+        if resultado:
+            await registrar_respuesta_async(servicio_cosmos_async, current_app.config, resultado)
+            return jsonify(resultado), 201
+        else:
+            return jsonify({'error': 'Error al guardar respuesta'}), 500
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp_asincrono.route('/api/preguntas/cuestionario/<cuestionario_id>', methods=['GET'])
+async def obtener_preguntas_cuestionario(cuestionario_id):
+    """Obtiene las preguntas activas de un cuestionario (con ETag, admite If-None-Match)
+
+    Retorna la versión vigente (ver servicios/versiones_preguntas.py); si el
+    cuestionario aún no tiene versión publicada se consultan las preguntas.
+    """
+    try:
+        hash_version, preguntas = await repositorio_versiones.obtener_actual_async(
+            servicio_cosmos_async, current_app.config, cuestionario_id
+        )
+        if hash_version is None:
+            preguntas = await servicio_cosmos_async.consultar_documentos(
+                current_app.config['COSMOS_CONTAINER_PREGUNTAS'], CONSULTA_ACTIVAS,
+                [{"name": "@cuestionario_id", "value": cuestionario_id}],
+                partition_key=cuestionario_id
+            )
+
+        etag = hash_version or etag_de_contenido(preguntas)
+        if request.if_none_match.contains(etag):
+            respuesta = Response('', status=304)
+        else:
+            respuesta = jsonify(preguntas)
+        respuesta.set_etag(etag)
+        respuesta.headers['Cache-Control'] = _cache_control()
+        return respuesta
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp_asincrono.route('/api/recursos/videos/<nombre_video>', methods=['GET'])
+async def obtener_video_url(nombre_video):
+    """Obtiene la URL de un video con SAS token"""
+    try:
+        if not servicio_storage_async.cliente_blob:
+            return jsonify({'error': 'Azure Storage no está configurado'}), 503
+
+        contenedor_videos = current_app.config['AZURE_STORAGE_CONTAINER_VIDEOS']
+
+        # Verificar si el video existe
+        if not await servicio_storage_async.existe_archivo(contenedor_videos, nombre_video):
+            return jsonify({'error': 'Video no encontrado'}), 404
+
+        # Generar URL con SAS (válida por 24 horas)
+        url_sas = servicio_storage_async.generar_url_sas(contenedor_videos, nombre_video, duracion_horas=24)
+
+        if url_sas:
+            return jsonify({'url': url_sas}), 200
+        else:
+            return jsonify({'error': 'Error al generar URL'}), 500
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify, redirect, session, current_app
 from servicios.cosmos_db import servicio_cosmos
+from servicios.transporte_http import transporte_http
 import msal
-import requests
 
 bp_auth = Blueprint('auth', __name__)
 
@@ -11,7 +11,9 @@ def _construir_msal_app(cache=None):
         current_app.config['AZURE_CLIENT_ID'],
         authority=f"https://login.microsoftonline.com/{current_app.config['AZURE_TENANT_ID']}",
         client_credential=current_app.config['AZURE_CLIENT_SECRET'],
-        token_cache=cache
+        token_cache=cache,
+        http_client=transporte_http.sesion,
+        timeout=transporte_http.timeout
     )
 
 @bp_auth.route('/login', methods=['GET'])
@@ -44,7 +46,7 @@ def callback():
         
         # Obtener información del usuario
         access_token = result['access_token']
-        graph_response = requests.get(
+        graph_response = transporte_http.obtener(
             'https://graph.microsoft.com/v1.0/me',
             headers={'Authorization': f'Bearer {access_token}'}
         ).json()
@@ -1,33 +1,41 @@
 """
 Rutas para gestionar la configuración de la inducción
 """
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request
 from datetime import datetime
-from servicios.cosmos_db import servicio_cosmos
+from servicios.repositorio_configuracion import (
+    repositorio_configuracion, RECURSO_HTTP, MAX_OPERACIONES_PATCH, CONFIGURACION_POR_DEFECTO, documentos_activos
+)
+from utilidades.http_cache import responder_304_si_vigente, responder_con_etag, etag_derivado
 
 bp_configuracion = Blueprint('configuracion', __name__)
 
+def _responder_error_parche(estado, mensaje_error):
+    """Convierte el estado de RepositorioConfiguracion.parchear en una respuesta de error"""
+    if estado == 'sin_configuracion':
+        return jsonify({"error": "Configuración no encontrada"}), 404
+    if estado == 'no_aplica':
+        return jsonify({"error": "Documento no encontrado"}), 404
+    if estado == 'conflicto':
+        return jsonify({"error": "La configuración fue modificada por otro administrador, intente de nuevo"}), 409
+    return jsonify({"error": mensaje_error}), 500
+
 @bp_configuracion.route('/induccion', methods=['GET'])
 def obtener_configuracion_induccion():
-    """Obtiene la configuración actual de la inducción"""
+    """Obtiene la configuración actual de la inducción (con ETag, admite If-None-Match)"""
     try:
-        contenedor_configuracion = current_app.config['COSMOS_CONTAINER_CONFIGURACION']
+        no_modificado = responder_304_si_vigente(RECURSO_HTTP)
+        if no_modificado:
+            return no_modificado
         
-        # Buscar documento de configuración de inducción
-        query = "SELECT * FROM c WHERE c.tipo = 'induccion' AND c.id = 'induccion_general'"
-        items = servicio_cosmos.consultar_documentos(contenedor_configuracion, query)
+        # Lectura puntual del documento de configuración de inducción
+        config = repositorio_configuracion.obtener()
         
-        if items:
-            return jsonify(items[0]), 200
+        if config:
+            return responder_con_etag(RECURSO_HTTP, config, etag_derivado(config['_etag'], 'configuracion'))
         else:
             # Retornar configuración por defecto si no existe
-            return jsonify({
-                "id": "induccion_general",
-                "tipo": "induccion",
-                "titulo": "Inducción gestión por procesos",
-                "video_url": "/videos/induccion.mp4",
-                "descripcion": "En esta sesión cubriremos los pilares fundamentales de nuestra organización."
-            }), 200
+            return responder_con_etag(RECURSO_HTTP, CONFIGURACION_POR_DEFECTO)
             
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -45,26 +53,26 @@ def actualizar_configuracion_induccion():
             return jsonify({"error": "La descripción es requerida"}), 400
         # video_url es opcional
         
-        contenedor_configuracion = current_app.config['COSMOS_CONTAINER_CONFIGURACION']
-        
-        # Obtener configuración actual para preservar documentos
-        query = "SELECT * FROM c WHERE c.tipo = 'induccion' AND c.id = 'induccion_general'"
-        items = servicio_cosmos.consultar_documentos(contenedor_configuracion, query)
-        documentos_existentes = items[0].get('documentos', []) if items else []
-        
-        # Preparar documento actualizado
-        documento = {
-            "id": "induccion_general",
-            "tipo": "induccion",
+        campos = {
             "titulo": datos['titulo'].strip(),
             "video_url": datos.get('video_url', '').strip(),  # Opcional
-            "descripcion": datos['descripcion'].strip(),
-            "documentos": documentos_existentes,  # Preservar documentos
-            "fecha_modificacion": datetime.utcnow().isoformat()
+            "descripcion": datos['descripcion'].strip()
         }
         
-        # Actualizar documento (upsert)
-        resultado = servicio_cosmos.actualizar_documento(contenedor_configuracion, documento)
+        # Actualizar solo estos campos (patch); los documentos no se tocan
+        estado, resultado = repositorio_configuracion.parchear(lambda config: [
+            {'op': 'set', 'path': f'/{campo}', 'value': valor} for campo, valor in campos.items()
+        ])
+        
+        if estado == 'sin_configuracion':
+            # Primera vez: crear el documento de configuración
+            resultado = repositorio_configuracion.guardar({
+                **campos,
+                "documentos": [],
+                "fecha_modificacion": datetime.utcnow().isoformat()
+            })
+        elif estado != 'ok':
+            return _responder_error_parche(estado, "Error al actualizar configuración")
         
         if resultado:
             return jsonify({
@@ -79,21 +87,21 @@ def actualizar_configuracion_induccion():
 
 @bp_configuracion.route('/induccion/documentos', methods=['GET'])
 def obtener_documentos():
-    """Obtiene los documentos ACTIVOS de la inducción (para usuarios)"""
+    """Obtiene los documentos ACTIVOS de la inducción (para usuarios, con ETag)"""
     try:
-        contenedor_configuracion = current_app.config['COSMOS_CONTAINER_CONFIGURACION']
+        recurso = f'{RECURSO_HTTP}:documentos'
+        no_modificado = responder_304_si_vigente(recurso)
+        if no_modificado:
+            return no_modificado
         
-        # Buscar documento de configuración
-        query = "SELECT * FROM c WHERE c.tipo = 'induccion' AND c.id = 'induccion_general'"
-        items = servicio_cosmos.consultar_documentos(contenedor_configuracion, query)
+        # Lectura puntual del documento de configuración
+        config = repositorio_configuracion.obtener()
         
-        if items and 'documentos' in items[0]:
-            # Filtrar solo documentos activos y ordenar por campo 'orden'
-            documentos = [doc for doc in items[0]['documentos'] if doc.get('activo', True)]
-            documentos_ordenados = sorted(documentos, key=lambda x: x.get('orden', 999))
-            return jsonify(documentos_ordenados), 200
+        if config and 'documentos' in config:
+            # Solo documentos activos, ordenados por campo 'orden'
+            return responder_con_etag(recurso, documentos_activos(config), etag_derivado(config['_etag'], 'documentos'))
         else:
-            return jsonify([]), 200
+            return responder_con_etag(recurso, [])
             
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -102,15 +110,12 @@ def obtener_documentos():
 def obtener_todos_documentos():
     """Obtiene TODOS los documentos de la inducción (activos e inactivos, para admin)"""
     try:
-        contenedor_configuracion = current_app.config['COSMOS_CONTAINER_CONFIGURACION']
-        
-        # Buscar documento de configuración
-        query = "SELECT * FROM c WHERE c.tipo = 'induccion' AND c.id = 'induccion_general'"
-        items = servicio_cosmos.consultar_documentos(contenedor_configuracion, query)
+        # Lectura puntual del documento de configuración
+        config = repositorio_configuracion.obtener()
         
-        if items and 'documentos' in items[0]:
+        if config and 'documentos' in config:
             # Retornar TODOS los documentos (activos e inactivos) ordenados
-            documentos_ordenados = sorted(items[0]['documentos'], key=lambda x: x.get('orden', 999))
+            documentos_ordenados = sorted(config['documentos'], key=lambda x: x.get('orden', 999))
             return jsonify(documentos_ordenados), 200
         else:
             return jsonify([]), 200
@@ -120,7 +125,7 @@ def obtener_todos_documentos():
 
 @bp_configuracion.route('/induccion/documentos', methods=['POST'])
 def agregar_documento():
-    """Agrega un nuevo documento al array"""
+    """Agrega un nuevo documento al array (patch 'add', sin reescribir la configuración)"""
     try:
         datos = request.get_json()
         
@@ -132,18 +137,6 @@ def agregar_documento():
         if not datos.get('url') or not datos.get('url').strip():
             return jsonify({"error": "La URL es requerida"}), 400
         
-        contenedor_configuracion = current_app.config['COSMOS_CONTAINER_CONFIGURACION']
-        
-        # Obtener configuración actual
-        query = "SELECT * FROM c WHERE c.tipo = 'induccion' AND c.id = 'induccion_general'"
-        items = servicio_cosmos.consultar_documentos(contenedor_configuracion, query)
-        
-        if not items:
-            return jsonify({"error": "Configuración no encontrada"}), 404
-        
-        config = items[0]
-        documentos = config.get('documentos', [])
-        
         # Generar ID único para el documento
         import uuid
         nuevo_doc = {
@@ -152,119 +145,86 @@ def agregar_documento():
             "nombre": datos['nombre'].strip(),
             "url": datos['url'].strip(),
             "descripcion": datos.get('descripcion', '').strip(),
-            "orden": datos.get('orden', len(documentos) + 1),
             "activo": datos.get('activo', True)  # IMPORTANTE: guardar el campo activo
         }
         
-        documentos.append(nuevo_doc)
-        config['documentos'] = documentos
-        config['fecha_modificacion'] = datetime.utcnow().isoformat()
+        def operaciones(config):
+            documentos = config.get('documentos')
+            nuevo_doc['orden'] = datos.get('orden', len(documentos or []) + 1)
+            if documentos is None:
+                return [{'op': 'set', 'path': '/documentos', 'value': [nuevo_doc]}]
+            return [{'op': 'add', 'path': '/documentos/-', 'value': nuevo_doc}]
         
-        # Actualizar documento
-        resultado = servicio_cosmos.actualizar_documento(contenedor_configuracion, config)
+        estado, _ = repositorio_configuracion.parchear(operaciones)
         
-        if resultado:
+        if estado == 'ok':
             return jsonify({
                 "mensaje": "Documento agregado exitosamente",
                 "documento": nuevo_doc
             }), 201
-        else:
-            return jsonify({"error": "Error al agregar documento"}), 500
+        return _responder_error_parche(estado, "Error al agregar documento")
             
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @bp_configuracion.route('/induccion/documentos/<doc_id>', methods=['PUT'])
 def actualizar_documento(doc_id):
-    """Actualiza un documento específico"""
+    """Actualiza un documento específico (patch 'set' solo de los campos modificados)"""
     try:
         datos = request.get_json()
         
-        contenedor_configuracion = current_app.config['COSMOS_CONTAINER_CONFIGURACION']
-        
-        # Obtener configuración actual
-        query = "SELECT * FROM c WHERE c.tipo = 'induccion' AND c.id = 'induccion_general'"
-        items = servicio_cosmos.consultar_documentos(contenedor_configuracion, query)
-        
-        if not items:
-            return jsonify({"error": "Configuración no encontrada"}), 404
-        
-        config = items[0]
-        documentos = config.get('documentos', [])
-        
-        # Buscar y actualizar documento
-        doc_encontrado = False
-        for doc in documentos:
-            if doc['id'] == doc_id:
-                doc['nombre'] = datos.get('nombre', doc['nombre']).strip()
-                doc['tipo'] = datos.get('tipo', doc['tipo']).strip()
-                doc['url'] = datos.get('url', doc['url']).strip()
-                doc['descripcion'] = datos.get('descripcion', doc.get('descripcion', '')).strip()
-                doc['orden'] = datos.get('orden', doc.get('orden', 1))
-                doc['activo'] = datos.get('activo', doc.get('activo', True))  # IMPORTANTE: actualizar activo
-                doc_encontrado = True
-                break
-        
-        if not doc_encontrado:
-            return jsonify({"error": "Documento no encontrado"}), 404
-        
-        config['documentos'] = documentos
-        config['fecha_modificacion'] = datetime.utcnow().isoformat()
-        
-        # Actualizar documento
-        resultado = servicio_cosmos.actualizar_documento(contenedor_configuracion, config)
-        
-        if resultado:
+        def operaciones(config):
+            for indice, doc in enumerate(config.get('documentos', [])):
+                if doc['id'] == doc_id:
+                    campos = {
+                        'nombre': datos.get('nombre', doc['nombre']).strip(),
+                        'tipo': datos.get('tipo', doc['tipo']).strip(),
+                        'url': datos.get('url', doc['url']).strip(),
+                        'descripcion': datos.get('descripcion', doc.get('descripcion', '')).strip(),
+                        'orden': datos.get('orden', doc.get('orden', 1)),
+                        'activo': datos.get('activo', doc.get('activo', True))  # IMPORTANTE: actualizar activo
+                    }
+                    return [
+                        {'op': 'set', 'path': f'/documentos/{indice}/{campo}', 'value': valor}
+                        for campo, valor in campos.items() if doc.get(campo) != valor
+                    ]
+            return None
+        
+        estado, _ = repositorio_configuracion.parchear(operaciones)
+        
+        if estado == 'ok':
             return jsonify({
                 "mensaje": "Documento actualizado exitosamente"
             }), 200
-        else:
-            return jsonify({"error": "Error al actualizar documento"}), 500
+        return _responder_error_parche(estado, "Error al actualizar documento")
             
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @bp_configuracion.route('/induccion/documentos/<doc_id>', methods=['DELETE'])
 def eliminar_documento(doc_id):
-    """Elimina un documento del array"""
+    """Elimina un documento del array (patch 'remove')"""
     try:
-        contenedor_configuracion = current_app.config['COSMOS_CONTAINER_CONFIGURACION']
-        
-        # Obtener configuración actual
-        query = "SELECT * FROM c WHERE c.tipo = 'induccion' AND c.id = 'induccion_general'"
-        items = servicio_cosmos.consultar_documentos(contenedor_configuracion, query)
-        
-        if not items:
-            return jsonify({"error": "Configuración no encontrada"}), 404
-        
-        config = items[0]
-        documentos = config.get('documentos', [])
-        
-        # Filtrar documento a eliminar
-        documentos_filtrados = [doc for doc in documentos if doc['id'] != doc_id]
-        
-        if len(documentos_filtrados) == len(documentos):
-            return jsonify({"error": "Documento no encontrado"}), 404
-        
-        config['documentos'] = documentos_filtrados
-        config['fecha_modificacion'] = datetime.utcnow().isoformat()
+        def operaciones(config):
+            for indice, doc in enumerate(config.get('documentos', [])):
+                if doc['id'] == doc_id:
+                    return [{'op': 'remove', 'path': f'/documentos/{indice}'}]
+            return None
         
-        # Actualizar documento
-        resultado = servicio_cosmos.actualizar_documento(contenedor_configuracion, config)
+        estado, _ = repositorio_configuracion.parchear(operaciones)
         
-        if resultado:
+        if estado == 'ok':
             return jsonify({
                 "mensaje": "Documento eliminado exitosamente"
             }), 200
-        else:
-            return jsonify({"error": "Error al eliminar documento"}), 500
+        return _responder_error_parche(estado, "Error al eliminar documento")
             
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @bp_configuracion.route('/induccion/documentos/reordenar', methods=['PUT'])
 def reordenar_documentos():
-    """Reordena los documentos"""
+    """Reordena los documentos (patch 'set' del campo orden de los que cambian)"""
     try:
         datos = request.get_json()
         nuevo_orden = datos.get('documentos', [])
@@ -272,36 +232,34 @@ def reordenar_documentos():
         if not nuevo_orden:
             return jsonify({"error": "Se requiere el array de documentos"}), 400
         
-        contenedor_configuracion = current_app.config['COSMOS_CONTAINER_CONFIGURACION']
-        
-        # Obtener configuración actual
-        query = "SELECT * FROM c WHERE c.tipo = 'induccion' AND c.id = 'induccion_general'"
-        items = servicio_cosmos.consultar_documentos(contenedor_configuracion, query)
-        
-        if not items:
-            return jsonify({"error": "Configuración no encontrada"}), 404
-        
-        config = items[0]
-        
-        # Actualizar orden
-        for idx, doc_id in enumerate(nuevo_orden):
-            for doc in config.get('documentos', []):
-                if doc['id'] == doc_id:
-                    doc['orden'] = idx + 1
-                    break
+        posiciones = {doc_id: idx + 1 for idx, doc_id in enumerate(nuevo_orden)}
         
-        config['fecha_modificacion'] = datetime.utcnow().isoformat()
+        def operaciones(config):
+            documentos = config.get('documentos', [])
+            cambios = [
+                (indice, posiciones[doc['id']])
+                for indice, doc in enumerate(documentos)
+                if doc['id'] in posiciones and doc.get('orden') != posiciones[doc['id']]
+            ]
+            
+            if len(cambios) <= MAX_OPERACIONES_PATCH:
+                return [
+                    {'op': 'set', 'path': f'/documentos/{indice}/orden', 'value': orden}
+                    for indice, orden in cambios
+                ]
+            
+            # Demasiados cambios para un solo patch: se reemplaza solo el array
+            for indice, orden in cambios:
+                documentos[indice]['orden'] = orden
+            return [{'op': 'set', 'path': '/documentos', 'value': documentos}]
         
-        # Actualizar documento
-        resultado = servicio_cosmos.actualizar_documento(contenedor_configuracion, config)
+        estado, _ = repositorio_configuracion.parchear(operaciones)
         
-        if resultado:
+        if estado == 'ok':
             return jsonify({
                 "mensaje": "Documentos reordenados exitosamente"
             }), 200
-        else:
-            return jsonify({"error": "Error al reordenar documentos"}), 500
+        return _responder_error_parche(estado, "Error al reordenar documentos")
             
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-
@@ -1,20 +1,59 @@
+from azure.cosmos import exceptions
 from flask import Blueprint, request, jsonify
 from servicios.cosmos_db import servicio_cosmos
-from flask import current_app
-import uuid
-from datetime import datetime, timezone, timedelta
+from servicios.repositorio_respuestas import repositorio_respuestas, construir_respuesta
+from servicios.calificacion import motor_calificacion
+from servicios.cola_respuestas import cola_respuestas
+from utilidades.paginacion import (
+    obtener_parametros_paginacion, codificar_cursor, estado_error_cosmos, solicita_paginacion,
+    solicita_vista_completa
+)
+from utilidades.streaming import responder_en_streaming
+from servicios.estadisticas import (
+    resumir_respuestas, obtener_estadisticas, registrar_respuesta,
+    calcular_promedio, calcular_desviacion_estandar
+)
 
 bp_cuestionarios = Blueprint('cuestionarios', __name__)
 
-def obtener_fecha_colombia():
-    """Retorna la fecha y hora actual en zona horaria de Colombia (UTC-5)"""
-    return datetime.now(timezone(timedelta(hours=-5))).isoformat()
+def _responder_pagina(filtro=None, parametros=None, partition_key=None):
+    """Lee la página del listado de respuestas que indican ?limit=&cursor= y arma la respuesta"""
+    try:
+        limite, posicion = obtener_parametros_paginacion()
+        respuestas, siguiente = repositorio_respuestas.listar_pagina(
+            filtro, parametros, completa=solicita_vista_completa(), limite=limite, desde=posicion,
+            partition_key=partition_key
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except exceptions.CosmosHttpResponseError as e:
+        return jsonify({'error': str(e)}), estado_error_cosmos(e)
+    
+    return jsonify({
+        'total': len(respuestas),
+        'respuestas': respuestas,
+        'siguiente_cursor': codificar_cursor(siguiente)
+    }), 200
 
 @bp_cuestionarios.route('/respuesta', methods=['POST'])
 def guardar_respuesta():
-    """Guarda la respuesta de un cuestionario con estructura detallada
+    """Guarda la respuesta de un cuestionario y la califica en el servidor
     
-    Estructura esperada de cada pregunta en 'respuestas':
+    Envío compacto: 'respuestas' es un objeto {pregunta_id: respuesta}, con el
+    id de la opción elegida (opcion-multiple), una lista de ids
+    (opcion-multiple-multi), true/false (verdadero-falso), un número de la
+    escala (likert) o el texto (abierta):
+    {
+        "nombre": "Ana",
+        "cuestionario_id": "cuestionario_gestion_procesos",
+        "respuestas": {"pregunta_1": "opcion_b", "pregunta_2": true},
+        "tiempo_empleado": 120
+    }
+    
+    Formato detallado (anterior); si el cuestionario tiene preguntas en
+    CosmosDB se califica en el servidor a partir de respuesta_usuario y se
+    ignora el es_correcta del cliente. Estructura de cada pregunta en
+    'respuestas':
     {
         "orden": 1,
         "titulo": "Título de la pregunta",
@@ -25,67 +64,29 @@ def guardar_respuesta():
         "respuesta_usuario": "Opción A",
         "es_correcta": false
     }
+    
+    Con escritura diferida la respuesta se encola y se retorna 202; se
+    guarda en CosmosDB en segundo plano (ver servicios/cola_respuestas.py).
     """
     try:
         datos = request.get_json()
+        clave = None
+        if isinstance(datos, dict) and 'cuestionario_id' in datos:
+            clave = motor_calificacion.obtener_clave(datos['cuestionario_id'])
         
-        # Validar datos requeridos - ahora sesion_id es opcional si hay nombre
-        if 'nombre' not in datos and 'sesion_id' not in datos:
-            return jsonify({'error': 'Se requiere campo nombre o sesion_id'}), 400
-            
-        if 'cuestionario_id' not in datos:
-            return jsonify({'error': 'Campo requerido: cuestionario_id'}), 400
-            
-        if 'respuestas' not in datos:
-            return jsonify({'error': 'Campo requerido: respuestas'}), 400
-        
-        # Determinar el identificador de sesión (priorizar nombre sobre sesion_id)
-        sesion_id = datos.get('nombre') or datos.get('sesion_id')
-        
-        # Validar estructura de respuestas
-        if not isinstance(datos['respuestas'], list) or len(datos['respuestas']) == 0:
-            return jsonify({'error': 'El campo respuestas debe ser un array con al menos una pregunta'}), 400
-        
-        # Validar cada pregunta
-        for idx, pregunta in enumerate(datos['respuestas']):
-            campos_pregunta = ['orden', 'titulo', 'pregunta', 'tipo_pregunta', 'respuesta_correcta', 'respuesta_usuario']
-            for campo in campos_pregunta:
-                if campo not in pregunta:
-                    return jsonify({'error': f'Falta el campo {campo} en la pregunta {idx + 1}'}), 400
-        
-        # Calcular calificación automática si no se proporciona
-        total_preguntas = len(datos['respuestas'])
-        respuestas_correctas = sum(1 for p in datos['respuestas'] if p.get('es_correcta', False))
-        calificacion_calculada = round((respuestas_correctas / total_preguntas) * 100, 2)
-        
-        # Crear ID único combinando cuestionario, timestamp y UUID
-        timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
-        uuid_corto = str(uuid.uuid4())[:8]
-        documento_id = f"{datos['cuestionario_id']}_{timestamp}_{uuid_corto}"
-        
-        # Crear documento de respuesta
-        respuesta = {
-            'id': documento_id,
-            'cuestionario_id': datos['cuestionario_id'],
-            'sesion_id': datos.get('sesion_id', ''),  # Partition key - usar string vacío si no se proporciona
-            'nombre': datos.get('nombre', ''),
-            'cuestionario_titulo': datos.get('cuestionario_titulo', 'Sin título'),
-            'respuestas': datos['respuestas'],  # Array con estructura detallada de cada pregunta
-            'calificacion': datos.get('calificacion', calificacion_calculada),
-            'total_preguntas': total_preguntas,
-            'respuestas_correctas': respuestas_correctas,
-            'respuestas_incorrectas': total_preguntas - respuestas_correctas,
-            'porcentaje_acierto': calificacion_calculada,
-            'aprobado': datos.get('aprobado', calificacion_calculada >= 70),  # 70% como mínimo aprobatorio
-            'tiempo_empleado': datos.get('tiempo_empleado'),  # en segundos
-            'fecha_completado': obtener_fecha_colombia()
-        }
+        respuesta, error = construir_respuesta(datos, clave)
+        if error:
+            return jsonify({'error': error}), 400
         
-        contenedor_respuestas = current_app.config['COSMOS_CONTAINER_RESPUESTAS']
-        resultado = servicio_cosmos.crear_documento(contenedor_respuestas, respuesta)
+        # Si la cola no puede guardarla, se intenta la escritura directa
+        if cola_respuestas.activa and cola_respuestas.encolar(respuesta):
+            return jsonify(respuesta), 202, {'Location': f"/api/cuestionarios/respuesta/{respuesta['id']}/estado"}
+        
+        resultado = repositorio_respuestas.crear(respuesta)
         
         if resultado:
             # No existe contenedor de sesiones: solo guardamos la respuesta en 'respuestas'.
+            registrar_respuesta(resultado)
             return jsonify(resultado), 201
         else:
             return jsonify({'error': 'Error al guardar respuesta'}), 500
@@ -93,33 +94,68 @@ def guardar_respuesta():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp_cuestionarios.route('/respuesta/<respuesta_id>/estado', methods=['GET'])
+def obtener_estado_respuesta(respuesta_id):
+    """Indica si una respuesta enviada sigue en la cola ('pendiente', 'fallida') o ya está 'guardada'"""
+    try:
+        if cola_respuestas.activa:
+            en_cola = cola_respuestas.estado(respuesta_id)
+            if en_cola:
+                return jsonify({'id': respuesta_id, **en_cola}), 200
+        
+        respuesta = repositorio_respuestas.obtener(respuesta_id, request.args.get('cuestionario_id'))
+        if not respuesta:
+            return jsonify({'error': 'Respuesta no encontrada'}), 404
+        
+        return jsonify({'id': respuesta_id, 'estado': 'guardada'}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bp_cuestionarios.route('/respuestas/<cuestionario_id>', methods=['GET'])
 def obtener_respuestas_cuestionario(cuestionario_id):
-    """Obtiene todas las respuestas de un cuestionario específico"""
+    """Obtiene las respuestas de un cuestionario específico
+    
+    Sin parámetros retorna la lista completa en streaming (arreglo JSON, o
+    NDJSON con ?formato=ndjson); con ?limit=&cursor= retorna una sola página
+    junto con el cursor de la siguiente. Cada respuesta trae solo los campos
+    de resumen, salvo con ?vista=completa.
+    """
     try:
-        contenedor_respuestas = current_app.config['COSMOS_CONTAINER_RESPUESTAS']
-        consulta = "SELECT * FROM c WHERE c.cuestionario_id = @cuestionario_id ORDER BY c.fecha_completado DESC"
+        filtro = 'c.cuestionario_id = @cuestionario_id'
         parametros = [{"name": "@cuestionario_id", "value": cuestionario_id}]
+        # Con el contenedor particionado por cuestionario_id la consulta es de una sola partición
+        particion = repositorio_respuestas.particion_cuestionario(cuestionario_id)
+        
+        if solicita_paginacion():
+            return _responder_pagina(filtro, parametros, partition_key=particion)
         
-        respuestas = servicio_cosmos.consultar_documentos(
-            contenedor_respuestas, consulta, parametros
+        contenedor_respuestas = repositorio_respuestas.contenedor()
+        consulta = repositorio_respuestas.consulta_listado(filtro, completa=solicita_vista_completa())
+        documentos = servicio_cosmos.iterar_documentos(
+            contenedor_respuestas, consulta, parametros, partition_key=particion
         )
         
-        return jsonify(respuestas), 200
+        return responder_en_streaming(documentos)
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @bp_cuestionarios.route('/respuestas', methods=['GET'])
 def obtener_todas_respuestas():
-    """Obtiene todas las respuestas de todos los cuestionarios"""
+    """Obtiene las respuestas de todos los cuestionarios en streaming o por páginas (?limit=&cursor=)
+
+    Cada respuesta trae solo los campos de resumen, salvo con ?vista=completa.
+    """
     try:
-        contenedor_respuestas = current_app.config['COSMOS_CONTAINER_RESPUESTAS']
-        consulta = "SELECT * FROM c ORDER BY c.fecha_completado DESC"
+        if solicita_paginacion():
+            return _responder_pagina()
         
-        respuestas = servicio_cosmos.consultar_documentos(contenedor_respuestas, consulta)
+        contenedor_respuestas = repositorio_respuestas.contenedor()
+        consulta = repositorio_respuestas.consulta_listado(completa=solicita_vista_completa())
+        documentos = servicio_cosmos.iterar_documentos(contenedor_respuestas, consulta)
         
-        return jsonify(respuestas), 200
+        return responder_en_streaming(documentos)
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -128,16 +164,24 @@ def obtener_todas_respuestas():
 def obtener_estadisticas_cuestionario(cuestionario_id):
     """Obtiene estadísticas de un cuestionario"""
     try:
-        contenedor_respuestas = current_app.config['COSMOS_CONTAINER_RESPUESTAS']
-        consulta = "SELECT * FROM c WHERE c.cuestionario_id = @cuestionario_id"
         parametros = [{"name": "@cuestionario_id", "value": cuestionario_id}]
         
-        respuestas = servicio_cosmos.consultar_documentos(
-            contenedor_respuestas, consulta, parametros
-        )
+        # Leer contadores mantenidos incrementalmente (una lectura puntual)
+        documento = obtener_estadisticas(cuestionario_id)
+        if documento:
+            resumen = {
+                'total': documento['total'],
+                'aprobados': documento['aprobados'],
+                'promedio': calcular_promedio(documento)
+            }
+        else:
+            # Respaldo: agregados de CosmosDB sobre el contenedor de respuestas
+            resumen = resumir_respuestas(
+                repositorio_respuestas.contenedor(), 'c.cuestionario_id = @cuestionario_id', parametros,
+                partition_key=repositorio_respuestas.particion_cuestionario(cuestionario_id)
+            )
         
-        # Calcular estadísticas
-        total_respuestas = len(respuestas)
+        total_respuestas = resumen['total']
         if total_respuestas == 0:
             return jsonify({
                 'cuestionario_id': cuestionario_id,
@@ -148,9 +192,8 @@ def obtener_estadisticas_cuestionario(cuestionario_id):
                 'calificacion_promedio': 0
             }), 200
         
-        aprobados = sum(1 for r in respuestas if r.get('aprobado', False))
-        calificaciones = [r.get('calificacion', 0) for r in respuestas if r.get('calificacion') is not None]
-        calificacion_promedio = sum(calificaciones) / len(calificaciones) if calificaciones else 0
+        aprobados = resumen['aprobados']
+        calificacion_promedio = resumen['promedio']
         
         estadisticas = {
             'cuestionario_id': cuestionario_id,
@@ -158,7 +201,9 @@ def obtener_estadisticas_cuestionario(cuestionario_id):
             'aprobados': aprobados,
             'reprobados': total_respuestas - aprobados,
             'porcentaje_aprobacion': (aprobados / total_respuestas) * 100,
-            'calificacion_promedio': round(calificacion_promedio, 2)
+            'calificacion_promedio': round(calificacion_promedio, 2),
+            'desviacion_estandar': round(calcular_desviacion_estandar(documento), 2) if documento else None,
+            'histograma': documento['histograma'] if documento else None
         }
         
         return jsonify(estadisticas), 200
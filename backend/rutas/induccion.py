@@ -0,0 +1,30 @@
+"""
+Rutas de la página de inducción para los nuevos empleados
+"""
+from flask import Blueprint, jsonify, request
+from servicios.bundle_induccion import armar_bundle, CUESTIONARIO_POR_DEFECTO
+from servicios.repositorio_configuracion import RECURSO_HTTP_BUNDLE
+from utilidades.http_cache import responder_304_si_vigente, responder_con_etag
+
+bp_induccion = Blueprint('induccion', __name__)
+
+@bp_induccion.route('/bundle', methods=['GET'])
+def obtener_bundle():
+    """Obtiene en una sola respuesta lo que necesita la página de inducción
+    
+    Equivale a GET /api/configuracion/induccion, .../induccion/documentos,
+    /api/preguntas/cuestionarios y /api/preguntas/cuestionario/<id>
+    (?cuestionario_id=, por defecto el de la página). Con ETag (admite
+    If-None-Match) y, si el cliente acepta gzip, cuerpo precomprimido.
+    """
+    try:
+        cuestionario_id = request.args.get('cuestionario_id', CUESTIONARIO_POR_DEFECTO)
+        recurso = f'{RECURSO_HTTP_BUNDLE}:{cuestionario_id}'
+        no_modificado = responder_304_si_vigente(recurso)
+        if no_modificado:
+            return no_modificado
+        
+        return responder_con_etag(recurso, armar_bundle(cuestionario_id), comprimir=True)
+            
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
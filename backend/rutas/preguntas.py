@@ -1,33 +1,173 @@
 from flask import Blueprint, request, jsonify
-from servicios.cosmos_db import servicio_cosmos
+from servicios.cosmos_db import servicio_cosmos, MAX_OPERACIONES_LOTE
+from utilidades.http_cache import responder_304_si_vigente, responder_con_etag, invalidar_validador
+from servicios.calificacion import motor_calificacion
+from servicios.versiones_preguntas import repositorio_versiones, listar_cuestionarios as listar_cuestionarios_activos
+from servicios.repositorio_configuracion import RECURSO_HTTP_BUNDLE
 from flask import current_app
 import uuid
 from datetime import datetime, timezone, timedelta
 
 bp_preguntas = Blueprint('preguntas', __name__)
 
+# Las versiones se identifican por su contenido: el navegador y los proxies pueden guardarlas sin revalidar
+CACHE_CONTROL_VERSION = 'public, max-age=31536000, immutable'
+
+def _preguntas_modificadas(cuestionario_id):
+    """Publica la nueva versión de las preguntas e invalida los ETag y la clave de respuestas"""
+    repositorio_versiones.publicar(cuestionario_id)
+    invalidar_validador(f'preguntas:{cuestionario_id}')
+    invalidar_validador(RECURSO_HTTP_BUNDLE)
+    motor_calificacion.invalidar(cuestionario_id)
+
+# Preguntas de un cuestionario por ID (para leer en una sola consulta las que se actualizan en lote)
+CONSULTA_POR_IDS = "SELECT * FROM c WHERE ARRAY_CONTAINS(@ids, c.id)"
+
+def _url_version(cuestionario_id, hash_version):
+    return f'/api/preguntas/cuestionario/{cuestionario_id}/v/{hash_version}'
+
 def obtener_fecha_colombia():
     """Retorna la fecha y hora actual en zona horaria de Colombia (UTC-5)"""
     return datetime.now(timezone(timedelta(hours=-5))).isoformat()
 
+TIPOS_VALIDOS = [
+    'opcion-multiple',           # Selección única
+    'opcion-multiple-multi',     # Selección múltiple
+    'verdadero-falso',
+    'likert',                    # Escala de valoración
+    'abierta'                    # Texto libre (se cuenta como correcta)
+]
+
+CAMPOS_ACTUALIZABLES = ['orden', 'pregunta', 'tipo', 'opciones', 'respuesta_correcta', 
+                        'activo', 'cuestionario_titulo', 'escala_min', 
+                        'escala_max', 'etiquetas', 'longitud_minima', 'min_selecciones', 
+                        'max_selecciones']
+
+def _validar_pregunta(datos):
+    """Retorna el mensaje de error de una pregunta nueva, o None si es válida"""
+    # Validar datos requeridos
+    campos_requeridos = ['cuestionario_id', 'pregunta', 'tipo', 'orden']
+    for campo in campos_requeridos:
+        if campo not in datos:
+            return f'Campo requerido: {campo}'
+    
+    # Validar tipo de pregunta
+    if datos['tipo'] not in TIPOS_VALIDOS:
+        return 'Tipo de pregunta inválido'
+    
+    # Validar que tenga opciones si es opción múltiple (simple o multi)
+    if datos['tipo'] in ['opcion-multiple', 'opcion-multiple-multi'] and 'opciones' not in datos:
+        return 'Las preguntas de opción múltiple requieren opciones'
+    
+    # Validar que tenga respuesta correcta si es verdadero-falso
+    if datos['tipo'] == 'verdadero-falso' and 'respuesta_correcta' not in datos:
+        return 'Las preguntas verdadero-falso requieren respuesta_correcta'
+    
+    # Validar configuración de Likert
+    if datos['tipo'] == 'likert':
+        if 'escala_min' not in datos or 'escala_max' not in datos:
+            return 'Las preguntas Likert requieren escala_min y escala_max'
+        if datos['escala_min'] >= datos['escala_max']:
+            return 'escala_min debe ser menor que escala_max'
+    
+    # Preguntas abiertas no requieren validaciones adicionales
+    return None
+
+def _nueva_pregunta(datos):
+    """Arma el documento de una pregunta nueva (ya validada) con un ID único"""
+    return {
+        'id': f"{datos['cuestionario_id']}_pregunta_{str(uuid.uuid4())}",
+        'cuestionario_id': datos['cuestionario_id'],
+        'cuestionario_titulo': datos.get('cuestionario_titulo', ''),
+        'orden': datos['orden'],
+        'pregunta': datos['pregunta'],
+        'tipo': datos['tipo'],
+        'opciones': datos.get('opciones', []),
+        'respuesta_correcta': datos.get('respuesta_correcta'),
+        'activo': datos.get('activo', True),
+
+        # Campos para Likert
+        'escala_min': datos.get('escala_min'),
+        'escala_max': datos.get('escala_max'),
+        'etiquetas': datos.get('etiquetas', {}),
+
+        # Campos para preguntas abiertas
+        'longitud_minima': datos.get('longitud_minima'),
+        
+        # Campos para selección múltiple
+        'min_selecciones': datos.get('min_selecciones'),
+        'max_selecciones': datos.get('max_selecciones'),
+        'fecha_creacion': obtener_fecha_colombia(),
+        'fecha_modificacion': obtener_fecha_colombia()
+    }
+
 @bp_preguntas.route('/cuestionario/<cuestionario_id>', methods=['GET'])
 def obtener_preguntas_cuestionario(cuestionario_id):
-    """Obtiene todas las preguntas de un cuestionario específico"""
+    """Obtiene las preguntas activas de un cuestionario (con ETag, admite If-None-Match)
+
+    Retorna la versión vigente (ver servicios/versiones_preguntas.py); el
+    ETag es su hash.
+    """
     try:
-        contenedor_preguntas = current_app.config['COSMOS_CONTAINER_PREGUNTAS']
-        consulta = """
-            SELECT * FROM c 
-            WHERE c.cuestionario_id = @cuestionario_id 
-            AND c.activo = true 
-            ORDER BY c.orden ASC
-        """
-        parametros = [{"name": "@cuestionario_id", "value": cuestionario_id}]
-        
-        preguntas = servicio_cosmos.consultar_documentos(
-            contenedor_preguntas, consulta, parametros
-        )
-        
-        return jsonify(preguntas), 200
+        recurso = f'preguntas:{cuestionario_id}'
+        no_modificado = responder_304_si_vigente(recurso)
+        if no_modificado:
+            return no_modificado
+        
+        hash_version = repositorio_versiones.hash_actual(cuestionario_id)
+        if not hash_version:
+            return responder_con_etag(recurso, [])
+        
+        preguntas = repositorio_versiones.obtener_version(cuestionario_id, hash_version)
+        if preguntas is None:
+            return jsonify({'error': 'Versión de preguntas no encontrada'}), 500
+        
+        return responder_con_etag(recurso, preguntas, etag=hash_version)
+            
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp_preguntas.route('/cuestionario/<cuestionario_id>/version', methods=['GET'])
+def obtener_version_actual(cuestionario_id):
+    """Retorna el hash de la versión vigente de las preguntas y la URL para descargarla
+
+    Es la única lectura que debe revalidarse; la versión se descarga de
+    /cuestionario/<id>/v/<hash>, que no cambia nunca.
+    """
+    try:
+        recurso = f'preguntas:{cuestionario_id}:version'
+        no_modificado = responder_304_si_vigente(recurso)
+        if no_modificado:
+            return no_modificado
+        
+        hash_version = repositorio_versiones.hash_actual(cuestionario_id)
+        if not hash_version:
+            return jsonify({'error': 'Cuestionario no encontrado'}), 404
+        
+        return responder_con_etag(recurso, {
+            'cuestionario_id': cuestionario_id,
+            'hash': hash_version,
+            'url': _url_version(cuestionario_id, hash_version)
+        })
+            
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp_preguntas.route('/cuestionario/<cuestionario_id>/v/<hash_version>', methods=['GET'])
+def obtener_version_preguntas(cuestionario_id, hash_version):
+    """Obtiene una versión inmutable de las preguntas (Cache-Control: immutable)"""
+    try:
+        if request.if_none_match.contains(hash_version):
+            respuesta = current_app.response_class(status=304)
+        else:
+            preguntas = repositorio_versiones.obtener_version(cuestionario_id, hash_version)
+            if preguntas is None:
+                return jsonify({'error': 'Versión no encontrada'}), 404
+            respuesta = jsonify(preguntas)
+        
+        respuesta.set_etag(hash_version)
+        respuesta.headers['Cache-Control'] = CACHE_CONTROL_VERSION
+        return respuesta
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -55,74 +195,17 @@ def crear_pregunta():
     try:
         datos = request.get_json()
         
-        # Validar datos requeridos
-        campos_requeridos = ['cuestionario_id', 'pregunta', 'tipo', 'orden']
-        for campo in campos_requeridos:
-            if campo not in datos:
-                return jsonify({'error': f'Campo requerido: {campo}'}), 400
-        
-        # Validar tipo de pregunta
-        tipos_validos = [
-            'opcion-multiple',           # Selección única
-            'opcion-multiple-multi',     # Selección múltiple
-            'verdadero-falso',
-            'likert',                    # Escala de valoración
-            'abierta'                    # Texto libre (se cuenta como correcta)
-        ]
-        if datos['tipo'] not in tipos_validos:
-            return jsonify({'error': 'Tipo de pregunta inválido'}), 400
-        
-        # Validar que tenga opciones si es opción múltiple (simple o multi)
-        if datos['tipo'] in ['opcion-multiple', 'opcion-multiple-multi'] and 'opciones' not in datos:
-            return jsonify({'error': 'Las preguntas de opción múltiple requieren opciones'}), 400
-        
-        # Validar que tenga respuesta correcta si es verdadero-falso
-        if datos['tipo'] == 'verdadero-falso' and 'respuesta_correcta' not in datos:
-            return jsonify({'error': 'Las preguntas verdadero-falso requieren respuesta_correcta'}), 400
-        
-        # Validar configuración de Likert
-        if datos['tipo'] == 'likert':
-            if 'escala_min' not in datos or 'escala_max' not in datos:
-                return jsonify({'error': 'Las preguntas Likert requieren escala_min y escala_max'}), 400
-            if datos['escala_min'] >= datos['escala_max']:
-                return jsonify({'error': 'escala_min debe ser menor que escala_max'}), 400
-        
-        # Preguntas abiertas no requieren validaciones adicionales
-        
-        # Crear ID único usando UUID
-        documento_id = f"{datos['cuestionario_id']}_pregunta_{str(uuid.uuid4())}"
-        
-        # Crear pregunta
-        pregunta = {
-            'id': documento_id,
-            'cuestionario_id': datos['cuestionario_id'],
-            'cuestionario_titulo': datos.get('cuestionario_titulo', ''),
-            'orden': datos['orden'],
-            'pregunta': datos['pregunta'],
-            'tipo': datos['tipo'],
-            'opciones': datos.get('opciones', []),
-            'respuesta_correcta': datos.get('respuesta_correcta'),
-            'activo': datos.get('activo', True),
-
-            # Campos para Likert
-            'escala_min': datos.get('escala_min'),
-            'escala_max': datos.get('escala_max'),
-            'etiquetas': datos.get('etiquetas', {}),
-
-            # Campos para preguntas abiertas
-            'longitud_minima': datos.get('longitud_minima'),
-            
-            # Campos para selección múltiple
-            'min_selecciones': datos.get('min_selecciones'),
-            'max_selecciones': datos.get('max_selecciones'),
-            'fecha_creacion': obtener_fecha_colombia(),
-            'fecha_modificacion': obtener_fecha_colombia()
-        }
+        error = _validar_pregunta(datos)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        pregunta = _nueva_pregunta(datos)
         
         contenedor_preguntas = current_app.config['COSMOS_CONTAINER_PREGUNTAS']
         resultado = servicio_cosmos.crear_documento(contenedor_preguntas, pregunta)
         
         if resultado:
+            _preguntas_modificadas(datos['cuestionario_id'])
             return jsonify(resultado), 201
         else:
             return jsonify({'error': 'Error al crear pregunta'}), 500
@@ -147,11 +230,7 @@ def actualizar_pregunta(pregunta_id):
             return jsonify({'error': 'Pregunta no encontrada'}), 404
         
         # Actualizar campos permitidos
-        campos_actualizables = ['orden', 'pregunta', 'tipo', 'opciones', 'respuesta_correcta', 
-                               'activo', 'cuestionario_titulo', 'escala_min', 
-                               'escala_max', 'etiquetas', 'longitud_minima', 'min_selecciones', 
-                               'max_selecciones']
-        for campo in campos_actualizables:
+        for campo in CAMPOS_ACTUALIZABLES:
             if campo in datos:
                 pregunta[campo] = datos[campo]
         
@@ -160,6 +239,7 @@ def actualizar_pregunta(pregunta_id):
         resultado = servicio_cosmos.actualizar_documento(contenedor_preguntas, pregunta)
         
         if resultado:
+            _preguntas_modificadas(cuestionario_id)
             return jsonify(resultado), 200
         else:
             return jsonify({'error': 'Error al actualizar pregunta'}), 500
@@ -189,6 +269,7 @@ def eliminar_pregunta(pregunta_id):
         resultado = servicio_cosmos.eliminar_documento(contenedor_preguntas, pregunta_id, cuestionario_id)
         
         if resultado.get('success'):
+            _preguntas_modificadas(cuestionario_id)
             return jsonify({'mensaje': 'Pregunta eliminada exitosamente'}), 200
         else:
             return jsonify({'error': resultado.get('message', 'Error al eliminar pregunta')}), 500
@@ -196,20 +277,145 @@ def eliminar_pregunta(pregunta_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@bp_preguntas.route('/cuestionarios', methods=['GET'])
-def listar_cuestionarios():
-    """Lista todos los cuestionarios disponibles (IDs únicos)"""
+def _operacion_lote(operacion, cuestionario_id, actuales, fecha):
+    """Traduce una operación del lote al formato de execute_item_batch; retorna un mensaje si es inválida"""
+    if not isinstance(operacion, dict):
+        return 'Cada operación debe ser un objeto'
+    tipo = operacion.get('op')
+    
+    if tipo == 'crear':
+        datos = {**(operacion.get('pregunta') or {}), 'cuestionario_id': cuestionario_id}
+        return _validar_pregunta(datos) or ('create', (_nueva_pregunta(datos),))
+    
+    pregunta_id = operacion.get('id')
+    if not isinstance(pregunta_id, str) or not pregunta_id:
+        return 'Se requiere id'
+    
+    if tipo == 'actualizar':
+        pregunta = actuales.get(pregunta_id)
+        if not pregunta:
+            return 'Pregunta no encontrada'
+        cambios = operacion.get('pregunta') or {}
+        documento = {campo: valor for campo, valor in pregunta.items() if not campo.startswith('_')}
+        documento.update({campo: cambios[campo] for campo in CAMPOS_ACTUALIZABLES if campo in cambios})
+        documento['fecha_modificacion'] = fecha
+        # Solo si nadie la modificó desde que se leyó
+        return ('replace', (pregunta_id, documento), {'if_match_etag': pregunta['_etag']})
+    
+    if tipo == 'eliminar':
+        return ('delete', (pregunta_id,))
+    
+    if tipo == 'reordenar':
+        orden = operacion.get('orden')
+        if not isinstance(orden, int) or isinstance(orden, bool):
+            return 'Se requiere orden numérico'
+        return ('patch', (pregunta_id, [
+            {'op': 'set', 'path': '/orden', 'value': orden},
+            {'op': 'set', 'path': '/fecha_modificacion', 'value': fecha}
+        ]))
+    
+    return f'Operación desconocida: {tipo}'
+
+@bp_preguntas.route('/cuestionario/<cuestionario_id>/batch', methods=['POST'])
+def aplicar_lote_preguntas(cuestionario_id):
+    """Crea, actualiza, elimina y reordena preguntas de un cuestionario en lotes transaccionales
+    
+    Estructura esperada:
+    {
+        "operaciones": [
+            {"op": "crear", "pregunta": {...}},          // mismos campos que POST /cuestionario
+            {"op": "actualizar", "id": "...", "pregunta": {...}},  // solo los campos a cambiar
+            {"op": "eliminar", "id": "..."},
+            {"op": "reordenar", "id": "...", "orden": 3}
+        ]
+    }
+    
+    Las preguntas del cuestionario comparten partición, así que cada bloque
+    de hasta MAX_OPERACIONES_LOTE operaciones es una sola llamada a CosmosDB
+    que se aplica completa o no se aplica. Si una operación es inválida no se
+    envía ninguna (400). Si un bloque falla, los anteriores quedan aplicados
+    y los siguientes no se envían. Retorna el resultado de cada operación.
+    """
     try:
+        datos = request.get_json() or {}
+        operaciones = datos.get('operaciones')
+        
+        if not isinstance(operaciones, list) or not operaciones:
+            return jsonify({'error': 'Se requiere el array de operaciones'}), 400
+        
         contenedor_preguntas = current_app.config['COSMOS_CONTAINER_PREGUNTAS']
-        consulta = """
-            SELECT DISTINCT c.cuestionario_id, c.cuestionario_titulo 
-            FROM c 
-            WHERE c.activo = true
-        """
         
-        cuestionarios = servicio_cosmos.consultar_documentos(contenedor_preguntas, consulta)
+        # Las preguntas a actualizar se leen juntas y sin caché: se reemplazan con su _etag vigente
+        ids_actualizar = [
+            operacion.get('id') for operacion in operaciones
+            if isinstance(operacion, dict) and operacion.get('op') == 'actualizar'
+        ]
+        actuales = {}
+        if ids_actualizar:
+            actuales = {
+                pregunta['id']: pregunta
+                for pregunta in servicio_cosmos.consultar_documentos(
+                    contenedor_preguntas, CONSULTA_POR_IDS, [{"name": "@ids", "value": ids_actualizar}],
+                    partition_key=cuestionario_id, usar_cache=False
+                )
+            }
+        
+        fecha = obtener_fecha_colombia()
+        lote, errores = [], []
+        for indice, operacion in enumerate(operaciones):
+            traducida = _operacion_lote(operacion, cuestionario_id, actuales, fecha)
+            if isinstance(traducida, str):
+                errores.append({'indice': indice, 'error': traducida})
+            else:
+                lote.append(traducida)
+        
+        if errores:
+            return jsonify({'error': 'Operaciones inválidas, no se aplicó ninguna', 'errores': errores}), 400
+        
+        respuestas = servicio_cosmos.ejecutar_lote(contenedor_preguntas, cuestionario_id, lote)
+        
+        resultados = []
+        for indice, (operacion, respuesta) in enumerate(zip(lote, respuestas)):
+            argumento = operacion[1][0]
+            estado = int(respuesta['statusCode'])
+            resultado = {
+                'indice': indice,
+                'op': operaciones[indice]['op'],
+                'id': argumento['id'] if isinstance(argumento, dict) else argumento,
+                'estado': estado,
+                'ok': estado < 400
+            }
+            if resultado['ok'] and respuesta.get('resourceBody'):
+                resultado['pregunta'] = respuesta['resourceBody']
+            resultados.append(resultado)
+        
+        aplicadas = sum(1 for resultado in resultados if resultado['ok'])
+        if aplicadas:
+            _preguntas_modificadas(cuestionario_id)
+        
+        # 424: no se aplicó porque falló otra operación de su bloque (o un bloque anterior)
+        fallida = next((r for r in resultados if not r['ok'] and r['estado'] != 424), None)
+        if fallida is None:
+            return jsonify({
+                'mensaje': f'{aplicadas} operaciones aplicadas exitosamente',
+                'aplicadas': aplicadas,
+                'resultados': resultados
+            }), 200
         
-        return jsonify(cuestionarios), 200
+        return jsonify({
+            'error': f"La operación {fallida['indice']} ({fallida['op']}) falló con estado {fallida['estado']}",
+            'aplicadas': aplicadas,
+            'resultados': resultados
+        }), 409 if fallida['estado'] == 412 else fallida['estado']
+            
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp_preguntas.route('/cuestionarios', methods=['GET'])
+def listar_cuestionarios():
+    """Lista todos los cuestionarios disponibles (IDs únicos)"""
+    try:
+        return jsonify(listar_cuestionarios_activos()), 200
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -276,6 +482,8 @@ def inicializar_datos_ejemplo():
             if resultado:
                 resultados.append(resultado['id'])
         
+        _preguntas_modificadas('cuestionario_gestion_procesos')
+        
         return jsonify({
             'mensaje': f'{len(resultados)} preguntas creadas exitosamente',
             'ids': resultados
@@ -70,12 +70,12 @@ def subir_video():
         # Generar nombre seguro para el archivo
         nombre_archivo = secure_filename(archivo.filename)
         
-        # Subir archivo a Azure Storage
+        # Subir archivo a Azure Storage (por fragmentos, sin cargarlo completo en memoria)
         contenedor_videos = current_app.config['AZURE_STORAGE_CONTAINER_VIDEOS']
         url = servicio_storage.subir_archivo(
             contenedor_videos, 
             nombre_archivo, 
-            archivo.read(), 
+            archivo.stream, 
             sobrescribir=False
         )
         
@@ -150,12 +150,12 @@ def subir_documento():
         
         nombre_archivo = secure_filename(archivo.filename)
         
-        # Subir archivo a Azure Storage
+        # Subir archivo a Azure Storage (por fragmentos, sin cargarlo completo en memoria)
         contenedor_recursos = current_app.config['AZURE_STORAGE_CONTAINER_RECURSOS']
         url = servicio_storage.subir_archivo(
             contenedor_recursos, 
             nombre_archivo, 
-            archivo.read(), 
+            archivo.stream, 
             sobrescribir=False
         )
         
@@ -1,14 +1,13 @@
 from flask import Blueprint, request, jsonify, current_app
 from servicios.azure_storage import servicio_storage
-from servicios.cosmos_db import servicio_cosmos
-from azure.storage.blob import generate_blob_sas, BlobSasPermissions
-from datetime import datetime, timedelta
+from servicios.repositorio_configuracion import repositorio_configuracion
 import os
 
 bp_video = Blueprint('video', __name__)
 
 ALLOWED_EXTENSIONS = {'mp4', 'webm', 'ogg', 'mov'}
 MAX_FILE_SIZE = 500 * 1024 * 1024  # 500MB
+SAS_DURACION_HORAS = 30 * 24  # 30 días
 
 def allowed_file(filename):
     """Verifica si el archivo tiene una extensión permitida"""
@@ -68,41 +67,21 @@ def subir_video():
         # Subir archivo (sobrescribir si existe)
         blob_client.upload_blob(archivo, overwrite=True)
         
-        # Generar SAS URL
-        connection_string = current_app.config['AZURE_STORAGE_CONNECTION_STRING']
-        connection_parts = dict(item.split('=', 1) for item in connection_string.split(';') if '=' in item)
-        
-        account_name = connection_parts.get('AccountName')
-        account_key = connection_parts.get('AccountKey')
+        # Generar SAS URL válida por 30 días (o URL firmada con el almacenamiento local)
+        video_url = servicio_storage.generar_url_sas(
+            container_name, video_filename, duracion_horas=SAS_DURACION_HORAS
+        )
         
-        if not account_name or not account_key:
+        if not video_url:
             return jsonify({"error": "Error al generar URL"}), 500
         
-        # Generar SAS token válido por 30 días
-        sas_token = generate_blob_sas(
-            account_name=account_name,
-            container_name=container_name,
-            blob_name=video_filename,
-            account_key=account_key,
-            permission=BlobSasPermissions(read=True),
-            expiry=datetime.utcnow() + timedelta(days=30)  # 30 días
+        # Actualizar configuración automáticamente (patch solo de video_url)
+        estado, resultado = repositorio_configuracion.parchear(
+            lambda config: [{'op': 'set', 'path': '/video_url', 'value': video_url}]
         )
         
-        video_url = f"{blob_client.url}?{sas_token}"
-        
-        # Actualizar configuración automáticamente
-        contenedor_config = current_app.config['COSMOS_CONTAINER_CONFIGURACION']
-        query = "SELECT * FROM c WHERE c.tipo = 'induccion' AND c.id = 'induccion_general'"
-        items = servicio_cosmos.consultar_documentos(contenedor_config, query)
-        
-        if items:
-            config = items[0]
-            config['video_url'] = video_url
-            config['fecha_modificacion'] = datetime.utcnow().isoformat()
-            
-            resultado = servicio_cosmos.actualizar_documento(contenedor_config, config)
-            
-            if resultado:
+        if estado != 'sin_configuracion':
+            if estado == 'ok' and resultado:
                 return jsonify({
                     "mensaje": "Video subido y configuración actualizada exitosamente",
                     "video_url": video_url
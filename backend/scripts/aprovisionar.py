@@ -0,0 +1,101 @@
+"""
+Aprovisionamiento de CosmosDB y Azure Storage
+
+Crea (si no existen) la base de datos, los contenedores de CosmosDB y los
+contenedores de blobs que usa la aplicación. Es lo mismo que hace crear_app al
+iniciar cada worker cuando INICIO_RAPIDO=false; con INICIO_RAPIDO=true los
+workers no hacen esas llamadas y este script debe ejecutarse una vez por
+despliegue (y cada vez que cambien los contenedores configurados).
+
+También verifica que el partition key real de cada contenedor coincida con el
+configurado: en inicio rápido la aplicación usa el configurado sin consultarlo.
+Termina con código 1 si algo falla o no coincide.
+
+Uso:
+    python scripts/aprovisionar.py
+    python scripts/aprovisionar.py --entorno produccion
+"""
+import argparse
+import os
+import sys
+import time
+from dotenv import load_dotenv
+from flask import Flask
+
+# Permite importar config y servicios al ejecutar desde backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Cargar variables de entorno
+load_dotenv()
+
+from config import configuraciones  # noqa: E402
+from servicios.cosmos_db import servicio_cosmos, cosmos_configurado  # noqa: E402
+from servicios.azure_storage import servicio_storage, storage_configurado  # noqa: E402
+
+
+def aprovisionar_cosmos(config):
+    """Crea base de datos y contenedores. Retorna True si todos quedaron con el partition key esperado"""
+    if not cosmos_configurado(config):
+        print("❌ Error: COSMOS_ENDPOINT y COSMOS_KEY deben estar configurados en .env")
+        return False
+
+    inicio = time.perf_counter()
+    if not servicio_cosmos.inicializar(aprovisionar=True):
+        return False
+
+    correcto = True
+    for nombre, partition_key in servicio_cosmos.contenedores_config(config):
+        real = servicio_cosmos.claves_particion.get(nombre)
+        if real is None:
+            print(f"❌ Contenedor {nombre}: no se pudo crear")
+            correcto = False
+        elif real != partition_key.lstrip('/'):
+            print(f"❌ Contenedor {nombre}: particionado por /{real}, configurado {partition_key}")
+            correcto = False
+        else:
+            print(f"✅ Contenedor {nombre} ({partition_key})")
+    print(f"   CosmosDB aprovisionado en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    return correcto
+
+
+def aprovisionar_storage(config):
+    """Crea los contenedores de blobs. Retorna True si quedaron todos (o si Storage no está configurado)"""
+    if not storage_configurado(config):
+        print("ℹ️  Azure Storage no configurado, se omite")
+        return True
+
+    inicio = time.perf_counter()
+    if not servicio_storage.inicializar(aprovisionar=True):
+        return False
+
+    correcto = True
+    for nombre in servicio_storage.nombres_contenedores():
+        if nombre in servicio_storage.contenedores:
+            print(f"✅ Contenedor de blobs {nombre}")
+        else:
+            print(f"❌ Contenedor de blobs {nombre}: no se pudo crear")
+            correcto = False
+    print(f"   Azure Storage aprovisionado en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    return correcto
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entorno', default=os.getenv('FLASK_ENV', 'default'), choices=sorted(configuraciones))
+    args = parser.parse_args()
+
+    # Solo la configuración: sin rutas ni inicialización de crear_app
+    app = Flask(__name__)
+    app.config.from_object(configuraciones[args.entorno])
+
+    with app.app_context():
+        cosmos_correcto = aprovisionar_cosmos(app.config)
+        storage_correcto = aprovisionar_storage(app.config)
+
+    if not (cosmos_correcto and storage_correcto):
+        sys.exit(1)
+    print("✅ Aprovisionamiento completo: ya se puede usar INICIO_RAPIDO=true")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Migración del contenedor de respuestas a un contenedor particionado por /cuestionario_id
+
+CosmosDB no permite cambiar el partition key de un contenedor, así que la
+migración copia las respuestas a un contenedor nuevo y luego se cambia la
+aplicación para usarlo:
+
+1. copiar: crea el destino (si no existe) y copia las respuestas en orden de
+   _ts, guardando un punto de control tras cada página. Se puede interrumpir y
+   volver a ejecutar: continúa desde el último punto de control. Mientras la
+   aplicación sigue en línea, cada nueva ejecución copia también lo escrito
+   desde la anterior (upsert, así que repetir documentos no hace daño).
+2. verificar: compara el número de respuestas por cuestionario en origen y
+   destino. Termina con código 1 si hay diferencias.
+3. Cambio: ejecutar una última pasada de copiar, verificar, configurar
+   COSMOS_CONTAINER_RESPUESTAS=<destino> y reiniciar la aplicación. El
+   contenedor anterior puede eliminarse cuando ya no se necesite.
+
+Uso:
+    python scripts/migrar_respuestas.py copiar --destino respuestas_v2
+    python scripts/migrar_respuestas.py verificar --destino respuestas_v2
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from azure.cosmos import CosmosClient, PartitionKey
+from dotenv import load_dotenv
+
+# Permite importar servicios al ejecutar desde backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from servicios.cosmos_db import POLITICA_INDEXACION_RESPUESTAS  # noqa: E402
+
+# Cargar variables de entorno
+load_dotenv()
+
+COSMOS_ENDPOINT = os.getenv('COSMOS_ENDPOINT')
+COSMOS_KEY = os.getenv('COSMOS_KEY')
+COSMOS_DATABASE = os.getenv('COSMOS_DATABASE', 'induccion_gxp')
+
+PARTICION_DESTINO = '/cuestionario_id'
+# Campos de sistema de CosmosDB que no se copian
+CAMPOS_SISTEMA = ('_rid', '_self', '_etag', '_attachments', '_ts')
+
+
+def _leer_punto_control(ruta):
+    if not os.path.exists(ruta):
+        return {'desde_ts': 0, 'copiados': 0, 'omitidos': []}
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def _guardar_punto_control(ruta, punto_control):
+    temporal = f'{ruta}.tmp'
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(punto_control, archivo, indent=2)
+    os.replace(temporal, ruta)
+
+
+def copiar(base_datos, origen, destino, ruta_punto_control, tamano_pagina):
+    """Copia las respuestas con _ts >= punto de control al contenedor destino"""
+    contenedor_origen = base_datos.get_container_client(origen)
+    contenedor_destino = base_datos.create_container_if_not_exists(
+        id=destino, partition_key=PartitionKey(path=PARTICION_DESTINO),
+        indexing_policy=POLITICA_INDEXACION_RESPUESTAS
+    )
+
+    punto_control = _leer_punto_control(ruta_punto_control)
+    print(f"🔄 Copiando {origen} → {destino} desde _ts={punto_control['desde_ts']}")
+
+    # Se usa >= porque varios documentos pueden compartir el mismo _ts
+    paginas = contenedor_origen.query_items(
+        query="SELECT * FROM c WHERE c._ts >= @desde ORDER BY c._ts ASC",
+        parameters=[{'name': '@desde', 'value': punto_control['desde_ts']}],
+        enable_cross_partition_query=True,
+        max_item_count=tamano_pagina
+    ).by_page()
+
+    for pagina in paginas:
+        ultimo_ts = None
+        for respuesta in pagina:
+            ultimo_ts = respuesta['_ts']
+            if not respuesta.get('cuestionario_id'):
+                # Sin cuestionario_id no hay partición destino: se reporta para revisión manual
+                if respuesta['id'] not in punto_control['omitidos']:
+                    punto_control['omitidos'].append(respuesta['id'])
+                continue
+
+            contenedor_destino.upsert_item(
+                {k: v for k, v in respuesta.items() if k not in CAMPOS_SISTEMA}
+            )
+            punto_control['copiados'] += 1
+
+        if ultimo_ts is not None:
+            punto_control['desde_ts'] = ultimo_ts
+            _guardar_punto_control(ruta_punto_control, punto_control)
+            print(f"   {punto_control['copiados']} copiados (hasta _ts={ultimo_ts})")
+
+    _guardar_punto_control(ruta_punto_control, punto_control)
+    print(f"✅ Copia terminada: {punto_control['copiados']} escrituras acumuladas")
+    if punto_control['omitidos']:
+        print(f"⚠ {len(punto_control['omitidos'])} respuestas sin cuestionario_id no se copiaron "
+              f"(ver {ruta_punto_control})")
+
+
+def _contar_por_cuestionario(contenedor):
+    conteo = Counter()
+    for respuesta in contenedor.query_items(
+        query="SELECT c.cuestionario_id FROM c",
+        enable_cross_partition_query=True,
+        max_item_count=1000
+    ):
+        conteo[respuesta.get('cuestionario_id')] += 1
+    return conteo
+
+
+def verificar(base_datos, origen, destino):
+    """Compara el número de respuestas por cuestionario. Retorna True si coinciden"""
+    conteo_origen = _contar_por_cuestionario(base_datos.get_container_client(origen))
+    conteo_destino = _contar_por_cuestionario(base_datos.get_container_client(destino))
+    # Las respuestas sin cuestionario_id no se migran
+    conteo_origen.pop(None, None)
+
+    diferencias = {
+        cuestionario_id: (conteo_origen.get(cuestionario_id, 0), conteo_destino.get(cuestionario_id, 0))
+        for cuestionario_id in set(conteo_origen) | set(conteo_destino)
+        if conteo_origen.get(cuestionario_id, 0) != conteo_destino.get(cuestionario_id, 0)
+    }
+
+    print(f"Origen: {sum(conteo_origen.values())} respuestas · Destino: {sum(conteo_destino.values())} respuestas")
+    if not diferencias:
+        print("✅ Los conteos por cuestionario coinciden")
+        return True
+
+    print("❌ Diferencias (origen, destino):")
+    for cuestionario_id, (en_origen, en_destino) in sorted(diferencias.items(), key=lambda d: str(d[0])):
+        print(f"   {cuestionario_id}: {en_origen} vs {en_destino}")
+    print("Si el destino tiene de más, probablemente se eliminaron respuestas en el origen durante la copia.")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('accion', choices=['copiar', 'verificar'])
+    parser.add_argument('--origen', default=os.getenv('COSMOS_CONTAINER_RESPUESTAS', 'respuestas'))
+    parser.add_argument('--destino', default='respuestas_v2')
+    parser.add_argument('--punto-control', default='.migracion_respuestas.json',
+                        help='Archivo donde se guarda el avance de la copia')
+    parser.add_argument('--tamano-pagina', type=int, default=100)
+    args = parser.parse_args()
+
+    if not COSMOS_ENDPOINT or not COSMOS_KEY:
+        print("❌ Error: COSMOS_ENDPOINT y COSMOS_KEY deben estar configurados en .env")
+        sys.exit(1)
+    if args.origen == args.destino:
+        print("❌ Error: el origen y el destino deben ser contenedores distintos")
+        sys.exit(1)
+
+    cliente = CosmosClient(COSMOS_ENDPOINT, COSMOS_KEY)
+    base_datos = cliente.get_database_client(COSMOS_DATABASE)
+
+    if args.accion == 'copiar':
+        copiar(base_datos, args.origen, args.destino, args.punto_control, args.tamano_pagina)
+    elif not verificar(base_datos, args.origen, args.destino):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,22 @@
 from azure.storage.blob import BlobServiceClient, BlobSasPermissions, generate_blob_sas
 from datetime import datetime, timedelta
 from flask import current_app
+from servicios.metricas import ganchos_storage
+from servicios.transporte_http import transporte_http
+from servicios.storage_local import crear_cliente_local
 import os
 
+
+def storage_local(config):
+    """True si AZURE_STORAGE_BACKEND usa el almacenamiento en disco en lugar de Azure"""
+    return config['AZURE_STORAGE_BACKEND'] == 'local'
+
+
+def storage_configurado(config):
+    """True si hay un Storage que inicializar: el local, o Azure con cadena de conexión"""
+    return storage_local(config) or bool(config.get('AZURE_STORAGE_CONNECTION_STRING'))
+
+
 class ServicioAzureStorage:
     """Servicio para interactuar con Azure Blob Storage"""
     
@@ -10,9 +24,19 @@ class ServicioAzureStorage:
         self.cliente_blob = None
         self.contenedores = {}
     
-    def inicializar(self):
-        """Inicializa la conexión a Azure Storage"""
+    def inicializar(self, aprovisionar=True):
+        """Inicializa la conexión a Azure Storage
+        
+        Con aprovisionar=False (inicio rápido) los contenedores se enlazan sin
+        verificar que existan, así no hay llamadas de red al iniciar.
+        """
         try:
+            # Almacenamiento en disco: crear los contenedores son solo directorios
+            if storage_local(current_app.config):
+                self.cliente_blob = crear_cliente_local(current_app.config)
+                self._crear_contenedores()
+                return True
+            
             connection_string = current_app.config['AZURE_STORAGE_CONNECTION_STRING']
             
             # Validar que la cadena de conexión no sea la de ejemplo
@@ -20,10 +44,16 @@ class ServicioAzureStorage:
                 print("Azure Storage: Usando configuración de ejemplo, servicio no disponible")
                 return False
             
-            self.cliente_blob = BlobServiceClient.from_connection_string(connection_string)
+            ganchos = ganchos_storage() if current_app.config['METRICAS_HABILITADAS'] else {}
+            self.cliente_blob = BlobServiceClient.from_connection_string(
+                connection_string, **ganchos, **transporte_http.transporte_azure()
+            )
             
             # Crear o obtener contenedores
-            self._crear_contenedores()
+            if aprovisionar:
+                self._crear_contenedores()
+            else:
+                self._enlazar_contenedores()
             
             return True
         except Exception as e:
@@ -31,17 +61,23 @@ class ServicioAzureStorage:
             self.cliente_blob = None
             return False
     
+    def nombres_contenedores(self):
+        return [
+            current_app.config['AZURE_STORAGE_CONTAINER_VIDEOS'],
+            current_app.config['AZURE_STORAGE_CONTAINER_RECURSOS']
+        ]
+    
+    def _enlazar_contenedores(self):
+        """Obtiene los clientes de los contenedores sin llamadas de red (deben existir)"""
+        for nombre in self.nombres_contenedores():
+            self.contenedores[nombre] = self.cliente_blob.get_container_client(nombre)
+    
     def _crear_contenedores(self):
         """Crea los contenedores necesarios si no existen"""
         if not self.cliente_blob:
             return
-            
-        nombres_contenedores = [
-            current_app.config['AZURE_STORAGE_CONTAINER_VIDEOS'],
-            current_app.config['AZURE_STORAGE_CONTAINER_RECURSOS']
-        ]
         
-        for nombre in nombres_contenedores:
+        for nombre in self.nombres_contenedores():
             try:
                 contenedor = self.cliente_blob.get_container_client(nombre)
                 if not contenedor.exists():
@@ -113,6 +149,10 @@ class ServicioAzureStorage:
             if not contenedor:
                 return None
             
+            # Almacenamiento local: URL firmada que sirve /api/almacenamiento
+            if storage_local(current_app.config):
+                return contenedor.get_blob_client(nombre_archivo).url_firmada(timedelta(hours=duracion_horas))
+            
             # Extraer información de la cadena de conexión
             connection_parts = dict(item.split('=', 1) for item in 
                                   current_app.config['AZURE_STORAGE_CONNECTION_STRING'].split(';') if '=' in item)
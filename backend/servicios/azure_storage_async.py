@@ -0,0 +1,192 @@
+"""
+Variante asíncrona de ServicioAzureStorage (azure.storage.blob.aio) para el modo ASGI
+
+Mismos métodos que servicios/azure_storage.py como corrutinas. Igual que el
+servicio asíncrono de CosmosDB, recibe la configuración al inicializar y debe
+cerrarse dentro del loop del servidor.
+"""
+from azure.storage.blob import BlobSasPermissions, generate_blob_sas
+from azure.storage.blob.aio import BlobServiceClient
+from datetime import datetime, timedelta
+from servicios.azure_storage import storage_local
+from servicios.storage_local import crear_cliente_local
+
+
+class ServicioAzureStorageAsync:
+    """Servicio asíncrono para interactuar con Azure Blob Storage"""
+
+    def __init__(self):
+        self.cliente_blob = None
+        self.contenedores = {}
+        self.connection_string = None
+        self.local = False
+
+    async def inicializar(self, config, aprovisionar=True):
+        """Inicializa la conexión a Azure Storage con la configuración indicada
+
+        Con aprovisionar=False los contenedores se enlazan sin verificar que existan.
+        """
+        try:
+            if storage_local(config):
+                self.local = True
+                self.cliente_blob = crear_cliente_local(config, con_metricas=False, asincrono=True)
+                await self._crear_contenedores(config)
+                return True
+
+            connection_string = config['AZURE_STORAGE_CONNECTION_STRING']
+
+            # Validar que la cadena de conexión no sea la de ejemplo
+            if not connection_string or 'tu-cuenta' in connection_string or 'tu-clave' in connection_string:
+                print("Azure Storage: Usando configuración de ejemplo, servicio no disponible")
+                return False
+
+            self.connection_string = connection_string
+            self.cliente_blob = BlobServiceClient.from_connection_string(connection_string)
+
+            # Crear o obtener contenedores
+            if aprovisionar:
+                await self._crear_contenedores(config)
+            else:
+                for nombre in self.nombres_contenedores(config):
+                    self.contenedores[nombre] = self.cliente_blob.get_container_client(nombre)
+
+            return True
+        except Exception as e:
+            print(f"Azure Storage: No se pudo inicializar - {str(e)}")
+            self.cliente_blob = None
+            return False
+
+    async def cerrar(self):
+        """Cierra la sesión HTTP del cliente asíncrono"""
+        if self.cliente_blob:
+            await self.cliente_blob.close()
+            self.cliente_blob = None
+
+    def nombres_contenedores(self, config):
+        return [config['AZURE_STORAGE_CONTAINER_VIDEOS'], config['AZURE_STORAGE_CONTAINER_RECURSOS']]
+
+    async def _crear_contenedores(self, config):
+        """Crea los contenedores necesarios si no existen"""
+        for nombre in self.nombres_contenedores(config):
+            try:
+                contenedor = self.cliente_blob.get_container_client(nombre)
+                if not await contenedor.exists():
+                    await contenedor.create_container()
+                self.contenedores[nombre] = contenedor
+            except Exception as e:
+                print(f"Azure Storage: No se pudo crear contenedor {nombre} - {str(e)}")
+
+    async def subir_archivo(self, nombre_contenedor, nombre_archivo, datos_archivo, sobrescribir=False):
+        """Sube un archivo al contenedor especificado"""
+        try:
+            contenedor = self.contenedores.get(nombre_contenedor)
+            if not contenedor:
+                return None
+
+            blob_cliente = contenedor.get_blob_client(nombre_archivo)
+            await blob_cliente.upload_blob(datos_archivo, overwrite=sobrescribir)
+
+            return blob_cliente.url
+        except Exception as e:
+            print(f"Error al subir archivo: {str(e)}")
+            return None
+
+    async def descargar_archivo(self, nombre_contenedor, nombre_archivo):
+        """Descarga un archivo del contenedor"""
+        try:
+            contenedor = self.contenedores.get(nombre_contenedor)
+            if not contenedor:
+                return None
+
+            blob_cliente = contenedor.get_blob_client(nombre_archivo)
+            descarga = await blob_cliente.download_blob()
+            return await descarga.readall()
+        except Exception as e:
+            print(f"Error al descargar archivo: {str(e)}")
+            return None
+
+    async def eliminar_archivo(self, nombre_contenedor, nombre_archivo):
+        """Elimina un archivo del contenedor"""
+        try:
+            contenedor = self.contenedores.get(nombre_contenedor)
+            if not contenedor:
+                return False
+
+            blob_cliente = contenedor.get_blob_client(nombre_archivo)
+            await blob_cliente.delete_blob()
+            return True
+        except Exception as e:
+            print(f"Error al eliminar archivo: {str(e)}")
+            return False
+
+    async def listar_archivos(self, nombre_contenedor, prefijo=None):
+        """Lista archivos en un contenedor"""
+        try:
+            contenedor = self.contenedores.get(nombre_contenedor)
+            if not contenedor:
+                return []
+
+            return [
+                {'nombre': blob.name, 'tamaño': blob.size, 'ultima_modificacion': blob.last_modified}
+                async for blob in contenedor.list_blobs(name_starts_with=prefijo)
+            ]
+        except Exception as e:
+            print(f"Error al listar archivos: {str(e)}")
+            return []
+
+    def generar_url_sas(self, nombre_contenedor, nombre_archivo, duracion_horas=1):
+        """Genera una URL con SAS para acceso temporal
+
+        La firma se calcula localmente con la clave de la cuenta (sin llamadas
+        de red), por eso no es una corrutina.
+        """
+        try:
+            contenedor = self.contenedores.get(nombre_contenedor)
+            if not contenedor:
+                return None
+
+            if self.local:
+                return contenedor.get_blob_client(nombre_archivo).url_firmada(timedelta(hours=duracion_horas))
+
+            # Extraer información de la cadena de conexión
+            connection_parts = dict(item.split('=', 1) for item in
+                                    self.connection_string.split(';') if '=' in item)
+
+            account_name = connection_parts.get('AccountName')
+            account_key = connection_parts.get('AccountKey')
+
+            if not account_name or not account_key:
+                return None
+
+            sas_token = generate_blob_sas(
+                account_name=account_name,
+                container_name=nombre_contenedor,
+                blob_name=nombre_archivo,
+                account_key=account_key,
+                permission=BlobSasPermissions(read=True),
+                expiry=datetime.utcnow() + timedelta(hours=duracion_horas)
+            )
+
+            blob_cliente = contenedor.get_blob_client(nombre_archivo)
+            url_base = blob_cliente.url.split('?')[0]
+
+            return f"{url_base}?{sas_token}"
+        except Exception as e:
+            print(f"Error al generar URL SAS: {str(e)}")
+            return None
+
+    async def existe_archivo(self, nombre_contenedor, nombre_archivo):
+        """Verifica si un archivo existe en el contenedor"""
+        try:
+            contenedor = self.contenedores.get(nombre_contenedor)
+            if not contenedor:
+                return False
+
+            blob_cliente = contenedor.get_blob_client(nombre_archivo)
+            return await blob_cliente.exists()
+        except Exception as e:
+            print(f"Error al verificar existencia de archivo: {str(e)}")
+            return False
+
+# Instancia global del servicio asíncrono
+servicio_storage_async = ServicioAzureStorageAsync()
@@ -0,0 +1,74 @@
+"""
+Bundle de la página de inducción: todo lo que necesita para mostrarse en una respuesta
+
+Reúne la configuración, sus documentos activos, la lista de cuestionarios y
+las preguntas del cuestionario de la página. Antes eran cuatro peticiones
+seguidas (y la configuración se leía dos veces); aquí las lecturas a los
+contenedores de configuración y de preguntas se hacen en paralelo, en hilos
+que cuentan como parte de la petición (ver metricas.en_hilo_de_peticion).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from servicios.metricas import en_hilo_de_peticion
+from servicios.repositorio_configuracion import (
+    repositorio_configuracion, CONFIGURACION_POR_DEFECTO, documentos_activos
+)
+from servicios.versiones_preguntas import repositorio_versiones, listar_cuestionarios
+
+# Cuestionario de la página de inducción si no se indica otro
+CUESTIONARIO_POR_DEFECTO = 'cuestionario_gestion_procesos'
+
+_ejecutor = None
+_candado = threading.Lock()
+
+
+def _obtener_ejecutor():
+    """Pool de hilos del proceso, creado en la primera petición"""
+    global _ejecutor
+    with _candado:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(
+                max_workers=current_app.config['INDUCCION_BUNDLE_HILOS'], thread_name_prefix='bundle-induccion'
+            )
+    return _ejecutor
+
+
+def _preguntas_vigentes(cuestionario_id):
+    """(hash, preguntas) de la versión vigente del cuestionario; (None, []) si no tiene"""
+    hash_version = repositorio_versiones.hash_actual(cuestionario_id)
+    if not hash_version:
+        return None, []
+    return hash_version, repositorio_versiones.obtener_version(cuestionario_id, hash_version) or []
+
+
+def armar_bundle(cuestionario_id=CUESTIONARIO_POR_DEFECTO):
+    """Lee en paralelo las partes del bundle y lo retorna como diccionario
+
+    La configuración se lee en el hilo de la petición mientras los hilos del
+    pool consultan los cuestionarios y la versión de preguntas.
+    """
+    ejecutor = _obtener_ejecutor()
+    cuestionarios = ejecutor.submit(en_hilo_de_peticion(listar_cuestionarios))
+    preguntas = ejecutor.submit(en_hilo_de_peticion(_preguntas_vigentes), cuestionario_id)
+
+    configuracion = repositorio_configuracion.obtener()
+    hash_version, lista_preguntas = preguntas.result()
+
+    if configuracion:
+        # Sin los campos de sistema (_etag, _ts...) ni la lista completa de documentos
+        datos_configuracion = {
+            campo: valor for campo, valor in configuracion.items()
+            if not campo.startswith('_') and campo != 'documentos'
+        }
+    else:
+        datos_configuracion = CONFIGURACION_POR_DEFECTO
+
+    return {
+        'configuracion': datos_configuracion,
+        'documentos': documentos_activos(configuracion),
+        'cuestionarios': cuestionarios.result(),
+        'cuestionario_id': cuestionario_id,
+        'version_preguntas': hash_version,
+        'preguntas': lista_preguntas
+    }
@@ -0,0 +1,79 @@
+"""
+Caché en memoria con expiración (TTL) y desalojo LRU para lecturas de CosmosDB
+
+Cada proceso (worker de gunicorn) tiene su propia caché: una escritura solo
+invalida la caché del proceso que la hizo, los demás sirven el valor anterior
+como máximo durante el TTL del contenedor.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLRU:
+    """Caché LRU acotada por número de entradas, con TTL por entrada y contadores"""
+
+    def __init__(self, max_entradas=1024):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave):
+        """Retorna (encontrado, valor). El valor es una copia para que el llamador pueda modificarlo"""
+        with self._candado:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return False, None
+
+            valor, expira = entrada
+            if expira < time.monotonic():
+                del self._entradas[clave]
+                self.fallos += 1
+                return False, None
+
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+        return True, copy.deepcopy(valor)
+
+    def guardar(self, clave, valor, ttl_segundos):
+        """Guarda una copia del valor; desaloja la entrada menos usada si se supera el límite"""
+        valor = copy.deepcopy(valor)
+        with self._candado:
+            self._entradas[clave] = (valor, time.monotonic() + ttl_segundos)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.expulsiones += 1
+
+    def invalidar(self, condicion):
+        """Elimina las entradas cuya clave cumple la condición"""
+        with self._candado:
+            claves = [clave for clave in self._entradas if condicion(clave)]
+            for clave in claves:
+                del self._entradas[clave]
+            self.invalidaciones += len(claves)
+
+    def limpiar(self):
+        with self._candado:
+            self.invalidaciones += len(self._entradas)
+            self._entradas.clear()
+
+    def estadisticas(self):
+        """Contadores de uso de la caché"""
+        with self._candado:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'expulsiones': self.expulsiones,
+                'invalidaciones': self.invalidaciones,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0
+            }
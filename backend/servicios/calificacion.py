@@ -0,0 +1,335 @@
+"""
+Calificación de cuestionarios en el servidor a partir de la clave de respuestas
+
+El envío compacto trae solo {pregunta_id: respuesta}; el servidor carga la
+clave del cuestionario (la versión vigente de sus preguntas, ver
+servicios/versiones_preguntas.py, reducida a lo necesario para calificar) y
+decide qué respuestas son correctas. La clave se guarda por proceso durante
+CALIFICACION_CACHE_TTL segundos y se invalida al crear, editar o eliminar una
+pregunta; los demás procesos la recargan como máximo al vencer el TTL.
+
+Cada pregunta del intento se guarda como
+{pregunta_id, orden, tipo, respuesta_usuario, es_correcta}, con la respuesta
+tal como la envió el cliente (id de opción, lista de ids, bool, número o
+texto), y el intento guarda el hash de la versión en version_preguntas.
+expandir_respuestas agrega el texto de la pregunta y de las opciones de esa
+versión para el detalle que muestra el panel de administración.
+"""
+import threading
+import time
+from flask import current_app
+from servicios.versiones_preguntas import repositorio_versiones, CONSULTA_ACTIVAS
+
+# Nombre de cada tipo en el formato detallado de los envíos anteriores
+TIPOS_DETALLE = {
+    'opcion-multiple': 'multiple_choice',
+    'opcion-multiple-multi': 'multiple_choice_multi',
+    'verdadero-falso': 'verdadero_falso',
+    'likert': 'likert',
+    'abierta': 'texto_libre',
+}
+
+
+def _compilar_pregunta(pregunta):
+    """Reduce un documento de pregunta a lo que se necesita para calificarla y mostrarla"""
+    opciones = pregunta.get('opciones') or []
+    return {
+        'orden': pregunta.get('orden', 0),
+        'pregunta': pregunta.get('pregunta', ''),
+        'tipo': pregunta.get('tipo'),
+        'activo': pregunta.get('activo', True),
+        'opciones': {opcion.get('id'): opcion.get('texto', '') for opcion in opciones},
+        'correctas': frozenset(opcion.get('id') for opcion in opciones if opcion.get('correcta')),
+        'respuesta_correcta': pregunta.get('respuesta_correcta'),
+        'escala_min': pregunta.get('escala_min', 1),
+        'escala_max': pregunta.get('escala_max', 5),
+        'longitud_minima': pregunta.get('longitud_minima') or 1,
+    }
+
+
+def compilar_clave(cuestionario_id, preguntas, version=None):
+    """Arma la clave de respuestas de un cuestionario a partir de sus documentos de pregunta
+
+    version es el hash de la versión de preguntas de la que salen. Retorna
+    None si el cuestionario no tiene preguntas.
+    """
+    if not preguntas:
+        return None
+    compiladas = {pregunta['id']: _compilar_pregunta(pregunta) for pregunta in preguntas}
+    return {
+        'cuestionario_id': cuestionario_id,
+        'version': version,
+        'cuestionario_titulo': preguntas[0].get('cuestionario_titulo', 'Sin título'),
+        'preguntas': compiladas,
+        # Ids de las preguntas que se califican, en el orden del cuestionario
+        'activas': tuple(pregunta_id for pregunta_id, pregunta in compiladas.items() if pregunta['activo']),
+    }
+
+
+def _es_entero(valor):
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+
+def _calificar_opcion(pregunta, valor):
+    if not isinstance(valor, str) or valor not in pregunta['opciones']:
+        return None, False
+    return valor, valor in pregunta['correctas']
+
+
+def _calificar_opcion_multi(pregunta, valor):
+    if not isinstance(valor, list) or not all(isinstance(v, str) and v in pregunta['opciones'] for v in valor):
+        return None, False
+    seleccion = frozenset(valor)
+    return sorted(seleccion), seleccion == pregunta['correctas']
+
+
+def _calificar_verdadero_falso(pregunta, valor):
+    if not isinstance(valor, bool):
+        return None, False
+    return valor, valor == bool(pregunta['respuesta_correcta'])
+
+
+def _calificar_likert(pregunta, valor):
+    # No tiene respuesta correcta: cuenta como correcta si está dentro de la escala
+    if not _es_entero(valor) or not pregunta['escala_min'] <= valor <= pregunta['escala_max']:
+        return None, False
+    return valor, True
+
+
+def _calificar_abierta(pregunta, valor):
+    # No tiene respuesta correcta: cuenta como correcta si cumple la longitud mínima
+    if not isinstance(valor, str):
+        return None, False
+    valor = valor.strip()
+    return valor, len(valor) >= pregunta['longitud_minima']
+
+
+CALIFICADORES = {
+    'opcion-multiple': _calificar_opcion,
+    'opcion-multiple-multi': _calificar_opcion_multi,
+    'verdadero-falso': _calificar_verdadero_falso,
+    'likert': _calificar_likert,
+    'abierta': _calificar_abierta,
+}
+
+
+def calificar(clave, respuestas):
+    """Califica un envío compacto {pregunta_id: respuesta} con la clave del cuestionario
+
+    Se califican todas las preguntas activas: las que no se respondieron, o
+    cuya respuesta no es válida para su tipo, cuentan como incorrectas y se
+    guardan con respuesta_usuario None. Los ids que no están en la clave
+    (p. ej. una pregunta recién eliminada) se ignoran.
+    """
+    resultados = []
+    for pregunta_id in clave['activas']:
+        pregunta = clave['preguntas'][pregunta_id]
+        calificador = CALIFICADORES.get(pregunta['tipo'])
+        valor = respuestas.get(pregunta_id)
+        if calificador is None or valor is None:
+            valor, es_correcta = None, False
+        else:
+            valor, es_correcta = calificador(pregunta, valor)
+        resultados.append({
+            'pregunta_id': pregunta_id,
+            'orden': pregunta['orden'],
+            'tipo': pregunta['tipo'],
+            'respuesta_usuario': valor,
+            'es_correcta': es_correcta
+        })
+    return resultados
+
+
+def _opcion_por_texto(pregunta, valor):
+    """Id de la opción cuyo texto (o id) es valor, o None"""
+    if not isinstance(valor, str):
+        return None
+    valor = valor.strip()
+    if valor in pregunta['opciones']:
+        return valor
+    for opcion_id, texto in pregunta['opciones'].items():
+        if texto.strip() == valor:
+            return opcion_id
+    return None
+
+
+def _valor_detallado(pregunta, respuesta_usuario):
+    """Convierte la respuesta_usuario de un envío detallado (texto) al valor del envío compacto"""
+    tipo = pregunta['tipo']
+    if tipo == 'opcion-multiple':
+        return _opcion_por_texto(pregunta, respuesta_usuario)
+    if tipo == 'opcion-multiple-multi':
+        if isinstance(respuesta_usuario, str):
+            unica = _opcion_por_texto(pregunta, respuesta_usuario)
+            respuesta_usuario = [respuesta_usuario] if unica else respuesta_usuario.split(',')
+        if not isinstance(respuesta_usuario, list):
+            return None
+        return [_opcion_por_texto(pregunta, texto) for texto in respuesta_usuario]
+    if tipo == 'verdadero-falso':
+        if isinstance(respuesta_usuario, bool):
+            return respuesta_usuario
+        return {'verdadero': True, 'true': True, 'falso': False, 'false': False}.get(
+            str(respuesta_usuario).strip().lower()
+        )
+    if tipo == 'likert' and isinstance(respuesta_usuario, str):
+        try:
+            return int(respuesta_usuario)
+        except ValueError:
+            return None
+    return respuesta_usuario
+
+
+def respuestas_de_envio_detallado(clave, detalle):
+    """Convierte las preguntas de un envío detallado en {pregunta_id: respuesta} para calificar
+
+    Cada pregunta se ubica en la clave por su pregunta_id (si lo trae), por
+    el texto de la pregunta o por su orden. Solo se usa respuesta_usuario:
+    es_correcta y respuesta_correcta del cliente se ignoran.
+    """
+    activas = [(pregunta_id, clave['preguntas'][pregunta_id]) for pregunta_id in clave['activas']]
+    por_texto = {pregunta['pregunta'].strip(): pregunta_id for pregunta_id, pregunta in activas}
+    por_orden = {pregunta['orden']: pregunta_id for pregunta_id, pregunta in activas}
+
+    respuestas = {}
+    for resultado in detalle:
+        pregunta_id = resultado.get('pregunta_id')
+        if pregunta_id not in clave['preguntas']:
+            pregunta_id = por_texto.get(str(resultado.get('pregunta', '')).strip(), por_orden.get(resultado.get('orden')))
+        if pregunta_id is None or pregunta_id in respuestas:
+            continue
+        respuestas[pregunta_id] = _valor_detallado(clave['preguntas'][pregunta_id], resultado.get('respuesta_usuario'))
+    return respuestas
+
+
+def _texto_respuesta(pregunta, valor):
+    tipo = pregunta['tipo']
+    if valor is None:
+        return ''
+    if tipo == 'opcion-multiple':
+        return pregunta['opciones'].get(valor, '')
+    if tipo == 'opcion-multiple-multi':
+        return ', '.join(pregunta['opciones'].get(opcion_id, '') for opcion_id in valor)
+    if tipo == 'verdadero-falso':
+        return 'Verdadero' if valor else 'Falso'
+    return str(valor)
+
+
+def _texto_correcta(pregunta):
+    tipo = pregunta['tipo']
+    if tipo in ('opcion-multiple', 'opcion-multiple-multi'):
+        return ', '.join(texto for opcion_id, texto in pregunta['opciones'].items() if opcion_id in pregunta['correctas'])
+    if tipo == 'verdadero-falso':
+        return 'Verdadero' if pregunta['respuesta_correcta'] else 'Falso'
+    return 'N/A'
+
+
+def expandir_respuestas(respuesta, clave):
+    """Agrega a cada pregunta de un intento compacto los textos del formato detallado
+
+    (titulo, pregunta, tipo_pregunta, respuesta_correcta y respuesta_usuario
+    como texto). Los intentos con el formato detallado se retornan sin cambios.
+    """
+    detalle = []
+    for idx, resultado in enumerate(respuesta.get('respuestas') or []):
+        if 'pregunta_id' not in resultado or 'pregunta' in resultado:
+            detalle.append(resultado)
+            continue
+
+        pregunta = (clave or {}).get('preguntas', {}).get(resultado['pregunta_id'])
+        expandida = {
+            **resultado,
+            'titulo': f'Pregunta {idx + 1}',
+            'tipo_pregunta': TIPOS_DETALLE.get(resultado.get('tipo'), resultado.get('tipo')),
+        }
+        if pregunta:
+            expandida.update({
+                'pregunta': pregunta['pregunta'],
+                'respuesta_correcta': _texto_correcta(pregunta),
+                'respuesta_usuario': _texto_respuesta(pregunta, resultado.get('respuesta_usuario')),
+            })
+        else:
+            # La pregunta ya no existe: se muestra lo guardado
+            expandida.update({'pregunta': '', 'respuesta_correcta': ''})
+        detalle.append(expandida)
+    return {**respuesta, 'respuestas': detalle}
+
+
+class MotorCalificacion:
+    """Clave de respuestas por cuestionario, cacheada en memoria del proceso"""
+
+    def __init__(self):
+        self._claves = {}
+        self._candado = threading.Lock()
+
+    def _obtener_guardada(self, llave):
+        with self._candado:
+            entrada = self._claves.get(llave)
+            if entrada and entrada[1] >= time.monotonic():
+                return entrada[0]
+        return None
+
+    def _guardar(self, llave, clave, ttl):
+        # La clave no se copia: calificar y expandir_respuestas no la modifican
+        if clave is not None and ttl > 0:
+            with self._candado:
+                self._claves[llave] = (clave, time.monotonic() + ttl)
+        return clave
+
+    def obtener_clave(self, cuestionario_id):
+        """Retorna la clave de la versión vigente del cuestionario, o None si no tiene preguntas"""
+        clave = self._obtener_guardada(cuestionario_id)
+        if clave is not None:
+            return clave
+
+        hash_version = repositorio_versiones.hash_actual(cuestionario_id)
+        if not hash_version:
+            return None
+        return self._guardar(cuestionario_id, self.obtener_clave_version(cuestionario_id, hash_version),
+                             current_app.config['CALIFICACION_CACHE_TTL'])
+
+    def obtener_clave_version(self, cuestionario_id, hash_version):
+        """Retorna la clave de una versión de preguntas (la que vio el usuario), o None si no existe"""
+        clave = self._obtener_guardada((cuestionario_id, hash_version))
+        if clave is not None:
+            return clave
+
+        preguntas = repositorio_versiones.obtener_version(cuestionario_id, hash_version)
+        return self._guardar((cuestionario_id, hash_version),
+                             compilar_clave(cuestionario_id, preguntas, hash_version),
+                             current_app.config['CALIFICACION_CACHE_TTL'])
+
+    async def obtener_clave_async(self, servicio_async, configuracion, cuestionario_id):
+        """Versión para el modo ASGI de obtener_clave, con ServicioCosmosDBAsync
+
+        configuracion es la de la aplicación Quart (current_app de Flask no
+        está disponible en las rutas asíncronas). Si el cuestionario aún no
+        tiene versión publicada la clave sale de la consulta de preguntas
+        activas y el intento no guarda version_preguntas.
+        """
+        clave = self._obtener_guardada(cuestionario_id)
+        if clave is not None:
+            return clave
+
+        hash_version, preguntas = await repositorio_versiones.obtener_actual_async(
+            servicio_async, configuracion, cuestionario_id
+        )
+        if hash_version is None:
+            preguntas = await servicio_async.consultar_documentos(
+                configuracion['COSMOS_CONTAINER_PREGUNTAS'], CONSULTA_ACTIVAS,
+                [{"name": "@cuestionario_id", "value": cuestionario_id}],
+                partition_key=cuestionario_id
+            )
+        return self._guardar(cuestionario_id, compilar_clave(cuestionario_id, preguntas, hash_version),
+                             configuracion['CALIFICACION_CACHE_TTL'])
+
+    def invalidar(self, cuestionario_id):
+        """Olvida la clave vigente de un cuestionario; debe llamarse tras modificar sus preguntas
+
+        Las claves de versiones anteriores no cambian y se conservan.
+        """
+        with self._candado:
+            self._claves.pop(cuestionario_id, None)
+
+
+# Instancia global del motor de calificación
+motor_calificacion = MotorCalificacion()
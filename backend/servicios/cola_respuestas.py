@@ -0,0 +1,233 @@
+"""
+Escritura diferida (write-behind) de las respuestas de cuestionarios
+
+Con RESPUESTAS_ESCRITURA_DIFERIDA=true el envío de un cuestionario no espera a
+CosmosDB: la respuesta validada se guarda en una cola local en SQLite (modo
+WAL con synchronous=FULL, es decir, con fsync en cada commit) y la ruta
+responde 202 con el documento. Un hilo por proceso la envía después en lotes,
+reintentando con backoff mientras CosmosDB no esté disponible.
+
+Al iniciar, el hilo reenvía lo que haya quedado en la cola de una ejecución
+anterior. Varios workers pueden compartir el archivo: cada uno reclama su lote
+por un plazo (reclamada_hasta) antes de enviarlo, así no lo procesan dos a la
+vez. Si un proceso cae tras escribir en CosmosDB pero antes de sumar la
+respuesta a las estadísticas, el reenvío detecta que ya existe y completa ese
+paso; la entrada registra (estadisticas_registradas) cuándo ya se sumó, para
+no contarla dos veces si el proceso cae antes de borrarla. Solo una caída
+entre el patch de las estadísticas y ese commit local la contaría dos veces
+(POST /api/admin/estadisticas/reconstruir lo corrige).
+"""
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from servicios.repositorio_respuestas import repositorio_respuestas
+from servicios.estadisticas import registrar_respuesta
+
+ESTADO_PENDIENTE = 'pendiente'
+ESTADO_FALLIDA = 'fallida'
+
+# Segundos durante los que un lote reclamado no lo toma otro proceso
+PLAZO_RECLAMO = 120
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS respuestas_pendientes (
+    id TEXT PRIMARY KEY,
+    documento TEXT NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    siguiente_intento REAL NOT NULL DEFAULT 0,
+    reclamada_hasta REAL NOT NULL DEFAULT 0,
+    estadisticas_registradas INTEGER NOT NULL DEFAULT 0,
+    creada REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_respuestas_pendientes_estado
+    ON respuestas_pendientes (estado, siguiente_intento);
+"""
+
+
+class ColaRespuestas:
+    """Cola durable en SQLite de respuestas pendientes de guardar en CosmosDB"""
+
+    def __init__(self):
+        self.app = None
+        self.ruta = None
+        self.tamano_lote = 25
+        self.intervalo = 1.0
+        self.max_intentos = 20
+        self.espera_maxima = 300
+        self._hilo = None
+        self._despertar = threading.Event()
+
+    @property
+    def activa(self):
+        return self.ruta is not None
+
+    def _conectar(self):
+        # isolation_level=None: las transacciones se abren explícitamente
+        conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+        conexion.execute('PRAGMA synchronous=FULL')
+        return conexion
+
+    def iniciar(self, app):
+        """Crea la cola si no existe y arranca el hilo que la envía a CosmosDB"""
+        try:
+            self.app = app
+            self.ruta = app.config['RESPUESTAS_COLA_RUTA']
+            self.tamano_lote = app.config['RESPUESTAS_COLA_LOTE']
+            self.intervalo = app.config['RESPUESTAS_COLA_INTERVALO_MS'] / 1000
+            self.max_intentos = app.config['RESPUESTAS_COLA_MAX_INTENTOS']
+            self.espera_maxima = app.config['RESPUESTAS_COLA_ESPERA_MAXIMA_S']
+
+            directorio = os.path.dirname(os.path.abspath(self.ruta))
+            os.makedirs(directorio, exist_ok=True)
+            with closing(self._conectar()) as conexion:
+                conexion.execute('PRAGMA journal_mode=WAL')
+                conexion.executescript(ESQUEMA)
+
+            pendientes = self.contar().get(ESTADO_PENDIENTE, 0)
+            if pendientes:
+                print(f"Cola de respuestas: {pendientes} respuestas pendientes de una ejecución anterior, se reenviarán")
+
+            self._hilo = threading.Thread(target=self._ejecutar, name='cola-respuestas', daemon=True)
+            self._hilo.start()
+            return True
+        except Exception as e:
+            print(f"Error al iniciar la cola de respuestas: {str(e)}")
+            self.ruta = None
+            return False
+
+    def encolar(self, respuesta):
+        """Guarda la respuesta en la cola (durable al retornar). Retorna True si quedó guardada"""
+        try:
+            with closing(self._conectar()) as conexion:
+                conexion.execute(
+                    "INSERT INTO respuestas_pendientes (id, documento, creada) VALUES (?, ?, ?)",
+                    (respuesta['id'], json.dumps(respuesta), time.time())
+                )
+            self._despertar.set()
+            return True
+        except Exception as e:
+            print(f"Error al encolar respuesta: {str(e)}")
+            return False
+
+    def estado(self, respuesta_id):
+        """Estado de una respuesta en la cola ({'estado', 'intentos'}) o None si no está"""
+        with closing(self._conectar()) as conexion:
+            fila = conexion.execute(
+                "SELECT estado, intentos FROM respuestas_pendientes WHERE id = ?", (respuesta_id,)
+            ).fetchone()
+        return {'estado': fila[0], 'intentos': fila[1]} if fila else None
+
+    def contar(self):
+        """Cantidad de entradas por estado"""
+        with closing(self._conectar()) as conexion:
+            return dict(conexion.execute(
+                "SELECT estado, COUNT(*) FROM respuestas_pendientes GROUP BY estado"
+            ).fetchall())
+
+    def _reclamar_lote(self):
+        """Marca como reclamado (por PLAZO_RECLAMO) el siguiente lote listo para enviar"""
+        ahora = time.time()
+        with closing(self._conectar()) as conexion:
+            conexion.execute('BEGIN IMMEDIATE')
+            filas = conexion.execute(
+                """
+                SELECT id, documento, intentos, estadisticas_registradas FROM respuestas_pendientes
+                WHERE estado = ? AND siguiente_intento <= ? AND reclamada_hasta <= ?
+                ORDER BY creada LIMIT ?
+                """,
+                (ESTADO_PENDIENTE, ahora, ahora, self.tamano_lote)
+            ).fetchall()
+            conexion.executemany(
+                "UPDATE respuestas_pendientes SET reclamada_hasta = ? WHERE id = ?",
+                [(ahora + PLAZO_RECLAMO, fila[0]) for fila in filas]
+            )
+            conexion.execute('COMMIT')
+        return filas
+
+    def _eliminar(self, conexion, respuesta_id):
+        conexion.execute("DELETE FROM respuestas_pendientes WHERE id = ?", (respuesta_id,))
+
+    def _posponer(self, conexion, respuesta_id, intentos):
+        """Programa el siguiente intento con backoff exponencial, o marca la entrada como fallida"""
+        if intentos >= self.max_intentos:
+            print(f"Cola de respuestas: {respuesta_id} marcada como fallida tras {intentos} intentos")
+            conexion.execute(
+                "UPDATE respuestas_pendientes SET estado = ?, intentos = ?, reclamada_hasta = 0 WHERE id = ?",
+                (ESTADO_FALLIDA, intentos, respuesta_id)
+            )
+            return
+
+        espera = min(self.intervalo * (2 ** intentos), self.espera_maxima) * random.uniform(0.5, 1)
+        conexion.execute(
+            "UPDATE respuestas_pendientes SET intentos = ?, siguiente_intento = ?, reclamada_hasta = 0 WHERE id = ?",
+            (intentos, time.time() + espera, respuesta_id)
+        )
+
+    def _enviar(self, conexion, documento, estadisticas_registradas):
+        """Guarda la respuesta en CosmosDB y la suma a las estadísticas
+
+        Retorna True si quedó guardada (ahora o antes) y sumada; la entrada
+        registra que se sumó antes de que el llamador la borre.
+        """
+        if estadisticas_registradas:
+            return True
+
+        resultado = repositorio_respuestas.crear(documento)
+        if not resultado:
+            # Pudo haberse guardado antes de que el proceso anterior cayera: falta sumarla
+            resultado = repositorio_respuestas.obtener(documento['id'], documento['cuestionario_id'])
+            if resultado is None:
+                return False
+
+        registrar_respuesta(resultado)
+        conexion.execute(
+            "UPDATE respuestas_pendientes SET estadisticas_registradas = 1 WHERE id = ?", (documento['id'],)
+        )
+        return True
+
+    def enviar_lote(self):
+        """Envía un lote a CosmosDB. Retorna (reclamadas, enviadas)
+
+        Ante el primer fallo se liberan las restantes del lote: si CosmosDB
+        no responde no tiene sentido seguir intentando en esta vuelta.
+        """
+        filas = self._reclamar_lote()
+        enviadas = 0
+
+        with closing(self._conectar()) as conexion, self.app.app_context():
+            for indice, (respuesta_id, documento, intentos, estadisticas_registradas) in enumerate(filas):
+                if self._enviar(conexion, json.loads(documento), estadisticas_registradas):
+                    self._eliminar(conexion, respuesta_id)
+                    enviadas += 1
+                    continue
+
+                self._posponer(conexion, respuesta_id, intentos + 1)
+                conexion.executemany(
+                    "UPDATE respuestas_pendientes SET reclamada_hasta = 0 WHERE id = ?",
+                    [(fila[0],) for fila in filas[indice + 1:]]
+                )
+                break
+
+        return len(filas), enviadas
+
+    def _ejecutar(self):
+        """Bucle del hilo: envía lotes mientras haya, si no espera al intervalo o a un nuevo envío"""
+        while True:
+            try:
+                reclamadas, enviadas = self.enviar_lote()
+                if reclamadas == self.tamano_lote and enviadas == reclamadas:
+                    continue
+            except Exception as e:
+                print(f"Error al enviar la cola de respuestas: {str(e)}")
+
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+
+
+# Instancia global de la cola
+cola_respuestas = ColaRespuestas()
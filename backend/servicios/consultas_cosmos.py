@@ -0,0 +1,617 @@
+"""
+Subconjunto del SQL de CosmosDB para el backend simulado (servicios/cosmos_simulado.py)
+
+Cubre las consultas que arman las rutas y los servicios de la aplicación:
+
+    SELECT [DISTINCT] [TOP n] [VALUE] * | expresión [AS alias], ...
+    FROM c [WHERE condición] [ORDER BY expresión [ASC|DESC], ...] [OFFSET n LIMIT m]
+
+con comparaciones (=, !=, <>, <, <=, >, >=, IN), AND/OR/NOT, parámetros
+@nombre, literales, rutas (c.campo, c["campo"], c.lista[0]), las funciones
+IS_DEFINED, IS_NULL, IS_BOOL, IS_NUMBER, IS_STRING, IS_ARRAY, IS_OBJECT,
+ARRAY_CONTAINS, ARRAY_LENGTH, CONTAINS, STARTSWITH, ENDSWITH, LOWER y UPPER,
+y los agregados COUNT, SUM, AVG, MIN y MAX.
+
+Sigue la semántica de CosmosDB para los valores indefinidos: comparar un
+campo que no existe, o valores de tipos distintos, no es verdadero ni falso,
+y el WHERE solo conserva los documentos cuya condición es exactamente true.
+ORDER BY ordena por tipo (indefinido, null, booleanos, números, textos) y
+luego por valor.
+
+Lo que no está en el subconjunto (JOIN, GROUP BY, subconsultas...) lanza
+ErrorConsulta.
+"""
+import functools
+import json
+import re
+
+INDEFINIDO = object()
+
+AGREGADOS = {'COUNT', 'SUM', 'AVG', 'MIN', 'MAX'}
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<numero>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+      | (?P<texto>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<parametro>@\w+)
+      | (?P<nombre>[A-Za-z_]\w*)
+      | (?P<simbolo><=|>=|!=|<>|[=<>(),.*\[\]-])
+    )""", re.VERBOSE)
+
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f'}
+
+
+class ErrorConsulta(ValueError):
+    """Consulta inválida o fuera del subconjunto soportado"""
+
+
+# ---------------------------------------------------------------------------
+# Tipos y comparaciones con la semántica de CosmosDB
+# ---------------------------------------------------------------------------
+
+def _es_numero(valor):
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool)
+
+
+def _rango(valor):
+    """Orden de los tipos en ORDER BY: indefinido, null, bool, número, texto, arreglo, objeto"""
+    if valor is INDEFINIDO:
+        return 0
+    if valor is None:
+        return 1
+    if isinstance(valor, bool):
+        return 2
+    if _es_numero(valor):
+        return 3
+    if isinstance(valor, str):
+        return 4
+    if isinstance(valor, list):
+        return 5
+    return 6
+
+
+def clave_orden(valor):
+    rango = _rango(valor)
+    if rango <= 1:
+        return (rango, 0)
+    if rango <= 4:
+        return (rango, valor)
+    return (rango, json.dumps(valor, sort_keys=True))
+
+
+def _igual(a, b):
+    if a is INDEFINIDO or b is INDEFINIDO or _rango(a) != _rango(b):
+        return INDEFINIDO
+    return a == b
+
+
+def _comparador(operador):
+    def comparar(a, b):
+        if a is INDEFINIDO or b is INDEFINIDO or _rango(a) != _rango(b) or _rango(a) > 4:
+            return INDEFINIDO
+        return operador(clave_orden(a), clave_orden(b))
+    return comparar
+
+
+_COMPARACIONES = {
+    '=': _igual,
+    '!=': lambda a, b: _negar(_igual(a, b)),
+    '<>': lambda a, b: _negar(_igual(a, b)),
+    '<': _comparador(lambda a, b: a < b),
+    '<=': _comparador(lambda a, b: a <= b),
+    '>': _comparador(lambda a, b: a > b),
+    '>=': _comparador(lambda a, b: a >= b)
+}
+
+
+def _negar(valor):
+    return (not valor) if isinstance(valor, bool) else INDEFINIDO
+
+
+# ---------------------------------------------------------------------------
+# Funciones escalares
+# ---------------------------------------------------------------------------
+
+def _de_texto(funcion):
+    """Función sobre textos: indefinida si algún argumento no es texto"""
+    def aplicar(texto, otro, ignorar_mayusculas=False):
+        if not isinstance(texto, str) or not isinstance(otro, str):
+            return INDEFINIDO
+        if ignorar_mayusculas is True:
+            texto, otro = texto.lower(), otro.lower()
+        return funcion(texto, otro)
+    return aplicar
+
+
+def _array_contains(arreglo, valor, parcial=False):
+    if not isinstance(arreglo, list):
+        return INDEFINIDO
+    if parcial is True and isinstance(valor, dict):
+        return any(
+            isinstance(elemento, dict) and all(_igual(elemento.get(k, INDEFINIDO), v) is True for k, v in valor.items())
+            for elemento in arreglo
+        )
+    return any(_igual(elemento, valor) is True for elemento in arreglo)
+
+
+# nombre: (mínimo de argumentos, máximo de argumentos, función)
+FUNCIONES = {
+    'IS_DEFINED': (1, 1, lambda v: v is not INDEFINIDO),
+    'IS_NULL': (1, 1, lambda v: v is None),
+    'IS_BOOL': (1, 1, lambda v: isinstance(v, bool)),
+    'IS_NUMBER': (1, 1, _es_numero),
+    'IS_STRING': (1, 1, lambda v: isinstance(v, str)),
+    'IS_ARRAY': (1, 1, lambda v: isinstance(v, list)),
+    'IS_OBJECT': (1, 1, lambda v: isinstance(v, dict)),
+    'ARRAY_CONTAINS': (2, 3, _array_contains),
+    'ARRAY_LENGTH': (1, 1, lambda v: len(v) if isinstance(v, list) else INDEFINIDO),
+    'CONTAINS': (2, 3, _de_texto(lambda texto, parte: parte in texto)),
+    'STARTSWITH': (2, 3, _de_texto(lambda texto, prefijo: texto.startswith(prefijo))),
+    'ENDSWITH': (2, 3, _de_texto(lambda texto, sufijo: texto.endswith(sufijo))),
+    'LOWER': (1, 1, lambda v: v.lower() if isinstance(v, str) else INDEFINIDO),
+    'UPPER': (1, 1, lambda v: v.upper() if isinstance(v, str) else INDEFINIDO)
+}
+
+
+# ---------------------------------------------------------------------------
+# Agregados
+# ---------------------------------------------------------------------------
+
+def _agregar(nombre, valores):
+    valores = [valor for valor in valores if valor is not INDEFINIDO]
+    if nombre == 'COUNT':
+        return len(valores)
+    if nombre in ('SUM', 'AVG'):
+        if not all(_es_numero(valor) for valor in valores):
+            return INDEFINIDO
+        if nombre == 'SUM':
+            return sum(valores)
+        return sum(valores) / len(valores) if valores else INDEFINIDO
+    # MIN / MAX: solo sobre valores escalares
+    if not valores or any(_rango(valor) > 4 for valor in valores):
+        return INDEFINIDO
+    elegir = min if nombre == 'MIN' else max
+    return elegir(valores, key=clave_orden)
+
+
+# ---------------------------------------------------------------------------
+# Análisis: la consulta se compila a funciones (documento, parámetros) -> valor
+# ---------------------------------------------------------------------------
+
+def _tokenizar(texto):
+    tokens = []
+    posicion = 0
+    texto = texto.rstrip()
+    while posicion < len(texto):
+        coincidencia = _TOKEN.match(texto, posicion)
+        if not coincidencia or coincidencia.end() == posicion:
+            raise ErrorConsulta(f"Sintaxis no reconocida cerca de: {texto[posicion:posicion + 20]!r}")
+        tipo = coincidencia.lastgroup
+        tokens.append((tipo, coincidencia.group(tipo)))
+        posicion = coincidencia.end()
+    return tokens
+
+
+def _texto_literal(token):
+    return re.sub(r'\\(.)', lambda m: _ESCAPES.get(m.group(1), m.group(1)), token[1:-1])
+
+
+class _Analizador:
+    def __init__(self, texto):
+        self.tokens = _tokenizar(texto)
+        self.posicion = 0
+        self.raices = set()
+        self.parametros = set()
+
+    # -- tokens -------------------------------------------------------------
+
+    def _actual(self):
+        return self.tokens[self.posicion] if self.posicion < len(self.tokens) else (None, None)
+
+    def _avanzar(self):
+        token = self._actual()
+        self.posicion += 1
+        return token
+
+    def _es_palabra(self, *palabras):
+        tipo, valor = self._actual()
+        return tipo == 'nombre' and valor.upper() in palabras
+
+    def _es_simbolo(self, simbolo):
+        return self._actual() == ('simbolo', simbolo)
+
+    def _acepta_palabra(self, palabra):
+        if self._es_palabra(palabra):
+            self.posicion += 1
+            return True
+        return False
+
+    def _acepta_simbolo(self, simbolo):
+        if self._es_simbolo(simbolo):
+            self.posicion += 1
+            return True
+        return False
+
+    def _espera_palabra(self, palabra):
+        if not self._acepta_palabra(palabra):
+            raise ErrorConsulta(f"Se esperaba {palabra} cerca de {self._actual()[1]!r}")
+
+    def _espera_simbolo(self, simbolo):
+        if not self._acepta_simbolo(simbolo):
+            raise ErrorConsulta(f"Se esperaba '{simbolo}' cerca de {self._actual()[1]!r}")
+
+    def _nombre(self):
+        tipo, valor = self._avanzar()
+        if tipo != 'nombre':
+            raise ErrorConsulta(f"Se esperaba un identificador y llegó {valor!r}")
+        return valor
+
+    def _entero(self):
+        tipo, valor = self._avanzar()
+        if tipo != 'numero' or not valor.isdigit():
+            raise ErrorConsulta(f"Se esperaba un entero y llegó {valor!r}")
+        return int(valor)
+
+    # -- consulta -----------------------------------------------------------
+
+    def consulta(self):
+        self._espera_palabra('SELECT')
+        consulta = ConsultaSQL()
+        consulta.distinta = self._acepta_palabra('DISTINCT')
+        if self._acepta_palabra('TOP'):
+            consulta.top = self._entero()
+        consulta.valor = self._acepta_palabra('VALUE')
+
+        if not consulta.valor and self._acepta_simbolo('*'):
+            consulta.proyeccion = None
+        else:
+            consulta.proyeccion = self._proyeccion(consulta.valor)
+            agregados = [item for item in consulta.proyeccion if item[0] is not None]
+            if agregados and len(agregados) != len(consulta.proyeccion):
+                raise ErrorConsulta("No se pueden combinar agregados con otras expresiones sin GROUP BY")
+            consulta.agregada = bool(agregados)
+
+        self._espera_palabra('FROM')
+        alias = self._nombre()
+        if self.raices - {alias}:
+            raise ErrorConsulta(f"Identificador desconocido: {', '.join(sorted(self.raices - {alias}))}")
+
+        if self._acepta_palabra('WHERE'):
+            consulta.condicion = self._expresion()
+            if self.raices - {alias}:
+                raise ErrorConsulta(f"Identificador desconocido: {', '.join(sorted(self.raices - {alias}))}")
+
+        if self._acepta_palabra('ORDER'):
+            self._espera_palabra('BY')
+            while True:
+                expresion = self._expresion()
+                descendente = self._acepta_palabra('DESC')
+                if not descendente:
+                    self._acepta_palabra('ASC')
+                consulta.orden.append((expresion, descendente))
+                if not self._acepta_simbolo(','):
+                    break
+
+        if self._acepta_palabra('OFFSET'):
+            consulta.desplazamiento = self._entero()
+            self._espera_palabra('LIMIT')
+            consulta.limite = self._entero()
+
+        if self._actual()[0] is not None:
+            raise ErrorConsulta(f"No soportado por el backend simulado: {self._actual()[1]!r}")
+        if self.raices - {alias}:
+            raise ErrorConsulta(f"Identificador desconocido: {', '.join(sorted(self.raices - {alias}))}")
+
+        consulta.parametros = self.parametros
+        return consulta
+
+    def _proyeccion(self, valor):
+        """Lista de (agregado o None, expresión, nombre de salida)"""
+        items = []
+        sin_nombre = 0
+        while True:
+            agregado = None
+            if self._es_palabra(*AGREGADOS) and self.tokens[self.posicion + 1:self.posicion + 2] == [('simbolo', '(')]:
+                agregado = self._avanzar()[1].upper()
+                self._espera_simbolo('(')
+                expresion, nombre = self._expresion_con_nombre()
+                self._espera_simbolo(')')
+                nombre = None
+            else:
+                expresion, nombre = self._expresion_con_nombre()
+
+            if self._acepta_palabra('AS'):
+                nombre = self._nombre()
+            if nombre is None:
+                sin_nombre += 1
+                nombre = f'${sin_nombre}'
+            items.append((agregado, expresion, nombre))
+
+            if valor or not self._acepta_simbolo(','):
+                return items
+
+    def _expresion_con_nombre(self):
+        """Expresión y el nombre que toma en la proyección (el último campo de una ruta)"""
+        inicio = self.posicion
+        expresion = self._expresion()
+        tokens = self.tokens[inicio:self.posicion]
+        nombre = None
+        if tokens and tokens[0][0] == 'nombre' and tokens[0][1] in self.raices:
+            if len(tokens) == 1:
+                nombre = tokens[0][1]
+            elif tokens[-2] == ('simbolo', '.') and tokens[-1][0] == 'nombre':
+                nombre = tokens[-1][1]
+            elif tokens[-1] == ('simbolo', ']') and tokens[-2][0] == 'texto':
+                nombre = _texto_literal(tokens[-2][1])
+        return expresion, nombre
+
+    # -- expresiones --------------------------------------------------------
+
+    def _expresion(self):
+        izquierda = self._y()
+        while self._acepta_palabra('OR'):
+            izquierda = _o(izquierda, self._y())
+        return izquierda
+
+    def _y(self):
+        izquierda = self._no()
+        while self._acepta_palabra('AND'):
+            izquierda = _y(izquierda, self._no())
+        return izquierda
+
+    def _no(self):
+        if self._acepta_palabra('NOT'):
+            operando = self._no()
+            return lambda documento, parametros: _negar(operando(documento, parametros))
+        return self._comparacion()
+
+    def _comparacion(self):
+        izquierda = self._termino()
+        tipo, valor = self._actual()
+        if tipo == 'simbolo' and valor in _COMPARACIONES:
+            self._avanzar()
+            derecha = self._termino()
+            comparar = _COMPARACIONES[valor]
+            return lambda documento, parametros: comparar(izquierda(documento, parametros), derecha(documento, parametros))
+
+        negada = False
+        if self._es_palabra('NOT') and self.tokens[self.posicion + 1:self.posicion + 2] and \
+                self.tokens[self.posicion + 1][0] == 'nombre' and self.tokens[self.posicion + 1][1].upper() == 'IN':
+            self._avanzar()
+            negada = True
+        if self._acepta_palabra('IN'):
+            self._espera_simbolo('(')
+            opciones = [self._termino()]
+            while self._acepta_simbolo(','):
+                opciones.append(self._termino())
+            self._espera_simbolo(')')
+
+            def pertenece(documento, parametros):
+                valor = izquierda(documento, parametros)
+                if valor is INDEFINIDO:
+                    return INDEFINIDO
+                return any(_igual(valor, opcion(documento, parametros)) is True for opcion in opciones)
+
+            if negada:
+                return lambda documento, parametros: _negar(pertenece(documento, parametros))
+            return pertenece
+        return izquierda
+
+    def _termino(self):
+        tipo, valor = self._actual()
+
+        if tipo == 'simbolo' and valor == '(':
+            self._avanzar()
+            expresion = self._expresion()
+            self._espera_simbolo(')')
+            return expresion
+
+        if tipo == 'simbolo' and valor == '-':
+            self._avanzar()
+            tipo, valor = self._avanzar()
+            if tipo != 'numero':
+                raise ErrorConsulta(f"Se esperaba un número después de '-' y llegó {valor!r}")
+            return _constante(-_numero(valor))
+
+        if tipo == 'numero':
+            self._avanzar()
+            return _constante(_numero(valor))
+
+        if tipo == 'texto':
+            self._avanzar()
+            return _constante(_texto_literal(valor))
+
+        if tipo == 'parametro':
+            self._avanzar()
+            self.parametros.add(valor)
+            return lambda documento, parametros: parametros.get(valor, INDEFINIDO)
+
+        if tipo == 'nombre':
+            palabra = valor.upper()
+            if palabra in ('TRUE', 'FALSE', 'NULL', 'UNDEFINED'):
+                self._avanzar()
+                return _constante({'TRUE': True, 'FALSE': False, 'NULL': None, 'UNDEFINED': INDEFINIDO}[palabra])
+            if self.tokens[self.posicion + 1:self.posicion + 2] == [('simbolo', '(')]:
+                return self._funcion()
+            return self._ruta()
+
+        raise ErrorConsulta(f"Expresión no soportada cerca de {valor!r}")
+
+    def _funcion(self):
+        nombre = self._avanzar()[1].upper()
+        if nombre in AGREGADOS:
+            raise ErrorConsulta(f"{nombre} solo se admite en la proyección")
+        if nombre not in FUNCIONES:
+            raise ErrorConsulta(f"Función no soportada por el backend simulado: {nombre}")
+        minimo, maximo, funcion = FUNCIONES[nombre]
+
+        self._espera_simbolo('(')
+        argumentos = []
+        if not self._es_simbolo(')'):
+            argumentos.append(self._expresion())
+            while self._acepta_simbolo(','):
+                argumentos.append(self._expresion())
+        self._espera_simbolo(')')
+        if not minimo <= len(argumentos) <= maximo:
+            raise ErrorConsulta(f"{nombre} recibe entre {minimo} y {maximo} argumentos")
+
+        return lambda documento, parametros: funcion(*(argumento(documento, parametros) for argumento in argumentos))
+
+    def _ruta(self):
+        raiz = self._nombre()
+        self.raices.add(raiz)
+        claves = []
+        while True:
+            if self._acepta_simbolo('.'):
+                claves.append(self._nombre())
+            elif self._acepta_simbolo('['):
+                tipo, valor = self._avanzar()
+                if tipo == 'texto':
+                    claves.append(_texto_literal(valor))
+                elif tipo == 'numero' and valor.isdigit():
+                    claves.append(int(valor))
+                else:
+                    raise ErrorConsulta(f"Índice no soportado: {valor!r}")
+                self._espera_simbolo(']')
+            else:
+                break
+        return _acceso(claves)
+
+
+def _numero(texto):
+    return float(texto) if any(caracter in texto for caracter in '.eE') else int(texto)
+
+
+def _constante(valor):
+    return lambda documento, parametros: valor
+
+
+def _acceso(claves):
+    def acceder(documento, parametros):
+        valor = documento
+        for clave in claves:
+            if isinstance(clave, str):
+                valor = valor.get(clave, INDEFINIDO) if isinstance(valor, dict) else INDEFINIDO
+            else:
+                valor = valor[clave] if isinstance(valor, list) and clave < len(valor) else INDEFINIDO
+            if valor is INDEFINIDO:
+                break
+        return valor
+    return acceder
+
+
+def _y(izquierda, derecha):
+    def conjuncion(documento, parametros):
+        a = izquierda(documento, parametros)
+        if a is False:
+            return False
+        b = derecha(documento, parametros)
+        if b is False:
+            return False
+        return True if a is True and b is True else INDEFINIDO
+    return conjuncion
+
+
+def _o(izquierda, derecha):
+    def disyuncion(documento, parametros):
+        a = izquierda(documento, parametros)
+        if a is True:
+            return True
+        b = derecha(documento, parametros)
+        if b is True:
+            return True
+        return False if a is False and b is False else INDEFINIDO
+    return disyuncion
+
+
+# ---------------------------------------------------------------------------
+# Ejecución
+# ---------------------------------------------------------------------------
+
+class ConsultaSQL:
+    """Consulta analizada, lista para ejecutarse sobre una lista de documentos"""
+
+    def __init__(self):
+        self.distinta = False
+        self.top = None
+        self.valor = False
+        self.proyeccion = None
+        self.agregada = False
+        self.condicion = None
+        self.orden = []
+        self.desplazamiento = 0
+        self.limite = None
+        self.parametros = set()
+
+    def ejecutar(self, documentos, parametros=None):
+        """Resultados de la consulta sobre documentos (que no se modifican)
+
+        parametros sigue el formato del SDK: [{'name': '@x', 'value': ...}].
+        """
+        valores = {parametro['name']: parametro['value'] for parametro in parametros or []}
+        faltantes = self.parametros - set(valores)
+        if faltantes:
+            raise ErrorConsulta(f"Parámetros sin valor: {', '.join(sorted(faltantes))}")
+
+        filas = documentos
+        if self.condicion is not None:
+            filas = [documento for documento in documentos if self.condicion(documento, valores) is True]
+
+        if self.agregada:
+            return self._agregar(filas, valores)
+
+        # sort es estable: ordenar de la última clave a la primera da el orden compuesto
+        for expresion, descendente in reversed(self.orden):
+            filas = sorted(filas, key=lambda documento: clave_orden(expresion(documento, valores)), reverse=descendente)
+
+        resultados = self._proyectar(filas, valores)
+        if self.distinta:
+            resultados = _sin_repetidos(resultados)
+
+        fin = None if self.limite is None else self.desplazamiento + self.limite
+        resultados = resultados[self.desplazamiento:fin]
+        return resultados[:self.top] if self.top is not None else resultados
+
+    def _proyectar(self, filas, valores):
+        if self.proyeccion is None:
+            return list(filas)
+        if self.valor:
+            _, expresion, _ = self.proyeccion[0]
+            return [valor for valor in (expresion(fila, valores) for fila in filas) if valor is not INDEFINIDO]
+
+        resultados = []
+        for fila in filas:
+            resultado = {}
+            for _, expresion, nombre in self.proyeccion:
+                valor = expresion(fila, valores)
+                if valor is not INDEFINIDO:
+                    resultado[nombre] = valor
+            resultados.append(resultado)
+        return resultados
+
+    def _agregar(self, filas, valores):
+        calculados = [
+            (nombre, _agregar(agregado, [expresion(fila, valores) for fila in filas]))
+            for agregado, expresion, nombre in self.proyeccion
+        ]
+        if self.valor:
+            valor = calculados[0][1]
+            return [] if valor is INDEFINIDO else [valor]
+        return [{nombre: valor for nombre, valor in calculados if valor is not INDEFINIDO}]
+
+
+def _sin_repetidos(resultados):
+    vistos = set()
+    unicos = []
+    for resultado in resultados:
+        clave = json.dumps(resultado, sort_keys=True)
+        if clave not in vistos:
+            vistos.add(clave)
+            unicos.append(resultado)
+    return unicos
+
+
+@functools.lru_cache(maxsize=512)
+def analizar(texto):
+    """Analiza una consulta (con caché: las rutas repiten siempre las mismas)"""
+    return _Analizador(texto).consulta()
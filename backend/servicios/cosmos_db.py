@@ -1,5 +1,68 @@
+import threading
 from azure.cosmos import CosmosClient, PartitionKey, exceptions
+from azure.core import MatchConditions
 from flask import current_app
+from servicios.cache import CacheLRU
+from servicios.transporte_http import transporte_http
+from servicios.metricas import ganchos_cosmos
+from servicios.limitador_cosmos import SIN_REINTENTOS, limitador_ru, politicas_desde_config, ru_desde_config
+from servicios.cosmos_simulado import crear_cliente_simulado
+
+# Límite de operaciones de un lote transaccional de CosmosDB
+MAX_OPERACIONES_LOTE = 100
+
+# Los listados de respuestas se paginan con ORDER BY c.fecha_completado DESC, c.id DESC
+# (ver RepositorioRespuestas.listar_pagina): en CosmosDB ordenar por dos campos
+# requiere un índice compuesto
+INDICE_LISTADO_RESPUESTAS = [
+    {'path': '/fecha_completado', 'order': 'descending'},
+    {'path': '/id', 'order': 'descending'}
+]
+POLITICA_INDEXACION_RESPUESTAS = {
+    'indexingMode': 'consistent',
+    'automatic': True,
+    'includedPaths': [{'path': '/*'}],
+    'excludedPaths': [{'path': '/"_etag"/?'}],
+    'compositeIndexes': [INDICE_LISTADO_RESPUESTAS]
+}
+
+
+def backend_simulado(config):
+    """True si COSMOS_BACKEND usa el backend local (memoria o sqlite) en lugar de Azure"""
+    return config['COSMOS_BACKEND'] != 'azure'
+
+
+def cosmos_configurado(config):
+    """True si hay un CosmosDB que inicializar: el simulado, o Azure con endpoint y clave"""
+    return backend_simulado(config) or bool(config.get('COSMOS_ENDPOINT') and config.get('COSMOS_KEY'))
+
+
+def politica_indexacion(config, nombre_contenedor):
+    """Política de indexación con que se crea un contenedor (None: la predeterminada)"""
+    if nombre_contenedor == config['COSMOS_CONTAINER_RESPUESTAS']:
+        return POLITICA_INDEXACION_RESPUESTAS
+    return None
+
+
+def ganchos_cliente(config, con_metricas=True):
+    """raw_request_hook/raw_response_hook para CosmosClient
+    
+    Registran RU y latencia de cada llamada (servicios/metricas.py) y
+    descuentan su costo del limitador de RU del contenedor.
+    """
+    ganchos = ganchos_cosmos() if con_metricas and config['METRICAS_HABILITADAS'] else {}
+    if not limitador_ru.activo:
+        return ganchos
+    
+    registrar_metricas = ganchos.get('raw_response_hook')
+    
+    def al_responder(pipeline_response):
+        limitador_ru.descontar_respuesta(pipeline_response)
+        if registrar_metricas:
+            registrar_metricas(pipeline_response)
+    
+    return {**ganchos, 'raw_response_hook': al_responder}
+
 
 class ServicioCosmosDB:
     """Servicio para interactuar con Azure CosmosDB"""
@@ -8,66 +71,213 @@ class ServicioCosmosDB:
         self.cliente = None
         self.base_datos = None
         self.contenedores = {}
+        self.claves_particion = {}
+        self.cache = None
+        self.ttl_cache = {}
+        self.politicas_reintento = {}
+        self.conexion_diferida = None
+        self._candado_conexion = threading.Lock()
     
-    def inicializar(self):
-        """Inicializa la conexión a CosmosDB"""
+    def inicializar(self, aprovisionar=True):
+        """Inicializa la conexión a CosmosDB
+        
+        Con aprovisionar=False (inicio rápido) no hace llamadas de red: el
+        cliente se crea en el primer uso, los contenedores se enlazan sin
+        verificar que existan y el partition key se toma de la configuración.
+        La base de datos y los contenedores deben crearse antes con
+        scripts/aprovisionar.py.
+        """
         try:
-            self.cliente = CosmosClient(
-                current_app.config['COSMOS_ENDPOINT'],
-                current_app.config['COSMOS_KEY']
-            )
+            # Reintentos ante 429/503 y límite de RU/s por contenedor (ver servicios/limitador_cosmos.py)
+            self.politicas_reintento = politicas_desde_config(current_app.config)
+            limitador_ru.configurar(ru_desde_config(current_app.config))
             
-            # Crear o obtener base de datos
-            self.base_datos = self.cliente.create_database_if_not_exists(
-                id=current_app.config['COSMOS_DATABASE']
-            )
+            # El backend simulado no hace llamadas de red: siempre se aprovisiona
+            if aprovisionar or backend_simulado(current_app.config):
+                self.cliente = self._crear_cliente(current_app.config)
+                
+                # Crear o obtener base de datos
+                self.base_datos = self.cliente.create_database_if_not_exists(
+                    id=current_app.config['COSMOS_DATABASE']
+                )
+                
+                # Crear o obtener contenedores
+                self._crear_contenedores()
+            else:
+                # El constructor de CosmosClient ya consulta la cuenta: se difiere al primer uso
+                self.conexion_diferida = current_app.config
+                for nombre, partition_key in self.contenedores_config(current_app.config):
+                    self.claves_particion[nombre] = partition_key.lstrip('/')
             
-            # Crear o obtener contenedores
-            self._crear_contenedores()
+            if current_app.config['COSMOS_CACHE_HABILITADA']:
+                self.configurar_cache(
+                    CacheLRU(current_app.config['COSMOS_CACHE_MAX_ENTRADAS']),
+                    {
+                        current_app.config['COSMOS_CONTAINER_CONFIGURACION']: current_app.config['COSMOS_CACHE_TTL_CONFIGURACION'],
+                        current_app.config['COSMOS_CONTAINER_PREGUNTAS']: current_app.config['COSMOS_CACHE_TTL_PREGUNTAS'],
+                        current_app.config['COSMOS_CONTAINER_ADMINISTRADORES']: current_app.config['COSMOS_CACHE_TTL_ADMINISTRADORES']
+                    }
+                )
             
             return True
         except Exception as e:
             print(f"Error al inicializar CosmosDB: {str(e)}")
             return False
     
+    def _crear_cliente(self, config):
+        if backend_simulado(config):
+            return crear_cliente_simulado(config)
+        return CosmosClient(
+            config['COSMOS_ENDPOINT'], config['COSMOS_KEY'],
+            **ganchos_cliente(config), **transporte_http.transporte_azure()
+        )
+    
+    def contenedores_config(self, config):
+        """(nombre, partition key) de cada contenedor de la aplicación"""
+        return [
+            (config['COSMOS_CONTAINER_RESPUESTAS'], config['COSMOS_PARTICION_RESPUESTAS']),
+            (config['COSMOS_CONTAINER_PREGUNTAS'], '/cuestionario_id'),
+            (config['COSMOS_CONTAINER_ADMINISTRADORES'], '/email'),
+            # (config['COSMOS_CONTAINER_DOCUMENTOS'], '/id'),  # DEPRECATED
+            (config['COSMOS_CONTAINER_CONFIGURACION'], '/tipo')
+        ]
+    
+    def _conectar_diferido(self):
+        """Crea el cliente y enlaza los contenedores existentes (inicio rápido, primer uso)"""
+        with self._candado_conexion:
+            if self.cliente is not None:
+                return
+            config = self.conexion_diferida
+            cliente = self._crear_cliente(config)
+            self.base_datos = cliente.get_database_client(config['COSMOS_DATABASE'])
+            for nombre, _ in self.contenedores_config(config):
+                self.contenedores[nombre] = self.base_datos.get_container_client(nombre)
+            self.cliente = cliente
+    
     def _crear_contenedores(self):
         """Crea los contenedores necesarios si no existen"""
-        contenedores_config = [
-            (current_app.config['COSMOS_CONTAINER_RESPUESTAS'], '/id'),
-            (current_app.config['COSMOS_CONTAINER_PREGUNTAS'], '/cuestionario_id'),
-            (current_app.config['COSMOS_CONTAINER_ADMINISTRADORES'], '/email'),
-            # (current_app.config['COSMOS_CONTAINER_DOCUMENTOS'], '/id'),  # DEPRECATED
-            (current_app.config['COSMOS_CONTAINER_CONFIGURACION'], '/tipo')
-        ]
-        
-        for nombre, partition_key in contenedores_config:
+        for nombre, partition_key in self.contenedores_config(current_app.config):
             try:
+                politica = politica_indexacion(current_app.config, nombre)
                 contenedor = self.base_datos.create_container_if_not_exists(
                     id=nombre,
-                    partition_key=PartitionKey(path=partition_key)
+                    partition_key=PartitionKey(path=partition_key),
+                    indexing_policy=politica
                 )
                 self.contenedores[nombre] = contenedor
+                # Un contenedor existente conserva el partition key con el que se creó
+                # (p. ej. respuestas con /id antes de migrar), así que se usa el real
+                propiedades = contenedor.read()
+                clave_real = propiedades['partitionKey']['paths'][0]
+                if clave_real != partition_key:
+                    print(f"⚠ Contenedor {nombre} particionado por {clave_real} (configurado: {partition_key})")
+                self.claves_particion[nombre] = clave_real.lstrip('/')
+                if politica and not backend_simulado(current_app.config):
+                    self._agregar_indices_compuestos(contenedor, propiedades, politica)
             except exceptions.CosmosHttpResponseError as e:
                 print(f"Error al crear contenedor {nombre}: {str(e)}")
     
+    def _agregar_indices_compuestos(self, contenedor, propiedades, politica):
+        """Agrega a un contenedor existente los índices compuestos que le falten
+
+        Conserva el resto de su política de indexación y su TTL. CosmosDB
+        construye el índice en segundo plano; mientras tanto las consultas que
+        lo requieren pueden responder 400.
+        """
+        actual = propiedades.get('indexingPolicy') or {}
+        existentes = actual.get('compositeIndexes') or []
+        faltantes = [indice for indice in politica['compositeIndexes'] if indice not in existentes]
+        if not faltantes:
+            return
+        self.base_datos.replace_container(
+            contenedor,
+            partition_key=PartitionKey(path=propiedades['partitionKey']['paths'][0]),
+            indexing_policy={**actual, 'compositeIndexes': existentes + faltantes},
+            default_ttl=propiedades.get('defaultTtl')
+        )
+        print(f"✓ Índices compuestos agregados al contenedor {propiedades['id']}")
+    
     def obtener_contenedor(self, nombre_contenedor):
-        """Obtiene un contenedor específico"""
+        """Obtiene un contenedor específico (en inicio rápido, conecta en la primera llamada)"""
+        if self.cliente is None and self.conexion_diferida is not None:
+            self._conectar_diferido()
         return self.contenedores.get(nombre_contenedor)
     
+    def configurar_cache(self, cache, ttl_por_contenedor):
+        """Activa la caché de lecturas
+        
+        cache debe ofrecer obtener/guardar/invalidar (ver servicios/cache.py).
+        Solo se cachean los contenedores con TTL mayor que cero.
+        """
+        self.cache = cache
+        self.ttl_cache = {nombre: ttl for nombre, ttl in ttl_por_contenedor.items() if ttl > 0}
+    
+    def _usa_cache(self, nombre_contenedor):
+        return self.cache is not None and nombre_contenedor in self.ttl_cache
+    
+    def _invalidar_cache(self, nombre_contenedor, documento_id, partition_key):
+        """Invalida la lectura puntual del documento y las consultas que podrían incluirlo
+        
+        Claves de la caché: ('leer', contenedor, partition_key, id) y
+        ('consulta', contenedor, partition_key o None si es entre particiones, ...).
+        """
+        if not self._usa_cache(nombre_contenedor):
+            return
+        
+        def afectada(clave):
+            if clave[1] != nombre_contenedor:
+                return False
+            if clave[0] == 'leer':
+                return clave[3] == documento_id
+            return clave[2] is None or clave[2] == partition_key
+        
+        self.cache.invalidar(afectada)
+    
+    def _particion_de(self, nombre_contenedor, documento):
+        return documento.get(self.claves_particion.get(nombre_contenedor))
+    
+    def _con_reintentos(self, nombre_contenedor, operacion, limitar=False):
+        """Ejecuta operacion() con la política de reintentos del contenedor
+        
+        Con limitar=True cada intento espera antes al limitador de RU (escrituras).
+        """
+        politica = self.politicas_reintento.get(nombre_contenedor, SIN_REINTENTOS)
+        antes = (lambda: limitador_ru.esperar(nombre_contenedor)) if limitar else None
+        return politica.ejecutar(operacion, antes)
+
     def crear_documento(self, nombre_contenedor, documento):
         """Crea un nuevo documento en un contenedor"""
         try:
             contenedor = self.obtener_contenedor(nombre_contenedor)
-            return contenedor.create_item(body=documento)
+            resultado = self._con_reintentos(
+                nombre_contenedor, lambda: contenedor.create_item(body=documento), limitar=True
+            )
+            self._invalidar_cache(nombre_contenedor, documento.get('id'), self._particion_de(nombre_contenedor, documento))
+            return resultado
         except exceptions.CosmosHttpResponseError as e:
             print(f"Error al crear documento: {str(e)}")
             return None
     
-    def leer_documento(self, nombre_contenedor, documento_id, partition_key):
-        """Lee un documento específico"""
+    def leer_documento(self, nombre_contenedor, documento_id, partition_key, usar_cache=True):
+        """Lee un documento específico (pasa por la caché si el contenedor la usa)
+        
+        Con usar_cache=False se lee siempre de CosmosDB, p. ej. para obtener
+        el _etag vigente antes de una escritura condicional.
+        """
+        clave = ('leer', nombre_contenedor, partition_key, documento_id)
+        if usar_cache and self._usa_cache(nombre_contenedor):
+            encontrado, documento = self.cache.obtener(clave)
+            if encontrado:
+                return documento
+        
         try:
             contenedor = self.obtener_contenedor(nombre_contenedor)
-            return contenedor.read_item(item=documento_id, partition_key=partition_key)
+            documento = self._con_reintentos(
+                nombre_contenedor, lambda: contenedor.read_item(item=documento_id, partition_key=partition_key)
+            )
+            if self._usa_cache(nombre_contenedor):
+                self.cache.guardar(clave, documento, self.ttl_cache[nombre_contenedor])
+            return documento
         except exceptions.CosmosResourceNotFoundError:
             return None
         except exceptions.CosmosHttpResponseError as e:
@@ -78,11 +288,36 @@ class ServicioCosmosDB:
         """Actualiza un documento existente"""
         try:
             contenedor = self.obtener_contenedor(nombre_contenedor)
-            return contenedor.upsert_item(body=documento)
+            resultado = self._con_reintentos(
+                nombre_contenedor, lambda: contenedor.upsert_item(body=documento), limitar=True
+            )
+            self._invalidar_cache(nombre_contenedor, documento.get('id'), self._particion_de(nombre_contenedor, documento))
+            return resultado
         except exceptions.CosmosHttpResponseError as e:
             print(f"Error al actualizar documento: {str(e)}")
             return None
     
+    def parchear_documento(self, nombre_contenedor, documento_id, partition_key, operaciones, etag=None):
+        """Aplica operaciones de actualización parcial (patch) sobre un documento
+
+        Las operaciones siguen el formato de CosmosDB, p. ej.
+        {'op': 'incr', 'path': '/total', 'value': 1} (máximo 10 por llamada).
+        Con etag la escritura solo se aplica si el documento no cambió desde
+        esa versión. Los errores se propagan (CosmosResourceNotFoundError si
+        el documento no existe, CosmosAccessConditionFailedError si el etag
+        ya no es vigente).
+        """
+        contenedor = self.obtener_contenedor(nombre_contenedor)
+        condicion = {'etag': etag, 'match_condition': MatchConditions.IfNotModified} if etag else {}
+        resultado = self._con_reintentos(nombre_contenedor, lambda: contenedor.patch_item(
+            item=documento_id,
+            partition_key=partition_key,
+            patch_operations=operaciones,
+            **condicion
+        ), limitar=True)
+        self._invalidar_cache(nombre_contenedor, documento_id, partition_key)
+        return resultado
+    
     def eliminar_documento(self, nombre_contenedor, documento_id, partition_key):
         """Elimina un documento específico del contenedor"""
         try:
@@ -90,31 +325,165 @@ class ServicioCosmosDB:
             if not contenedor:
                 return {'success': False, 'message': 'Contenedor no encontrado'}
                 
-            contenedor.delete_item(item=documento_id, partition_key=partition_key)
+            self._con_reintentos(
+                nombre_contenedor,
+                lambda: contenedor.delete_item(item=documento_id, partition_key=partition_key),
+                limitar=True
+            )
+            self._invalidar_cache(nombre_contenedor, documento_id, partition_key)
             return {'success': True}
             
         except exceptions.CosmosResourceNotFoundError:
             return {'success': False, 'message': 'Documento no encontrado'}
             
         except exceptions.CosmosHttpResponseError as e:
-            return {'success': False, 'message': f'Error HTTP {e.status_code}: {e.message}'}
+            return {
+                'success': False,
+                'message': f'Error HTTP {e.status_code}: {e.message}',
+                'status_code': e.status_code,
+                'reintentar_en_ms': (e.headers or {}).get('x-ms-retry-after-ms')
+            }
             
         except Exception as e:
             return {'success': False, 'message': str(e)}
     
-    def consultar_documentos(self, nombre_contenedor, consulta, parametros=None):
-        """Ejecuta una consulta SQL en un contenedor"""
+    def consultar_documentos(self, nombre_contenedor, consulta, parametros=None, partition_key=None,
+                             usar_cache=True):
+        """Ejecuta una consulta SQL en un contenedor
+        
+        Con partition_key la consulta se limita a esa partición; sin ella se
+        ejecuta entre particiones. Pasa por la caché si el contenedor la usa
+        (con usar_cache=False se consulta siempre a CosmosDB).
+        """
+        clave = ('consulta', nombre_contenedor, partition_key, consulta,
+                 tuple((p['name'], repr(p['value'])) for p in parametros or []))
+        if usar_cache and self._usa_cache(nombre_contenedor):
+            encontrado, items = self.cache.obtener(clave)
+            if encontrado:
+                return items
+        
         try:
             contenedor = self.obtener_contenedor(nombre_contenedor)
-            items = list(contenedor.query_items(
-                query=consulta,
-                parameters=parametros,
-                enable_cross_partition_query=True
-            ))
+            if partition_key is not None:
+                items = self._con_reintentos(nombre_contenedor, lambda: list(contenedor.query_items(
+                    query=consulta,
+                    parameters=parametros,
+                    partition_key=partition_key
+                )))
+            else:
+                items = self._con_reintentos(nombre_contenedor, lambda: list(contenedor.query_items(
+                    query=consulta,
+                    parameters=parametros,
+                    enable_cross_partition_query=True
+                )))
+            if self._usa_cache(nombre_contenedor):
+                self.cache.guardar(clave, items, self.ttl_cache[nombre_contenedor])
             return items
         except exceptions.CosmosHttpResponseError as e:
             print(f"Error al consultar documentos: {str(e)}")
             return []
+    
+    def ejecutar_lote(self, nombre_contenedor, partition_key, operaciones):
+        """Ejecuta operaciones en lotes transaccionales de una partición
+        
+        Las operaciones siguen el formato de execute_item_batch del SDK, p. ej.
+        ('create', (documento,)), ('replace', (id, documento), {'if_match_etag': etag}),
+        ('patch', (id, operaciones_patch)) o ('delete', (id,)). Se envían en
+        bloques de MAX_OPERACIONES_LOTE; cada bloque se aplica completo o no se
+        aplica, y si uno falla los siguientes no se envían.
+        
+        Retorna una respuesta por operación, en orden ({'statusCode', 'resourceBody', ...}).
+        En el bloque que falló la operación culpable lleva su código de error y
+        las demás 424; las de los bloques no enviados también llevan 424.
+        """
+        contenedor = self.obtener_contenedor(nombre_contenedor)
+        respuestas = []
+        for inicio in range(0, len(operaciones), MAX_OPERACIONES_LOTE):
+            bloque = operaciones[inicio:inicio + MAX_OPERACIONES_LOTE]
+            try:
+                respuestas.extend(self._con_reintentos(nombre_contenedor, lambda: contenedor.execute_item_batch(
+                    batch_operations=bloque, partition_key=partition_key
+                ), limitar=True))
+                for operacion in bloque:
+                    argumento = operacion[1][0]
+                    documento_id = argumento.get('id') if isinstance(argumento, dict) else argumento
+                    self._invalidar_cache(nombre_contenedor, documento_id, partition_key)
+            except exceptions.CosmosBatchOperationError as e:
+                print(f"Error en lote transaccional (operación {inicio + e.error_index}): {e.http_error_message}")
+                respuestas.extend(e.operation_responses)
+                break
+            except exceptions.CosmosHttpResponseError as e:
+                print(f"Error al ejecutar lote transaccional: {str(e)}")
+                respuestas.extend({'statusCode': e.status_code} for _ in bloque)
+                break
+        
+        respuestas.extend({'statusCode': 424} for _ in operaciones[len(respuestas):])
+        return respuestas
+    
+    def consultar_documentos_paginado(self, nombre_contenedor, consulta, parametros=None,
+                                      tamano_pagina=100, token_continuacion=None, partition_key=None):
+        """Ejecuta una consulta SQL y retorna una sola página de resultados
+
+        Retorna una tupla (items, token_continuacion). El token es None cuando
+        no quedan más páginas y debe enviarse tal cual para pedir la siguiente.
+        Con partition_key la consulta se limita a esa partición. Los errores
+        de CosmosDB se propagan: un token inválido o vencido responde 400 y
+        no debe confundirse con el final del listado.
+        """
+        contenedor = self.obtener_contenedor(nombre_contenedor)
+        
+        def leer_pagina():
+            paginas = contenedor.query_items(
+                query=consulta,
+                parameters=parametros,
+                partition_key=partition_key,
+                enable_cross_partition_query=partition_key is None,
+                max_item_count=tamano_pagina
+            ).by_page(token_continuacion)
+            
+            items = list(next(paginas, []))
+            return items, paginas.continuation_token or None
+        
+        return self._con_reintentos(nombre_contenedor, leer_pagina)
+    
+    def consultar_agregado(self, nombre_contenedor, consulta, parametros=None, partition_key=None):
+        """Ejecuta una consulta SELECT VALUE <agregado> y retorna el valor escalar
+
+        Retorna None si la consulta no produce valor (p. ej. AVG sin documentos).
+        A diferencia de consultar_documentos, los errores de CosmosDB se propagan
+        para que el llamador pueda recurrir a otra estrategia.
+        """
+        contenedor = self.obtener_contenedor(nombre_contenedor)
+        valores = self._con_reintentos(nombre_contenedor, lambda: list(contenedor.query_items(
+            query=consulta,
+            parameters=parametros,
+            partition_key=partition_key,
+            enable_cross_partition_query=partition_key is None
+        )))
+        return valores[0] if valores else None
+    
+    def iterar_documentos(self, nombre_contenedor, consulta, parametros=None, tamano_pagina=100,
+                          partition_key=None):
+        """Ejecuta una consulta SQL y entrega los documentos uno a uno
+
+        A diferencia de consultar_documentos no acumula los resultados: solo
+        mantiene en memoria la página que CosmosDB está entregando. Los errores
+        se propagan al consumidor porque pueden ocurrir a mitad de la iteración
+        (ante 429 solo reintenta el SDK). Antes de cada página espera al
+        limitador de RU del contenedor.
+        """
+        contenedor = self.obtener_contenedor(nombre_contenedor)
+        documentos = contenedor.query_items(
+            query=consulta,
+            parameters=parametros,
+            partition_key=partition_key,
+            enable_cross_partition_query=partition_key is None,
+            max_item_count=tamano_pagina
+        )
+        for indice, documento in enumerate(documentos):
+            if indice % tamano_pagina == tamano_pagina - 1:
+                limitador_ru.esperar(nombre_contenedor)
+            yield documento
 
 # Instancia global del servicio
 servicio_cosmos = ServicioCosmosDB()
@@ -0,0 +1,311 @@
+"""
+Variante asíncrona de ServicioCosmosDB (azure.cosmos.aio) para el modo ASGI
+
+Ofrece los mismos métodos que servicios/cosmos_db.py pero como corrutinas, así
+un solo proceso atiende muchas peticiones concurrentes mientras espera a
+CosmosDB. El cliente asíncrono queda ligado al event loop en el que se crea:
+debe inicializarse y cerrarse dentro del loop del servidor (ver asgi.py).
+
+Como este servicio también corre fuera de Flask, inicializar recibe la
+configuración explícitamente en lugar de leer current_app.
+"""
+from azure.cosmos import PartitionKey, exceptions
+from azure.cosmos.aio import CosmosClient
+from azure.core import MatchConditions
+from servicios.cosmos_db import backend_simulado, ganchos_cliente, politica_indexacion
+from servicios.cosmos_simulado import crear_cliente_simulado
+from servicios.limitador_cosmos import SIN_REINTENTOS, limitador_ru, politicas_desde_config, ru_desde_config
+
+
+class ServicioCosmosDBAsync:
+    """Servicio asíncrono para interactuar con Azure CosmosDB"""
+
+    def __init__(self):
+        self.cliente = None
+        self.base_datos = None
+        self.contenedores = {}
+        self.claves_particion = {}
+        self.cache = None
+        self.ttl_cache = {}
+        self.politicas_reintento = {}
+
+    async def inicializar(self, config, aprovisionar=True):
+        """Inicializa la conexión a CosmosDB con la configuración indicada (p. ej. app.config)
+
+        Con aprovisionar=False solo enlaza la base de datos y los contenedores
+        existentes; el cliente asíncrono no hace llamadas de red hasta el primer uso.
+        """
+        try:
+            # Mismos reintentos y mismo limitador de RU (del proceso) que el servicio síncrono.
+            # Sin métricas: fuera de Flask no hay endpoint al cual atribuirlas
+            self.politicas_reintento = politicas_desde_config(config)
+            limitador_ru.configurar(ru_desde_config(config))
+            if backend_simulado(config):
+                self.cliente = crear_cliente_simulado(config, con_metricas=False, asincrono=True)
+                aprovisionar = True
+            else:
+                self.cliente = CosmosClient(
+                    config['COSMOS_ENDPOINT'], config['COSMOS_KEY'], **ganchos_cliente(config, con_metricas=False)
+                )
+
+            if not aprovisionar:
+                self.base_datos = self.cliente.get_database_client(config['COSMOS_DATABASE'])
+                for nombre, partition_key in self.contenedores_config(config):
+                    self.contenedores[nombre] = self.base_datos.get_container_client(nombre)
+                    self.claves_particion[nombre] = partition_key.lstrip('/')
+                return True
+
+            # Crear o obtener base de datos
+            self.base_datos = await self.cliente.create_database_if_not_exists(
+                id=config['COSMOS_DATABASE']
+            )
+
+            # Crear o obtener contenedores
+            await self._crear_contenedores(config)
+
+            return True
+        except Exception as e:
+            print(f"Error al inicializar CosmosDB (async): {str(e)}")
+            return False
+
+    async def cerrar(self):
+        """Cierra la sesión HTTP del cliente asíncrono"""
+        if self.cliente:
+            await self.cliente.close()
+            self.cliente = None
+
+    def contenedores_config(self, config):
+        """(nombre, partition key) de cada contenedor de la aplicación"""
+        return [
+            (config['COSMOS_CONTAINER_RESPUESTAS'], config['COSMOS_PARTICION_RESPUESTAS']),
+            (config['COSMOS_CONTAINER_PREGUNTAS'], '/cuestionario_id'),
+            (config['COSMOS_CONTAINER_ADMINISTRADORES'], '/email'),
+            (config['COSMOS_CONTAINER_CONFIGURACION'], '/tipo')
+        ]
+
+    async def _crear_contenedores(self, config):
+        """Crea los contenedores necesarios si no existen"""
+        for nombre, partition_key in self.contenedores_config(config):
+            try:
+                # Los índices que falten en un contenedor existente los agrega el servicio síncrono
+                contenedor = await self.base_datos.create_container_if_not_exists(
+                    id=nombre,
+                    partition_key=PartitionKey(path=partition_key),
+                    indexing_policy=politica_indexacion(config, nombre)
+                )
+                self.contenedores[nombre] = contenedor
+                # Igual que en la versión síncrona: se usa el partition key real
+                propiedades = await contenedor.read()
+                self.claves_particion[nombre] = propiedades['partitionKey']['paths'][0].lstrip('/')
+            except exceptions.CosmosHttpResponseError as e:
+                print(f"Error al crear contenedor {nombre}: {str(e)}")
+
+    def obtener_contenedor(self, nombre_contenedor):
+        """Obtiene un contenedor específico"""
+        return self.contenedores.get(nombre_contenedor)
+
+    def configurar_cache(self, cache, ttl_por_contenedor):
+        """Activa la caché de lecturas (mismas claves que ServicioCosmosDB)
+
+        Pasando la caché del servicio síncrono, las escrituras de cualquiera
+        de los dos invalidan las lecturas de ambos dentro del proceso.
+        """
+        self.cache = cache
+        self.ttl_cache = {nombre: ttl for nombre, ttl in ttl_por_contenedor.items() if ttl > 0}
+
+    def _usa_cache(self, nombre_contenedor):
+        return self.cache is not None and nombre_contenedor in self.ttl_cache
+
+    def _invalidar_cache(self, nombre_contenedor, documento_id, partition_key):
+        """Invalida la lectura puntual del documento y las consultas que podrían incluirlo"""
+        if not self._usa_cache(nombre_contenedor):
+            return
+
+        def afectada(clave):
+            if clave[1] != nombre_contenedor:
+                return False
+            if clave[0] == 'leer':
+                return clave[3] == documento_id
+            return clave[2] is None or clave[2] == partition_key
+
+        self.cache.invalidar(afectada)
+
+    def _particion_de(self, nombre_contenedor, documento):
+        return documento.get(self.claves_particion.get(nombre_contenedor))
+
+    async def _con_reintentos(self, nombre_contenedor, operacion, limitar=False):
+        """Ejecuta await operacion() con la política de reintentos del contenedor (ver ServicioCosmosDB)"""
+        politica = self.politicas_reintento.get(nombre_contenedor, SIN_REINTENTOS)
+        antes = (lambda: limitador_ru.esperar_async(nombre_contenedor)) if limitar else None
+        return await politica.ejecutar_async(operacion, antes)
+
+    async def crear_documento(self, nombre_contenedor, documento):
+        """Crea un nuevo documento en un contenedor"""
+        try:
+            contenedor = self.obtener_contenedor(nombre_contenedor)
+            resultado = await self._con_reintentos(
+                nombre_contenedor, lambda: contenedor.create_item(body=documento), limitar=True
+            )
+            self._invalidar_cache(nombre_contenedor, documento.get('id'), self._particion_de(nombre_contenedor, documento))
+            return resultado
+        except exceptions.CosmosHttpResponseError as e:
+            print(f"Error al crear documento: {str(e)}")
+            return None
+
+    async def leer_documento(self, nombre_contenedor, documento_id, partition_key, usar_cache=True):
+        """Lee un documento específico (pasa por la caché si el contenedor la usa)"""
+        clave = ('leer', nombre_contenedor, partition_key, documento_id)
+        if usar_cache and self._usa_cache(nombre_contenedor):
+            encontrado, documento = self.cache.obtener(clave)
+            if encontrado:
+                return documento
+
+        try:
+            contenedor = self.obtener_contenedor(nombre_contenedor)
+            documento = await self._con_reintentos(
+                nombre_contenedor, lambda: contenedor.read_item(item=documento_id, partition_key=partition_key)
+            )
+            if self._usa_cache(nombre_contenedor):
+                self.cache.guardar(clave, documento, self.ttl_cache[nombre_contenedor])
+            return documento
+        except exceptions.CosmosResourceNotFoundError:
+            return None
+        except exceptions.CosmosHttpResponseError as e:
+            print(f"Error al leer documento: {str(e)}")
+            return None
+
+    async def actualizar_documento(self, nombre_contenedor, documento):
+        """Actualiza un documento existente"""
+        try:
+            contenedor = self.obtener_contenedor(nombre_contenedor)
+            resultado = await self._con_reintentos(
+                nombre_contenedor, lambda: contenedor.upsert_item(body=documento), limitar=True
+            )
+            self._invalidar_cache(nombre_contenedor, documento.get('id'), self._particion_de(nombre_contenedor, documento))
+            return resultado
+        except exceptions.CosmosHttpResponseError as e:
+            print(f"Error al actualizar documento: {str(e)}")
+            return None
+
+    async def parchear_documento(self, nombre_contenedor, documento_id, partition_key, operaciones, etag=None):
+        """Aplica operaciones patch sobre un documento. Los errores se propagan"""
+        contenedor = self.obtener_contenedor(nombre_contenedor)
+        condicion = {'etag': etag, 'match_condition': MatchConditions.IfNotModified} if etag else {}
+        resultado = await self._con_reintentos(nombre_contenedor, lambda: contenedor.patch_item(
+            item=documento_id,
+            partition_key=partition_key,
+            patch_operations=operaciones,
+            **condicion
+        ), limitar=True)
+        self._invalidar_cache(nombre_contenedor, documento_id, partition_key)
+        return resultado
+
+    async def eliminar_documento(self, nombre_contenedor, documento_id, partition_key):
+        """Elimina un documento específico del contenedor"""
+        try:
+            contenedor = self.obtener_contenedor(nombre_contenedor)
+            if not contenedor:
+                return {'success': False, 'message': 'Contenedor no encontrado'}
+
+            await self._con_reintentos(
+                nombre_contenedor,
+                lambda: contenedor.delete_item(item=documento_id, partition_key=partition_key),
+                limitar=True
+            )
+            self._invalidar_cache(nombre_contenedor, documento_id, partition_key)
+            return {'success': True}
+
+        except exceptions.CosmosResourceNotFoundError:
+            return {'success': False, 'message': 'Documento no encontrado'}
+
+        except exceptions.CosmosHttpResponseError as e:
+            return {
+                'success': False,
+                'message': f'Error HTTP {e.status_code}: {e.message}',
+                'status_code': e.status_code,
+                'reintentar_en_ms': (e.headers or {}).get('x-ms-retry-after-ms')
+            }
+
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+
+    async def consultar_documentos(self, nombre_contenedor, consulta, parametros=None, partition_key=None):
+        """Ejecuta una consulta SQL en un contenedor (entre particiones si no hay partition_key)"""
+        clave = ('consulta', nombre_contenedor, partition_key, consulta,
+                 tuple((p['name'], repr(p['value'])) for p in parametros or []))
+        if self._usa_cache(nombre_contenedor):
+            encontrado, items = self.cache.obtener(clave)
+            if encontrado:
+                return items
+
+        try:
+            contenedor = self.obtener_contenedor(nombre_contenedor)
+
+            async def consultar():
+                return [item async for item in contenedor.query_items(
+                    query=consulta,
+                    parameters=parametros,
+                    partition_key=partition_key
+                )]
+
+            items = await self._con_reintentos(nombre_contenedor, consultar)
+            if self._usa_cache(nombre_contenedor):
+                self.cache.guardar(clave, items, self.ttl_cache[nombre_contenedor])
+            return items
+        except exceptions.CosmosHttpResponseError as e:
+            print(f"Error al consultar documentos: {str(e)}")
+            return []
+
+    async def consultar_documentos_paginado(self, nombre_contenedor, consulta, parametros=None,
+                                            tamano_pagina=100, token_continuacion=None, partition_key=None):
+        """Ejecuta una consulta SQL y retorna una sola página: (items, token_continuacion) (errores se propagan)"""
+        contenedor = self.obtener_contenedor(nombre_contenedor)
+
+        async def leer_pagina():
+            paginas = contenedor.query_items(
+                query=consulta,
+                parameters=parametros,
+                partition_key=partition_key,
+                max_item_count=tamano_pagina
+            ).by_page(token_continuacion)
+
+            items = []
+            async for pagina in paginas:
+                items = [item async for item in pagina]
+                break
+            return items, paginas.continuation_token or None
+
+        return await self._con_reintentos(nombre_contenedor, leer_pagina)
+
+    async def consultar_agregado(self, nombre_contenedor, consulta, parametros=None, partition_key=None):
+        """Ejecuta una consulta SELECT VALUE <agregado> y retorna el valor escalar (errores se propagan)"""
+        contenedor = self.obtener_contenedor(nombre_contenedor)
+
+        async def consultar():
+            return [valor async for valor in contenedor.query_items(
+                query=consulta,
+                parameters=parametros,
+                partition_key=partition_key
+            )]
+
+        valores = await self._con_reintentos(nombre_contenedor, consultar)
+        return valores[0] if valores else None
+
+    async def iterar_documentos(self, nombre_contenedor, consulta, parametros=None, tamano_pagina=100,
+                                partition_key=None):
+        """Entrega los documentos de una consulta uno a uno (generador asíncrono, pausado por el limitador de RU)"""
+        contenedor = self.obtener_contenedor(nombre_contenedor)
+        indice = 0
+        async for documento in contenedor.query_items(
+            query=consulta,
+            parameters=parametros,
+            partition_key=partition_key,
+            max_item_count=tamano_pagina
+        ):
+            if indice % tamano_pagina == tamano_pagina - 1:
+                await limitador_ru.esperar_async(nombre_contenedor)
+            indice += 1
+            yield documento
+
+# Instancia global del servicio asíncrono
+servicio_cosmos_async = ServicioCosmosDBAsync()
@@ -0,0 +1,910 @@
+"""
+Backend simulado de CosmosDB (en memoria o en SQLite) para pruebas sin Azure
+
+Con COSMOS_BACKEND=memoria o COSMOS_BACKEND=sqlite, ServicioCosmosDB y
+ServicioCosmosDBAsync crean un ClienteSimulado en lugar de CosmosClient. Imita
+la parte del SDK que usan (create_item, read_item, upsert_item, replace_item,
+patch_item, delete_item, execute_item_batch y query_items con by_page) con los
+mismos errores (400, 404, 409, 412 y 429), así la caché, los reintentos, el limitador de RU
+y todas las rutas corren igual que contra Azure. Las consultas se evalúan con
+el subconjunto de SQL de servicios/consultas_cosmos.py.
+
+- memoria: los datos viven en el proceso y se pierden al reiniciar. Con varios
+  workers de gunicorn cada uno tiene los suyos.
+- sqlite: los documentos se guardan como JSON en COSMOS_SIMULADO_RUTA y los
+  comparten todos los procesos de la máquina (para pruebas de carga con varios
+  workers).
+
+Cada llamada espera COSMOS_SIMULADO_LATENCIA_MS (más un jitter de hasta
+COSMOS_SIMULADO_LATENCIA_VARIACION_MS) y cobra unas RU aproximadas a las de
+CosmosDB (ver RU_POR_KB), multiplicadas por COSMOS_SIMULADO_FACTOR_RU. El
+cargo pasa por las métricas y por el limitador de RU igual que el
+x-ms-request-charge de una respuesta real (el del último llamado queda en
+client_connection.last_response_headers, como en el SDK). Con COSMOS_SIMULADO_RU_POR_SEGUNDO
+mayor que cero cada contenedor tiene ese throughput aprovisionado y responde
+429 con x-ms-retry-after-ms cuando se excede.
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from azure.cosmos import exceptions
+from azure.core import MatchConditions
+from servicios.consultas_cosmos import ErrorConsulta, analizar
+from servicios.limitador_cosmos import CuboTokensRU, limitador_ru
+from servicios.metricas import registrar_llamada_cosmos
+
+BACKENDS_SIMULADOS = ('memoria', 'sqlite')
+
+# RU por KB del documento, aproximadas a las de CosmosDB con la indexación por defecto
+RU_POR_KB = {
+    'lectura': 1.0,
+    'creacion': 5.7,
+    'upsert': 10.7,
+    'reemplazo': 10.7,
+    'patch': 10.7,
+    'eliminacion': 5.7
+}
+# Consultas: costo fijo por página, por documento examinado y por KB devuelto
+RU_CONSULTA_PAGINA = 2.3
+RU_CONSULTA_DOCUMENTO = 0.05
+RU_CONSULTA_KB = 0.3
+# Respuestas de error (404, 409, 412); los 429 no cobran
+RU_ERROR = 1.0
+
+TAMANO_PAGINA_POR_DEFECTO = 100
+MAX_OPERACIONES_PATCH = 10
+MAX_OPERACIONES_LOTE = 100
+
+# Documentos de todas las particiones en AlmacenMemoria.documentos / AlmacenSQLite.documentos
+TODAS = object()
+
+
+def _error(clase, codigo, mensaje, encabezados=None):
+    error = clase(status_code=codigo, message=mensaje)
+    if encabezados:
+        error.headers = encabezados
+    return error
+
+
+def _kb(texto):
+    return max(1, math.ceil(len(texto.encode('utf-8')) / 1024))
+
+
+def _particion(valor):
+    return json.dumps(valor)
+
+
+# ---------------------------------------------------------------------------
+# Almacenamiento de los documentos (como texto JSON, igual que en CosmosDB)
+# ---------------------------------------------------------------------------
+
+class AlmacenMemoria:
+    """Documentos en un diccionario del proceso: {contenedor: {partición: {id: (texto, documento)}}}"""
+
+    def __init__(self):
+        self._claves = {}
+        self._documentos = {}
+        self._candado = threading.Lock()
+
+    def registrar_contenedor(self, nombre, clave):
+        """Crea el contenedor si no existe. Retorna su partition key (el existente si ya estaba)"""
+        with self._candado:
+            self._documentos.setdefault(nombre, {})
+            return self._claves.setdefault(nombre, clave)
+
+    def clave_particion(self, nombre):
+        return self._claves.get(nombre)
+
+    def leer(self, nombre, particion, documento_id):
+        guardado = self._documentos[nombre].get(particion, {}).get(documento_id)
+        return guardado[0] if guardado else None
+
+    def insertar(self, nombre, particion, documento_id, texto):
+        """Guarda el documento solo si no existe. Retorna False si ya existía"""
+        with self._candado:
+            documentos = self._documentos[nombre].setdefault(particion, {})
+            if documento_id in documentos:
+                return False
+            documentos[documento_id] = (texto, json.loads(texto))
+            return True
+
+    def guardar(self, nombre, particion, documento_id, texto):
+        with self._candado:
+            self._documentos[nombre].setdefault(particion, {})[documento_id] = (texto, json.loads(texto))
+
+    def modificar(self, nombre, particion, documento_id, funcion):
+        """Reemplaza atómicamente el documento por funcion(texto actual o None)"""
+        with self._candado:
+            documentos = self._documentos[nombre].setdefault(particion, {})
+            actual = documentos.get(documento_id)
+            texto = funcion(actual[0] if actual else None)
+            documentos[documento_id] = (texto, json.loads(texto))
+            return texto
+
+    def eliminar(self, nombre, particion, documento_id):
+        """Elimina el documento. Retorna su texto, o None si no existía"""
+        with self._candado:
+            guardado = self._documentos[nombre].get(particion, {}).pop(documento_id, None)
+            return guardado[0] if guardado else None
+
+    def aplicar_lote(self, nombre, particion, funcion):
+        """Aplica atómicamente los cambios {id: texto o None para eliminar} que retorna funcion(leer)
+
+        leer(id) retorna el texto guardado en la partición; si funcion lanza
+        una excepción no se aplica ningún cambio.
+        """
+        with self._candado:
+            documentos = self._documentos[nombre].setdefault(particion, {})
+            cambios = funcion(lambda documento_id: (documentos.get(documento_id) or (None,))[0])
+            for documento_id, texto in cambios.items():
+                if texto is None:
+                    documentos.pop(documento_id, None)
+                else:
+                    documentos[documento_id] = (texto, json.loads(texto))
+            return cambios
+
+    def documentos(self, nombre, particion=TODAS):
+        """Documentos (compartidos: no deben modificarse) de una partición o de todas"""
+        with self._candado:
+            particiones = self._documentos[nombre]
+            if particion is not TODAS:
+                return [documento for _, documento in particiones.get(particion, {}).values()]
+            return [documento for grupo in particiones.values() for _, documento in grupo.values()]
+
+
+class AlmacenSQLite:
+    """Documentos en un archivo SQLite, compartido por todos los procesos que lo abran"""
+
+    ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS contenedores (
+        nombre TEXT PRIMARY KEY,
+        clave TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS documentos (
+        contenedor TEXT NOT NULL,
+        particion TEXT NOT NULL,
+        id TEXT NOT NULL,
+        documento TEXT NOT NULL,
+        PRIMARY KEY (contenedor, particion, id)
+    );
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        with closing(sqlite3.connect(ruta, timeout=30)) as conexion:
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.executescript(self.ESQUEMA)
+
+    def _conexion(self):
+        """Una conexión por hilo (y por proceso: no se reutiliza después de un fork)"""
+        if getattr(self._local, 'pid', None) != os.getpid():
+            # isolation_level=None: las transacciones se abren explícitamente
+            self._local.conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            self._local.conexion.execute('PRAGMA synchronous=NORMAL')
+            self._local.pid = os.getpid()
+        return self._local.conexion
+
+    def registrar_contenedor(self, nombre, clave):
+        conexion = self._conexion()
+        conexion.execute("INSERT OR IGNORE INTO contenedores (nombre, clave) VALUES (?, ?)", (nombre, clave))
+        return self.clave_particion(nombre)
+
+    def clave_particion(self, nombre):
+        fila = self._conexion().execute("SELECT clave FROM contenedores WHERE nombre = ?", (nombre,)).fetchone()
+        return fila[0] if fila else None
+
+    def leer(self, nombre, particion, documento_id):
+        fila = self._conexion().execute(
+            "SELECT documento FROM documentos WHERE contenedor = ? AND particion = ? AND id = ?",
+            (nombre, particion, documento_id)
+        ).fetchone()
+        return fila[0] if fila else None
+
+    def insertar(self, nombre, particion, documento_id, texto):
+        try:
+            self._conexion().execute(
+                "INSERT INTO documentos (contenedor, particion, id, documento) VALUES (?, ?, ?, ?)",
+                (nombre, particion, documento_id, texto)
+            )
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def guardar(self, nombre, particion, documento_id, texto):
+        self._conexion().execute(
+            "INSERT OR REPLACE INTO documentos (contenedor, particion, id, documento) VALUES (?, ?, ?, ?)",
+            (nombre, particion, documento_id, texto)
+        )
+
+    def modificar(self, nombre, particion, documento_id, funcion):
+        conexion = self._conexion()
+        conexion.execute('BEGIN IMMEDIATE')
+        try:
+            texto = funcion(self.leer(nombre, particion, documento_id))
+            self.guardar(nombre, particion, documento_id, texto)
+            conexion.execute('COMMIT')
+            return texto
+        except Exception:
+            conexion.execute('ROLLBACK')
+            raise
+
+    def eliminar(self, nombre, particion, documento_id):
+        conexion = self._conexion()
+        conexion.execute('BEGIN IMMEDIATE')
+        try:
+            texto = self.leer(nombre, particion, documento_id)
+            conexion.execute(
+                "DELETE FROM documentos WHERE contenedor = ? AND particion = ? AND id = ?",
+                (nombre, particion, documento_id)
+            )
+            conexion.execute('COMMIT')
+            return texto
+        except Exception:
+            conexion.execute('ROLLBACK')
+            raise
+
+    def aplicar_lote(self, nombre, particion, funcion):
+        conexion = self._conexion()
+        conexion.execute('BEGIN IMMEDIATE')
+        try:
+            cambios = funcion(lambda documento_id: self.leer(nombre, particion, documento_id))
+            for documento_id, texto in cambios.items():
+                if texto is None:
+                    conexion.execute(
+                        "DELETE FROM documentos WHERE contenedor = ? AND particion = ? AND id = ?",
+                        (nombre, particion, documento_id)
+                    )
+                else:
+                    self.guardar(nombre, particion, documento_id, texto)
+            conexion.execute('COMMIT')
+            return cambios
+        except Exception:
+            conexion.execute('ROLLBACK')
+            raise
+
+    def documentos(self, nombre, particion=TODAS):
+        if particion is TODAS:
+            filas = self._conexion().execute("SELECT documento FROM documentos WHERE contenedor = ?", (nombre,))
+        else:
+            filas = self._conexion().execute(
+                "SELECT documento FROM documentos WHERE contenedor = ? AND particion = ?", (nombre, particion)
+            )
+        return [json.loads(fila[0]) for fila in filas]
+
+
+_almacenes = {}
+_candado_almacenes = threading.Lock()
+
+
+def _almacen(config):
+    """Almacén del proceso para la configuración (el mismo para el servicio síncrono y el asíncrono)"""
+    backend = config['COSMOS_BACKEND']
+    if backend not in BACKENDS_SIMULADOS:
+        raise ValueError(f"COSMOS_BACKEND desconocido: {backend} (azure, memoria o sqlite)")
+    clave = (backend, config['COSMOS_SIMULADO_RUTA'] if backend == 'sqlite' else None)
+    with _candado_almacenes:
+        if clave not in _almacenes:
+            _almacenes[clave] = AlmacenMemoria() if backend == 'memoria' else AlmacenSQLite(clave[1])
+        return _almacenes[clave]
+
+
+# ---------------------------------------------------------------------------
+# Latencia, RU y throughput aprovisionado
+# ---------------------------------------------------------------------------
+
+class SimuladorCosmos:
+    """Latencia y cargo de RU de cada llamada, y 429 al exceder el throughput por contenedor"""
+
+    def __init__(self):
+        self.latencia_ms = 0
+        self.variacion_ms = 0
+        self.factor_ru = 1.0
+        self.ru_por_segundo = 0
+        self._cubos = {}
+        self._candado = threading.Lock()
+
+    def configurar(self, config):
+        self.latencia_ms = config['COSMOS_SIMULADO_LATENCIA_MS']
+        self.variacion_ms = config['COSMOS_SIMULADO_LATENCIA_VARIACION_MS']
+        self.factor_ru = config['COSMOS_SIMULADO_FACTOR_RU']
+        if config['COSMOS_SIMULADO_RU_POR_SEGUNDO'] != self.ru_por_segundo:
+            self.ru_por_segundo = config['COSMOS_SIMULADO_RU_POR_SEGUNDO']
+            self._cubos = {}
+
+    def latencia(self):
+        """Segundos que debe tardar la próxima llamada"""
+        return (self.latencia_ms + random.uniform(0, self.variacion_ms)) / 1000
+
+    def _cubo(self, nombre_contenedor):
+        if self.ru_por_segundo <= 0:
+            return None
+        with self._candado:
+            if nombre_contenedor not in self._cubos:
+                self._cubos[nombre_contenedor] = CuboTokensRU(self.ru_por_segundo)
+            return self._cubos[nombre_contenedor]
+
+    def verificar_throughput(self, nombre_contenedor):
+        """Lanza un 429 (con x-ms-retry-after-ms) si el contenedor agotó su throughput"""
+        cubo = self._cubo(nombre_contenedor)
+        espera = cubo.tiempo_de_espera() if cubo else 0
+        if espera > 0:
+            raise _error(
+                exceptions.CosmosHttpResponseError, 429,
+                f"Request rate is large (simulado: {self.ru_por_segundo} RU/s)",
+                {'x-ms-retry-after-ms': str(math.ceil(espera * 1000))}
+            )
+
+    def cobrar(self, nombre_contenedor, operacion, ru, duracion, items=None, con_metricas=True):
+        """Descuenta el cargo del throughput y del limitador de RU, lo registra en las métricas y lo retorna"""
+        cargo = round(ru * self.factor_ru, 2)
+        cubo = self._cubo(nombre_contenedor)
+        if cubo:
+            cubo.descontar(cargo)
+        limitador_ru.descontar(nombre_contenedor, cargo)
+        if con_metricas:
+            registrar_llamada_cosmos(nombre_contenedor, operacion, cargo, duracion, items)
+        return cargo
+
+
+# Simulador global del proceso (los cubos de throughput son por contenedor, como en CosmosDB)
+simulador_cosmos = SimuladorCosmos()
+
+
+# ---------------------------------------------------------------------------
+# Patch (JSON Patch con las operaciones de CosmosDB)
+# ---------------------------------------------------------------------------
+
+def _error_patch(mensaje):
+    return _error(exceptions.CosmosHttpResponseError, 400, f"Patch inválido: {mensaje}")
+
+
+def _ubicar(documento, ruta):
+    """(contenedor padre, clave o índice) de una ruta /a/b/0; el índice '-' queda como texto"""
+    partes = [parte.replace('~1', '/').replace('~0', '~') for parte in ruta.split('/')[1:]]
+    if not ruta.startswith('/') or not partes:
+        raise _error_patch(f"ruta {ruta!r}")
+
+    padre = documento
+    for parte in partes[:-1]:
+        if isinstance(padre, dict) and parte in padre:
+            padre = padre[parte]
+        elif isinstance(padre, list) and parte.isdigit() and int(parte) < len(padre):
+            padre = padre[int(parte)]
+        else:
+            raise _error_patch(f"la ruta {ruta!r} no existe")
+
+    clave = partes[-1]
+    if isinstance(padre, list):
+        if clave != '-' and not clave.isdigit():
+            raise _error_patch(f"índice inválido en {ruta!r}")
+        clave = clave if clave == '-' else int(clave)
+    elif not isinstance(padre, dict):
+        raise _error_patch(f"la ruta {ruta!r} no apunta a un objeto ni a un arreglo")
+    return padre, clave
+
+
+def aplicar_patch(documento, operaciones, campos_fijos=()):
+    """Aplica sobre documento las operaciones add, set, replace, remove e incr de CosmosDB"""
+    if len(operaciones) > MAX_OPERACIONES_PATCH:
+        raise _error_patch(f"máximo {MAX_OPERACIONES_PATCH} operaciones por llamada")
+
+    for operacion in operaciones:
+        tipo, ruta, valor = operacion.get('op'), operacion.get('path', ''), operacion.get('value')
+        if ruta.lstrip('/') in campos_fijos:
+            raise _error_patch(f"no se puede modificar {ruta}")
+        padre, clave = _ubicar(documento, ruta)
+        existe = clave in padre if isinstance(padre, dict) else clave != '-' and clave < len(padre)
+
+        if tipo == 'add':
+            if isinstance(padre, list):
+                if clave != '-' and clave > len(padre):
+                    raise _error_patch(f"índice fuera de rango en {ruta}")
+                padre.insert(len(padre) if clave == '-' else clave, valor)
+            else:
+                padre[clave] = valor
+        elif tipo == 'set':
+            if isinstance(padre, list) and (clave == '-' or clave == len(padre)):
+                padre.append(valor)
+            elif isinstance(padre, list) and not existe:
+                raise _error_patch(f"índice fuera de rango en {ruta}")
+            else:
+                padre[clave] = valor
+        elif tipo in ('replace', 'remove'):
+            if not existe:
+                raise _error_patch(f"la ruta {ruta} no existe")
+            if tipo == 'replace':
+                padre[clave] = valor
+            else:
+                del padre[clave]
+        elif tipo == 'incr':
+            if not isinstance(valor, (int, float)) or isinstance(valor, bool):
+                raise _error_patch(f"incr requiere un número en {ruta}")
+            actual = padre[clave] if existe else 0
+            if not isinstance(actual, (int, float)) or isinstance(actual, bool):
+                raise _error_patch(f"{ruta} no es numérico")
+            if isinstance(padre, list) and not existe:
+                raise _error_patch(f"índice fuera de rango en {ruta}")
+            padre[clave] = actual + valor
+        else:
+            raise _error_patch(f"operación no soportada: {tipo}")
+    return documento
+
+
+# ---------------------------------------------------------------------------
+# Contenedores, base de datos y cliente con la interfaz del SDK
+# ---------------------------------------------------------------------------
+
+class ConexionSimulada:
+    """Lo que se usa de client_connection: los encabezados de la última respuesta"""
+
+    def __init__(self):
+        self.last_response_headers = {}
+
+
+class ContenedorSimulado:
+    """Equivalente de ContainerProxy sobre un almacén local"""
+
+    def __init__(self, nombre, base_datos, almacen, simulador, con_metricas=True):
+        self.id = nombre
+        self._nombre_almacen = f'{base_datos}/{nombre}'
+        self.almacen = almacen
+        self.simulador = simulador
+        self.con_metricas = con_metricas
+        self.client_connection = ConexionSimulada()
+
+    @property
+    def clave(self):
+        """Campo del partition key (404 si el contenedor no fue creado)"""
+        clave = self.almacen.clave_particion(self._nombre_almacen)
+        if clave is None:
+            raise _error(exceptions.CosmosResourceNotFoundError, 404, f"El contenedor {self.id} no existe")
+        return clave.lstrip('/')
+
+    def _particion(self, partition_key):
+        self.clave  # 404 si el contenedor no existe
+        return _particion(partition_key)
+
+    def _ejecutar(self, operacion, funcion, *args):
+        self.simulador.verificar_throughput(self.id)
+        inicio = time.perf_counter()
+        latencia = self.simulador.latencia()
+        if latencia > 0:
+            time.sleep(latencia)
+        return self._cobrar(operacion, inicio, funcion, *args)
+
+    def _cobrar(self, operacion, inicio, funcion, *args):
+        """Ejecuta funcion (que retorna resultado, RU e items) y registra su cargo"""
+        try:
+            resultado, ru, items = funcion(*args)
+        except (exceptions.CosmosHttpResponseError, exceptions.CosmosBatchOperationError):
+            self._encabezados(self.simulador.cobrar(self.id, operacion, RU_ERROR, time.perf_counter() - inicio,
+                                                    con_metricas=self.con_metricas))
+            raise
+        self._encabezados(self.simulador.cobrar(self.id, operacion, ru, time.perf_counter() - inicio,
+                                                items, self.con_metricas))
+        return resultado
+
+    def _encabezados(self, cargo):
+        self.client_connection.last_response_headers = {'x-ms-request-charge': str(cargo)}
+
+    def _serializar(self, documento):
+        """Texto JSON del documento con _etag y _ts nuevos"""
+        if not isinstance(documento.get('id'), str) or not documento['id']:
+            raise _error(exceptions.CosmosHttpResponseError, 400, "El documento debe tener un id de texto")
+        return json.dumps({**documento, '_etag': f'"{uuid.uuid4()}"', '_ts': int(time.time())})
+
+    def _particion_de(self, documento):
+        return _particion(documento.get(self.clave))
+
+    def _no_encontrado(self):
+        return _error(exceptions.CosmosResourceNotFoundError, 404, "Entity with the specified id does not exist in the system.")
+
+    # -- operaciones: retornan (resultado, RU, items) -------------------------
+
+    def _crear(self, body):
+        texto = self._serializar(body)
+        if not self.almacen.insertar(self._nombre_almacen, self._particion_de(body), body['id'], texto):
+            raise _error(exceptions.CosmosResourceExistsError, 409, "Entity with the specified id already exists in the system.")
+        return json.loads(texto), RU_POR_KB['creacion'] * _kb(texto), None
+
+    def _leer(self, item, partition_key):
+        texto = self.almacen.leer(self._nombre_almacen, self._particion(partition_key), item)
+        if texto is None:
+            raise self._no_encontrado()
+        return json.loads(texto), RU_POR_KB['lectura'] * _kb(texto), None
+
+    def _upsert(self, body):
+        texto = self._serializar(body)
+        self.almacen.guardar(self._nombre_almacen, self._particion_de(body), body['id'], texto)
+        return json.loads(texto), RU_POR_KB['upsert'] * _kb(texto), None
+
+    def _reemplazar(self, item, body):
+        if body.get('id') != item:
+            raise _error(exceptions.CosmosHttpResponseError, 400, "El id del documento no coincide con el indicado")
+
+        def reemplazar(actual):
+            if actual is None:
+                raise self._no_encontrado()
+            return self._serializar(body)
+
+        texto = self.almacen.modificar(self._nombre_almacen, self._particion_de(body), item, reemplazar)
+        return json.loads(texto), RU_POR_KB['reemplazo'] * _kb(texto), None
+
+    def _parchear(self, item, partition_key, operaciones, etag, match_condition):
+        clave = self.clave
+
+        def parchear(actual):
+            if actual is None:
+                raise self._no_encontrado()
+            documento = json.loads(actual)
+            if etag and match_condition == MatchConditions.IfNotModified and documento.get('_etag') != etag:
+                raise _error(exceptions.CosmosAccessConditionFailedError, 412,
+                             "Operation cannot be performed because one of the specified precondition is not met.")
+            return self._serializar(aplicar_patch(documento, operaciones, ('id', clave)))
+
+        texto = self.almacen.modificar(self._nombre_almacen, self._particion(partition_key), item, parchear)
+        return json.loads(texto), RU_POR_KB['patch'] * _kb(texto), None
+
+    def _eliminar(self, item, partition_key):
+        texto = self.almacen.eliminar(self._nombre_almacen, self._particion(partition_key), item)
+        if texto is None:
+            raise self._no_encontrado()
+        return None, RU_POR_KB['eliminacion'] * _kb(texto), None
+
+    def _operacion_lote(self, particion, tipo, argumentos, opciones, actual):
+        """Una operación de execute_item_batch sobre el estado pendiente del lote
+
+        actual(id) retorna el texto vigente dentro del lote. Retorna
+        (id, texto nuevo o None si se elimina o no cambia, respuesta, RU).
+        """
+        if tipo not in ('create', 'upsert', 'replace', 'read', 'delete', 'patch'):
+            raise _error(exceptions.CosmosHttpResponseError, 400, f"Operación de lote no soportada: {tipo}")
+        if tipo in ('create', 'upsert'):
+            documento_id, body = argumentos[0].get('id'), argumentos[0]
+        else:
+            documento_id, body = argumentos[0], argumentos[1] if len(argumentos) > 1 else None
+        guardado = actual(documento_id) if isinstance(documento_id, str) else None
+
+        if tipo in ('create', 'upsert', 'replace'):
+            texto = self._serializar(body)
+            if self._particion_de(body) != particion:
+                raise _error(exceptions.CosmosHttpResponseError, 400,
+                             "El partition key del documento no coincide con el del lote")
+        if tipo == 'create' and guardado is not None:
+            raise _error(exceptions.CosmosResourceExistsError, 409, "Entity with the specified id already exists in the system.")
+        if tipo in ('read', 'replace', 'patch', 'delete') and guardado is None:
+            raise self._no_encontrado()
+        if tipo == 'replace' and body.get('id') != documento_id:
+            raise _error(exceptions.CosmosHttpResponseError, 400, "El id del documento no coincide con el indicado")
+
+        etag = opciones.get('if_match_etag')
+        if etag and guardado is not None and json.loads(guardado).get('_etag') != etag:
+            raise _error(exceptions.CosmosAccessConditionFailedError, 412,
+                         "Operation cannot be performed because one of the specified precondition is not met.")
+
+        if tipo == 'read':
+            return documento_id, None, {'statusCode': 200, 'resourceBody': json.loads(guardado)}, RU_POR_KB['lectura'] * _kb(guardado)
+        if tipo == 'delete':
+            return documento_id, None, {'statusCode': 204}, RU_POR_KB['eliminacion'] * _kb(guardado)
+        if tipo == 'patch':
+            texto = self._serializar(aplicar_patch(json.loads(guardado), argumentos[1], ('id', self.clave)))
+
+        codigo = 201 if tipo == 'create' or (tipo == 'upsert' and guardado is None) else 200
+        operacion = {'create': 'creacion', 'upsert': 'upsert', 'replace': 'reemplazo', 'patch': 'patch'}[tipo]
+        return documento_id, texto, {'statusCode': codigo, 'resourceBody': json.loads(texto)}, RU_POR_KB[operacion] * _kb(texto)
+
+    def _lote(self, operaciones, partition_key):
+        """Lote transaccional: se aplican todas las operaciones o ninguna
+
+        Si una falla lanza CosmosBatchOperationError con su índice; en
+        operation_responses esa operación lleva su código de error y las demás 424.
+        """
+        if len(operaciones) > MAX_OPERACIONES_LOTE:
+            raise _error(exceptions.CosmosHttpResponseError, 400,
+                         f"Máximo {MAX_OPERACIONES_LOTE} operaciones por lote transaccional")
+        particion = self._particion(partition_key)
+        respuestas = []
+        cargos = []
+
+        def aplicar(leer):
+            # Textos que deja el lote hasta ahora (None: eliminado)
+            cambios = {}
+
+            def actual(documento_id):
+                return cambios[documento_id] if documento_id in cambios else leer(documento_id)
+
+            for indice, operacion in enumerate(operaciones):
+                tipo, argumentos = operacion[0].lower(), operacion[1]
+                opciones = operacion[2] if len(operacion) > 2 else {}
+                try:
+                    documento_id, texto, respuesta, ru = self._operacion_lote(
+                        particion, tipo, argumentos, opciones, actual
+                    )
+                except exceptions.CosmosHttpResponseError as e:
+                    fallidas = [{'statusCode': 424, 'requestCharge': 0} for _ in operaciones]
+                    fallidas[indice] = {'statusCode': e.status_code, 'requestCharge': RU_ERROR}
+                    raise exceptions.CosmosBatchOperationError(
+                        error_index=indice, headers={}, status_code=e.status_code,
+                        message=f"There was an error in the transactional batch on index {indice}. Error message: {e.http_error_message}",
+                        operation_responses=fallidas
+                    )
+                if tipo != 'read':
+                    cambios[documento_id] = texto
+                respuestas.append({**respuesta, 'requestCharge': round(ru * self.simulador.factor_ru, 2)})
+                cargos.append(ru)
+            return cambios
+
+        self.almacen.aplicar_lote(self._nombre_almacen, particion, aplicar)
+        return respuestas, sum(cargos), len(respuestas)
+
+    def evaluar_consulta(self, query, parameters, partition_key):
+        """Resultados completos de una consulta: (resultados, bytes, documentos examinados)"""
+        particion = TODAS if partition_key is None else self._particion(partition_key)
+        documentos = self.almacen.documentos(self._nombre_almacen, particion)
+        try:
+            resultados = analizar(query).ejecutar(documentos, parameters)
+        except ErrorConsulta as e:
+            raise _error(exceptions.CosmosHttpResponseError, 400, f"Consulta no soportada: {str(e)}")
+        # Copia por JSON: el llamador puede modificar lo que recibe
+        texto = json.dumps(resultados)
+        return json.loads(texto), len(texto.encode('utf-8')), len(documentos)
+
+    # -- interfaz del SDK -----------------------------------------------------
+
+    def read(self, **kwargs):
+        return {'id': self.id, 'partitionKey': {'paths': [f'/{self.clave}'], 'kind': 'Hash'}}
+
+    def create_item(self, body, **kwargs):
+        return self._ejecutar('creacion', self._crear, body)
+
+    def read_item(self, item, partition_key, **kwargs):
+        return self._ejecutar('lectura', self._leer, item, partition_key)
+
+    def upsert_item(self, body, **kwargs):
+        return self._ejecutar('upsert', self._upsert, body)
+
+    def replace_item(self, item, body, **kwargs):
+        return self._ejecutar('reemplazo', self._reemplazar, item, body)
+
+    def patch_item(self, item, partition_key, patch_operations, etag=None, match_condition=None, **kwargs):
+        return self._ejecutar('patch', self._parchear, item, partition_key, patch_operations, etag, match_condition)
+
+    def delete_item(self, item, partition_key, **kwargs):
+        return self._ejecutar('eliminacion', self._eliminar, item, partition_key)
+
+    def execute_item_batch(self, batch_operations, partition_key, **kwargs):
+        return self._ejecutar('lote', self._lote, batch_operations, partition_key)
+
+    def query_items(self, query, parameters=None, partition_key=None, max_item_count=None, **kwargs):
+        return ResultadoConsulta(self, query, parameters, partition_key, max_item_count)
+
+
+class PaginasConsulta:
+    """Lo que retorna by_page: un iterador de páginas con continuation_token como en el SDK
+
+    La consulta se evalúa al pedir la primera página y las siguientes son
+    cortes del mismo resultado. El token es el desplazamiento de la próxima
+    página (None cuando no quedan más).
+    """
+
+    def __init__(self, contenedor, consulta, parametros, partition_key, tamano_pagina, token):
+        self.contenedor = contenedor
+        self.consulta = consulta
+        self.parametros = parametros
+        self.partition_key = partition_key
+        self.tamano_pagina = tamano_pagina or TAMANO_PAGINA_POR_DEFECTO
+        self.continuation_token = token
+        self.terminada = False
+        self._resultados = None
+        self._bytes = 0
+
+    def siguiente_pagina(self):
+        """(items de la página, RU, cantidad de items) y avanza el token"""
+        try:
+            desde = int(self.continuation_token or 0)
+        except ValueError:
+            raise _error(exceptions.CosmosHttpResponseError, 400, "Token de continuación inválido")
+
+        ru = RU_CONSULTA_PAGINA
+        if self._resultados is None:
+            self._resultados, self._bytes, examinados = self.contenedor.evaluar_consulta(
+                self.consulta, self.parametros, self.partition_key
+            )
+            ru += RU_CONSULTA_DOCUMENTO * examinados
+
+        hasta = desde + self.tamano_pagina
+        pagina = self._resultados[desde:hasta]
+        if self._resultados:
+            ru += RU_CONSULTA_KB * self._bytes * len(pagina) / len(self._resultados) / 1024
+
+        self.continuation_token = str(hasta) if hasta < len(self._resultados) else None
+        self.terminada = self.continuation_token is None
+        return pagina, ru, len(pagina)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.terminada:
+            raise StopIteration
+        return iter(self.contenedor._ejecutar('consulta', self.siguiente_pagina))
+
+
+class ResultadoConsulta:
+    """Equivalente de ItemPaged: se itera documento a documento o por páginas con by_page"""
+
+    def __init__(self, contenedor, *consulta):
+        self.contenedor = contenedor
+        self.consulta = consulta
+
+    def by_page(self, continuation_token=None):
+        return PaginasConsulta(self.contenedor, *self.consulta, continuation_token)
+
+    def __iter__(self):
+        for pagina in self.by_page():
+            yield from pagina
+
+
+class BaseDatosSimulada:
+    """Equivalente de DatabaseProxy"""
+
+    def __init__(self, nombre, almacen, simulador, con_metricas=True):
+        self.id = nombre
+        self.almacen = almacen
+        self.simulador = simulador
+        self.con_metricas = con_metricas
+
+    def _contenedor(self, nombre):
+        return ContenedorSimulado(nombre, self.id, self.almacen, self.simulador, self.con_metricas)
+
+    def create_container_if_not_exists(self, id, partition_key, **kwargs):
+        self.almacen.registrar_contenedor(f'{self.id}/{id}', partition_key['paths'][0])
+        return self.get_container_client(id)
+
+    def get_container_client(self, container):
+        return self._contenedor(container)
+
+
+class ClienteSimulado:
+    """Equivalente de CosmosClient (sin llamadas de red)"""
+
+    def __init__(self, almacen, simulador, con_metricas=True):
+        self.almacen = almacen
+        self.simulador = simulador
+        self.con_metricas = con_metricas
+
+    def create_database_if_not_exists(self, id, **kwargs):
+        return self.get_database_client(id)
+
+    def get_database_client(self, database):
+        return BaseDatosSimulada(database, self.almacen, self.simulador, self.con_metricas)
+
+
+# ---------------------------------------------------------------------------
+# Variante asíncrona (interfaz de azure.cosmos.aio)
+# ---------------------------------------------------------------------------
+
+async def _iterar(items):
+    for item in items:
+        yield item
+
+
+class ContenedorSimuladoAsync:
+    """Equivalente asíncrono de ContainerProxy: la latencia se espera con asyncio.sleep"""
+
+    def __init__(self, contenedor):
+        self.contenedor = contenedor
+        self.id = contenedor.id
+
+    async def _ejecutar(self, operacion, funcion, *args):
+        contenedor = self.contenedor
+        contenedor.simulador.verificar_throughput(contenedor.id)
+        inicio = time.perf_counter()
+        latencia = contenedor.simulador.latencia()
+        if latencia > 0:
+            await asyncio.sleep(latencia)
+        return contenedor._cobrar(operacion, inicio, funcion, *args)
+
+    async def read(self, **kwargs):
+        return self.contenedor.read()
+
+    async def create_item(self, body, **kwargs):
+        return await self._ejecutar('creacion', self.contenedor._crear, body)
+
+    async def read_item(self, item, partition_key, **kwargs):
+        return await self._ejecutar('lectura', self.contenedor._leer, item, partition_key)
+
+    async def upsert_item(self, body, **kwargs):
+        return await self._ejecutar('upsert', self.contenedor._upsert, body)
+
+    async def replace_item(self, item, body, **kwargs):
+        return await self._ejecutar('reemplazo', self.contenedor._reemplazar, item, body)
+
+    async def patch_item(self, item, partition_key, patch_operations, etag=None, match_condition=None, **kwargs):
+        return await self._ejecutar(
+            'patch', self.contenedor._parchear, item, partition_key, patch_operations, etag, match_condition
+        )
+
+    async def delete_item(self, item, partition_key, **kwargs):
+        return await self._ejecutar('eliminacion', self.contenedor._eliminar, item, partition_key)
+
+    async def execute_item_batch(self, batch_operations, partition_key, **kwargs):
+        return await self._ejecutar('lote', self.contenedor._lote, batch_operations, partition_key)
+
+    def query_items(self, query, parameters=None, partition_key=None, max_item_count=None, **kwargs):
+        return ResultadoConsultaAsync(self, query, parameters, partition_key, max_item_count)
+
+
+class PaginasConsultaAsync:
+    """Equivalente asíncrono de PaginasConsulta"""
+
+    def __init__(self, contenedor_async, paginas):
+        self.contenedor_async = contenedor_async
+        self.paginas = paginas
+
+    @property
+    def continuation_token(self):
+        return self.paginas.continuation_token
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.paginas.terminada:
+            raise StopAsyncIteration
+        return _iterar(await self.contenedor_async._ejecutar('consulta', self.paginas.siguiente_pagina))
+
+
+class ResultadoConsultaAsync:
+    """Equivalente de AsyncItemPaged"""
+
+    def __init__(self, contenedor_async, *consulta):
+        self.contenedor_async = contenedor_async
+        self.consulta = consulta
+
+    def by_page(self, continuation_token=None):
+        paginas = PaginasConsulta(self.contenedor_async.contenedor, *self.consulta, continuation_token)
+        return PaginasConsultaAsync(self.contenedor_async, paginas)
+
+    async def _items(self):
+        async for pagina in self.by_page():
+            async for item in pagina:
+                yield item
+
+    def __aiter__(self):
+        return self._items()
+
+
+class BaseDatosSimuladaAsync(BaseDatosSimulada):
+    async def create_container_if_not_exists(self, id, partition_key, **kwargs):
+        return super().create_container_if_not_exists(id, partition_key)
+
+    def get_container_client(self, container):
+        return ContenedorSimuladoAsync(self._contenedor(container))
+
+
+class ClienteSimuladoAsync(ClienteSimulado):
+    async def create_database_if_not_exists(self, id, **kwargs):
+        return self.get_database_client(id)
+
+    def get_database_client(self, database):
+        return BaseDatosSimuladaAsync(database, self.almacen, self.simulador, self.con_metricas)
+
+    async def close(self):
+        pass
+
+
+def crear_cliente_simulado(config, con_metricas=True, asincrono=False):
+    """Cliente simulado según COSMOS_BACKEND (memoria o sqlite) y la configuración de latencia y RU"""
+    simulador_cosmos.configurar(config)
+    clase = ClienteSimuladoAsync if asincrono else ClienteSimulado
+    return clase(_almacen(config), simulador_cosmos, con_metricas and config['METRICAS_HABILITADAS'])
@@ -0,0 +1,246 @@
+"""
+Eliminación masiva de respuestas en segundo plano
+
+Las respuestas se eliminan en lotes con un pool de hilos acotado. Los errores
+429 (throttling) se reintentan respetando x-ms-retry-after-ms o con backoff
+exponencial. El avance se guarda en el contenedor de configuración
+(tipo='trabajo_eliminacion') para que cualquier worker pueda informar el estado.
+
+Mientras corre, el trabajo actualiza su 'latido' cada ELIMINACION_MASIVA_LATIDO_S
+segundos. Si el proceso que lo ejecuta se reinicia o cae, el trabajo deja de
+latir; al consultarlo después de LATIDOS_PARA_VENCER intervalos sin latido se
+marca como fallido. Iniciar otra eliminación con los mismos filtros elimina
+las respuestas que quedaron y recalcula las estadísticas.
+"""
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from azure.cosmos import exceptions
+from flask import current_app
+from servicios.cosmos_db import servicio_cosmos
+from servicios.repositorio_respuestas import repositorio_respuestas
+from servicios.estadisticas import contar_documentos, reconstruir_estadisticas
+
+TIPO_TRABAJO = 'trabajo_eliminacion'
+CODIGOS_REINTENTABLES = {429, 503}
+ESTADOS_ACTIVOS = ('pendiente', 'en_progreso')
+LATIDOS_PARA_VENCER = 4
+
+
+def construir_filtro(cuestionario_id=None, desde=None, hasta=None):
+    """Arma la condición SQL y los parámetros para los filtros de eliminación
+
+    desde y hasta se comparan con fecha_completado (ISO 8601), hasta es exclusivo.
+    """
+    condiciones = []
+    parametros = []
+
+    if cuestionario_id:
+        condiciones.append('c.cuestionario_id = @cuestionario_id')
+        parametros.append({'name': '@cuestionario_id', 'value': cuestionario_id})
+    if desde:
+        condiciones.append('c.fecha_completado >= @desde')
+        parametros.append({'name': '@desde', 'value': desde})
+    if hasta:
+        condiciones.append('c.fecha_completado < @hasta')
+        parametros.append({'name': '@hasta', 'value': hasta})
+
+    return ' AND '.join(condiciones) or None, parametros or None
+
+
+def iniciar_eliminacion(cuestionario_id=None, desde=None, hasta=None):
+    """Registra un trabajo de eliminación y lo ejecuta en un hilo en segundo plano
+
+    Retorna el documento del trabajo recién creado.
+    """
+    contenedor_configuracion = current_app.config['COSMOS_CONTAINER_CONFIGURACION']
+
+    trabajo = {
+        'id': f'eliminacion_{uuid.uuid4().hex}',
+        'tipo': TIPO_TRABAJO,
+        'estado': 'pendiente',
+        'filtros': {'cuestionario_id': cuestionario_id, 'desde': desde, 'hasta': hasta},
+        'total': None,
+        'eliminados': 0,
+        'errores': 0,
+        'fecha_inicio': datetime.utcnow().isoformat(),
+        'fecha_fin': None
+    }
+    trabajo['latido'] = trabajo['fecha_inicio']
+    servicio_cosmos.actualizar_documento(contenedor_configuracion, trabajo)
+
+    app = current_app._get_current_object()
+    hilo = threading.Thread(target=_ejecutar_trabajo, args=(app, trabajo), daemon=True)
+    hilo.start()
+
+    return trabajo
+
+
+def obtener_trabajo(trabajo_id):
+    """Lee el estado de un trabajo de eliminación
+
+    Se lee sin caché: el avance lo escribe el hilo del trabajo, quizá en otro
+    worker. Un trabajo pendiente o en progreso sin latido reciente se marca
+    como fallido.
+    """
+    contenedor_configuracion = current_app.config['COSMOS_CONTAINER_CONFIGURACION']
+    trabajo = servicio_cosmos.leer_documento(contenedor_configuracion, trabajo_id, TIPO_TRABAJO, usar_cache=False)
+    if trabajo and _latido_vencido(trabajo):
+        return _marcar_interrumpido(contenedor_configuracion, trabajo)
+    return trabajo
+
+
+def _latido_vencido(trabajo):
+    if trabajo.get('estado') not in ESTADOS_ACTIVOS:
+        return False
+    vencimiento = current_app.config['ELIMINACION_MASIVA_LATIDO_S'] * LATIDOS_PARA_VENCER
+    try:
+        ultimo = datetime.fromisoformat(trabajo.get('latido') or trabajo['fecha_inicio'])
+    except (KeyError, TypeError, ValueError):
+        return False
+    return (datetime.utcnow() - ultimo).total_seconds() > vencimiento
+
+
+def _marcar_interrumpido(contenedor_configuracion, trabajo):
+    """Marca como fallido un trabajo cuyo proceso dejó de latir
+
+    El patch se condiciona al _etag leído: si el trabajo volvió a latir o
+    terminó entretanto, se retorna su estado vigente sin modificarlo.
+    """
+    operaciones = [
+        {'op': 'set', 'path': '/estado', 'value': 'fallido'},
+        {'op': 'set', 'path': '/mensaje', 'value': (
+            'El proceso que ejecutaba el trabajo se detuvo. Inicie de nuevo la eliminación '
+            'con los mismos filtros para eliminar las respuestas restantes y recalcular las estadísticas'
+        )},
+        {'op': 'set', 'path': '/fecha_fin', 'value': datetime.utcnow().isoformat()}
+    ]
+    try:
+        return servicio_cosmos.parchear_documento(
+            contenedor_configuracion, trabajo['id'], TIPO_TRABAJO, operaciones, etag=trabajo.get('_etag')
+        )
+    except exceptions.CosmosAccessConditionFailedError:
+        return servicio_cosmos.leer_documento(contenedor_configuracion, trabajo['id'], TIPO_TRABAJO, usar_cache=False)
+    except Exception as e:
+        print(f"Error al marcar como interrumpido el trabajo {trabajo['id']}: {str(e)}")
+        return trabajo
+
+
+def _guardar_trabajo(app, trabajo):
+    trabajo['latido'] = datetime.utcnow().isoformat()
+    servicio_cosmos.actualizar_documento(app.config['COSMOS_CONTAINER_CONFIGURACION'], trabajo)
+
+
+def _latir(app, trabajo_id, detener):
+    """Actualiza el latido del trabajo cada ELIMINACION_MASIVA_LATIDO_S segundos hasta que se detenga
+
+    Cubre los tramos largos sin avance guardado (conteo inicial, lotes con
+    muchos reintentos por 429).
+    """
+    while not detener.wait(app.config['ELIMINACION_MASIVA_LATIDO_S']):
+        try:
+            with app.app_context():
+                servicio_cosmos.parchear_documento(
+                    app.config['COSMOS_CONTAINER_CONFIGURACION'], trabajo_id, TIPO_TRABAJO,
+                    [{'op': 'set', 'path': '/latido', 'value': datetime.utcnow().isoformat()}]
+                )
+        except Exception as e:
+            print(f"Error al registrar el latido del trabajo {trabajo_id}: {str(e)}")
+
+
+def _ejecutar_trabajo(app, trabajo):
+    with app.app_context():
+        contenedor_respuestas = repositorio_respuestas.contenedor()
+        tamano_lote = app.config['ELIMINACION_MASIVA_LOTE']
+        filtro, parametros = construir_filtro(**trabajo['filtros'])
+        # Filtrando por cuestionario el recorrido queda en una sola partición
+        particion = repositorio_respuestas.particion_cuestionario(trabajo['filtros']['cuestionario_id'])
+
+        detener_latido = threading.Event()
+        threading.Thread(target=_latir, args=(app, trabajo['id'], detener_latido), daemon=True).start()
+
+        try:
+            trabajo['estado'] = 'en_progreso'
+            trabajo['total'] = contar_documentos(contenedor_respuestas, filtro, parametros, partition_key=particion)
+            _guardar_trabajo(app, trabajo)
+
+            consulta = "SELECT c.id, c.cuestionario_id FROM c" + (f" WHERE {filtro}" if filtro else '')
+            documentos = servicio_cosmos.iterar_documentos(
+                contenedor_respuestas, consulta, parametros, tamano_pagina=tamano_lote,
+                partition_key=particion
+            )
+
+            with ThreadPoolExecutor(max_workers=app.config['ELIMINACION_MASIVA_HILOS']) as ejecutor:
+                lote = []
+                for documento in documentos:
+                    lote.append(documento)
+                    if len(lote) >= tamano_lote:
+                        _procesar_lote(app, ejecutor, lote, trabajo)
+                        lote = []
+                if lote:
+                    _procesar_lote(app, ejecutor, lote, trabajo)
+
+            trabajo['estado'] = 'completado'
+        except Exception as e:
+            print(f"Error en eliminación masiva {trabajo['id']}: {str(e)}")
+            trabajo['estado'] = 'fallido'
+            trabajo['mensaje'] = str(e)
+
+        trabajo['fecha_fin'] = datetime.utcnow().isoformat()
+        detener_latido.set()
+        _guardar_trabajo(app, trabajo)
+
+        # Recalcular estadísticas con lo que haya quedado en el contenedor
+        try:
+            reconstruir_estadisticas()
+        except Exception as e:
+            print(f"Error al reconstruir estadísticas tras la eliminación: {str(e)}")
+
+
+def _procesar_lote(app, ejecutor, documentos, trabajo):
+    """Elimina un lote en paralelo y guarda el avance del trabajo"""
+    resultados = ejecutor.map(lambda documento: _eliminar_con_reintentos(app, documento), documentos)
+
+    for exito in resultados:
+        if exito:
+            trabajo['eliminados'] += 1
+        else:
+            trabajo['errores'] += 1
+
+    _guardar_trabajo(app, trabajo)
+
+
+def _eliminar_con_reintentos(app, documento):
+    """Elimina un documento reintentando ante 429/503. Retorna True si quedó eliminado
+
+    El documento es la proyección {id, cuestionario_id}, suficiente para
+    calcular el partition key con cualquiera de los dos esquemas.
+    """
+    reintentos = app.config['ELIMINACION_MASIVA_REINTENTOS']
+    documento_id = documento['id']
+
+    for intento in range(reintentos + 1):
+        # Los hilos del pool no heredan el contexto de la aplicación
+        with app.app_context():
+            resultado = repositorio_respuestas.eliminar(documento)
+
+        if resultado.get('success'):
+            return True
+        if resultado.get('message') == 'Documento no encontrado':
+            # Ya fue eliminado (p. ej. por otro administrador)
+            return True
+        if resultado.get('status_code') not in CODIGOS_REINTENTABLES or intento == reintentos:
+            print(f"No se pudo eliminar {documento_id}: {resultado.get('message')}")
+            return False
+
+        espera_ms = resultado.get('reintentar_en_ms')
+        if espera_ms:
+            espera = float(espera_ms) / 1000
+        else:
+            espera = min(0.1 * (2 ** intento), 5) * random.uniform(0.5, 1.5)
+        time.sleep(espera)
+
+    return False
@@ -0,0 +1,414 @@
+"""
+Cálculo de estadísticas de respuestas: contadores incrementales y agregados de CosmosDB
+"""
+import math
+from datetime import datetime
+from azure.cosmos import exceptions
+from flask import current_app
+from servicios.cosmos_db import servicio_cosmos
+
+CALIFICACION_MINIMA_APROBATORIA = 70
+
+# Cada criterio define la condición SQL y su equivalente en Python para el
+# cálculo por proyección
+CRITERIOS_APROBADO = {
+    'aprobado': (
+        'c.aprobado = true',
+        lambda r: r.get('aprobado', False) is True
+    ),
+    'calificacion': (
+        f'c.calificacion >= {CALIFICACION_MINIMA_APROBATORIA}',
+        lambda r: (r.get('calificacion') or 0) >= CALIFICACION_MINIMA_APROBATORIA
+    )
+}
+
+
+def _armar_where(*condiciones):
+    condiciones = [c for c in condiciones if c]
+    return f" WHERE {' AND '.join(condiciones)}" if condiciones else ''
+
+
+def resumir_respuestas(nombre_contenedor, filtro=None, parametros=None, criterio='aprobado', partition_key=None):
+    """Calcula total, aprobados y calificación promedio de las respuestas
+
+    Usa agregados de CosmosDB (COUNT/AVG) para no descargar los documentos. Si
+    un agregado no es soportado (p. ej. entre particiones) recurre a proyectar
+    solo calificacion/aprobado y reducir en Python. Con partition_key los
+    agregados se calculan en una sola partición.
+
+    Retorna un dict con 'total', 'aprobados' y 'promedio'.
+    """
+    condicion_aprobado, _ = CRITERIOS_APROBADO[criterio]
+
+    try:
+        total = servicio_cosmos.consultar_agregado(
+            nombre_contenedor, f"SELECT VALUE COUNT(1) FROM c{_armar_where(filtro)}", parametros,
+            partition_key=partition_key
+        ) or 0
+        aprobados = servicio_cosmos.consultar_agregado(
+            nombre_contenedor,
+            f"SELECT VALUE COUNT(1) FROM c{_armar_where(filtro, condicion_aprobado)}",
+            parametros, partition_key=partition_key
+        ) or 0
+        promedio = servicio_cosmos.consultar_agregado(
+            nombre_contenedor,
+            f"SELECT VALUE AVG(c.calificacion) FROM c{_armar_where(filtro, 'IS_NUMBER(c.calificacion)')}",
+            parametros, partition_key=partition_key
+        ) or 0
+    except exceptions.CosmosHttpResponseError as e:
+        print(f"Agregado no soportado, calculando por proyección: {str(e)}")
+        return _resumir_por_proyeccion(nombre_contenedor, filtro, parametros, criterio, partition_key)
+
+    return {'total': total, 'aprobados': aprobados, 'promedio': promedio}
+
+
+def _resumir_por_proyeccion(nombre_contenedor, filtro, parametros, criterio, partition_key=None):
+    """Reduce en Python proyectando únicamente calificacion y aprobado"""
+    consulta = f"SELECT c.calificacion, c.aprobado FROM c{_armar_where(filtro)}"
+
+    documentos = servicio_cosmos.iterar_documentos(
+        nombre_contenedor, consulta, parametros, tamano_pagina=1000, partition_key=partition_key
+    )
+    return reducir_resumen(documentos, criterio)
+
+
+def reducir_resumen(respuestas, criterio='aprobado'):
+    """Total, aprobados y calificación promedio de respuestas proyectadas (calificacion, aprobado)"""
+    _, es_aprobado = CRITERIOS_APROBADO[criterio]
+    total = 0
+    aprobados = 0
+    suma_calificaciones = 0
+    total_calificaciones = 0
+
+    for respuesta in respuestas:
+        total += 1
+        if es_aprobado(respuesta):
+            aprobados += 1
+        calificacion = respuesta.get('calificacion')
+        if isinstance(calificacion, (int, float)) and not isinstance(calificacion, bool):
+            suma_calificaciones += calificacion
+            total_calificaciones += 1
+
+    promedio = suma_calificaciones / total_calificaciones if total_calificaciones else 0
+    return {'total': total, 'aprobados': aprobados, 'promedio': promedio}
+
+
+def contar_documentos(nombre_contenedor, filtro=None, parametros=None, partition_key=None):
+    """Cuenta documentos con SELECT VALUE COUNT(1), con respaldo por proyección de ids"""
+    where = _armar_where(filtro)
+    try:
+        return servicio_cosmos.consultar_agregado(
+            nombre_contenedor, f"SELECT VALUE COUNT(1) FROM c{where}", parametros,
+            partition_key=partition_key
+        ) or 0
+    except exceptions.CosmosHttpResponseError as e:
+        print(f"COUNT no soportado, contando por proyección: {str(e)}")
+        return sum(1 for _ in servicio_cosmos.iterar_documentos(
+            nombre_contenedor, f"SELECT c.id FROM c{where}", parametros, tamano_pagina=1000,
+            partition_key=partition_key
+        ))
+
+
+# ---------------------------------------------------------------------------
+# Estadísticas mantenidas de forma incremental
+#
+# Se guardan en el contenedor de configuración (partition key tipo='estadisticas'):
+# un documento global y uno por cuestionario. Cada respuesta guardada o eliminada
+# ajusta los contadores con operaciones 'incr' (atómicas en CosmosDB), por lo que
+# leer las estadísticas es una sola lectura puntual.
+# ---------------------------------------------------------------------------
+
+TIPO_ESTADISTICAS = 'estadisticas'
+ID_ESTADISTICAS_GLOBAL = 'estadisticas_global'
+TOTAL_RANGOS_HISTOGRAMA = 10  # Rangos de 10 puntos: 0-9, 10-19, ..., 90-100
+
+
+def id_estadisticas(cuestionario_id=None):
+    """Retorna el id del documento de estadísticas global o de un cuestionario"""
+    return f'estadisticas_{cuestionario_id}' if cuestionario_id else ID_ESTADISTICAS_GLOBAL
+
+
+def _rango_histograma(calificacion):
+    return str(min(max(int(calificacion // 10), 0), TOTAL_RANGOS_HISTOGRAMA - 1))
+
+
+def _calificacion_numerica(respuesta):
+    calificacion = respuesta.get('calificacion')
+    if isinstance(calificacion, (int, float)) and not isinstance(calificacion, bool):
+        return calificacion
+    return None
+
+
+def _documento_vacio(cuestionario_id=None):
+    return {
+        'id': id_estadisticas(cuestionario_id),
+        'tipo': TIPO_ESTADISTICAS,
+        'cuestionario_id': cuestionario_id,
+        'total': 0,
+        'aprobados': 0,
+        'total_calificaciones': 0,
+        'suma_calificaciones': 0,
+        'suma_cuadrados': 0,
+        'histograma': {str(i): 0 for i in range(TOTAL_RANGOS_HISTOGRAMA)}
+    }
+
+
+def _acumular(documento, respuesta, signo=1):
+    """Suma (o resta, con signo=-1) una respuesta a un documento de estadísticas en memoria"""
+    documento['total'] += signo
+    if respuesta.get('aprobado', False) is True:
+        documento['aprobados'] += signo
+
+    calificacion = _calificacion_numerica(respuesta)
+    if calificacion is not None:
+        documento['total_calificaciones'] += signo
+        documento['suma_calificaciones'] += signo * calificacion
+        documento['suma_cuadrados'] += signo * calificacion * calificacion
+        documento['histograma'][_rango_histograma(calificacion)] += signo
+
+
+def _operaciones_delta(respuesta, signo):
+    """Construye las operaciones patch 'incr' equivalentes a _acumular"""
+    operaciones = [{'op': 'incr', 'path': '/total', 'value': signo}]
+    if respuesta.get('aprobado', False) is True:
+        operaciones.append({'op': 'incr', 'path': '/aprobados', 'value': signo})
+
+    calificacion = _calificacion_numerica(respuesta)
+    if calificacion is not None:
+        operaciones.extend([
+            {'op': 'incr', 'path': '/total_calificaciones', 'value': signo},
+            {'op': 'incr', 'path': '/suma_calificaciones', 'value': signo * calificacion},
+            {'op': 'incr', 'path': '/suma_cuadrados', 'value': signo * calificacion * calificacion},
+            {'op': 'incr', 'path': f'/histograma/{_rango_histograma(calificacion)}', 'value': signo}
+        ])
+
+    operaciones.append({'op': 'set', 'path': '/fecha_modificacion', 'value': datetime.utcnow().isoformat()})
+    return operaciones
+
+
+def _documentos_afectados(respuesta):
+    """Ids de los documentos de estadísticas que cuentan una respuesta"""
+    documentos_id = [ID_ESTADISTICAS_GLOBAL]
+    if respuesta.get('cuestionario_id'):
+        documentos_id.append(id_estadisticas(respuesta['cuestionario_id']))
+    return documentos_id
+
+
+def _documento_inicial(documento_id):
+    """Documento vacío con el id dado (el global o el de un cuestionario)"""
+    if documento_id == ID_ESTADISTICAS_GLOBAL:
+        return _documento_vacio()
+    return _documento_vacio(documento_id[len('estadisticas_'):])
+
+
+def _consulta_respuestas(documento_id, claves_particion, contenedor_respuestas):
+    """Consulta, parámetros y partition key de las respuestas que cuenta un documento"""
+    consulta = "SELECT c.calificacion, c.aprobado FROM c"
+    if documento_id == ID_ESTADISTICAS_GLOBAL:
+        return consulta, None, None
+    cuestionario_id = documento_id[len('estadisticas_'):]
+    particion = cuestionario_id if claves_particion.get(contenedor_respuestas) == 'cuestionario_id' else None
+    return (
+        f"{consulta} WHERE c.cuestionario_id = @cuestionario_id",
+        [{"name": "@cuestionario_id", "value": cuestionario_id}],
+        particion
+    )
+
+
+def _documento_desde_respuestas(documento_id):
+    """Calcula un documento de estadísticas recorriendo las respuestas guardadas
+
+    Los errores de CosmosDB se propagan.
+    """
+    contenedor_respuestas = current_app.config['COSMOS_CONTAINER_RESPUESTAS']
+    consulta, parametros, particion = _consulta_respuestas(
+        documento_id, servicio_cosmos.claves_particion, contenedor_respuestas
+    )
+    documento = _documento_inicial(documento_id)
+    for respuesta in servicio_cosmos.iterar_documentos(
+        contenedor_respuestas, consulta, parametros, tamano_pagina=1000, partition_key=particion
+    ):
+        _acumular(documento, respuesta)
+    documento['fecha_modificacion'] = datetime.utcnow().isoformat()
+    return documento
+
+
+async def _documento_desde_respuestas_async(servicio_async, contenedor_respuestas, documento_id):
+    """Versión asíncrona de _documento_desde_respuestas"""
+    consulta, parametros, particion = _consulta_respuestas(
+        documento_id, servicio_async.claves_particion, contenedor_respuestas
+    )
+    documento = _documento_inicial(documento_id)
+    async for respuesta in servicio_async.iterar_documentos(
+        contenedor_respuestas, consulta, parametros, tamano_pagina=1000, partition_key=particion
+    ):
+        _acumular(documento, respuesta)
+    documento['fecha_modificacion'] = datetime.utcnow().isoformat()
+    return documento
+
+
+def _aplicar_delta(respuesta, signo):
+    """Aplica los 'incr' de una respuesta a cada documento de estadísticas que la cuenta
+
+    Si un documento aún no existe se crea una sola vez contando todas las
+    respuestas guardadas, que ya incluyen (o ya excluyen) la actual, así no
+    queda un documento parcial sin las respuestas anteriores. Si otro proceso
+    lo creó entretanto (crear_documento retorna None ante el 409) se aplica
+    el patch sobre el suyo.
+    """
+    contenedor_configuracion = current_app.config['COSMOS_CONTAINER_CONFIGURACION']
+    operaciones = _operaciones_delta(respuesta, signo)
+
+    for documento_id in _documentos_afectados(respuesta):
+        try:
+            try:
+                servicio_cosmos.parchear_documento(
+                    contenedor_configuracion, documento_id, TIPO_ESTADISTICAS, operaciones
+                )
+            except exceptions.CosmosResourceNotFoundError:
+                documento = _documento_desde_respuestas(documento_id)
+                if servicio_cosmos.crear_documento(contenedor_configuracion, documento) is None:
+                    servicio_cosmos.parchear_documento(
+                        contenedor_configuracion, documento_id, TIPO_ESTADISTICAS, operaciones
+                    )
+        except Exception as e:
+            print(f"Error al actualizar estadísticas: {str(e)}")
+
+
+def registrar_respuesta(respuesta):
+    """Suma una respuesta recién guardada a las estadísticas global y del cuestionario"""
+    _aplicar_delta(respuesta, 1)
+
+
+async def registrar_respuesta_async(servicio_async, config, respuesta):
+    """Versión para el modo ASGI de registrar_respuesta, con ServicioCosmosDBAsync"""
+    contenedor_configuracion = config['COSMOS_CONTAINER_CONFIGURACION']
+    operaciones = _operaciones_delta(respuesta, 1)
+    for documento_id in _documentos_afectados(respuesta):
+        try:
+            try:
+                await servicio_async.parchear_documento(
+                    contenedor_configuracion, documento_id, TIPO_ESTADISTICAS, operaciones
+                )
+            except exceptions.CosmosResourceNotFoundError:
+                documento = await _documento_desde_respuestas_async(
+                    servicio_async, config['COSMOS_CONTAINER_RESPUESTAS'], documento_id
+                )
+                if await servicio_async.crear_documento(contenedor_configuracion, documento) is None:
+                    await servicio_async.parchear_documento(
+                        contenedor_configuracion, documento_id, TIPO_ESTADISTICAS, operaciones
+                    )
+        except Exception as e:
+            print(f"Error al actualizar estadísticas: {str(e)}")
+
+
+def descontar_respuesta(respuesta):
+    """Resta una respuesta eliminada de las estadísticas global y del cuestionario"""
+    _aplicar_delta(respuesta, -1)
+
+
+def reconstruir_estadisticas():
+    """Recalcula todos los documentos de estadísticas recorriendo las respuestas
+
+    Retorna un dict {id_documento: documento}. Los cuestionarios que ya no
+    tienen respuestas quedan con sus contadores en cero.
+    """
+    contenedor_respuestas = current_app.config['COSMOS_CONTAINER_RESPUESTAS']
+    contenedor_configuracion = current_app.config['COSMOS_CONTAINER_CONFIGURACION']
+
+    documentos = {ID_ESTADISTICAS_GLOBAL: _documento_vacio()}
+
+    # Conservar (en cero) los documentos de cuestionarios existentes
+    existentes = servicio_cosmos.consultar_documentos(
+        contenedor_configuracion,
+        "SELECT c.cuestionario_id FROM c WHERE c.tipo = @tipo AND IS_STRING(c.cuestionario_id)",
+        [{"name": "@tipo", "value": TIPO_ESTADISTICAS}]
+    )
+    for existente in existentes:
+        documentos[id_estadisticas(existente['cuestionario_id'])] = _documento_vacio(existente['cuestionario_id'])
+
+    consulta = "SELECT c.cuestionario_id, c.calificacion, c.aprobado FROM c"
+    acumular_respuestas(
+        documentos, servicio_cosmos.iterar_documentos(contenedor_respuestas, consulta, tamano_pagina=1000)
+    )
+
+    fecha = datetime.utcnow().isoformat()
+    for documento in documentos.values():
+        documento['fecha_modificacion'] = fecha
+        servicio_cosmos.actualizar_documento(contenedor_configuracion, documento)
+
+    return documentos
+
+
+def acumular_respuestas(documentos, respuestas):
+    """Suma cada respuesta al documento global y al de su cuestionario (creándolo si falta)
+
+    documentos es un dict {id_documento: documento} que debe incluir el global.
+    """
+    documento_global = documentos[ID_ESTADISTICAS_GLOBAL]
+    for respuesta in respuestas:
+        cuestionario_id = respuesta.get('cuestionario_id')
+        _acumular(documento_global, respuesta)
+        if cuestionario_id:
+            documento_id = id_estadisticas(cuestionario_id)
+            if documento_id not in documentos:
+                documentos[documento_id] = _documento_vacio(cuestionario_id)
+            _acumular(documentos[documento_id], respuesta)
+    return documentos
+
+
+def obtener_estadisticas(cuestionario_id=None):
+    """Lee el documento de estadísticas (una lectura puntual)
+
+    Si aún no existe se calcula una sola vez recorriendo las respuestas ya
+    guardadas y se persiste, así también cuentan las anteriores a los
+    contadores. Sin respuestas no se persiste nada: lo crea la primera.
+    Retorna None si CosmosDB falla, para que el llamador recurra a
+    resumir_respuestas.
+    """
+    contenedor_configuracion = current_app.config['COSMOS_CONTAINER_CONFIGURACION']
+    documento_id = id_estadisticas(cuestionario_id)
+    documento = servicio_cosmos.leer_documento(contenedor_configuracion, documento_id, TIPO_ESTADISTICAS)
+    if documento:
+        return documento
+
+    try:
+        documento = _documento_desde_respuestas(documento_id)
+    except Exception as e:
+        print(f"Error al calcular estadísticas: {str(e)}")
+        return None
+
+    if not documento['total']:
+        return documento
+    creado = servicio_cosmos.crear_documento(contenedor_configuracion, documento)
+    if creado:
+        return creado
+    # Otro proceso lo creó entretanto (409) o la escritura falló
+    return servicio_cosmos.leer_documento(
+        contenedor_configuracion, documento_id, TIPO_ESTADISTICAS, usar_cache=False
+    )
+
+
+def calcular_promedio(documento):
+    """Calificación promedio a partir de los contadores"""
+    if not documento['total_calificaciones']:
+        return 0
+    return documento['suma_calificaciones'] / documento['total_calificaciones']
+
+
+def calcular_desviacion_estandar(documento):
+    """Desviación estándar poblacional de las calificaciones a partir de los contadores"""
+    n = documento['total_calificaciones']
+    if not n:
+        return 0
+    varianza = documento['suma_cuadrados'] / n - calcular_promedio(documento) ** 2
+    return math.sqrt(max(varianza, 0))
+
+
+def contar_aprobados_por_calificacion(documento):
+    """Respuestas con calificación >= 70 según el histograma (rangos 70-79, 80-89 y 90-100)"""
+    primer_rango = CALIFICACION_MINIMA_APROBATORIA // 10
+    return sum(
+        documento['histograma'].get(str(rango), 0)
+        for rango in range(primer_rango, TOTAL_RANGOS_HISTOGRAMA)
+    )
@@ -0,0 +1,209 @@
+"""
+Reintentos ante throttling y limitador de RU por contenedor para CosmosDB
+
+Cuando una cohorte completa termina la inducción al mismo tiempo, CosmosDB
+responde 429 (y ocasionalmente 503). El SDK ya reintenta los 429 unas cuantas
+veces; si aun así falla, PoliticaReintentos vuelve a intentar la operación
+respetando x-ms-retry-after-ms y, si no viene, con backoff exponencial con
+jitter para que los workers no reintenten todos a la vez.
+
+LimitadorRU es un cubo de tokens por contenedor, en RU/s, compartido por todo
+el proceso. Cada respuesta de CosmosDB descuenta su x-ms-request-charge (ver
+descontar_respuesta, conectado como raw_response_hook del cliente) y las
+escrituras y operaciones masivas esperan a que haya saldo antes de llamar,
+así el proceso se mantiene por debajo del throughput aprovisionado en lugar
+de provocar el throttling.
+"""
+import asyncio
+import random
+import re
+import threading
+import time
+from azure.cosmos import exceptions
+
+CODIGOS_REINTENTABLES = {429, 503}
+
+_CONTENEDOR_EN_URL = re.compile(r'/colls/([^/]+)')
+
+
+class PoliticaReintentos:
+    """Reintentos con backoff exponencial y jitter ante 429/503"""
+
+    def __init__(self, max_reintentos=3, espera_base_ms=100, espera_maxima_ms=5000):
+        self.max_reintentos = max_reintentos
+        self.espera_base_ms = espera_base_ms
+        self.espera_maxima_ms = espera_maxima_ms
+
+    def _reintentable(self, error, intento):
+        return error.status_code in CODIGOS_REINTENTABLES and intento < self.max_reintentos
+
+    def espera(self, error, intento):
+        """Segundos a esperar antes del reintento número intento + 1"""
+        sugerida_ms = (error.headers or {}).get('x-ms-retry-after-ms')
+        if sugerida_ms:
+            # Lo que indica CosmosDB más un jitter pequeño para no reintentar todos juntos
+            espera_ms = float(sugerida_ms) + random.uniform(0, self.espera_base_ms)
+        else:
+            tope_ms = min(self.espera_base_ms * (2 ** intento), self.espera_maxima_ms)
+            espera_ms = random.uniform(tope_ms / 2, tope_ms)
+        return min(espera_ms, self.espera_maxima_ms) / 1000
+
+    def ejecutar(self, operacion, antes=None):
+        """Ejecuta operacion() reintentando ante 429/503; el último error se propaga
+
+        antes se llama antes de cada intento (p. ej. para esperar al limitador de RU).
+        """
+        intento = 0
+        while True:
+            if antes:
+                antes()
+            try:
+                return operacion()
+            except exceptions.CosmosHttpResponseError as e:
+                if not self._reintentable(e, intento):
+                    raise
+                time.sleep(self.espera(e, intento))
+                intento += 1
+
+    async def ejecutar_async(self, operacion, antes=None):
+        """Igual que ejecutar, para corrutinas: operacion y antes retornan awaitables"""
+        intento = 0
+        while True:
+            if antes:
+                await antes()
+            try:
+                return await operacion()
+            except exceptions.CosmosHttpResponseError as e:
+                if not self._reintentable(e, intento):
+                    raise
+                await asyncio.sleep(self.espera(e, intento))
+                intento += 1
+
+
+SIN_REINTENTOS = PoliticaReintentos(max_reintentos=0)
+
+
+class CuboTokensRU:
+    """Cubo de tokens en RU/s con ráfaga de un segundo
+
+    El costo de una operación solo se conoce al recibir la respuesta, así que
+    el saldo puede quedar negativo: quien llega después espera lo necesario
+    para recuperarlo.
+    """
+
+    def __init__(self, ru_por_segundo):
+        self.ru_por_segundo = ru_por_segundo
+        self.capacidad = ru_por_segundo
+        self._saldo = float(ru_por_segundo)
+        self._ultima_recarga = time.monotonic()
+        self._candado = threading.Lock()
+
+    def _recargar(self):
+        ahora = time.monotonic()
+        self._saldo = min(self.capacidad, self._saldo + (ahora - self._ultima_recarga) * self.ru_por_segundo)
+        self._ultima_recarga = ahora
+
+    def tiempo_de_espera(self):
+        """Segundos hasta que el saldo vuelva a ser positivo (0 si ya lo es)"""
+        with self._candado:
+            self._recargar()
+            if self._saldo > 0:
+                return 0
+            return -self._saldo / self.ru_por_segundo + 0.001
+
+    def descontar(self, ru):
+        with self._candado:
+            self._recargar()
+            self._saldo -= ru
+
+    def esperar(self):
+        espera = self.tiempo_de_espera()
+        while espera > 0:
+            time.sleep(espera)
+            espera = self.tiempo_de_espera()
+
+    async def esperar_async(self):
+        espera = self.tiempo_de_espera()
+        while espera > 0:
+            await asyncio.sleep(espera)
+            espera = self.tiempo_de_espera()
+
+
+class LimitadorRU:
+    """Cubos de RU/s por contenedor, compartidos por los servicios síncrono y asíncrono"""
+
+    def __init__(self):
+        self.cubos = {}
+
+    def configurar(self, ru_por_contenedor):
+        """Define el límite de cada contenedor; 0 lo deja sin límite
+
+        Los cubos existentes con el mismo límite se conservan, así inicializar
+        ambos servicios no reinicia el saldo.
+        """
+        cubos = {}
+        for nombre, ru in ru_por_contenedor.items():
+            if ru <= 0:
+                continue
+            existente = self.cubos.get(nombre)
+            cubos[nombre] = existente if existente and existente.ru_por_segundo == ru else CuboTokensRU(ru)
+        self.cubos = cubos
+
+    @property
+    def activo(self):
+        return bool(self.cubos)
+
+    def esperar(self, nombre_contenedor):
+        cubo = self.cubos.get(nombre_contenedor)
+        if cubo:
+            cubo.esperar()
+
+    async def esperar_async(self, nombre_contenedor):
+        cubo = self.cubos.get(nombre_contenedor)
+        if cubo:
+            await cubo.esperar_async()
+
+    def descontar(self, nombre_contenedor, ru):
+        cubo = self.cubos.get(nombre_contenedor)
+        if cubo:
+            cubo.descontar(ru)
+
+    def descontar_respuesta(self, pipeline_response):
+        """raw_response_hook: descuenta el x-ms-request-charge de la respuesta de su contenedor"""
+        contenedor = _CONTENEDOR_EN_URL.search(pipeline_response.http_request.url)
+        if contenedor:
+            self.descontar(
+                contenedor.group(1),
+                float(pipeline_response.http_response.headers.get('x-ms-request-charge') or 0)
+            )
+
+
+def politicas_desde_config(config):
+    """Política de reintentos de cada contenedor según la configuración"""
+    def politica(max_reintentos):
+        return PoliticaReintentos(
+            max_reintentos,
+            config['COSMOS_REINTENTOS_ESPERA_BASE_MS'],
+            config['COSMOS_REINTENTOS_ESPERA_MAXIMA_MS']
+        )
+
+    return {
+        config['COSMOS_CONTAINER_RESPUESTAS']: politica(config['COSMOS_REINTENTOS_RESPUESTAS']),
+        config['COSMOS_CONTAINER_PREGUNTAS']: politica(config['COSMOS_REINTENTOS_PREGUNTAS']),
+        config['COSMOS_CONTAINER_ADMINISTRADORES']: politica(config['COSMOS_REINTENTOS_ADMINISTRADORES']),
+        config['COSMOS_CONTAINER_CONFIGURACION']: politica(config['COSMOS_REINTENTOS_CONFIGURACION'])
+    }
+
+
+def ru_desde_config(config):
+    """Límite de RU/s de cada contenedor según la configuración (0 = sin límite)"""
+    return {
+        config['COSMOS_CONTAINER_RESPUESTAS']: config['COSMOS_RU_POR_SEGUNDO_RESPUESTAS'],
+        config['COSMOS_CONTAINER_PREGUNTAS']: config['COSMOS_RU_POR_SEGUNDO_PREGUNTAS'],
+        config['COSMOS_CONTAINER_ADMINISTRADORES']: config['COSMOS_RU_POR_SEGUNDO_ADMINISTRADORES'],
+        config['COSMOS_CONTAINER_CONFIGURACION']: config['COSMOS_RU_POR_SEGUNDO_CONFIGURACION']
+    }
+
+
+# Limitador global del proceso
+limitador_ru = LimitadorRU()
@@ -0,0 +1,312 @@
+"""
+Métricas de consumo por endpoint: RU y latencia de CosmosDB, bytes y latencia de Storage
+
+Los clientes de CosmosDB y Storage se crean con raw_request_hook y
+raw_response_hook (ver ganchos_cosmos y ganchos_storage). Esos ganchos corren
+en el mismo hilo que hizo la llamada, una vez por petición HTTP (cada página
+de una consulta cuenta por separado), así que cada llamada se atribuye al
+endpoint de Flask que la originó. Las llamadas fuera de una petición (inicio,
+trabajos en segundo plano) se registran con endpoint '(fuera_de_peticion)'.
+
+Los histogramas se exponen en formato de texto de Prometheus en /api/metricas
+y cada respuesta lleva un encabezado Server-Timing con el tiempo de la
+petición repartido entre cosmos, storage y serialización.
+"""
+import re
+import threading
+import time
+from flask import copy_current_request_context, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+ENDPOINT_FUERA_DE_PETICION = '(fuera_de_peticion)'
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_RU = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+BUCKETS_ITEMS = (0, 1, 10, 100, 1000)
+BUCKETS_BYTES = (1024, 16 * 1024, 256 * 1024, 1024 ** 2, 16 * 1024 ** 2, 256 * 1024 ** 2, 1024 ** 3)
+
+_CONTENEDOR_EN_URL = re.compile(r'/colls/([^/]+)')
+
+
+class Histograma:
+    """Histograma acumulativo con buckets fijos (semántica de Prometheus)"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.conteos = [0] * len(buckets)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.suma += valor
+        self.total += 1
+        for indice, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.conteos[indice] += 1
+
+
+class RegistroMetricas:
+    """Histogramas agrupados por nombre y etiquetas, seguros entre hilos"""
+
+    def __init__(self):
+        self._metricas = {}
+        self._candado = threading.Lock()
+
+    def definir(self, nombre, descripcion, buckets):
+        self._metricas[nombre] = {'descripcion': descripcion, 'buckets': buckets, 'series': {}}
+
+    def observar(self, nombre, etiquetas, valor):
+        metrica = self._metricas[nombre]
+        clave = tuple(sorted(etiquetas.items()))
+        with self._candado:
+            histograma = metrica['series'].get(clave)
+            if histograma is None:
+                histograma = metrica['series'][clave] = Histograma(metrica['buckets'])
+            histograma.observar(valor)
+
+    def limpiar(self):
+        with self._candado:
+            for metrica in self._metricas.values():
+                metrica['series'].clear()
+
+    def formato_prometheus(self):
+        """Serializa todos los histogramas en el formato de texto de Prometheus (0.0.4)"""
+        lineas = []
+        with self._candado:
+            for nombre, metrica in self._metricas.items():
+                lineas.append(f"# HELP {nombre} {metrica['descripcion']}")
+                lineas.append(f"# TYPE {nombre} histogram")
+                for clave, histograma in metrica['series'].items():
+                    for limite, conteo in zip(histograma.buckets, histograma.conteos):
+                        lineas.append(f"{nombre}_bucket{_etiquetas(clave, le=_numero(limite))} {conteo}")
+                    lineas.append(f"{nombre}_bucket{_etiquetas(clave, le='+Inf')} {histograma.total}")
+                    lineas.append(f"{nombre}_sum{_etiquetas(clave)} {_numero(histograma.suma)}")
+                    lineas.append(f"{nombre}_count{_etiquetas(clave)} {histograma.total}")
+        return '\n'.join(lineas) + '\n'
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(clave, **adicionales):
+    pares = list(clave) + list(adicionales.items())
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in pares) + '}'
+
+
+registro = RegistroMetricas()
+registro.definir('induccion_http_duracion_segundos', 'Duración de las peticiones HTTP por endpoint', BUCKETS_SEGUNDOS)
+registro.definir('induccion_cosmos_ru_por_peticion', 'RU de CosmosDB consumidas por cada petición HTTP', BUCKETS_RU)
+registro.definir('induccion_cosmos_ru', 'RU de cada llamada a CosmosDB', BUCKETS_RU)
+registro.definir('induccion_cosmos_duracion_segundos', 'Duración de cada llamada a CosmosDB', BUCKETS_SEGUNDOS)
+registro.definir('induccion_cosmos_items', 'Documentos devueltos por cada llamada a CosmosDB', BUCKETS_ITEMS)
+registro.definir('induccion_storage_duracion_segundos', 'Duración de cada llamada a Azure Storage', BUCKETS_SEGUNDOS)
+registro.definir('induccion_storage_bytes', 'Bytes transferidos por cada llamada a Azure Storage', BUCKETS_BYTES)
+registro.definir('induccion_inicio_segundos', 'Duración del arranque de la aplicación (crear_app) por fase', BUCKETS_SEGUNDOS)
+
+
+# ---------------------------------------------------------------------------
+# Acumulado de la petición actual (para Server-Timing y el RU por petición)
+# ---------------------------------------------------------------------------
+
+def _endpoint_actual():
+    if not has_request_context():
+        return ENDPOINT_FUERA_DE_PETICION
+    return request.endpoint or 'desconocido'
+
+
+def _acumulado():
+    """Acumulado de la petición en curso, o None fuera de una petición"""
+    if not has_request_context():
+        return None
+    if 'metricas' not in g:
+        g.metricas = {'cosmos': 0.0, 'cosmos_ru': 0.0, 'cosmos_llamadas': 0, 'storage': 0.0, 'serializar': 0.0}
+    return g.metricas
+
+
+# Una petición puede repartir sus llamadas entre varios hilos (ver en_hilo_de_peticion)
+_candado_acumulado = threading.Lock()
+
+
+def _sumar(campo, valor):
+    acumulado = _acumulado()
+    if acumulado is not None:
+        with _candado_acumulado:
+            acumulado[campo] += valor
+
+
+def en_hilo_de_peticion(funcion):
+    """Envuelve funcion para ejecutarla en otro hilo como parte de la petición actual
+
+    El hilo ve el mismo request (las llamadas se atribuyen al mismo endpoint)
+    y suma su tiempo y RU al acumulado de la petición, así aparecen en
+    Server-Timing. Debe llamarse dentro de la petición.
+    """
+    acumulado = _acumulado()
+
+    @copy_current_request_context
+    def ejecutar(*args, **kwargs):
+        if acumulado is not None:
+            g.metricas = acumulado
+        return funcion(*args, **kwargs)
+    return ejecutar
+
+
+# ---------------------------------------------------------------------------
+# Ganchos para los clientes de Azure
+# ---------------------------------------------------------------------------
+
+def _marcar_inicio(pipeline_request):
+    pipeline_request.context['metricas_inicio'] = time.perf_counter()
+
+
+def _duracion(pipeline_response):
+    inicio = pipeline_response.context.get('metricas_inicio')
+    return time.perf_counter() - inicio if inicio is not None else 0.0
+
+
+def _operacion_cosmos(http_request):
+    encabezados = http_request.headers
+    if str(encabezados.get('x-ms-documentdb-isquery', '')).lower() == 'true':
+        return 'consulta'
+    if str(encabezados.get('x-ms-documentdb-is-upsert', '')).lower() == 'true':
+        return 'upsert'
+    return {
+        'GET': 'lectura', 'POST': 'creacion', 'PUT': 'reemplazo',
+        'PATCH': 'patch', 'DELETE': 'eliminacion'
+    }.get(http_request.method, http_request.method.lower())
+
+
+def registrar_llamada_cosmos(contenedor, operacion, cargo, duracion, items=None):
+    """Registra una llamada a CosmosDB en los histogramas y en el acumulado de la petición
+
+    La usan el gancho del cliente y el backend simulado (servicios/cosmos_simulado.py),
+    que no pasa por HTTP.
+    """
+    etiquetas = {'endpoint': _endpoint_actual(), 'contenedor': contenedor, 'operacion': operacion}
+    registro.observar('induccion_cosmos_ru', etiquetas, cargo)
+    registro.observar('induccion_cosmos_duracion_segundos', etiquetas, duracion)
+    if items is not None:
+        registro.observar('induccion_cosmos_items', etiquetas, items)
+
+    _sumar('cosmos', duracion)
+    _sumar('cosmos_ru', cargo)
+    _sumar('cosmos_llamadas', 1)
+
+
+def _registrar_cosmos(pipeline_response):
+    http_request = pipeline_response.http_request
+    encabezados = pipeline_response.http_response.headers
+    contenedor = _CONTENEDOR_EN_URL.search(http_request.url)
+    items = encabezados.get('x-ms-item-count')
+    registrar_llamada_cosmos(
+        contenedor.group(1) if contenedor else '-',
+        _operacion_cosmos(http_request),
+        float(encabezados.get('x-ms-request-charge') or 0),
+        _duracion(pipeline_response),
+        int(items) if items is not None else None
+    )
+
+
+def registrar_llamada_storage(metodo, duracion, enviados=0, recibidos=0):
+    """Registra una llamada a Storage en los histogramas y en el acumulado de la petición
+
+    La usan el gancho del cliente y el almacenamiento local (servicios/storage_local.py).
+    """
+    etiquetas = {'endpoint': _endpoint_actual(), 'metodo': metodo}
+    registro.observar('induccion_storage_duracion_segundos', etiquetas, duracion)
+    if enviados:
+        registro.observar('induccion_storage_bytes', {**etiquetas, 'direccion': 'subida'}, enviados)
+    if recibidos:
+        registro.observar('induccion_storage_bytes', {**etiquetas, 'direccion': 'descarga'}, recibidos)
+
+    _sumar('storage', duracion)
+
+
+def _registrar_storage(pipeline_response):
+    http_request = pipeline_response.http_request
+    registrar_llamada_storage(
+        http_request.method,
+        _duracion(pipeline_response),
+        int(http_request.headers.get('Content-Length') or 0),
+        int(pipeline_response.http_response.headers.get('Content-Length') or 0)
+    )
+
+
+def _sin_fallar(funcion):
+    """Las métricas nunca deben interrumpir la llamada a Azure"""
+    def envoltura(objeto):
+        try:
+            funcion(objeto)
+        except Exception as e:
+            print(f"Error al registrar métricas: {str(e)}")
+    return envoltura
+
+
+def ganchos_cosmos():
+    """kwargs para CosmosClient que registran RU, documentos y duración de cada llamada"""
+    return {
+        'raw_request_hook': _sin_fallar(_marcar_inicio),
+        'raw_response_hook': _sin_fallar(_registrar_cosmos)
+    }
+
+
+def ganchos_storage():
+    """kwargs para BlobServiceClient que registran bytes y duración de cada llamada"""
+    return {
+        'raw_request_hook': _sin_fallar(_marcar_inicio),
+        'raw_response_hook': _sin_fallar(_registrar_storage)
+    }
+
+
+# ---------------------------------------------------------------------------
+# Integración con Flask
+# ---------------------------------------------------------------------------
+
+class ProveedorJSONMedido(DefaultJSONProvider):
+    """Proveedor JSON de Flask que suma el tiempo de serialización a la petición actual"""
+
+    def dumps(self, obj, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            _sumar('serializar', time.perf_counter() - inicio)
+
+
+def _iniciar_peticion():
+    g.metricas_inicio = time.perf_counter()
+    _acumulado()
+
+
+def _finalizar_peticion(respuesta):
+    acumulado = _acumulado()
+    duracion = time.perf_counter() - g.get('metricas_inicio', time.perf_counter())
+    endpoint = _endpoint_actual()
+
+    registro.observar('induccion_http_duracion_segundos', {'endpoint': endpoint, 'metodo': request.method}, duracion)
+    if acumulado['cosmos_llamadas']:
+        registro.observar('induccion_cosmos_ru_por_peticion', {'endpoint': endpoint}, acumulado['cosmos_ru'])
+
+    # Las respuestas en streaming consultan CosmosDB después de este punto:
+    # sus llamadas quedan en los histogramas pero no en Server-Timing
+    respuesta.headers['Server-Timing'] = ', '.join([
+        f"cosmos;dur={acumulado['cosmos'] * 1000:.1f};desc=\"{acumulado['cosmos_llamadas']} llamadas, {acumulado['cosmos_ru']:.2f} RU\"",
+        f"storage;dur={acumulado['storage'] * 1000:.1f}",
+        f"serialize;dur={acumulado['serializar'] * 1000:.1f}",
+        f"total;dur={duracion * 1000:.1f}"
+    ])
+    return respuesta
+
+
+def instrumentar_app(app):
+    """Registra la medición de peticiones (Server-Timing) y el proveedor JSON medido"""
+    app.json = ProveedorJSONMedido(app)
+    app.before_request(_iniciar_peticion)
+    app.after_request(_finalizar_peticion)
@@ -0,0 +1,115 @@
+"""
+Repositorio del documento de configuración de la inducción (induccion_general)
+
+El documento vive en el contenedor de configuración con partition key
+tipo='induccion', así que se lee con una lectura puntual (read_item) en lugar
+de una consulta entre particiones.
+"""
+from datetime import datetime
+from azure.cosmos import exceptions
+from flask import current_app
+from servicios.cosmos_db import servicio_cosmos
+from utilidades.http_cache import invalidar_validador
+
+ID_CONFIGURACION = 'induccion_general'
+TIPO_CONFIGURACION = 'induccion'
+# Clave del recurso para los ETag HTTP (ver utilidades/http_cache.py)
+RECURSO_HTTP = 'configuracion'
+# El bundle de la página de inducción depende de la configuración y de las preguntas
+RECURSO_HTTP_BUNDLE = 'induccion_bundle'
+# Reintentos cuando otro administrador modificó el documento entre la lectura y la escritura (412)
+MAX_REINTENTOS_CONFLICTO = 3
+# CosmosDB admite hasta 10 operaciones por patch; una se reserva para fecha_modificacion
+MAX_OPERACIONES_PATCH = 9
+
+# Se muestra mientras no se haya guardado la configuración
+CONFIGURACION_POR_DEFECTO = {
+    "id": ID_CONFIGURACION,
+    "tipo": TIPO_CONFIGURACION,
+    "titulo": "Inducción gestión por procesos",
+    "video_url": "/videos/induccion.mp4",
+    "descripcion": "En esta sesión cubriremos los pilares fundamentales de nuestra organización."
+}
+
+
+def documentos_activos(configuracion):
+    """Documentos activos de la configuración ordenados por el campo 'orden' (lo que ven los usuarios)"""
+    documentos = [doc for doc in (configuracion or {}).get('documentos', []) if doc.get('activo', True)]
+    return sorted(documentos, key=lambda x: x.get('orden', 999))
+
+
+class RepositorioConfiguracion:
+    """Acceso al documento induccion_general del contenedor de configuración"""
+
+    def _contenedor(self):
+        return current_app.config['COSMOS_CONTAINER_CONFIGURACION']
+
+    def obtener(self, usar_cache=True):
+        """Lee la configuración con una lectura puntual. Retorna None si no existe
+
+        El documento conserva el campo _etag de CosmosDB, que identifica la
+        versión leída.
+        """
+        return servicio_cosmos.leer_documento(
+            self._contenedor(), ID_CONFIGURACION, TIPO_CONFIGURACION, usar_cache=usar_cache
+        )
+
+    def guardar(self, configuracion):
+        """Guarda (upsert) la configuración completa y retorna el documento resultante"""
+        configuracion['id'] = ID_CONFIGURACION
+        configuracion['tipo'] = TIPO_CONFIGURACION
+        resultado = servicio_cosmos.actualizar_documento(self._contenedor(), configuracion)
+        invalidar_validador(RECURSO_HTTP)
+        invalidar_validador(RECURSO_HTTP_BUNDLE)
+        return resultado
+
+    def parchear(self, construir_operaciones):
+        """Aplica una actualización parcial (patch) condicionada al _etag leído
+
+        construir_operaciones recibe la configuración vigente y retorna la lista
+        de operaciones patch (máximo MAX_OPERACIONES_PATCH), o None si el cambio
+        no aplica (p. ej. el elemento a modificar no existe). Si otro
+        administrador modificó el documento entre la lectura y la escritura, se
+        vuelve a leer y se reintenta hasta MAX_REINTENTOS_CONFLICTO veces.
+
+        Retorna una tupla (estado, documento) con estado 'ok',
+        'sin_configuracion', 'no_aplica' o 'conflicto'.
+        """
+        for intento in range(MAX_REINTENTOS_CONFLICTO + 1):
+            # Tras un conflicto la caché ya no sirve: se necesita el _etag vigente
+            configuracion = self.obtener(usar_cache=intento == 0)
+            if not configuracion:
+                return 'sin_configuracion', None
+
+            operaciones = construir_operaciones(configuracion)
+            if operaciones is None:
+                return 'no_aplica', configuracion
+
+            operaciones = operaciones + [
+                {'op': 'set', 'path': '/fecha_modificacion', 'value': datetime.utcnow().isoformat()}
+            ]
+
+            try:
+                resultado = servicio_cosmos.parchear_documento(
+                    self._contenedor(), ID_CONFIGURACION, TIPO_CONFIGURACION,
+                    operaciones, etag=self.obtener_etag(configuracion)
+                )
+            except exceptions.CosmosAccessConditionFailedError:
+                continue
+            except exceptions.CosmosResourceNotFoundError:
+                return 'sin_configuracion', None
+
+            invalidar_validador(RECURSO_HTTP)
+            invalidar_validador(RECURSO_HTTP_BUNDLE)
+            return 'ok', resultado
+
+        return 'conflicto', None
+
+    @staticmethod
+    def obtener_etag(configuracion):
+        """Retorna el ETag de la versión leída, o None"""
+        return configuracion.get('_etag') if configuracion else None
+
+
+# Instancia global del repositorio
+repositorio_configuracion = RepositorioConfiguracion()
@@ -0,0 +1,223 @@
+"""
+Repositorio del contenedor de respuestas
+
+El contenedor nuevo se particiona por /cuestionario_id, así las consultas de un
+cuestionario se resuelven en una sola partición. Los despliegues que aún no
+migraron (scripts/migrar_respuestas.py) siguen con /id; este módulo calcula el
+partition key según el contenedor real para que las rutas funcionen con ambos.
+"""
+import uuid
+from datetime import datetime, timezone, timedelta
+from flask import current_app
+from servicios.cosmos_db import servicio_cosmos
+from servicios.calificacion import calificar, respuestas_de_envio_detallado
+
+# Campos que muestran los listados. El arreglo 'respuestas' (texto de cada
+# pregunta y lo contestado) es la mayor parte del documento y solo se entrega
+# en el detalle de un intento
+CAMPOS_RESUMEN = (
+    'id', 'nombre', 'sesion_id', 'cuestionario_id', 'cuestionario_titulo', 'calificacion',
+    'aprobado', 'total_preguntas', 'respuestas_correctas', 'fecha_completado'
+)
+
+CAMPOS_PREGUNTA = ('orden', 'titulo', 'pregunta', 'tipo_pregunta', 'respuesta_correcta', 'respuesta_usuario')
+
+
+def obtener_fecha_colombia():
+    """Retorna la fecha y hora actual en zona horaria de Colombia (UTC-5)"""
+    return datetime.now(timezone(timedelta(hours=-5))).isoformat()
+
+
+def es_envio_compacto(datos):
+    """Indica si el envío trae las respuestas como {pregunta_id: respuesta} (se califica en el servidor)"""
+    return isinstance(datos, dict) and isinstance(datos.get('respuestas'), dict)
+
+
+def construir_respuesta(datos, clave=None):
+    """Valida el cuerpo de un envío de cuestionario y arma el documento de respuesta
+
+    La calificación se calcula con la clave de respuestas del cuestionario
+    (ver servicios/calificacion.py). El envío compacto ({pregunta_id:
+    respuesta}) la requiere. El formato detallado se convierte al compacto
+    con respuestas_de_envio_detallado, así se ignora el es_correcta que
+    envía el cliente; solo sin clave (cuestionario sin preguntas en
+    CosmosDB) se cuenta ese es_correcta. calificacion y aprobado del
+    cliente se ignoran siempre.
+
+    Retorna una tupla (respuesta, error): si los datos no son válidos la
+    respuesta es None y error describe el problema.
+    """
+    # Validar datos requeridos - ahora sesion_id es opcional si hay nombre
+    if 'nombre' not in datos and 'sesion_id' not in datos:
+        return None, 'Se requiere campo nombre o sesion_id'
+        
+    if 'cuestionario_id' not in datos:
+        return None, 'Campo requerido: cuestionario_id'
+        
+    if 'respuestas' not in datos:
+        return None, 'Campo requerido: respuestas'
+    
+    if es_envio_compacto(datos):
+        if len(datos['respuestas']) == 0:
+            return None, 'El campo respuestas debe tener al menos una pregunta'
+        if clave is None:
+            return None, f"El cuestionario {datos['cuestionario_id']} no tiene preguntas"
+        
+        detalle = calificar(clave, datos['respuestas'])
+        titulo = datos.get('cuestionario_titulo', clave['cuestionario_titulo'])
+    else:
+        # Validar estructura de respuestas
+        if not isinstance(datos['respuestas'], list) or len(datos['respuestas']) == 0:
+            return None, 'El campo respuestas debe ser un array con al menos una pregunta'
+        
+        # Validar cada pregunta
+        for idx, pregunta in enumerate(datos['respuestas']):
+            for campo in CAMPOS_PREGUNTA:
+                if campo not in pregunta:
+                    return None, f'Falta el campo {campo} en la pregunta {idx + 1}'
+        
+        if clave is not None:
+            detalle = calificar(clave, respuestas_de_envio_detallado(clave, datos['respuestas']))
+            titulo = datos.get('cuestionario_titulo', clave['cuestionario_titulo'])
+        else:
+            detalle = datos['respuestas']
+            titulo = datos.get('cuestionario_titulo', 'Sin título')
+    
+    datos = {campo: valor for campo, valor in datos.items() if campo not in ('calificacion', 'aprobado')}
+    
+    # Calcular calificación automática si no se proporciona
+    total_preguntas = len(detalle)
+    respuestas_correctas = sum(1 for p in detalle if p.get('es_correcta', False))
+    calificacion_calculada = round((respuestas_correctas / total_preguntas) * 100, 2) if total_preguntas else 0.0
+    
+    # Crear ID único combinando cuestionario, timestamp y UUID
+    timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
+    uuid_corto = str(uuid.uuid4())[:8]
+    documento_id = f"{datos['cuestionario_id']}_{timestamp}_{uuid_corto}"
+    
+    respuesta = {
+        'id': documento_id,
+        'cuestionario_id': datos['cuestionario_id'],
+        'sesion_id': datos.get('sesion_id', ''),  # Usar string vacío si no se proporciona
+        'nombre': datos.get('nombre', ''),
+        'cuestionario_titulo': titulo,
+        'respuestas': detalle,  # Array con el resultado de cada pregunta
+        'calificacion': datos.get('calificacion', calificacion_calculada),
+        'total_preguntas': total_preguntas,
+        'respuestas_correctas': respuestas_correctas,
+        'respuestas_incorrectas': total_preguntas - respuestas_correctas,
+        'porcentaje_acierto': calificacion_calculada,
+        'aprobado': datos.get('aprobado', calificacion_calculada >= 70),  # 70% como mínimo aprobatorio
+        'tiempo_empleado': datos.get('tiempo_empleado'),  # en segundos
+        'fecha_completado': obtener_fecha_colombia()
+    }
+    if clave is not None and clave.get('version'):
+        # Versión de las preguntas con que se calificó (ver servicios/versiones_preguntas.py)
+        respuesta['version_preguntas'] = clave['version']
+    return respuesta, None
+
+
+class RepositorioRespuestas:
+    """Acceso al contenedor de respuestas con el partition key correcto"""
+
+    def contenedor(self):
+        return current_app.config['COSMOS_CONTAINER_RESPUESTAS']
+
+    def clave_particion(self):
+        """Nombre del campo usado como partition key ('cuestionario_id' o 'id')"""
+        return servicio_cosmos.claves_particion.get(self.contenedor(), 'id')
+
+    def particion_de(self, respuesta):
+        """Valor del partition key de una respuesta (o de su proyección)"""
+        return respuesta.get(self.clave_particion())
+
+    def particion_cuestionario(self, cuestionario_id):
+        """Partition key para consultar solo las respuestas de un cuestionario
+
+        Retorna None cuando el contenedor no está particionado por
+        cuestionario_id; en ese caso la consulta debe ser entre particiones.
+        """
+        return cuestionario_id if self.clave_particion() == 'cuestionario_id' else None
+
+    def _campos(self, completa):
+        return '*' if completa else ', '.join(f'c.{campo}' for campo in CAMPOS_RESUMEN)
+
+    def consulta_listado(self, filtro=None, completa=False):
+        """Consulta SQL de un listado ordenado por fecha, proyectando solo CAMPOS_RESUMEN
+
+        Con completa=True selecciona los documentos completos.
+        """
+        where = f' WHERE {filtro}' if filtro else ''
+        return f"SELECT {self._campos(completa)} FROM c{where} ORDER BY c.fecha_completado DESC"
+
+    def listar_pagina(self, filtro=None, parametros=None, completa=False, limite=100, desde=None,
+                      partition_key=None):
+        """Una página del listado ordenado por fecha_completado e id descendentes
+
+        Pagina por posición (keyset) en lugar de con el token de continuación
+        del SDK, que en una consulta ORDER BY entre particiones no es estable:
+        desde es la posición [fecha_completado, id] de la última respuesta de
+        la página anterior y la consulta pide solo las que le siguen.
+
+        Retorna una tupla (respuestas, siguiente), donde siguiente es la
+        posición de la última respuesta o None si no quedan más. Lanza
+        ValueError si desde no es una posición válida; los errores de
+        CosmosDB se propagan.
+        """
+        condiciones = [filtro] if filtro else []
+        parametros = list(parametros or [])
+        if desde is not None:
+            if not (isinstance(desde, list) and len(desde) == 2 and all(isinstance(v, str) for v in desde)):
+                raise ValueError('Cursor inválido')
+            condiciones.append(
+                '(c.fecha_completado < @ultima_fecha OR (c.fecha_completado = @ultima_fecha AND c.id < @ultimo_id))'
+            )
+            parametros.extend([
+                {"name": "@ultima_fecha", "value": desde[0]},
+                {"name": "@ultimo_id", "value": desde[1]}
+            ])
+
+        where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        # Se pide una de más para saber si hay una página siguiente
+        consulta = (
+            f"SELECT TOP {limite + 1} {self._campos(completa)} FROM c{where} "
+            "ORDER BY c.fecha_completado DESC, c.id DESC"
+        )
+        respuestas = list(servicio_cosmos.iterar_documentos(
+            self.contenedor(), consulta, parametros, tamano_pagina=limite + 1, partition_key=partition_key
+        ))
+        if len(respuestas) <= limite:
+            return respuestas, None
+        respuestas = respuestas[:limite]
+        return respuestas, [respuestas[-1]['fecha_completado'], respuestas[-1]['id']]
+
+    def crear(self, respuesta):
+        return servicio_cosmos.crear_documento(self.contenedor(), respuesta)
+
+    def obtener(self, respuesta_id, cuestionario_id=None):
+        """Lee una respuesta por id. Retorna None si no existe
+
+        Con el cuestionario_id (o si el contenedor sigue particionado por /id)
+        es una lectura puntual; sin él se busca el id entre particiones.
+        """
+        if self.clave_particion() == 'id':
+            return servicio_cosmos.leer_documento(self.contenedor(), respuesta_id, respuesta_id)
+        if cuestionario_id:
+            return servicio_cosmos.leer_documento(self.contenedor(), respuesta_id, cuestionario_id)
+
+        encontradas = servicio_cosmos.consultar_documentos(
+            self.contenedor(),
+            "SELECT * FROM c WHERE c.id = @id",
+            [{"name": "@id", "value": respuesta_id}]
+        )
+        return encontradas[0] if encontradas else None
+
+    def eliminar(self, respuesta):
+        """Elimina una respuesta; basta con que traiga id y el campo de partición"""
+        return servicio_cosmos.eliminar_documento(
+            self.contenedor(), respuesta['id'], self.particion_de(respuesta)
+        )
+
+
+# Instancia global del repositorio
+repositorio_respuestas = RepositorioRespuestas()
@@ -0,0 +1,360 @@
+"""
+Almacenamiento local (disco) en lugar de Azure Blob Storage para pruebas sin Azure
+
+Con AZURE_STORAGE_BACKEND=local, ServicioAzureStorage y ServicioAzureStorageAsync
+crean un ClienteBlobLocal en lugar de BlobServiceClient. Imita la parte del SDK
+que usan (get_container_client, exists, create_container, list_blobs,
+get_blob_client, upload_blob, download_blob, delete_blob) con los mismos
+errores (404 y 409), así las rutas de recursos y de subida de videos corren
+igual que contra Azure. Cada contenedor es un directorio dentro de
+AZURE_STORAGE_LOCAL_RUTA y cada blob un archivo.
+
+- Las subidas se copian por fragmentos a un archivo temporal y se publican con
+  un rename atómico: nunca se carga el archivo completo en memoria y una
+  lectura concurrente ve el archivo anterior o el nuevo, nunca uno a medias.
+- Las URL con SAS se reemplazan por URL firmadas con HMAC-SHA256 (SECRET_KEY)
+  con permiso y vencimiento (sp, se, sig, como un SAS) que sirve la ruta
+  /api/almacenamiento (rutas/almacenamiento_local.py) con soporte de Range.
+- Cada operación registra duración y bytes en /api/metricas igual que los
+  ganchos del cliente de Azure.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import re
+import tempfile
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote, urlencode
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from servicios.metricas import registrar_llamada_storage
+
+# Prefijo de la ruta que sirve los blobs (ver rutas/almacenamiento_local.py)
+RUTA_DESCARGA = '/api/almacenamiento'
+
+# Tamaño de los fragmentos de lectura y escritura
+TAMANO_FRAGMENTO = 4 * 1024 * 1024
+
+# Directorio de archivos temporales de subida, dentro de la raíz y fuera de los contenedores
+DIRECTORIO_TEMPORAL = '.subidas'
+
+# Mismas reglas que los nombres de contenedor de Azure
+_NOMBRE_CONTENEDOR = re.compile(r'^[a-z0-9](?!.*--)[a-z0-9-]{1,61}[a-z0-9]$')
+
+
+def _ruta_segura(raiz, nombre):
+    """Ruta de un blob dentro de raiz; rechaza nombres que salgan del contenedor"""
+    partes = nombre.split('/') if nombre else []
+    if not partes or any(parte in ('', '.', '..') for parte in partes) or '\\' in nombre or '\x00' in nombre:
+        raise ValueError(f"Nombre de blob no válido: {nombre!r}")
+    return os.path.join(raiz, *partes)
+
+
+def _fecha_archivo(estado):
+    return datetime.fromtimestamp(estado.st_mtime, tz=timezone.utc)
+
+
+class PropiedadesBlob:
+    """Equivalente a BlobProperties con los campos que usa la aplicación"""
+
+    def __init__(self, name, size, last_modified):
+        self.name = name
+        self.size = size
+        self.last_modified = last_modified
+
+
+class DescargaLocal:
+    """Equivalente a StorageStreamDownloader: lee el archivo por fragmentos"""
+
+    def __init__(self, blob, ruta):
+        self.blob = blob
+        self.ruta = ruta
+        self.size = os.path.getsize(ruta)
+
+    def chunks(self):
+        inicio = time.perf_counter()
+        leidos = 0
+        try:
+            with open(self.ruta, 'rb') as archivo:
+                while fragmento := archivo.read(TAMANO_FRAGMENTO):
+                    leidos += len(fragmento)
+                    yield fragmento
+        finally:
+            self.blob._registrar('GET', inicio, recibidos=leidos)
+
+    def readall(self):
+        return b''.join(self.chunks())
+
+    def readinto(self, destino):
+        leidos = 0
+        for fragmento in self.chunks():
+            destino.write(fragmento)
+            leidos += len(fragmento)
+        return leidos
+
+
+class BlobLocal:
+    """Equivalente a BlobClient sobre un archivo"""
+
+    def __init__(self, contenedor, nombre):
+        self.contenedor = contenedor
+        self.cliente = contenedor.cliente
+        self.container_name = contenedor.container_name
+        self.blob_name = nombre
+        self.ruta = _ruta_segura(contenedor.ruta, nombre)
+
+    @property
+    def url(self):
+        """URL sin firma (como la de un blob privado: responde 403 sin sp/se/sig)"""
+        return self.cliente.url_blob(self.container_name, self.blob_name)
+
+    def _registrar(self, metodo, inicio, enviados=0, recibidos=0):
+        if self.cliente.con_metricas:
+            registrar_llamada_storage(metodo, time.perf_counter() - inicio, enviados, recibidos)
+
+    def _verificar_contenedor(self):
+        if not os.path.isdir(self.contenedor.ruta):
+            raise ResourceNotFoundError(f"El contenedor {self.container_name} no existe")
+
+    def exists(self, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return os.path.isfile(self.ruta)
+        finally:
+            self._registrar('HEAD', inicio)
+
+    def upload_blob(self, data, overwrite=False, **kwargs):
+        """Copia data (bytes, str, archivo o iterable de bytes) por fragmentos y publica el archivo"""
+        inicio = time.perf_counter()
+        self._verificar_contenedor()
+        os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+
+        descriptor, temporal = tempfile.mkstemp(dir=self.cliente.ruta_temporal)
+        escritos = 0
+        try:
+            with os.fdopen(descriptor, 'wb') as archivo:
+                if isinstance(data, str):
+                    data = data.encode('utf-8')
+                if isinstance(data, (bytes, bytearray, memoryview)):
+                    archivo.write(data)
+                    escritos = len(data)
+                elif hasattr(data, 'read'):
+                    while fragmento := data.read(TAMANO_FRAGMENTO):
+                        archivo.write(fragmento)
+                        escritos += len(fragmento)
+                else:
+                    for fragmento in data:
+                        archivo.write(fragmento)
+                        escritos += len(fragmento)
+
+            if overwrite:
+                os.replace(temporal, self.ruta)
+            else:
+                # link falla si el destino ya existe: sin carrera entre verificar y publicar
+                try:
+                    os.link(temporal, self.ruta)
+                except FileExistsError:
+                    raise ResourceExistsError(f"El blob {self.blob_name} ya existe")
+        finally:
+            if os.path.exists(temporal):
+                os.unlink(temporal)
+            self._registrar('PUT', inicio, enviados=escritos)
+
+        return {'last_modified': _fecha_archivo(os.stat(self.ruta))}
+
+    def download_blob(self, **kwargs):
+        if not os.path.isfile(self.ruta):
+            raise ResourceNotFoundError(f"El blob {self.blob_name} no existe")
+        return DescargaLocal(self, self.ruta)
+
+    def delete_blob(self, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            os.unlink(self.ruta)
+        except FileNotFoundError:
+            raise ResourceNotFoundError(f"El blob {self.blob_name} no existe")
+        finally:
+            self._registrar('DELETE', inicio)
+
+    def url_firmada(self, duracion):
+        """URL de lectura firmada que vence en duracion (timedelta), el equivalente al SAS"""
+        return self.cliente.url_firmada(self.container_name, self.blob_name, duracion)
+
+
+class ContenedorLocal:
+    """Equivalente a ContainerClient sobre un directorio"""
+
+    def __init__(self, cliente, nombre):
+        if not _NOMBRE_CONTENEDOR.match(nombre):
+            raise ValueError(f"Nombre de contenedor no válido: {nombre!r}")
+        self.cliente = cliente
+        self.container_name = nombre
+        self.ruta = os.path.join(cliente.ruta, nombre)
+
+    def exists(self, **kwargs):
+        return os.path.isdir(self.ruta)
+
+    def create_container(self, **kwargs):
+        try:
+            os.mkdir(self.ruta)
+        except FileExistsError:
+            raise ResourceExistsError(f"El contenedor {self.container_name} ya existe")
+        return self
+
+    def get_blob_client(self, blob):
+        return BlobLocal(self, blob)
+
+    def list_blobs(self, name_starts_with=None, **kwargs):
+        """Blobs en orden lexicográfico, como los lista Azure (los nombres con / son subdirectorios)"""
+        inicio = time.perf_counter()
+        if not os.path.isdir(self.ruta):
+            raise ResourceNotFoundError(f"El contenedor {self.container_name} no existe")
+
+        blobs = []
+        for directorio, _, archivos in os.walk(self.ruta):
+            relativo = os.path.relpath(directorio, self.ruta)
+            for archivo in archivos:
+                nombre = archivo if relativo == '.' else f"{relativo.replace(os.sep, '/')}/{archivo}"
+                if name_starts_with and not nombre.startswith(name_starts_with):
+                    continue
+                try:
+                    estado = os.stat(os.path.join(directorio, archivo))
+                except FileNotFoundError:
+                    continue  # eliminado mientras se listaba
+                blobs.append(PropiedadesBlob(nombre, estado.st_size, _fecha_archivo(estado)))
+
+        blobs.sort(key=lambda blob: blob.name)
+        if self.cliente.con_metricas:
+            registrar_llamada_storage('GET', time.perf_counter() - inicio)
+        return iter(blobs)
+
+
+class ClienteBlobLocal:
+    """Equivalente a BlobServiceClient sobre un directorio raíz
+
+    También firma y verifica las URL de descarga.
+    """
+
+    def __init__(self, ruta, clave, url_base='', con_metricas=True):
+        self.ruta = os.path.abspath(ruta)
+        self.ruta_temporal = os.path.join(self.ruta, DIRECTORIO_TEMPORAL)
+        self.clave = clave.encode('utf-8')
+        self.url_base = url_base.rstrip('/')
+        self.con_metricas = con_metricas
+        os.makedirs(self.ruta_temporal, exist_ok=True)
+
+    def get_container_client(self, container):
+        return ContenedorLocal(self, container)
+
+    def ruta_blob(self, contenedor, nombre):
+        """Ruta del archivo de un blob, o None si el contenedor o el nombre no son válidos"""
+        try:
+            return _ruta_segura(ContenedorLocal(self, contenedor).ruta, nombre)
+        except ValueError:
+            return None
+
+    def url_blob(self, contenedor, nombre):
+        return f"{self.url_base}{RUTA_DESCARGA}/{contenedor}/{quote(nombre)}"
+
+    def _firma(self, contenedor, nombre, permiso, vencimiento):
+        mensaje = f"{permiso}\n{vencimiento}\n/{contenedor}/{nombre}".encode('utf-8')
+        digesto = hmac.new(self.clave, mensaje, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digesto).decode('ascii').rstrip('=')
+
+    def url_firmada(self, contenedor, nombre, duracion, permiso='r'):
+        vencimiento = int(time.time() + duracion.total_seconds())
+        parametros = {'sp': permiso, 'se': vencimiento, 'sig': self._firma(contenedor, nombre, permiso, vencimiento)}
+        return f"{self.url_blob(contenedor, nombre)}?{urlencode(parametros)}"
+
+    def verificar_firma(self, contenedor, nombre, parametros, permiso='r'):
+        """Valida sp/se/sig de una URL firmada. Retorna (valida, segundos hasta el vencimiento)"""
+        try:
+            vencimiento = int(parametros.get('se', ''))
+        except ValueError:
+            return False, 0
+        if permiso not in parametros.get('sp', ''):
+            return False, 0
+        esperada = self._firma(contenedor, nombre, parametros.get('sp', ''), vencimiento)
+        if not hmac.compare_digest(esperada, parametros.get('sig', '')):
+            return False, 0
+        restante = vencimiento - int(time.time())
+        return restante > 0, restante
+
+
+# ---------------------------------------------------------------------------
+# Variante asíncrona (servicios/azure_storage_async.py): el disco se usa en un hilo
+# ---------------------------------------------------------------------------
+
+class DescargaLocalAsync:
+
+    def __init__(self, descarga):
+        self.descarga = descarga
+        self.size = descarga.size
+
+    async def readall(self):
+        return await asyncio.to_thread(self.descarga.readall)
+
+
+class BlobLocalAsync:
+
+    def __init__(self, blob):
+        self.blob = blob
+        self.url = blob.url
+
+    async def exists(self, **kwargs):
+        return await asyncio.to_thread(self.blob.exists)
+
+    async def upload_blob(self, data, overwrite=False, **kwargs):
+        return await asyncio.to_thread(self.blob.upload_blob, data, overwrite)
+
+    async def download_blob(self, **kwargs):
+        return DescargaLocalAsync(await asyncio.to_thread(self.blob.download_blob))
+
+    async def delete_blob(self, **kwargs):
+        await asyncio.to_thread(self.blob.delete_blob)
+
+    def url_firmada(self, duracion):
+        return self.blob.url_firmada(duracion)
+
+
+class ContenedorLocalAsync:
+
+    def __init__(self, contenedor):
+        self.contenedor = contenedor
+        self.container_name = contenedor.container_name
+
+    async def exists(self, **kwargs):
+        return self.contenedor.exists()
+
+    async def create_container(self, **kwargs):
+        self.contenedor.create_container()
+        return self
+
+    def get_blob_client(self, blob):
+        return BlobLocalAsync(self.contenedor.get_blob_client(blob))
+
+    async def list_blobs(self, name_starts_with=None, **kwargs):
+        for blob in await asyncio.to_thread(self.contenedor.list_blobs, name_starts_with):
+            yield blob
+
+
+class ClienteBlobLocalAsync(ClienteBlobLocal):
+
+    def get_container_client(self, container):
+        return ContenedorLocalAsync(ContenedorLocal(self, container))
+
+    async def close(self):
+        pass
+
+
+def crear_cliente_local(config, con_metricas=True, asincrono=False):
+    """Cliente local en AZURE_STORAGE_LOCAL_RUTA, con URL firmadas con SECRET_KEY"""
+    clase = ClienteBlobLocalAsync if asincrono else ClienteBlobLocal
+    return clase(
+        config['AZURE_STORAGE_LOCAL_RUTA'],
+        config['SECRET_KEY'],
+        config['AZURE_STORAGE_LOCAL_URL_BASE'],
+        con_metricas and config['METRICAS_HABILITADAS']
+    )
@@ -0,0 +1,112 @@
+"""
+Sesión HTTP compartida (pool de conexiones) para CosmosDB, Blob Storage, MSAL y Graph
+
+Sin esto cada cliente usa su propio transporte con los valores por defecto y la
+llamada a Graph del login abre una conexión TCP+TLS nueva cada vez. Aquí hay
+una sola requests.Session por proceso, con un pool de conexiones por host
+(HTTP_POOL_POR_HOST), timeouts de conexión y lectura y keep-alive TCP para que
+las conexiones inactivas del pool no las corte en silencio el balanceador de
+Azure (unos 4 minutos sin tráfico).
+
+Con gunicorn cada worker es un proceso con su propio pool: el total de
+conexiones abiertas por host es workers × HTTP_POOL_POR_HOST. Con --preload
+crear_app corre en el proceso maestro antes del fork; para que los workers no
+compartan sockets, el pool se vacía en cada proceso hijo después del fork y
+cada worker abre sus propias conexiones en el primer uso.
+"""
+import os
+import socket
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from azure.core.pipeline.transport import RequestsTransport
+
+
+class _AdaptadorHTTP(HTTPAdapter):
+    """HTTPAdapter con keep-alive TCP en los sockets del pool"""
+
+    def __init__(self, keepalive_segundos=0, **kwargs):
+        self.keepalive_segundos = keepalive_segundos
+        super().__init__(**kwargs)
+
+    def _opciones_socket(self):
+        opciones = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)]
+        if self.keepalive_segundos > 0:
+            opciones.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+            # No disponibles en todas las plataformas (p. ej. TCP_KEEPIDLE en macOS)
+            for nombre, valor in (('TCP_KEEPIDLE', self.keepalive_segundos),
+                                  ('TCP_KEEPINTVL', max(self.keepalive_segundos // 4, 1)),
+                                  ('TCP_KEEPCNT', 4)):
+                if hasattr(socket, nombre):
+                    opciones.append((socket.IPPROTO_TCP, getattr(socket, nombre), valor))
+        return opciones
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = self._opciones_socket()
+        super().init_poolmanager(*args, **kwargs)
+
+
+class TransporteHTTP:
+    """Sesión HTTP del proceso y transportes de azure-core que la comparten"""
+
+    def __init__(self):
+        self.sesion = None
+        self.timeout_conexion = 5
+        self.timeout_lectura = 60
+
+    def configurar(self, config):
+        """Crea la sesión con la configuración de la aplicación (una vez por proceso)"""
+        self.timeout_conexion = config['HTTP_TIMEOUT_CONEXION_S']
+        self.timeout_lectura = config['HTTP_TIMEOUT_LECTURA_S']
+
+        sesion = requests.Session()
+        # Sin reintentos en el adaptador: los SDK de Azure tienen sus propias políticas
+        adaptador = _AdaptadorHTTP(
+            keepalive_segundos=config['HTTP_KEEPALIVE_S'],
+            pool_connections=config['HTTP_POOL_HOSTS'],
+            pool_maxsize=config['HTTP_POOL_POR_HOST'],
+            max_retries=Retry(total=False, redirect=False, raise_on_status=False)
+        )
+        sesion.mount('https://', adaptador)
+        sesion.mount('http://', adaptador)
+        self.sesion = sesion
+
+    @property
+    def timeout(self):
+        """(conexión, lectura) para requests"""
+        return (self.timeout_conexion, self.timeout_lectura)
+
+    def transporte_azure(self):
+        """Transporte para CosmosClient/BlobServiceClient sobre la sesión compartida
+
+        Retorna {} si no se configuró, para que el cliente use su transporte por defecto.
+        """
+        if self.sesion is None:
+            return {}
+        return {
+            'transport': RequestsTransport(
+                session=self.sesion,
+                session_owner=False,
+                connection_timeout=self.timeout_conexion,
+                read_timeout=self.timeout_lectura
+            ),
+            # CosmosDB reemplaza el timeout de conexión del transporte por el suyo en cada petición
+            'connection_timeout': self.timeout_conexion
+        }
+
+    def obtener(self, url, **kwargs):
+        """GET con la sesión compartida (o requests.get si no se configuró)"""
+        kwargs.setdefault('timeout', self.timeout)
+        return (self.sesion or requests).get(url, **kwargs)
+
+    def _vaciar_pool(self):
+        if self.sesion is not None:
+            self.sesion.close()
+
+
+# Instancia global del transporte
+transporte_http = TransporteHTTP()
+
+# Tras un fork (gunicorn --preload) el hijo no debe reutilizar los sockets del padre
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=transporte_http._vaciar_pool)
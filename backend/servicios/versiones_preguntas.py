@@ -0,0 +1,269 @@
+"""
+Versiones inmutables de las preguntas de cada cuestionario
+
+Al crear, editar o eliminar una pregunta se publica el conjunto de preguntas
+activas del cuestionario como una versión identificada por el hash de su
+contenido. Cada versión es un documento del contenedor de configuración
+(tipo='version_preguntas', id='<cuestionario_id>:<hash>') que no se modifica
+nunca; otro documento (tipo='version_preguntas_actual', id=<cuestionario_id>)
+apunta a la versión vigente. Leer las preguntas son dos lecturas puntuales en
+lugar de una consulta con ORDER BY, y la versión se sirve con
+Cache-Control: immutable.
+
+Los intentos calificados en el servidor guardan el hash en version_preguntas,
+así el detalle se arma con las preguntas que vio el usuario. Al publicar se
+conservan las últimas VERSIONES_PREGUNTAS_CONSERVAR versiones del cuestionario
+y cualquier otra que algún intento guardado referencie; las demás se eliminan.
+"""
+from datetime import datetime, timedelta
+from azure.cosmos import exceptions
+from flask import current_app
+from servicios.cache import CacheLRU
+from servicios.cosmos_db import servicio_cosmos
+from utilidades.http_cache import etag_de_contenido
+
+TIPO_VERSION = 'version_preguntas'
+TIPO_VERSION_ACTUAL = 'version_preguntas_actual'
+
+CONSULTA_ACTIVAS = """
+    SELECT * FROM c
+    WHERE c.cuestionario_id = @cuestionario_id
+    AND c.activo = true
+    ORDER BY c.orden ASC
+"""
+
+CONSULTA_CUESTIONARIOS = """
+    SELECT DISTINCT c.cuestionario_id, c.cuestionario_titulo
+    FROM c
+    WHERE c.activo = true
+"""
+
+CONSULTA_VERSIONES = """
+    SELECT c.id, c.hash, c.fecha_publicacion FROM c
+    WHERE c.cuestionario_id = @cuestionario_id
+"""
+
+# Versiones (entre las candidatas a eliminar) que referencia algún intento guardado
+CONSULTA_REFERENCIADAS = """
+    SELECT DISTINCT VALUE c.version_preguntas FROM c
+    WHERE c.cuestionario_id = @cuestionario_id
+    AND ARRAY_CONTAINS(@hashes, c.version_preguntas)
+"""
+
+# Las versiones no cambian: se recuerdan en el proceso sin depender del TTL
+# de la caché de CosmosDB
+TTL_VERSIONES = 24 * 3600
+# Reintentos cuando otra publicación modificó el puntero entre la lectura y la escritura (412)
+MAX_REINTENTOS_CONFLICTO = 3
+
+
+def _sin_campos_sistema(documento):
+    """Quita _rid, _etag, _ts, etc.: cambian con cada escritura aunque el contenido sea igual"""
+    return {campo: valor for campo, valor in documento.items() if not campo.startswith('_')}
+
+
+def id_version(cuestionario_id, hash_version):
+    return f'{cuestionario_id}:{hash_version}'
+
+
+def listar_cuestionarios():
+    """Cuestionarios con preguntas activas (cuestionario_id y cuestionario_titulo)"""
+    return servicio_cosmos.consultar_documentos(
+        current_app.config['COSMOS_CONTAINER_PREGUNTAS'], CONSULTA_CUESTIONARIOS
+    )
+
+
+class RepositorioVersionesPreguntas:
+    """Publicación y lectura de las versiones de preguntas de cada cuestionario"""
+
+    def __init__(self):
+        self._versiones = CacheLRU(max_entradas=64)
+
+    def _contenedor(self):
+        return current_app.config['COSMOS_CONTAINER_CONFIGURACION']
+
+    def publicar(self, cuestionario_id, permitir_vacia=True):
+        """Publica las preguntas activas del cuestionario como versión vigente
+
+        Debe llamarse tras modificar sus preguntas. Si el contenido no cambió
+        el hash es el mismo y la versión se reutiliza. Retorna el hash, o None
+        si no se pudo guardar (o si no hay preguntas y permitir_vacia es False).
+        """
+        # La fecha es la de la consulta: entre dos publicaciones simultáneas
+        # el puntero queda en la que leyó las preguntas más recientes
+        fecha = datetime.utcnow().isoformat()
+        preguntas = [
+            _sin_campos_sistema(pregunta)
+            for pregunta in servicio_cosmos.consultar_documentos(
+                current_app.config['COSMOS_CONTAINER_PREGUNTAS'], CONSULTA_ACTIVAS,
+                [{"name": "@cuestionario_id", "value": cuestionario_id}],
+                partition_key=cuestionario_id, usar_cache=False
+            )
+        ]
+        if not preguntas and not permitir_vacia:
+            return None
+        hash_version = etag_de_contenido(preguntas)
+
+        version = servicio_cosmos.actualizar_documento(self._contenedor(), {
+            'id': id_version(cuestionario_id, hash_version),
+            'tipo': TIPO_VERSION,
+            'cuestionario_id': cuestionario_id,
+            'hash': hash_version,
+            'preguntas': preguntas,
+            'fecha_publicacion': fecha
+        })
+        if not version or not self._apuntar(cuestionario_id, hash_version, len(preguntas), fecha):
+            return None
+
+        self._depurar(cuestionario_id)
+        return hash_version
+
+    def _apuntar(self, cuestionario_id, hash_version, total_preguntas, fecha):
+        """Actualiza el puntero a la versión vigente si la publicación es posterior
+
+        La escritura se condiciona al _etag leído: si otra publicación cambió
+        el puntero entre la lectura y la escritura se vuelve a leer y comparar,
+        hasta MAX_REINTENTOS_CONFLICTO veces. No se escribe si el puntero ya
+        tiene una fecha_publicacion igual o posterior. Retorna False si no se
+        pudo escribir.
+        """
+        for _ in range(MAX_REINTENTOS_CONFLICTO + 1):
+            actual = servicio_cosmos.leer_documento(
+                self._contenedor(), cuestionario_id, TIPO_VERSION_ACTUAL, usar_cache=False
+            )
+            if actual and actual.get('fecha_publicacion', '') >= fecha:
+                return True
+
+            if not actual:
+                creado = servicio_cosmos.crear_documento(self._contenedor(), {
+                    'id': cuestionario_id,
+                    'tipo': TIPO_VERSION_ACTUAL,
+                    'hash': hash_version,
+                    'total_preguntas': total_preguntas,
+                    'fecha_publicacion': fecha
+                })
+                if creado:
+                    return True
+                # Otra publicación lo creó (409): se compara con la suya
+                continue
+
+            try:
+                servicio_cosmos.parchear_documento(
+                    self._contenedor(), cuestionario_id, TIPO_VERSION_ACTUAL, [
+                        {'op': 'set', 'path': '/hash', 'value': hash_version},
+                        {'op': 'set', 'path': '/total_preguntas', 'value': total_preguntas},
+                        {'op': 'set', 'path': '/fecha_publicacion', 'value': fecha}
+                    ], etag=actual.get('_etag')
+                )
+                return True
+            except exceptions.CosmosAccessConditionFailedError:
+                continue
+            except exceptions.CosmosHttpResponseError as e:
+                print(f"Error al actualizar la versión vigente de {cuestionario_id}: {str(e)}")
+                return False
+
+        return False
+
+    def _depurar(self, cuestionario_id):
+        """Elimina las versiones que ya no se necesitan
+
+        Se conservan las últimas VERSIONES_PREGUNTAS_CONSERVAR (por
+        fecha_publicacion), las reemplazadas hace menos de
+        CALIFICACION_CACHE_TTL (otros procesos pueden seguir calificando con
+        ellas) y las que referencia algún intento guardado. Si alguna consulta
+        falla no se elimina nada.
+        """
+        conservar = current_app.config['VERSIONES_PREGUNTAS_CONSERVAR']
+        if conservar <= 0:
+            return
+        try:
+            versiones = sorted(
+                servicio_cosmos.iterar_documentos(
+                    self._contenedor(), CONSULTA_VERSIONES,
+                    [{"name": "@cuestionario_id", "value": cuestionario_id}],
+                    partition_key=TIPO_VERSION
+                ),
+                key=lambda version: version.get('fecha_publicacion', ''), reverse=True
+            )
+            if len(versiones) <= conservar:
+                return
+
+            limite = (datetime.utcnow()
+                      - timedelta(seconds=current_app.config['CALIFICACION_CACHE_TTL'])).isoformat()
+            # Una versión dejó de ser vigente cuando se publicó la siguiente
+            candidatas = [
+                version for siguiente, version in zip(versiones[conservar - 1:], versiones[conservar:])
+                if siguiente.get('fecha_publicacion', '') < limite
+            ]
+            if not candidatas:
+                return
+
+            contenedor_respuestas = current_app.config['COSMOS_CONTAINER_RESPUESTAS']
+            particionado = servicio_cosmos.claves_particion.get(contenedor_respuestas) == 'cuestionario_id'
+            referenciadas = set(servicio_cosmos.iterar_documentos(
+                contenedor_respuestas, CONSULTA_REFERENCIADAS, [
+                    {"name": "@cuestionario_id", "value": cuestionario_id},
+                    {"name": "@hashes", "value": [version['hash'] for version in candidatas]}
+                ],
+                partition_key=cuestionario_id if particionado else None
+            ))
+        except exceptions.CosmosHttpResponseError as e:
+            print(f"Error al depurar las versiones de {cuestionario_id}: {str(e)}")
+            return
+
+        for version in candidatas:
+            if version['hash'] not in referenciadas:
+                servicio_cosmos.eliminar_documento(self._contenedor(), version['id'], TIPO_VERSION)
+
+    def hash_actual(self, cuestionario_id):
+        """Hash de la versión vigente; la publica si el cuestionario aún no tiene
+
+        Retorna None si el cuestionario no tiene versión ni preguntas activas
+        (no se publican versiones vacías de cuestionarios inexistentes).
+        """
+        actual = servicio_cosmos.leer_documento(self._contenedor(), cuestionario_id, TIPO_VERSION_ACTUAL)
+        if actual:
+            return actual['hash']
+
+        return self.publicar(cuestionario_id, permitir_vacia=False)
+
+    def _recordar(self, cuestionario_id, hash_version, documento):
+        if not documento:
+            return None
+        self._versiones.guardar((cuestionario_id, hash_version), documento['preguntas'], TTL_VERSIONES)
+        return documento['preguntas']
+
+    def obtener_version(self, cuestionario_id, hash_version):
+        """Preguntas de una versión, o None si no existe"""
+        encontrado, preguntas = self._versiones.obtener((cuestionario_id, hash_version))
+        if encontrado:
+            return preguntas
+
+        documento = servicio_cosmos.leer_documento(
+            self._contenedor(), id_version(cuestionario_id, hash_version), TIPO_VERSION
+        )
+        return self._recordar(cuestionario_id, hash_version, documento)
+
+    async def obtener_actual_async(self, servicio_async, configuracion, cuestionario_id):
+        """Versión para el modo ASGI: retorna (hash, preguntas) de la versión vigente
+
+        Retorna (None, None) si el cuestionario aún no tiene versión; publicar
+        requiere el contexto de Flask y lo hace la primera lectura síncrona.
+        """
+        contenedor = configuracion['COSMOS_CONTAINER_CONFIGURACION']
+        actual = await servicio_async.leer_documento(contenedor, cuestionario_id, TIPO_VERSION_ACTUAL)
+        if not actual:
+            return None, None
+
+        hash_version = actual['hash']
+        encontrado, preguntas = self._versiones.obtener((cuestionario_id, hash_version))
+        if not encontrado:
+            documento = await servicio_async.leer_documento(
+                contenedor, id_version(cuestionario_id, hash_version), TIPO_VERSION
+            )
+            preguntas = self._recordar(cuestionario_id, hash_version, documento)
+        return (hash_version, preguntas) if preguntas is not None else (None, None)
+
+
+# Instancia global del repositorio
+repositorio_versiones = RepositorioVersionesPreguntas()
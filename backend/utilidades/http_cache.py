@@ -0,0 +1,120 @@
+"""
+Utilidades de caché HTTP: ETag fuertes, Cache-Control y respuestas 304
+
+Cada recurso cacheable se identifica con una clave (p. ej. 'configuracion' o
+'preguntas:<cuestionario_id>'). El último ETag emitido se recuerda en memoria
+durante HTTP_CACHE_TTL_VALIDADOR segundos, así una petición condicional cuyo
+If-None-Match coincide se responde con 304 sin leer CosmosDB.
+
+Con comprimir=True (y HTTP_GZIP_PRECOMPRIMIDO) el cuerpo se comprime con gzip
+una sola vez por ETag y se reutiliza en las peticiones siguientes; la
+representación comprimida lleva el ETag con el sufijo '-gzip'.
+"""
+import gzip
+import hashlib
+import json
+from flask import Response, current_app, jsonify, request
+from servicios.cache import CacheLRU
+
+_validadores = CacheLRU(max_entradas=512)
+# Cuerpos comprimidos por ETag: el ETag identifica el contenido, no vencen por cambios
+_comprimidos = CacheLRU(max_entradas=64)
+TTL_COMPRIMIDOS = 3600
+SUFIJO_GZIP = '-gzip'
+
+
+def etag_de_contenido(datos):
+    """ETag fuerte a partir del contenido serializado de forma canónica"""
+    serializado = json.dumps(datos, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(serializado.encode('utf-8')).hexdigest()[:32]
+
+
+def etag_derivado(etag_cosmos, variante):
+    """ETag fuerte para una representación derivada de un documento de CosmosDB
+
+    La variante distingue representaciones distintas del mismo documento
+    (p. ej. la configuración completa y solo sus documentos).
+    """
+    return hashlib.sha256(f'{etag_cosmos}:{variante}'.encode('utf-8')).hexdigest()[:32]
+
+
+def _cache_control():
+    return f"public, max-age={current_app.config['HTTP_CACHE_MAX_AGE']}, must-revalidate"
+
+
+def _respuesta_304(etag):
+    respuesta = Response(status=304)
+    respuesta.set_etag(etag)
+    respuesta.headers['Cache-Control'] = _cache_control()
+    return respuesta
+
+
+def _coincide(etag):
+    """ETag de la representación que el cliente ya tiene (con o sin gzip), o None"""
+    for candidato in (etag, f'{etag}{SUFIJO_GZIP}'):
+        if request.if_none_match.contains(candidato):
+            return candidato
+    return None
+
+
+def _acepta_gzip():
+    return current_app.config['HTTP_GZIP_PRECOMPRIMIDO'] and 'gzip' in request.accept_encodings
+
+
+def _cuerpo_comprimido(etag, datos):
+    encontrado, cuerpo = _comprimidos.obtener(etag)
+    if not encontrado:
+        cuerpo = gzip.compress(current_app.json.dumps(datos).encode('utf-8'))
+        _comprimidos.guardar(etag, cuerpo, TTL_COMPRIMIDOS)
+    return cuerpo
+
+
+def responder_304_si_vigente(recurso):
+    """Retorna una respuesta 304 si el If-None-Match coincide con el ETag recordado del recurso
+
+    Retorna None si no hay validador vigente o no coincide; en ese caso el
+    handler debe leer los datos y llamar a responder_con_etag.
+    """
+    if not request.if_none_match:
+        return None
+
+    encontrado, etag = _validadores.obtener(recurso)
+    if encontrado:
+        etag_cliente = _coincide(etag)
+        if etag_cliente:
+            return _respuesta_304(etag_cliente)
+    return None
+
+
+def responder_con_etag(recurso, datos, etag=None, comprimir=False):
+    """Responde los datos con ETag y Cache-Control, o 304 si el cliente ya los tiene
+
+    Si no se indica etag se calcula a partir del contenido. Con comprimir=True
+    y un cliente que acepta gzip se envía el cuerpo precomprimido.
+    """
+    etag = etag or etag_de_contenido(datos)
+    _validadores.guardar(recurso, etag, current_app.config['HTTP_CACHE_TTL_VALIDADOR'])
+
+    etag_cliente = _coincide(etag)
+    if etag_cliente:
+        return _respuesta_304(etag_cliente)
+
+    if comprimir and _acepta_gzip():
+        respuesta = Response(_cuerpo_comprimido(etag, datos), mimetype='application/json')
+        respuesta.headers['Content-Encoding'] = 'gzip'
+        respuesta.set_etag(f'{etag}{SUFIJO_GZIP}')
+    else:
+        respuesta = jsonify(datos)
+        respuesta.set_etag(etag)
+    if comprimir:
+        respuesta.vary.add('Accept-Encoding')
+    respuesta.headers['Cache-Control'] = _cache_control()
+    return respuesta
+
+
+def invalidar_validador(recurso):
+    """Olvida el ETag recordado de un recurso y de sus variantes ('<recurso>:...')
+
+    Debe llamarse tras modificar el recurso.
+    """
+    _validadores.invalidar(lambda clave: clave == recurso or clave.startswith(f'{recurso}:'))
@@ -0,0 +1,77 @@
+"""
+Utilidades para paginar listados con ?limit=&cursor=
+"""
+import base64
+import json
+from flask import request
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 1000
+
+
+def codificar_cursor(posicion):
+    """Convierte la posición donde termina una página en un cursor opaco para URLs (sin relleno '=')"""
+    if posicion is None:
+        return None
+    texto = json.dumps(posicion, separators=(',', ':'), ensure_ascii=False)
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Recupera la posición guardada en el cursor
+
+    Retorna None si no se envió cursor. Lanza ValueError si está vacío o no
+    es un cursor emitido por la API.
+    """
+    if cursor is None:
+        return None
+    try:
+        relleno = cursor + '=' * (-len(cursor) % 4)
+        texto = base64.b64decode(relleno.encode('ascii'), altchars=b'-_', validate=True).decode('utf-8')
+        return json.loads(texto)
+    except (ValueError, UnicodeError):
+        raise ValueError('Cursor inválido')
+
+
+def estado_error_cosmos(error):
+    """Código HTTP para un CosmosHttpResponseError al leer una página
+
+    400 si CosmosDB rechazó la consulta (p. ej. por los valores del cursor),
+    503 si está saturado o no disponible y 500 en otro caso.
+    """
+    if error.status_code == 400:
+        return 400
+    if error.status_code in (429, 503):
+        return 503
+    return 500
+
+
+def solicita_vista_completa():
+    """Indica si el listado debe traer los documentos completos (?vista=completa) en vez del resumen"""
+    return request.args.get('vista') == 'completa'
+
+
+def solicita_paginacion():
+    """Indica si la petición actual trae parámetros de paginación"""
+    return 'limit' in request.args or 'cursor' in request.args
+
+
+def obtener_parametros_paginacion():
+    """Lee limit y cursor de la petición actual
+
+    Retorna una tupla (limite, posicion), con la posición decodificada del
+    cursor (None en la primera página). Lanza ValueError si los parámetros no
+    son válidos.
+    """
+    try:
+        limite = int(request.args.get('limit', LIMITE_POR_DEFECTO))
+    except ValueError:
+        raise ValueError('El parámetro limit debe ser un número entero')
+
+    if limite < 1:
+        raise ValueError('El parámetro limit debe ser mayor que cero')
+
+    limite = min(limite, LIMITE_MAXIMO)
+    posicion = decodificar_cursor(request.args.get('cursor'))
+
+    return limite, posicion
@@ -0,0 +1,82 @@
+"""
+Utilidades para responder listados grandes en streaming (NDJSON o arreglo JSON)
+
+Cada documento se serializa en cuanto el iterador de CosmosDB lo entrega, así
+la memoria por petición no depende del tamaño del contenedor.
+"""
+import itertools
+import json
+from flask import Response, request, stream_with_context
+
+TIPO_NDJSON = 'application/x-ndjson'
+_SIN_DOCUMENTOS = object()
+
+
+def _serializar(documento):
+    return json.dumps(documento, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def solicita_ndjson():
+    """Indica si el cliente pidió NDJSON (?formato=ndjson o Accept: application/x-ndjson)"""
+    if request.args.get('formato') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best == TIPO_NDJSON
+
+
+def generar_ndjson(documentos):
+    """Genera una línea JSON por documento"""
+    try:
+        for documento in documentos:
+            yield _serializar(documento) + '\n'
+    except Exception as e:
+        # Los encabezados ya se enviaron: se informa el error como última línea
+        print(f"Error durante el streaming NDJSON: {str(e)}")
+        yield _serializar({'error': str(e)}) + '\n'
+
+
+def generar_arreglo_json(documentos, clave=None, contar=False):
+    """Genera un arreglo JSON elemento a elemento
+
+    Si se indica clave, el arreglo se envuelve en un objeto ({clave: [...]}) y,
+    con contar=True, se agrega 'total' al final del objeto.
+    """
+    total = 0
+    yield '{"%s":[' % clave if clave else '['
+    try:
+        for documento in documentos:
+            yield (',' if total else '') + _serializar(documento)
+            total += 1
+    except Exception as e:
+        # No se puede cambiar el código de estado: el JSON queda truncado
+        print(f"Error durante el streaming JSON: {str(e)}")
+        return
+
+    if clave and contar:
+        yield '],"total":%d}' % total
+    elif clave:
+        yield ']}'
+    else:
+        yield ']'
+
+
+def responder_en_streaming(documentos, clave=None, contar=False):
+    """Arma la respuesta Flask en NDJSON o arreglo JSON según lo que pida el cliente
+
+    Lee el primer documento antes de crear la respuesta: la consulta a
+    CosmosDB se ejecuta recién en ese momento, y así un error inicial (p. ej.
+    consulta inválida o 429 agotado) se propaga al llamador, que aún puede
+    responder 500 en lugar de un 200 con el cuerpo truncado.
+    """
+    documentos = iter(documentos)
+    primero = next(documentos, _SIN_DOCUMENTOS)
+    if primero is not _SIN_DOCUMENTOS:
+        documentos = itertools.chain([primero], documentos)
+
+    if solicita_ndjson():
+        generador = generar_ndjson(documentos)
+        tipo = TIPO_NDJSON
+    else:
+        generador = generar_arreglo_json(documentos, clave=clave, contar=contar)
+        tipo = 'application/json'
+
+    return Response(stream_with_context(generador), status=200, mimetype=tipo)
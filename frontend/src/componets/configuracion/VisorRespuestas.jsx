@@ -20,8 +20,7 @@ const VisorRespuestas = () => {
   const cargarRespuestas = async () => {
     try {
       setCargando(true)
-      const datos = await adminAPI.obtenerTodasRespuestas()
-      setRespuestas(datos.respuestas || [])
+      await adminAPI.obtenerRespuestasPaginadas(setRespuestas)
     } catch (err) {
       setError(err.message)
     } finally {
@@ -66,10 +65,21 @@ const VisorRespuestas = () => {
     enlace.click()
   }
 
-  const eliminarRespuesta = async (respuestaId, nombreUsuario) => {
+  // El listado trae solo el resumen; el detalle por pregunta se pide al abrir el modal
+  const verDetalle = async (respuesta) => {
+    setRespuestaSeleccionada(respuesta)
+    try {
+      const detalle = await adminAPI.obtenerDetalleRespuesta(respuesta.id, respuesta.cuestionario_id)
+      setRespuestaSeleccionada(detalle)
+    } catch (error) {
+      alert(`Error al cargar el detalle: ${error.message}`)
+    }
+  }
+
+  const eliminarRespuesta = async (respuestaId, cuestionarioId, nombreUsuario) => {
     if (window.confirm(`¿Estás seguro de eliminar la respuesta de ${nombreUsuario}? Esta acción no se puede deshacer.`)) {
       try {
-        await adminAPI.eliminarRespuesta(respuestaId)
+        await adminAPI.eliminarRespuesta(respuestaId, cuestionarioId)
         await cargarRespuestas() // Recargar la lista
         alert('Respuesta eliminada exitosamente')
       } catch (error) {
@@ -179,14 +189,14 @@ const VisorRespuestas = () => {
 
               <div className="card-actions">
                 <button
-                  onClick={() => setRespuestaSeleccionada(respuesta)}
+                  onClick={() => verDetalle(respuesta)}
                   className="btn-ver-detalle"
                 >
                   <FaEye />
                   Ver Detalle
                 </button>
                 <button
-                  onClick={() => eliminarRespuesta(respuesta.id, respuesta.nombre || 'Sin nombre')}
+                  onClick={() => eliminarRespuesta(respuesta.id, respuesta.cuestionario_id, respuesta.nombre || 'Sin nombre')}
                   className="btn-eliminar-respuesta"
                   title="Eliminar respuesta"
                 >
@@ -251,6 +261,7 @@ const DetalleRespuesta = ({ respuesta, onCerrar }) => {
 
           <div className="respuestas-detalle">
             <h5>Respuestas por Pregunta</h5>
+            {!respuesta.respuestas && <p>Cargando detalle...</p>}
             {respuesta.respuestas?.map((resp, index) => (
               <div key={index} className={`pregunta-detalle ${resp.es_correcta ? 'correcta' : 'incorrecta'}`}>
                 <div className="pregunta-numero">#{resp.orden}</div>
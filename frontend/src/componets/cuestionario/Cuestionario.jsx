@@ -4,7 +4,7 @@ import { useCuestionario } from '../../hooks/useCuestionario'
 import { preguntasAPI } from '../../servicios/api'
 import './Cuestionario.css'
 
-export const Cuestionario = ({ cuestionarioId = 'cuestionario_gestion_procesos', nombre }) => {
+export const Cuestionario = ({ cuestionarioId = 'cuestionario_gestion_procesos', nombre, preguntasIniciales }) => {
   const [respuestas, setRespuestas] = useState({})
   const [preguntaActual, setPreguntaActual] = useState(0)
   const [mostrarResultados, setMostrarResultados] = useState(false)
@@ -26,7 +26,8 @@ export const Cuestionario = ({ cuestionarioId = 'cuestionario_gestion_procesos',
     const cargarPreguntas = async () => {
       try {
         setCargandoPreguntas(true)
-        const preguntasDB = await preguntasAPI.obtenerPreguntas(cuestionarioId)
+        // Las preguntas pueden venir ya en el bundle de la página de inducción
+        const preguntasDB = preguntasIniciales || await preguntasAPI.obtenerPreguntas(cuestionarioId)
 
         // Convertir formato de DB a formato del componente
         const preguntasFormateadas = preguntasDB.map(p => ({
@@ -8,7 +8,7 @@ export const GestionPreguntas = ({ cuestionarioId = 'cuestionario_gestion_proces
   const [preguntas, setPreguntas] = useState([])
   const [modoEdicion, setModoEdicion] = useState(null) // null, 'crear', o ID de pregunta
   const [preguntaActual, setPreguntaActual] = useState(null)
-  const { obtenerPreguntas, crearPregunta, actualizarPregunta, eliminarPregunta, inicializarDatos, cargando, error } = useGestionPreguntas(cuestionarioId)
+  const { obtenerPreguntas, crearPregunta, actualizarPregunta, eliminarPregunta, aplicarLote, inicializarDatos, cargando, error } = useGestionPreguntas(cuestionarioId)
 
   useEffect(() => {
     cargarPreguntas()
@@ -133,12 +133,14 @@ export const GestionPreguntas = ({ cuestionarioId = 'cuestionario_gestion_proces
     nuevasPreguntasArray[index] = nuevasPreguntasArray[nuevoIndex]
     nuevasPreguntasArray[nuevoIndex] = preguntaActual
 
-    // Actualizar orden en la base de datos
-    const promesas = nuevasPreguntasArray.map((p, idx) =>
-      actualizarPregunta(p.id, { ...p, orden: idx + 1 })
-    )
+    // Actualizar en una sola petición el orden de las preguntas que cambiaron
+    const operaciones = nuevasPreguntasArray
+      .map((p, idx) => ({ op: 'reordenar', id: p.id, orden: idx + 1 }))
+      .filter((operacion, idx) => nuevasPreguntasArray[idx].orden !== operacion.orden)
 
-    await Promise.all(promesas)
+    if (operaciones.length > 0) {
+      await aplicarLote(operaciones)
+    }
     await cargarPreguntas()
   }
 
@@ -3,13 +3,16 @@ import { FaFolder, FaFilePdf, FaFileWord, FaFileExcel, FaFilePowerpoint, FaExter
 import { documentosAPI } from '../../servicios/api'
 import './ListaRecursos.css'
 
-export const ListaRecursos = () => {
-  const [documentos, setDocumentos] = useState([])
-  const [cargando, setCargando] = useState(true)
+export const ListaRecursos = ({ documentosIniciales }) => {
+  const [documentos, setDocumentos] = useState(documentosIniciales || [])
+  const [cargando, setCargando] = useState(!documentosIniciales)
   const [error, setError] = useState(null)
 
   useEffect(() => {
-    cargarDocumentos()
+    // Los documentos ya vienen en el bundle de la página de inducción
+    if (!documentosIniciales) {
+      cargarDocumentos()
+    }
   }, [])
 
   const cargarDocumentos = async () => {
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react'
 import { FaDatabase, FaChartBar, FaUsers, FaClipboardList, FaQuestionCircle, FaSync, FaTrashAlt } from 'react-icons/fa'
 import { useAdminDatos } from '../../hooks/useAdminDatos'
+import { adminAPI } from '../../servicios/api'
 import './VisorContenedores.css'
 
 export const VisorContenedores = () => {
@@ -204,13 +205,24 @@ const VistaSesiones = ({ sesiones, formatearFecha, onVaciar, cargando }) => {
 
 const VistaRespuestas = ({ respuestas, formatearFecha, onVaciar, cargando }) => {
   const [respuestaExpandida, setRespuestaExpandida] = useState(null)
+  // Detalle por pregunta de cada intento, pedido al expandirlo
+  const [detalles, setDetalles] = useState({})
 
   if (respuestas.length === 0) {
     return <div className='mensaje-vacio'>No hay respuestas registradas</div>
   }
 
-  const toggleExpansion = (id) => {
+  const toggleExpansion = async (respuesta) => {
+    const id = respuesta.id
     setRespuestaExpandida(respuestaExpandida === id ? null : id)
+    if (respuestaExpandida === id || detalles[id]) return
+
+    try {
+      const detalle = await adminAPI.obtenerDetalleRespuesta(id, respuesta.cuestionario_id)
+      setDetalles(previos => ({ ...previos, [id]: detalle }))
+    } catch (error) {
+      console.error('Error al cargar el detalle de la respuesta:', error)
+    }
   }
 
   return (
@@ -223,7 +235,7 @@ const VistaRespuestas = ({ respuestas, formatearFecha, onVaciar, cargando }) =>
       </div>
       {respuestas.map((respuesta) => (
         <div key={respuesta.id} className='tarjeta-respuesta'>
-          <div className='encabezado-respuesta' onClick={() => toggleExpansion(respuesta.id)}>
+          <div className='encabezado-respuesta' onClick={() => toggleExpansion(respuesta)}>
             <div className='info-principal'>
               <h4>{respuesta.cuestionario_titulo}</h4>
               <p>Sesión: <code>{respuesta.sesion_id?.substring(0, 8)}...</code></p>
@@ -240,7 +252,8 @@ const VistaRespuestas = ({ respuestas, formatearFecha, onVaciar, cargando }) =>
           {respuestaExpandida === respuesta.id && (
             <div className='detalles-respuesta'>
               <h5>Respuestas Detalladas:</h5>
-              {respuesta.respuestas?.map((r, idx) => (
+              {!detalles[respuesta.id] && <p>Cargando detalle...</p>}
+              {detalles[respuesta.id]?.respuestas?.map((r, idx) => (
                 <div key={idx} className={`detalle-pregunta ${r.es_correcta ? 'correcta' : 'incorrecta'}`}>
                   <p><strong>#{r.orden} - {r.titulo}</strong></p>
                   <p className='texto-pregunta'>{r.pregunta}</p>
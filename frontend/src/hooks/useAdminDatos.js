@@ -17,8 +17,7 @@ export const useAdminDatos = () => {
     setCargando(true)
     setError(null)
     try {
-      const datos = await adminAPI.obtenerTodasRespuestas()
-      setRespuestas(datos.respuestas || [])
+      const datos = await adminAPI.obtenerRespuestasPaginadas(setRespuestas)
       return datos
     } catch (err) {
       setError(err.message)
@@ -63,7 +62,7 @@ export const useAdminDatos = () => {
     setError(null)
     try {
       const [datosRespuestas, datosPreguntas, datosEstadisticas] = await Promise.all([
-        adminAPI.obtenerTodasRespuestas(),
+        adminAPI.obtenerRespuestasPaginadas(setRespuestas),
         adminAPI.obtenerTodasPreguntas(),
         adminAPI.obtenerEstadisticas()
       ])
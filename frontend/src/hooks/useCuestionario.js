@@ -10,91 +10,21 @@ export const useCuestionario = (nombre, cuestionarioId, cuestionarioTitulo) => {
   const [resultado, setResultado] = useState(null)
 
   /**
-   * Convierte las respuestas del componente al formato del backend
+   * Arma el envío compacto {pregunta_id: respuesta}; el backend califica con su
+   * clave de respuestas. Se omiten las preguntas sin responder.
    * @param {Array} preguntas - Array de preguntas con su estructura
    * @param {Object} respuestasUsuario - Objeto con las respuestas del usuario
-   * @returns {Array} - Array formateado para el backend
+   * @returns {Object} - Respuestas por id de pregunta
    */
   const formatearRespuestas = (preguntas, respuestasUsuario) => {
-    return preguntas.map((pregunta, index) => {
+    const respuestas = {}
+    preguntas.forEach(pregunta => {
       const respuestaUsuario = respuestasUsuario[pregunta.id]
-
-      // Determinar respuesta correcta según el tipo
-      let respuestaCorrecta
-      let respuestaUsuarioTexto
-      let esCorrecta = false
-      let tipoPregunta = 'multiple_choice'
-      let opciones = []
-
-      switch (pregunta.tipo) {
-        case 'opcion-multiple':
-          const opcionCorrecta = pregunta.opciones.find(op => op.correcta)
-          respuestaCorrecta = opcionCorrecta?.texto || ''
-          const opcionSeleccionada = pregunta.opciones.find(op => op.id === respuestaUsuario)
-          respuestaUsuarioTexto = opcionSeleccionada?.texto || ''
-          esCorrecta = opcionSeleccionada?.correcta || false
-          opciones = pregunta.opciones?.map(op => op.texto) || []
-          tipoPregunta = 'multiple_choice'
-          break
-
-        case 'opcion-multiple-multi':
-          const opcionesCorrectas = pregunta.opciones.filter(op => op.correcta)
-          respuestaCorrecta = opcionesCorrectas.map(op => op.texto).join(', ')
-          const seleccionadas = Array.isArray(respuestaUsuario) ? respuestaUsuario : []
-          const opcionesSeleccionadas = pregunta.opciones.filter(op => seleccionadas.includes(op.id))
-          respuestaUsuarioTexto = opcionesSeleccionadas.map(op => op.texto).join(', ')
-          // Verificar si todas las correctas están seleccionadas
-          const correctasIds = opcionesCorrectas.map(op => op.id)
-          esCorrecta = seleccionadas.length === correctasIds.length &&
-            seleccionadas.every(id => correctasIds.includes(id))
-          opciones = pregunta.opciones?.map(op => op.texto) || []
-          tipoPregunta = 'multiple_choice_multi'
-          break
-
-        case 'verdadero-falso':
-          respuestaCorrecta = pregunta.respuestaCorrecta ? 'Verdadero' : 'Falso'
-          respuestaUsuarioTexto = respuestaUsuario ? 'Verdadero' : 'Falso'
-          esCorrecta = respuestaUsuario === pregunta.respuestaCorrecta
-          opciones = ['Verdadero', 'Falso']
-          tipoPregunta = 'verdadero_falso'
-          break
-
-        case 'likert':
-          respuestaCorrecta = 'N/A' // No hay respuesta correcta
-          respuestaUsuarioTexto = String(respuestaUsuario || '')
-          esCorrecta = true // Siempre correcta
-          opciones = Array.from(
-            { length: pregunta.escala_max - pregunta.escala_min + 1 },
-            (_, i) => String(pregunta.escala_min + i)
-          )
-          tipoPregunta = 'likert'
-          break
-
-        case 'abierta':
-          respuestaCorrecta = 'N/A' // No hay respuesta correcta
-          respuestaUsuarioTexto = String(respuestaUsuario || '')
-          esCorrecta = true // Siempre correcta
-          opciones = []
-          tipoPregunta = 'texto_libre'
-          break
-
-        default:
-          respuestaCorrecta = ''
-          respuestaUsuarioTexto = ''
-          esCorrecta = false
-      }
-
-      return {
-        orden: index + 1,
-        titulo: `Pregunta ${index + 1}`,
-        pregunta: pregunta.pregunta,
-        tipo_pregunta: tipoPregunta,
-        opciones: opciones,
-        respuesta_correcta: respuestaCorrecta,
-        respuesta_usuario: respuestaUsuarioTexto,
-        es_correcta: esCorrecta
+      if (respuestaUsuario !== undefined && respuestaUsuario !== null) {
+        respuestas[pregunta.id] = respuestaUsuario
       }
     })
+    return respuestas
   }
 
   /**
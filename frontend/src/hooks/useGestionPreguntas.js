@@ -72,6 +72,20 @@ export const useGestionPreguntas = (cuestionarioId) => {
     }
   }
 
+  const aplicarLote = async (operaciones) => {
+    setCargando(true)
+    setError(null)
+    try {
+      const resultado = await preguntasAPI.aplicarLote(cuestionarioId, operaciones)
+      return resultado
+    } catch (err) {
+      setError(err.message)
+      return null
+    } finally {
+      setCargando(false)
+    }
+  }
+
   const inicializarDatos = async () => {
     setCargando(true)
     setError(null)
@@ -91,6 +105,7 @@ export const useGestionPreguntas = (cuestionarioId) => {
     crearPregunta,
     actualizarPregunta,
     eliminarPregunta,
+    aplicarLote,
     inicializarDatos,
     cargando,
     error
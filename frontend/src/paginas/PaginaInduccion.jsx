@@ -6,9 +6,11 @@ import VideoPlayer from '../componets/videoPlayer/VideoPlayer'
 import Cuestionario from '../componets/cuestionario/Cuestionario'
 import ListaRecursos from '../componets/listaRecursos/ListaRecursos'
 import InfoSesion from '../componets/infoSesion/InfoSesion'
-import { configuracionAPI } from '../servicios/api'
+import { configuracionAPI, induccionAPI } from '../servicios/api'
 import './PaginaInduccion.css'
 
+const CUESTIONARIO_ID = 'cuestionario_gestion_procesos'
+
 export const PaginaInduccion = () => {
   const [searchParams] = useSearchParams()
   const [mostrarModalNombre, setMostrarModalNombre] = useState(false)
@@ -16,11 +18,21 @@ export const PaginaInduccion = () => {
   const [nombreTemporal, setNombreTemporal] = useState('')
   const [mensajeError, setMensajeError] = useState('')
   const [configuracion, setConfiguracion] = useState(null)
+  const [bundle, setBundle] = useState(null)
 
   useEffect(() => {
-    // Cargar configuración de inducción
+    // Cargar configuración, documentos y preguntas en una sola petición
     const cargarConfiguracion = async () => {
       try {
+        const datos = await induccionAPI.obtenerBundle(CUESTIONARIO_ID)
+        setBundle(datos)
+        setConfiguracion(datos.configuracion)
+        return
+      } catch (error) {
+        console.error('Error al cargar el bundle de inducción:', error)
+      }
+      try {
+        // Si el bundle falla, cada componente carga lo suyo por separado
         const config = await configuracionAPI.obtenerInduccion()
         setConfiguracion(config)
       } catch (error) {
@@ -103,8 +115,12 @@ export const PaginaInduccion = () => {
             />
           </div>
           <div className='columna-derecha'>
-            <Cuestionario cuestionarioId="cuestionario_gestion_procesos" nombre={nombre} />
-            <ListaRecursos />
+            <Cuestionario
+              cuestionarioId={CUESTIONARIO_ID}
+              nombre={nombre}
+              preguntasIniciales={bundle?.preguntas}
+            />
+            <ListaRecursos documentosIniciales={bundle?.documentos} />
           </div>
         </div>
       </div>
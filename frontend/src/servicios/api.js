@@ -82,9 +82,13 @@ export const verificarSalud = async () => {
 
 // Servicio de Preguntas
 export const preguntasAPI = {
-  // Obtener preguntas de un cuestionario
+  // Obtener preguntas de un cuestionario: se consulta el hash de la versión
+  // vigente y la versión (inmutable) queda en la caché del navegador
   obtenerPreguntas: async (cuestionarioId) => {
-    const response = await fetch(`${API_BASE_URL}/preguntas/cuestionario/${cuestionarioId}`)
+    const respuestaVersion = await fetch(`${API_BASE_URL}/preguntas/cuestionario/${cuestionarioId}/version`)
+    if (respuestaVersion.status === 404) return []
+    const { hash } = await manejarRespuesta(respuestaVersion)
+    const response = await fetch(`${API_BASE_URL}/preguntas/cuestionario/${cuestionarioId}/v/${hash}`)
     return manejarRespuesta(response)
   },
 
@@ -116,6 +120,16 @@ export const preguntasAPI = {
     return manejarRespuesta(response)
   },
 
+  // Aplicar varias operaciones (crear, actualizar, eliminar, reordenar) en una sola petición
+  aplicarLote: async (cuestionarioId, operaciones) => {
+    const response = await fetch(`${API_BASE_URL}/preguntas/cuestionario/${cuestionarioId}/batch`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ operaciones })
+    })
+    return manejarRespuesta(response)
+  },
+
   // Listar todos los cuestionarios disponibles
   listarCuestionarios: async () => {
     const response = await fetch(`${API_BASE_URL}/preguntas/cuestionarios`)
@@ -135,12 +149,27 @@ export const preguntasAPI = {
 export const adminAPI = {
 
 
-  // Obtener todas las respuestas
-  obtenerTodasRespuestas: async () => {
-    const response = await fetch(`${API_BASE_URL}/admin/respuestas/todas`)
+  // Obtener una página de respuestas (usar siguiente_cursor para pedir la siguiente)
+  obtenerTodasRespuestas: async ({ limite = 100, cursor = null } = {}) => {
+    const parametros = new URLSearchParams({ limit: limite })
+    if (cursor) parametros.append('cursor', cursor)
+    const response = await fetch(`${API_BASE_URL}/admin/respuestas/todas?${parametros}`)
     return manejarRespuesta(response)
   },
 
+  // Recorrer todas las páginas de respuestas; onPagina recibe el acumulado tras cada página
+  obtenerRespuestasPaginadas: async (onPagina) => {
+    let acumuladas = []
+    let cursor = null
+    do {
+      const datos = await adminAPI.obtenerTodasRespuestas({ cursor })
+      acumuladas = acumuladas.concat(datos.respuestas || [])
+      cursor = datos.siguiente_cursor
+      if (onPagina) onPagina(acumuladas)
+    } while (cursor)
+    return { total: acumuladas.length, respuestas: acumuladas }
+  },
+
   // Obtener todas las preguntas
   obtenerTodasPreguntas: async () => {
     const response = await fetch(`${API_BASE_URL}/admin/preguntas/todas`)
@@ -155,21 +184,44 @@ export const adminAPI = {
 
 
 
-  // Vaciar contenedor de respuestas
-  vaciarRespuestas: async () => {
+  // Vaciar contenedor de respuestas (trabajo en segundo plano); espera a que termine
+  vaciarRespuestas: async (filtros = {}) => {
     const response = await fetch(`${API_BASE_URL}/admin/respuestas/vaciar`, {
-      method: 'DELETE'
+      method: 'DELETE',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(filtros)
     })
+    const { trabajo } = await manejarRespuesta(response)
+
+    let estado = trabajo
+    while (estado.estado === 'pendiente' || estado.estado === 'en_progreso') {
+      await new Promise(resolver => setTimeout(resolver, 1000))
+      estado = await adminAPI.obtenerEstadoVaciado(trabajo.id)
+    }
+    if (estado.estado === 'fallido') {
+      throw new Error(estado.mensaje || 'Error al vaciar respuestas')
+    }
+    return { ...estado, total_eliminados: estado.eliminados }
+  },
+
+  // Consultar avance de un trabajo de vaciado
+  obtenerEstadoVaciado: async (trabajoId) => {
+    const response = await fetch(`${API_BASE_URL}/admin/respuestas/vaciar/${trabajoId}`)
     return manejarRespuesta(response)
   },
 
-  // Eliminar respuesta individual
-  eliminarRespuesta: async (respuestaId) => {
-    try {
-      console.log('DEBUG: Eliminando respuesta:', respuestaId)
-      console.log('DEBUG: URL:', `${API_BASE_URL}/admin/respuestas/${respuestaId}`)
+  // Obtener un intento completo (los listados solo traen el resumen)
+  obtenerDetalleRespuesta: async (respuestaId, cuestionarioId) => {
+    const consulta = cuestionarioId ? `?cuestionario_id=${encodeURIComponent(cuestionarioId)}` : ''
+    const response = await fetch(`${API_BASE_URL}/admin/respuestas/${respuestaId}${consulta}`)
+    return manejarRespuesta(response)
+  },
 
-      const response = await fetch(`${API_BASE_URL}/admin/respuestas/${respuestaId}`, {
+  // Eliminar respuesta individual (el cuestionario_id permite una lectura puntual en el backend)
+  eliminarRespuesta: async (respuestaId, cuestionarioId) => {
+    try {
+      const consulta = cuestionarioId ? `?cuestionario_id=${encodeURIComponent(cuestionarioId)}` : ''
+      const response = await fetch(`${API_BASE_URL}/admin/respuestas/${respuestaId}${consulta}`, {
         method: 'DELETE',
         credentials: 'include',
         headers: {
@@ -177,9 +229,6 @@ export const adminAPI = {
         }
       })
 
-      console.log('DEBUG: Response status:', response.status)
-      console.log('DEBUG: Response headers:', response.headers)
-
       return manejarRespuesta(response)
     } catch (error) {
       console.error('ERROR: En eliminarRespuesta:', error)
@@ -241,6 +290,15 @@ export const documentosAPI = {
   }
 }
 
+// API de la página de inducción
+export const induccionAPI = {
+  // Configuración, documentos, cuestionarios y preguntas en una sola petición
+  obtenerBundle: async (cuestionarioId) => {
+    const response = await fetch(`${API_BASE_URL}/induccion/bundle?cuestionario_id=${encodeURIComponent(cuestionarioId)}`)
+    return manejarRespuesta(response)
+  }
+}
+
 // API de Configuración de Inducción
 export const configuracionAPI = {
   // Obtener configuración de inducción